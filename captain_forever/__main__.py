@@ -1,25 +1,16 @@
 # pylint: disable=no-member
 # pylint: disable=no-name-in-module
+# pylint: disable=unused-import
 # Disabling pylint warnings related to PyGame that aren't valid
+# Disabling unused import because importing startup starts its clock
 """
 Main file that executes our game and initializes classes.
+
+Run with --help to see the headless and profiling options.
 """
-import pygame
-from game import CaptainForever
-from controller import ArrowController
-from view import PyGameView
+# imported first so the startup timeline includes every other import
+from startup import startup_timeline
+from cli import main
 
 if __name__ == "__main__":
-    pygame.init()
-    WIDTH = 1082
-    HEIGHT = 720
-    screen = pygame.display.set_mode((WIDTH, HEIGHT))
-    pygame.display.set_caption("Captain Forever")
-    captain_forever_game_instance = CaptainForever(WIDTH, HEIGHT)
-    captain_forever_controller = ArrowController(
-        captain_forever_game_instance, WIDTH, HEIGHT
-    )
-    captain_forever_view = PyGameView(captain_forever_game_instance, screen)
-    captain_forever_game_instance.main_loop(
-        captain_forever_controller, captain_forever_view
-    )
+    main()
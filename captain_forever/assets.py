@@ -0,0 +1,242 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# Disabling pylint warnings related to PyGame that aren't valid
+"""
+Registry of loaded PyGame surfaces that accounts for their memory and keeps
+caches of derived surfaces within budget.
+"""
+import sys
+from collections import OrderedDict
+from pygame.mask import Mask
+
+
+def surface_bytes(surface):
+    """
+    Return the number of bytes of pixel data held by a surface, or of bits
+    held by a collision mask.
+
+    Args:
+        surface: PyGame surface or mask.
+
+    Returns:
+        Int, bytes used by the surface's pixels or the mask's bits.
+    """
+    if isinstance(surface, Mask):
+        width, height = surface.get_size()
+        return -(-width // 8) * height
+    return surface.get_pitch() * surface.get_height()
+
+
+class SurfaceRegistry:
+    """
+    Hold cached surfaces in named caches and account for their memory by
+    cache, by asset and by variant of an asset.
+
+    Assets loaded from disk live in the "sprites" cache and are kept for the
+    whole run, as are the pre-rendered frames in the "particles" cache.
+    Surfaces derived from them, like rotations and tints, can be rebuilt at
+    any time, so those caches can be given a budget in bytes and the least
+    recently used surfaces that nothing else holds are evicted to stay
+    within it. Surfaces still in use, like the tinted sprite NPC ships
+    keep, are never evicted, since dropping them would free no memory and
+    the next request would build an untracked second copy. Collision masks
+    of sprites and their rotations are derived the same way and live in the
+    "masks" cache, under the same keys as the rotations they come from, and
+    sprites scaled down for rendering at a lower resolution live in "zooms".
+
+    Constants:
+        CACHES: Tuple of strings, names of every cache.
+        DERIVED_CACHES: Tuple of strings, caches that can be given a budget.
+
+    Attributes:
+        _caches: Dict, maps cache names to OrderedDicts of key to
+        (asset, variant, surface, bytes) tuples in least recently used order.
+        _cache_bytes: Dict, maps cache names to bytes currently held.
+        _budgets: Dict, maps derived cache names to their budget in bytes or
+        None for no limit.
+        _evictions: Dict, maps cache names to the number of surfaces evicted.
+    """
+
+    CACHES = ("sprites", "particles", "tints", "rotations", "masks", "zooms")
+    DERIVED_CACHES = ("tints", "rotations", "masks", "zooms")
+
+    def __init__(self, budgets=None):
+        """
+        Initialize SurfaceRegistry.
+
+        Args:
+            budgets: Dict, maps derived cache names to budgets in bytes.
+            Caches not given have no limit.
+        """
+        self._caches = {cache: OrderedDict() for cache in self.CACHES}
+        self._cache_bytes = dict.fromkeys(self.CACHES, 0)
+        self._budgets = dict.fromkeys(self.DERIVED_CACHES)
+        self._evictions = dict.fromkeys(self.CACHES, 0)
+        for cache, budget in (budgets or {}).items():
+            self.set_budget(cache, budget)
+
+    @property
+    def budgets(self):
+        """
+        Return _budgets.
+
+        Returns:
+            _budgets: Dict, maps derived cache names to budgets in bytes.
+        """
+        return self._budgets
+
+    @property
+    def evictions(self):
+        """
+        Return _evictions.
+
+        Returns:
+            _evictions: Dict, maps cache names to surfaces evicted so far.
+        """
+        return self._evictions
+
+    def set_budget(self, cache, budget):
+        """
+        Set the budget of a derived cache, evicting surfaces if it is over.
+
+        Args:
+            cache: String, name of a derived cache.
+            budget: Int, budget in bytes, or None for no limit.
+
+        Raises:
+            ValueError: If cache is not a derived cache.
+        """
+        if cache not in self.DERIVED_CACHES:
+            raise ValueError(
+                f"Only derived caches {self.DERIVED_CACHES} have budgets,"
+                f" not {cache!r}"
+            )
+        self._budgets[cache] = budget
+        self._enforce_budget(cache)
+
+    def get(self, cache, key):
+        """
+        Return a cached surface and mark it as recently used.
+
+        Args:
+            cache: String, name of the cache.
+            key: Hashable key the surface was stored under.
+
+        Returns:
+            The cached PyGame surface, or None if it is not cached.
+        """
+        entries = self._caches[cache]
+        entry = entries.get(key)
+        if entry is None:
+            return None
+        entries.move_to_end(key)
+        return entry[2]
+
+    def put(self, cache, key, asset, variant, surface):
+        """
+        Store a surface, evicting older ones if the cache goes over budget.
+
+        Args:
+            cache: String, name of the cache.
+            key: Hashable key to store the surface under.
+            asset: String, name of the sprite the surface comes from.
+            variant: String, describes how the surface differs from the
+            sprite on disk, such as "scaled" or "green".
+            surface: PyGame surface to store.
+
+        Returns:
+            The stored surface.
+        """
+        self.evict(cache, key)
+        size = surface_bytes(surface)
+        self._caches[cache][key] = (asset, variant, surface, size)
+        self._cache_bytes[cache] += size
+        if cache in self._budgets:
+            self._enforce_budget(cache)
+        return surface
+
+    def evict(self, cache, key):
+        """
+        Drop a surface from a cache if it is there.
+
+        Args:
+            cache: String, name of the cache.
+            key: Hashable key the surface was stored under.
+        """
+        entry = self._caches[cache].pop(key, None)
+        if entry is not None:
+            self._cache_bytes[cache] -= entry[3]
+
+    def _enforce_budget(self, cache):
+        """
+        Evict least recently used surfaces that are not in use until a
+        cache is within budget. A cache whose surfaces are all in use stays
+        over budget, which is the memory they really hold.
+
+        Args:
+            cache: String, name of a derived cache.
+        """
+        budget = self._budgets[cache]
+        if budget is None:
+            return
+        entries = self._caches[cache]
+        for key in list(entries):
+            if self._cache_bytes[cache] <= budget:
+                break
+            entry = entries[key]
+            # the entry and the call's argument are the only references to
+            # a surface nothing else holds
+            if sys.getrefcount(entry[2]) > 2:
+                continue
+            del entries[key]
+            self._cache_bytes[cache] -= entry[3]
+            self._evictions[cache] += 1
+
+    def clear(self, cache=None):
+        """
+        Drop every surface from one cache, or from all of them.
+
+        Args:
+            cache: String, name of the cache to clear, or None for all.
+        """
+        for name in (cache,) if cache else self.CACHES:
+            self._caches[name].clear()
+            self._cache_bytes[name] = 0
+
+    def usage_by_cache(self):
+        """
+        Return the bytes currently held in each cache.
+
+        Returns:
+            Dict mapping cache names to ints.
+        """
+        return dict(self._cache_bytes)
+
+    def usage(self):
+        """
+        Return a breakdown of the memory currently held.
+
+        Returns:
+            Dict with the "total" bytes, bytes per "cache", per "asset" and
+            per "variant" (as "asset/variant"), each cache's "budget" and
+            the number of "evictions" from each cache.
+        """
+        by_asset = {}
+        by_variant = {}
+        for entries in self._caches.values():
+            for asset, variant, _, size in entries.values():
+                by_asset[asset] = by_asset.get(asset, 0) + size
+                name = f"{asset}/{variant}"
+                by_variant[name] = by_variant.get(name, 0) + size
+        return {
+            "total": sum(self._cache_bytes.values()),
+            "cache": dict(self._cache_bytes),
+            "asset": by_asset,
+            "variant": by_variant,
+            "budget": dict(self._budgets),
+            "evictions": dict(self._evictions),
+        }
+
+
+# shared registry so every sprite load and derived surface is accounted for
+registry = SurfaceRegistry({"tints": 4 * 2**20, "rotations": 16 * 2**20})
@@ -0,0 +1,702 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# pylint: disable=protected-access
+# Disabling pylint warnings related to PyGame that aren't valid
+# Disabling protected access because scenarios set up game state directly
+"""
+Benchmark suite that times the game's hot paths in scripted scenarios.
+
+Run the suite and store the results as JSON with
+
+    python benchmark.py run --output baseline.json
+
+then compare a later run against that baseline with
+
+    python benchmark.py compare baseline.json current.json
+
+which exits with status 1 if any benchmark got slower than the threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+from time import perf_counter, strftime
+import pygame
+from pygame.math import Vector2
+from game import CaptainForever
+from models import Bullet, Ship, NPCShip, StaticObject
+from modular import build_modular_ship
+from utils import load_sprite
+from assets import registry
+from view import PyGameView, print_text
+from observations import ObservationRasterizer
+from scheduler import AIScheduler
+from sectors import SectorWorld
+from startup import measure_startup
+
+WIDTH = 1082
+HEIGHT = 720
+SPRITE_NAMES = (
+    "asteroid",
+    "background",
+    "bullet",
+    "fire",
+    "player",
+    "player_ship",
+    "ship",
+    "space_background",
+)
+
+
+def time_calls(func, runs, setup=None):
+    """
+    Time repeated calls of a function.
+
+    Args:
+        func: Callable with no arguments, the code being timed.
+        runs: Int, number of times to call func.
+        setup: Callable with no arguments run untimed before each call, or
+        None.
+
+    Returns:
+        List of floats, duration of each call in ms.
+    """
+    samples = []
+    for _ in range(runs):
+        if setup is not None:
+            setup()
+        start = perf_counter()
+        func()
+        samples.append((perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(samples):
+    """
+    Reduce timing samples to summary statistics.
+
+    Args:
+        samples: List of floats, durations in ms.
+
+    Returns:
+        Dict with the run count and mean, median, p95, min and max in ms.
+    """
+    ordered = sorted(samples)
+    return {
+        "runs": len(ordered),
+        "mean_ms": statistics.fmean(ordered),
+        "median_ms": statistics.median(ordered),
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "min_ms": ordered[0],
+        "max_ms": ordered[-1],
+    }
+
+
+def _new_game(
+    precise_collisions=False, flow_field=False, ai_scheduler=None, world=None
+):
+    """
+    Create a game that keeps its current enemies and does not spawn more.
+
+    Args:
+        precise_collisions: Bool, whether the game checks collisions pixel
+        by pixel.
+        flow_field: Bool, whether NPC ships steer by a flow field.
+        ai_scheduler: AIScheduler instance to spread NPC decisions with, or
+        None.
+        world: SectorWorld instance to play in, or None.
+
+    Returns:
+        An instance of CaptainForever.
+    """
+    game = CaptainForever(
+        WIDTH,
+        HEIGHT,
+        seed=0,
+        precise_collisions=precise_collisions,
+        flow_field=flow_field,
+        ai_scheduler=ai_scheduler,
+        world=world,
+    )
+    # pushing the spawn counter far negative stops reinforcements arriving
+    game._enemy_spawn_counter = -(10**9)
+    return game
+
+
+def _keep_playing(game, player_ship):
+    """
+    Undo the end of the game so a scenario keeps exercising the hot paths.
+
+    Args:
+        game: An instance of CaptainForever.
+        player_ship: Ship instance to put back if the player was destroyed.
+    """
+    if game.message:
+        game._message = ""
+        game._message_flag = ""
+        game.player_ship = player_ship
+
+
+def _scatter(count, top, bottom):
+    """
+    Return evenly spread positions inside a horizontal band of the screen.
+
+    Args:
+        count: Int, number of positions.
+        top: Int, top edge of the band.
+        bottom: Int, bottom edge of the band.
+
+    Returns:
+        List of (x, y) tuples.
+    """
+    columns = max(1, int((count * WIDTH / (bottom - top)) ** 0.5))
+    rows = -(-count // columns)
+    return [
+        (
+            (index % columns + 0.5) * WIDTH / columns,
+            top + (index // columns + 0.5) * (bottom - top) / rows,
+        )
+        for index in range(count)
+    ]
+
+
+def idle_world():
+    """
+    Build a freshly started game with nobody pressing anything.
+
+    Returns:
+        An instance of CaptainForever.
+    """
+    return _new_game()
+
+
+def npc_sustained_fire():
+    """
+    Build a game with 8 NPC ships that shoot at the player every tick.
+
+    Returns:
+        An instance of CaptainForever.
+    """
+    game = _new_game()
+    game._npc_ships[:] = [
+        NPCShip(position, "ship", game.npc_bullets.append)
+        for position in _scatter(8, 0, 120)
+    ]
+    game.player_ship._health = 10**9
+    return game
+
+
+def _bullets(count, precise_collisions=False):
+    """
+    Build a game with count player bullets and count NPC bullets drifting
+    across the top of the screen, away from every ship.
+
+    Args:
+        count: Int, number of bullets of each kind.
+        precise_collisions: Bool, whether the game checks collisions pixel
+        by pixel.
+
+    Returns:
+        An instance of CaptainForever.
+    """
+    game = _new_game(precise_collisions)
+    game._npc_ships[:] = [
+        NPCShip(position, "ship", game.npc_bullets.append)
+        for position in _scatter(3, 620, 720)
+    ]
+    for position in _scatter(count, 0, 200):
+        game.bullets.append(Bullet(position, Vector2(0.01, 0)))
+        game.npc_bullets.append(Bullet(position, Vector2(-0.01, 0)))
+    return game
+
+
+def _on_player(game, count):
+    """
+    Put NPC bullets on the player ship's opaque pixels until it has count
+    of them, so every bullet passes the circle test and, with precise
+    collisions, is checked against the ship's mask as well.
+
+    Args:
+        game: An instance of CaptainForever.
+        count: Int, number of NPC bullets to keep on the player ship.
+    """
+    player_ship = game.player_ship
+    mask, corner = player_ship.get_mask()
+    width, height = mask.get_size()
+    pixels = [
+        corner + Vector2(x, y)
+        for y in range(height)
+        for x in range(width)
+        if mask.get_at((x, y))
+        and player_ship.position.distance_to(corner + Vector2(x, y))
+        < player_ship.radius
+    ]
+    for index in range(len(game.npc_bullets), count):
+        game.npc_bullets.append(
+            Bullet(pixels[index * 7 % len(pixels)], Vector2(0, 0))
+        )
+
+
+def bullets_1k():
+    """
+    Build a game with a thousand player bullets drifting across the top of
+    the screen and a thousand NPC bullets hitting the player ship.
+
+    Returns:
+        An instance of CaptainForever.
+    """
+    game = _bullets(1000)
+    game.npc_bullets.clear()
+    game.player_ship._health = 10**9
+    _on_player(game, 1000)
+    return game
+
+
+def bullets_1k_precise():
+    """
+    Build bullets_1k in a game that checks collisions pixel by pixel.
+
+    Returns:
+        An instance of CaptainForever.
+    """
+    game = _bullets(1000, precise_collisions=True)
+    game.prepare_collision_masks()
+    game.npc_bullets.clear()
+    game.player_ship._health = 10**9
+    _on_player(game, 1000)
+    return game
+
+
+def bullets_10k():
+    """
+    Build a game with ten thousand bullets of each kind.
+
+    Returns:
+        An instance of CaptainForever.
+    """
+    return _bullets(10000)
+
+
+def debris_5000():
+    """
+    Build a game with a thousand bullets of each kind and five thousand
+    pieces of debris at rest between them and the NPC ships, far enough
+    from the bullets to be in other cells of the collision grid.
+
+    Returns:
+        An instance of CaptainForever.
+    """
+    game = _bullets(1000)
+    game._debris[:] = [
+        StaticObject(position, "asteroid")
+        for position in _scatter(5000, 260, 600)
+    ]
+    game._sort_sleepers()
+    return game
+
+
+def npcs_500():
+    """
+    Build a game with 500 NPC ships spread over the screen.
+
+    Returns:
+        An instance of CaptainForever.
+    """
+    game = _new_game()
+    game._npc_ships[:] = [
+        NPCShip(position, "ship", game.npc_bullets.append)
+        for position in _scatter(500, 0, HEIGHT)
+    ]
+    game.player_ship._health = 10**9
+    return game
+
+
+def npcs_500_scheduled():
+    """
+    Build a game with 500 NPC ships spread over the screen, whose decisions
+    are spread over ticks within a 1 ms budget.
+
+    Returns:
+        An instance of CaptainForever.
+    """
+    game = _new_game(ai_scheduler=AIScheduler(budget_us=1000))
+    game._npc_ships[:] = [
+        NPCShip(position, "ship", game.npc_bullets.append)
+        for position in _scatter(500, 0, HEIGHT)
+    ]
+    game.player_ship._health = 10**9
+    return game
+
+
+def npcs_2000_flow():
+    """
+    Build a game with 2000 NPC ships spread over the screen, steering by a
+    flow field.
+
+    Returns:
+        An instance of CaptainForever.
+    """
+    game = _new_game(flow_field=True)
+    game._npc_ships[:] = [
+        NPCShip(position, "ship", game.npc_bullets.append)
+        for position in _scatter(2000, 0, HEIGHT)
+    ]
+    game.player_ship._health = 10**9
+    return game
+
+
+def sectors_travel():
+    """
+    Build a game in a sector world with the player flying fast enough to
+    enter a new sector every 18 ticks.
+
+    Returns:
+        An instance of CaptainForever.
+    """
+    game = _new_game(world=SectorWorld(WIDTH, HEIGHT, budget_bytes=64 * 1024))
+    game.player_ship._velocity = Vector2(60, 0)
+    game.player_ship._health = 10**9
+    return game
+
+
+def modular_ships_40():
+    """
+    Build a game with 40 NPC ships of 60 parts each across the bottom of the
+    screen and a thousand player bullets drifting across the top.
+
+    Returns:
+        An instance of CaptainForever.
+    """
+    game = _new_game()
+    generator = random.Random(0)
+    game._npc_ships[:] = [
+        build_modular_ship(position, game.npc_bullets.append, 60, generator)
+        for position in _scatter(40, 420, HEIGHT)
+    ]
+    for position in _scatter(1000, 0, 200):
+        game.bullets.append(Bullet(position, Vector2(0.01, 0)))
+    game.player_ship._health = 10**9
+    return game
+
+
+def explosions_40():
+    """
+    Build a game with 40 explosions going off at once.
+
+    Returns:
+        An instance of CaptainForever.
+    """
+    game = _new_game()
+    _keep_exploding(game)
+    return game
+
+
+def _keep_exploding(game, explosions=40):
+    """
+    Set off explosions until the game is showing the given number at once.
+
+    Args:
+        game: An instance of CaptainForever.
+        explosions: Int, number of simultaneous explosions to keep going.
+    """
+    missing = explosions - len(game.particles) // 24
+    for position in _scatter(max(0, missing), 100, 600):
+        game.particles.emit_explosion(position)
+
+
+# scenarios that run the simulation and render it every tick
+WORLD_SCENARIOS = {
+    "idle_world": idle_world,
+    "npc_sustained_fire": npc_sustained_fire,
+    "bullets_1k": bullets_1k,
+    "bullets_1k_precise": bullets_1k_precise,
+    "bullets_10k": bullets_10k,
+    "debris_5000": debris_5000,
+    "npcs_500": npcs_500,
+    "npcs_500_scheduled": npcs_500_scheduled,
+    "npcs_2000_flow": npcs_2000_flow,
+    "explosions_40": explosions_40,
+    "modular_ships_40": modular_ships_40,
+    "sectors_travel": sectors_travel,
+}
+SCENARIOS = (
+    *WORLD_SCENARIOS,
+    "rapid_restarts",
+    "asset_cold_load",
+    "cold_start",
+)
+
+
+def bench_world(build, screen, ticks):
+    """
+    Time the game logic, the view and making observations for a scenario
+    world.
+
+    Args:
+        build: Callable returning the scenario's CaptainForever instance.
+        screen: PyGame surface the view draws on.
+        ticks: Int, number of ticks to time each function over.
+
+    Returns:
+        Dict mapping timed function names to summary statistics.
+    """
+    game = build()
+    player_ship = game.player_ship
+    view = PyGameView(game, screen, max_fps=0)
+    results = {}
+
+    def logic_tick():
+        game._process_game_logic()
+        _keep_playing(game, player_ship)
+
+    # keeps sustained fire, explosions and hits going for every timed tick
+    def reload_npcs():
+        for npc_ship in game.npc_ships:
+            npc_ship._shooting_delay = 1000
+        if build is explosions_40:
+            _keep_exploding(game)
+        elif build in (bullets_1k, bullets_1k_precise):
+            _on_player(game, 1000)
+
+    results["process_game_logic"] = summarize(
+        time_calls(logic_tick, ticks, reload_npcs)
+    )
+    results["view_draw"] = summarize(time_calls(view.draw, ticks))
+    rasterizer = ObservationRasterizer(WIDTH, HEIGHT)
+    results["observe_grid"] = summarize(
+        time_calls(lambda: rasterizer.rasterize(game), ticks)
+    )
+    results["observe_features"] = summarize(
+        time_calls(lambda: rasterizer.features(game), ticks)
+    )
+    return results
+
+
+def bench_components(screen, ticks):
+    """
+    Time Ship.draw and print_text on their own.
+
+    Args:
+        screen: PyGame surface to draw on.
+        ticks: Int, number of calls to time each function over.
+
+    Returns:
+        Dict mapping timed function names to summary statistics.
+    """
+    ship = NPCShip((400, 400), "ship", [].append)
+    ship.rotate()
+    player_ship = Ship((400, 400), [].append, "player", True, False)
+    font = pygame.font.Font(None, 64)
+    message = (
+        "You won! \n To exit, press escape \n To start a new game, press enter"
+    )
+    return {
+        "npc_ship_draw": summarize(
+            time_calls(lambda: ship.draw(screen), ticks, ship.rotate)
+        ),
+        "player_ship_draw": summarize(
+            time_calls(lambda: player_ship.draw(screen), ticks)
+        ),
+        "print_text": summarize(
+            time_calls(lambda: print_text(screen, message, font), ticks)
+        ),
+    }
+
+
+def bench_rapid_restarts(ticks):
+    """
+    Time restarting the game over and over.
+
+    Args:
+        ticks: Int, number of restarts to time.
+
+    Returns:
+        Dict mapping timed function names to summary statistics.
+    """
+    game = _new_game()
+    return {"restart": summarize(time_calls(game.restart, ticks))}
+
+
+def bench_asset_cold_load(ticks):
+    """
+    Time loading each sprite from disk with an empty surface cache.
+
+    Args:
+        ticks: Int, number of loads to time per sprite.
+
+    Returns:
+        Dict mapping "load_sprite:<name>" to summary statistics.
+    """
+    return {
+        f"load_sprite:{name}": summarize(
+            time_calls(
+                lambda name=name: load_sprite(name, True, True),
+                ticks,
+                registry.clear,
+            )
+        )
+        for name in SPRITE_NAMES
+    }
+
+
+def bench_cold_start(runs):
+    """
+    Time launching the game in a new process until its first frame.
+
+    Args:
+        runs: Int, number of launches.
+
+    Returns:
+        Dict mapping "time_to_first_frame" and "<phase>_done" to summary
+        statistics of the ms from launch to the end of each phase.
+    """
+    samples = {}
+    for _ in range(runs):
+        for phase, elapsed in measure_startup(["--no-sound"]).items():
+            samples.setdefault(phase, []).append(elapsed)
+    timings = {
+        f"{phase}_done": summarize(values) for phase, values in samples.items()
+    }
+    timings["time_to_first_frame"] = timings.pop("first_frame_done")
+    return timings
+
+
+def run_benchmarks(scenarios=SCENARIOS, ticks=120):
+    """
+    Run the chosen scenarios under the SDL dummy video driver.
+
+    Args:
+        scenarios: Iterable of scenario names to run.
+        ticks: Int, number of timed calls per benchmark.
+
+    Returns:
+        Dict with "meta" describing the run, "results" mapping
+        "<scenario>.<function>" to summary statistics and "surfaces"
+        mapping each scenario to the surface registry's memory usage after
+        it ran.
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    results = {}
+    surfaces = {}
+    for scenario in scenarios:
+        if scenario in WORLD_SCENARIOS:
+            timings = bench_world(WORLD_SCENARIOS[scenario], screen, ticks)
+            if scenario == "idle_world":
+                timings.update(bench_components(screen, ticks))
+        elif scenario == "rapid_restarts":
+            timings = bench_rapid_restarts(ticks)
+        elif scenario == "asset_cold_load":
+            timings = bench_asset_cold_load(max(1, ticks // 10))
+        elif scenario == "cold_start":
+            timings = bench_cold_start(max(1, ticks // 40))
+        else:
+            raise ValueError(f"Unknown scenario: {scenario}")
+        for name, summary in timings.items():
+            results[f"{scenario}.{name}"] = summary
+        surfaces[scenario] = registry.usage()
+    return {
+        "meta": {
+            "timestamp": strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pygame": pygame.version.ver,
+            "platform": platform.platform(),
+            "ticks": ticks,
+        },
+        "results": results,
+        "surfaces": surfaces,
+    }
+
+
+def compare_results(baseline, current, threshold=0.10, statistic="median_ms"):
+    """
+    Compare two benchmark runs.
+
+    Args:
+        baseline: Dict, stored output of run_benchmarks.
+        current: Dict, new output of run_benchmarks.
+        threshold: Float, fractional slowdown that counts as a regression.
+        statistic: String, summary statistic to compare.
+
+    Returns:
+        List of (name, baseline_ms, current_ms, change, regressed) tuples
+        for benchmarks present in both runs, where change is the fractional
+        difference from the baseline.
+    """
+    comparisons = []
+    for name, summary in sorted(current["results"].items()):
+        if name not in baseline["results"]:
+            continue
+        baseline_ms = baseline["results"][name][statistic]
+        current_ms = summary[statistic]
+        change = (current_ms - baseline_ms) / baseline_ms if baseline_ms else 0
+        comparisons.append(
+            (name, baseline_ms, current_ms, change, change > threshold)
+        )
+    return comparisons
+
+
+def main(argv=None):
+    """
+    Run or compare benchmarks from the command line.
+
+    Args:
+        argv: List of strings, command line arguments without the program
+        name, or None to use sys.argv.
+
+    Returns:
+        Int, exit status.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the benchmark suite")
+    run_parser.add_argument("--output", default="benchmark.json")
+    run_parser.add_argument("--ticks", type=int, default=120)
+    run_parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=SCENARIOS,
+        help="scenario to run, can be repeated (default: all)",
+    )
+    compare_parser = commands.add_parser(
+        "compare", help="flag regressions against a baseline"
+    )
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10)
+    compare_parser.add_argument("--statistic", default="median_ms")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        report = run_benchmarks(args.scenario or SCENARIOS, args.ticks)
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(report, output_file, indent=2)
+        for name, summary in report["results"].items():
+            print(f"{name:45} {summary['median_ms']:10.3f} ms")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)
+    with open(args.current, encoding="utf-8") as current_file:
+        current = json.load(current_file)
+    regressions = 0
+    for name, baseline_ms, current_ms, change, regressed in compare_results(
+        baseline, current, args.threshold, args.statistic
+    ):
+        flag = "REGRESSION" if regressed else ""
+        regressions += regressed
+        print(
+            f"{name:45} {baseline_ms:10.3f} -> {current_ms:10.3f} ms "
+            f"{change:+8.1%} {flag}"
+        )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+"""
+Profiling captures that hook into the game loop: cProfile over a window of
+frames or seconds, and periodic tracemalloc snapshots.
+"""
+import cProfile
+import os
+import pstats
+import sys
+import tracemalloc
+from time import perf_counter
+
+
+class CProfileCapture:
+    """
+    Run cProfile over the first frames or seconds of the game loop and write
+    the result as pstats and/or callgrind files.
+
+    Instances are frame hooks, so they are passed to
+    CaptainForever.main_loop and called after every frame.
+
+    Attributes:
+        _frames: Int, number of frames to profile, or None.
+        _seconds: Float, number of seconds to profile, or None.
+        _pstats_path: String, file the pstats output is written to, or None.
+        _callgrind_path: String, file the callgrind output is written to,
+        or None.
+        _profile: cProfile.Profile instance while profiling, else None.
+        _start_time: Float, perf_counter value when profiling started.
+    """
+
+    def __init__(
+        self, frames=None, seconds=None, pstats_path=None, callgrind_path=None
+    ):
+        """
+        Initialize CProfileCapture.
+
+        Args:
+            frames: Int, number of frames to profile, or None.
+            seconds: Float, number of seconds to profile, or None. With
+            neither frames nor seconds the whole run is profiled.
+            pstats_path: String, file to write pstats output to, or None.
+            callgrind_path: String, file to write callgrind output to, or
+            None.
+        """
+        self._frames = frames
+        self._seconds = seconds
+        self._pstats_path = pstats_path
+        self._callgrind_path = callgrind_path
+        self._profile = None
+        self._start_time = None
+
+    def start(self):
+        """
+        Start profiling.
+        """
+        self._profile = cProfile.Profile()
+        self._start_time = perf_counter()
+        self._profile.enable()
+
+    def __call__(self, frame):
+        """
+        Stop profiling once the frame or time window has passed.
+
+        Args:
+            frame: Int, number of frames run so far.
+
+        Returns:
+            False, profiling never ends the game loop.
+        """
+        if self._profile is None:
+            return False
+        if (self._frames is not None and frame >= self._frames) or (
+            self._seconds is not None
+            and perf_counter() - self._start_time >= self._seconds
+        ):
+            self.finish()
+        return False
+
+    def finish(self):
+        """
+        Stop profiling and write the output files, if still profiling.
+        """
+        if self._profile is None:
+            return
+        self._profile.disable()
+        stats = pstats.Stats(self._profile)
+        self._profile = None
+        if self._pstats_path:
+            stats.dump_stats(self._pstats_path)
+            print(f"Wrote pstats profile to {self._pstats_path}")
+        if self._callgrind_path:
+            write_callgrind(stats, self._callgrind_path)
+            print(f"Wrote callgrind profile to {self._callgrind_path}")
+        if not self._pstats_path and not self._callgrind_path:
+            stats.sort_stats("cumulative").print_stats(25)
+
+
+class TracemallocCapture:
+    """
+    Take tracemalloc snapshots every few frames and print the code that
+    allocated the most memory per frame since the previous snapshot.
+
+    Instances are frame hooks, so they are passed to
+    CaptainForever.main_loop and called after every frame.
+
+    Attributes:
+        _interval: Int, number of frames between snapshots.
+        _top: Int, number of allocators printed per snapshot.
+        _snapshot_dir: String, directory snapshots are dumped to, or None.
+        _stream: File object that the top allocators are printed to.
+        _previous: tracemalloc.Snapshot taken last, or None.
+    """
+
+    # drop allocations made by tracemalloc itself from the report
+    FILTERS = (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    )
+
+    def __init__(self, interval, top=10, snapshot_dir=None, stream=None):
+        """
+        Initialize TracemallocCapture.
+
+        Args:
+            interval: Int, number of frames between snapshots.
+            top: Int, number of allocators printed per snapshot.
+            snapshot_dir: String, directory to dump snapshots to, or None.
+            stream: File object to print to, sys.stdout if not given.
+        """
+        self._interval = interval
+        self._top = top
+        self._snapshot_dir = snapshot_dir
+        self._stream = stream if stream is not None else sys.stdout
+        self._previous = None
+
+    def start(self):
+        """
+        Start tracing allocations and take the first snapshot.
+        """
+        tracemalloc.start()
+        self._previous = self._take_snapshot(0)
+
+    def _take_snapshot(self, frame):
+        """
+        Take a filtered snapshot and dump it if a directory was given.
+
+        Args:
+            frame: Int, number of frames run so far.
+
+        Returns:
+            A tracemalloc.Snapshot instance.
+        """
+        snapshot = tracemalloc.take_snapshot().filter_traces(self.FILTERS)
+        if self._snapshot_dir:
+            os.makedirs(self._snapshot_dir, exist_ok=True)
+            snapshot.dump(
+                os.path.join(self._snapshot_dir, f"frame-{frame}.snapshot")
+            )
+        return snapshot
+
+    def top_allocators(self, snapshot):
+        """
+        Return the biggest allocators since the previous snapshot.
+
+        Args:
+            snapshot: tracemalloc.Snapshot instance taken just now.
+
+        Returns:
+            List of tracemalloc.StatisticDiff instances, largest first.
+        """
+        differences = snapshot.compare_to(self._previous, "lineno")
+        return [diff for diff in differences if diff.size_diff > 0][: self._top]
+
+    def __call__(self, frame):
+        """
+        Take a snapshot and print the top allocators every interval frames.
+
+        Args:
+            frame: Int, number of frames run so far.
+
+        Returns:
+            False, snapshots never end the game loop.
+        """
+        if self._previous is None or frame % self._interval:
+            return False
+        snapshot = self._take_snapshot(frame)
+        print(
+            (
+                f"Top allocators per frame, frames {frame - self._interval}"
+                f"-{frame}:"
+            ),
+            file=self._stream,
+        )
+        for diff in self.top_allocators(snapshot):
+            location = diff.traceback[0]
+            print(
+                (
+                    f"  {diff.size_diff / self._interval:10.0f} B"
+                    f" {diff.count_diff / self._interval:8.1f} blocks"
+                    f"  {location.filename}:{location.lineno}"
+                ),
+                file=self._stream,
+            )
+        self._previous = snapshot
+        return False
+
+    def finish(self):
+        """
+        Stop tracing allocations.
+        """
+        if self._previous is not None:
+            tracemalloc.stop()
+            self._previous = None
+
+
+def stop_after_seconds(seconds):
+    """
+    Create a frame hook that ends the game loop after some time.
+
+    Args:
+        seconds: Float, how long the game loop should run for.
+
+    Returns:
+        Function taking the frame number and returning whether to stop.
+    """
+    deadline = perf_counter() + seconds
+
+    def hook(frame):  # pylint: disable=unused-argument
+        return perf_counter() >= deadline
+
+    return hook
+
+
+def write_callgrind(stats, path):
+    """
+    Write pstats data in callgrind format for KCachegrind/QCachegrind.
+
+    Costs are in microseconds. Each function's own time is reported as its
+    self cost and each call to another function carries that callee's
+    cumulative time for calls from this caller.
+
+    Args:
+        stats: pstats.Stats instance.
+        path: String, file to write to.
+    """
+    callees = {}
+    for function, (_, _, _, _, callers) in stats.stats.items():
+        for caller, caller_stats in callers.items():
+            callees.setdefault(caller, []).append((function, caller_stats))
+
+    def name(function):
+        filename, line, function_name = function
+        return f"{function_name}:{line}" if filename != "~" else function_name
+
+    with open(path, "w", encoding="utf-8") as callgrind_file:
+        callgrind_file.write(
+            "# callgrind format\nversion: 1\ncreator: captain_forever\n"
+            "events: Microseconds\n"
+        )
+        for function, (_, _, total_time, _, _) in stats.stats.items():
+            callgrind_file.write(
+                f"\nfl={function[0]}\nfn={name(function)}\n"
+                f"{function[1]} {int(total_time * 1e6)}\n"
+            )
+            for callee, (_, calls, _, cumulative) in callees.get(function, ()):
+                callgrind_file.write(
+                    f"cfl={callee[0]}\ncfn={name(callee)}\n"
+                    f"calls={calls} {callee[1]}\n"
+                    f"{function[1]} {int(cumulative * 1e6)}\n"
+                )
@@ -0,0 +1,514 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# pylint: disable=import-outside-toplevel
+# pylint: disable=wrong-import-order
+# Disabling pylint warnings related to PyGame that aren't valid
+# Disabling import outside toplevel because modules only some options need
+# are imported when those options are given, to start faster
+# Disabling wrong import order because the startup timeline is imported
+# before PyGame so its clock starts from the first import
+"""
+Command line entry point that sets up the window and runs the game, with
+optional headless mode and profiling captures.
+"""
+import argparse
+import os
+import sys
+from startup import startup_timeline
+import pygame
+from game import CaptainForever
+from controller import ArrowController
+from view import RENDER_SCALES, PyGameView
+from profiler import FrameProfiler
+import timeline
+from assets import registry
+from pacing import FramePacer
+
+WIDTH = 1082
+HEIGHT = 720
+
+
+def build_parser():
+    """
+    Build the command line argument parser.
+
+    Returns:
+        An argparse.ArgumentParser instance.
+    """
+    parser = argparse.ArgumentParser(
+        prog="captain_forever", description="Play Captain Forever."
+    )
+    run = parser.add_argument_group("running")
+    run.add_argument(
+        "--headless",
+        action="store_true",
+        help="run without a window using the SDL dummy video driver",
+    )
+    run.add_argument("--frames", type=int, help="quit after this many frames")
+    run.add_argument(
+        "--seconds", type=float, help="quit after this many seconds"
+    )
+    run.add_argument(
+        "--max-fps",
+        type=int,
+        default=60,
+        help="frame rate cap, 0 for uncapped (default: 60)",
+    )
+    run.add_argument(
+        "--overlay",
+        action="store_true",
+        help="start with the frame profiler overlay shown",
+    )
+    run.add_argument(
+        "--sleep-before-poll",
+        action="store_true",
+        help=(
+            "wait for the next frame before reading input instead of after"
+            " presenting, so input is sampled right before it is simulated"
+        ),
+    )
+    run.add_argument(
+        "--no-sound", action="store_true", help="play no sound effects"
+    )
+    run.add_argument(
+        "--idle-timeout-ms",
+        type=int,
+        default=250,
+        metavar="MS",
+        help=(
+            "while paused, on the end screen or in the background, block"
+            " waiting for input for up to this long instead of drawing"
+            " frames (default: 250)"
+        ),
+    )
+    run.add_argument(
+        "--no-idle",
+        action="store_true",
+        help="keep simulating and drawing every frame, even when idle",
+    )
+    run.add_argument(
+        "--precise-collisions",
+        action="store_true",
+        help=(
+            "only count collisions where the sprites' opaque pixels overlap,"
+            " not just their circles"
+        ),
+    )
+    run.add_argument(
+        "--startup-timeline",
+        nargs="?",
+        const="-",
+        metavar="FILE",
+        help=(
+            "print how long each startup phase took once the first frame is"
+            " shown, or write it to FILE as JSON"
+        ),
+    )
+
+    run.add_argument(
+        "--flow-field",
+        action="store_true",
+        help=(
+            "steer NPC ships by a flow field that also keeps them apart,"
+            " for large swarms"
+        ),
+    )
+
+    run.add_argument(
+        "--modular-parts",
+        type=int,
+        default=0,
+        metavar="PARTS",
+        help=(
+            "build NPC ships from this many parts, which bullets break off"
+            " one at a time"
+        ),
+    )
+
+    run.add_argument(
+        "--ai-budget-us",
+        type=float,
+        metavar="US",
+        help=(
+            "spread the decisions of NPC ships far from the player over"
+            " ticks, taking at most about this many microseconds per tick"
+        ),
+    )
+
+    world = parser.add_argument_group("sector world")
+    world.add_argument(
+        "--sectors",
+        action="store_true",
+        help=(
+            "play in an endless world of sectors, where flying off the"
+            " screen enters the next sector instead of wrapping around"
+        ),
+    )
+    world.add_argument(
+        "--world-seed",
+        type=int,
+        default=0,
+        metavar="SEED",
+        help="seed the sectors are generated from (default: 0)",
+    )
+    world.add_argument(
+        "--sector-budget-kb",
+        type=int,
+        default=256,
+        metavar="KB",
+        help=(
+            "most memory sectors left behind are kept frozen in, beyond"
+            " which the oldest are generated afresh (default: 256)"
+        ),
+    )
+
+    collector = parser.add_argument_group("garbage collection")
+    collector.add_argument(
+        "--gc-gen0-threshold",
+        type=int,
+        default=0,
+        metavar="OBJECTS",
+        help=(
+            "generation 0 threshold during play, 0 to only collect young"
+            " objects in the slack before the next frame (default: 0)"
+        ),
+    )
+    collector.add_argument(
+        "--no-gc-policy",
+        action="store_true",
+        help="leave the garbage collector at Python's defaults",
+    )
+
+    render = parser.add_argument_group("rendering")
+    render.add_argument(
+        "--render-scale",
+        type=float,
+        choices=RENDER_SCALES,
+        default=1.0,
+        help=(
+            "draw the game at this fraction of the window size and upscale"
+            " it, to lower the fill rate on slow machines (default: 1.0)"
+        ),
+    )
+    render.add_argument(
+        "--render-budget-ms",
+        type=float,
+        metavar="MS",
+        help=(
+            "lower the render scale while drawing a frame takes longer than"
+            " this, and raise it again once there is time to spare"
+        ),
+    )
+    render.add_argument(
+        "--smooth-upscale",
+        action="store_true",
+        help="upscale with smoothscale instead of scale",
+    )
+
+    saves = parser.add_argument_group("save files")
+    saves.add_argument("--load", help="save file to start the game from")
+    saves.add_argument("--save", help="file to save the game to on exit")
+
+    cprofile = parser.add_argument_group("cProfile")
+    cprofile.add_argument(
+        "--cprofile",
+        action="store_true",
+        help="run under cProfile, for the whole run unless a window is given",
+    )
+    cprofile.add_argument(
+        "--cprofile-frames",
+        type=int,
+        help="profile only the first this many frames",
+    )
+    cprofile.add_argument(
+        "--cprofile-seconds",
+        type=float,
+        help="profile only the first this many seconds",
+    )
+    cprofile.add_argument("--pstats-out", help="file to write pstats output to")
+    cprofile.add_argument(
+        "--callgrind-out", help="file to write callgrind output to"
+    )
+
+    memory = parser.add_argument_group("tracemalloc")
+    memory.add_argument(
+        "--tracemalloc-interval",
+        type=int,
+        metavar="FRAMES",
+        help="take a tracemalloc snapshot every this many frames",
+    )
+    memory.add_argument(
+        "--tracemalloc-top",
+        type=int,
+        default=10,
+        help="number of top allocators printed per snapshot (default: 10)",
+    )
+    memory.add_argument(
+        "--tracemalloc-dir", help="directory to dump snapshots to"
+    )
+
+    surfaces = parser.add_argument_group("surface memory")
+    surfaces.add_argument(
+        "--surface-budget",
+        action="append",
+        default=[],
+        metavar="CACHE=MB",
+        help=(
+            "memory budget for a derived surface cache"
+            f" ({', '.join(registry.DERIVED_CACHES)}), can be repeated"
+        ),
+    )
+
+    trace = parser.add_argument_group("timeline")
+    trace.add_argument(
+        "--trace-budget-ms",
+        type=float,
+        help="write a Chrome trace whenever a frame takes longer than this",
+    )
+    trace.add_argument(
+        "--trace-dir", default=".", help="directory trace files go in"
+    )
+    trace.add_argument(
+        "--no-trace",
+        action="store_true",
+        help="turn off the timeline recorder",
+    )
+
+    hitches = parser.add_argument_group("hitch capture")
+    hitches.add_argument(
+        "--hitch-ms",
+        type=float,
+        metavar="MS",
+        help=(
+            "write a capture bundle, which hitch.py can replay, whenever a"
+            " frame takes longer than this"
+        ),
+    )
+    hitches.add_argument(
+        "--hitch-dir", default=".", help="directory bundles go in"
+    )
+    hitches.add_argument(
+        "--hitch-frames",
+        type=int,
+        default=120,
+        metavar="FRAMES",
+        help="number of frames kept before a hitch (default: 120)",
+    )
+    hitches.add_argument(
+        "--hitch-sample-ms",
+        type=float,
+        metavar="MS",
+        help="sample the game loop's stack this often for bundles",
+    )
+    return parser
+
+
+def main(argv=None):
+    """
+    Parse the command line and run the game.
+
+    Args:
+        argv: List of strings, command line arguments without the program
+        name, or None to use sys.argv.
+    """
+    startup_timeline.mark("import")
+    args = build_parser().parse_args(argv)
+    if args.headless:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+    for budget in args.surface_budget:
+        cache, _, megabytes = budget.partition("=")
+        registry.set_budget(cache, int(float(megabytes) * 2**20))
+
+    timeline.recorder.enabled = not args.no_trace
+    timeline.recorder.frame_budget_ms = args.trace_budget_ms
+    timeline.recorder.output_dir = args.trace_dir
+
+    captures = []
+    hooks = []
+    if args.seconds is not None:
+        from capture import stop_after_seconds
+
+        hooks.append(stop_after_seconds(args.seconds))
+    if (
+        args.cprofile
+        or args.cprofile_frames
+        or args.cprofile_seconds
+        or args.pstats_out
+        or args.callgrind_out
+    ):
+        from capture import CProfileCapture
+
+        captures.append(
+            CProfileCapture(
+                args.cprofile_frames,
+                args.cprofile_seconds,
+                args.pstats_out,
+                args.callgrind_out,
+            )
+        )
+    if args.tracemalloc_interval:
+        from capture import TracemallocCapture
+
+        captures.append(
+            TracemallocCapture(
+                args.tracemalloc_interval,
+                args.tracemalloc_top,
+                args.tracemalloc_dir,
+            )
+        )
+    hooks.extend(captures)
+
+    # only the display is initialized up front: the mixer is started by the
+    # sound bank, fonts on first use and joysticks are never used
+    pygame.display.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Captain Forever")
+    startup_timeline.mark("display")
+    sound_bank = None
+    if not args.no_sound:
+        from sounds import SoundBank
+
+        try:
+            sound_bank = SoundBank()
+        except pygame.error as error:
+            # no audio device, play on without sound
+            print(f"Sound disabled: {error}")
+    ai_scheduler = None
+    if args.ai_budget_us is not None:
+        from scheduler import AIScheduler
+
+        ai_scheduler = AIScheduler(args.ai_budget_us)
+    world = None
+    if args.sectors:
+        from sectors import SectorWorld
+
+        world = SectorWorld(
+            WIDTH, HEIGHT, args.world_seed, args.sector_budget_kb * 1024
+        )
+    captain_forever_game_instance = CaptainForever(
+        WIDTH,
+        HEIGHT,
+        FrameProfiler(enabled=args.overlay),
+        sound_bank,
+        precise_collisions=args.precise_collisions,
+        flow_field=args.flow_field,
+        modular_parts=args.modular_parts,
+        ai_scheduler=ai_scheduler,
+        world=world,
+    )
+    if args.load:
+        from serialization import load_game
+
+        with open(args.load, "rb") as save_file:
+            load_game(captain_forever_game_instance, save_file.read())
+    pacer = FramePacer(args.max_fps, args.sleep_before_poll)
+    captain_forever_controller = ArrowController(
+        captain_forever_game_instance, WIDTH, HEIGHT, pacer
+    )
+    captain_forever_view = PyGameView(
+        captain_forever_game_instance,
+        screen,
+        pacer=pacer,
+        render_scale=args.render_scale,
+        render_budget_ms=args.render_budget_ms,
+        smooth=args.smooth_upscale,
+    )
+    startup_timeline.mark("assets")
+    # explosions and collision masks are made once the first frame is up
+    # rather than before
+    warm_ups = [captain_forever_game_instance.particles.load_frames]
+    if args.precise_collisions:
+        warm_ups.append(captain_forever_game_instance.prepare_collision_masks)
+    hooks.insert(
+        0,
+        startup_timeline.first_frame_hook(args.startup_timeline, warm_ups),
+    )
+    gc_policy = None
+    if not args.no_gc_policy:
+        from gcpolicy import GCPolicy
+
+        gc_policy = GCPolicy(
+            captain_forever_game_instance.profiler, args.gc_gen0_threshold
+        )
+        pacer.add_slack_task(gc_policy.collect_in_slack)
+        # runs after the first frame hook, so warmed up resources are frozen
+        hooks.append(gc_policy.frame_hook(captain_forever_game_instance))
+        gc_policy.start()
+    sampler = None
+    if args.hitch_ms is not None:
+        from hitch import HitchDetector, StackSampler
+
+        if args.hitch_sample_ms is not None:
+            sampler = StackSampler(args.hitch_sample_ms)
+            sampler.start()
+        hooks.append(
+            HitchDetector(
+                captain_forever_game_instance,
+                captain_forever_controller,
+                args.hitch_ms,
+                args.hitch_frames,
+                args.hitch_dir,
+                sampler,
+                pacer,
+                stream=sys.stdout,
+            )
+        )
+    for capture in captures:
+        capture.start()
+    try:
+        captain_forever_game_instance.main_loop(
+            captain_forever_controller,
+            captain_forever_view,
+            args.frames,
+            hooks,
+            (
+                # headless runs have no one to wake them, so they never idle
+                None
+                if args.no_idle or args.headless
+                else args.idle_timeout_ms
+            ),
+        )
+    finally:
+        # quitting with escape raises SystemExit, captures are still written
+        for capture in captures:
+            capture.finish()
+        if sampler is not None:
+            sampler.stop()
+        if args.save:
+            from serialization import save_game
+
+            with open(args.save, "wb") as save_file:
+                save_file.write(save_game(captain_forever_game_instance))
+        if args.ai_budget_us is not None:
+            stats = captain_forever_game_instance.ai_scheduler.stats()
+            print(
+                f"AI scheduler: {stats['over_budget']} of {stats['ticks']}"
+                f" ticks over budget, {stats['deferred']} turns deferred,"
+                f" worst {stats['worst_us']:.0f} us"
+            )
+        if args.sectors:
+            stats = captain_forever_game_instance.world.stats()
+            print(
+                f"Sectors: {stats['generated']} generated,"
+                f" {stats['thawed']} thawed, {stats['frozen']} frozen in"
+                f" {stats['frozen_bytes'] / 1024:.1f} KB,"
+                f" {stats['evictions']} evicted"
+            )
+        if gc_policy is not None:
+            gc_policy.stop()
+            stats = gc_policy.stats()
+            print(
+                f"GC: {sum(stats['collections'])} collections"
+                f" ({stats['slack']} in frame slack, {stats['forced']}"
+                f" forced), {stats['pause_ms']:.1f} ms in total, worst"
+                f" {stats['worst_ms']:.2f} ms"
+            )
+        summary = pacer.latency_summary()
+        if summary is not None:
+            print(
+                f"Input latency: {summary[0]:.1f} ms average,"
+                f" {summary[1]:.1f} ms worst over the last"
+                f" {len(pacer.latencies)} inputs"
+            )
@@ -5,6 +5,7 @@
 Captain Forever controller.
 """
 from abc import ABC, abstractmethod
+import random
 import pygame
 
 
@@ -54,15 +55,70 @@ class CaptainForeverController(ABC):
 class ArrowController(CaptainForeverController):
     """
     Define controller that takes WASD keys as
-    user input.
+    user input. P pauses the game, F3 toggles the frame profiler overlay
+    and F4 writes the timeline recorder to a Chrome trace file.
+
+    Events are handled first and the held arrow keys are polled last, right
+    before the game logic runs, so movement uses the latest key state.
+
+    Attributes:
+        _pacer: FramePacer instance that events are read from and applied
+        input is reported to, or None to read events straight from PyGame.
+        _buttons: Int, RemoteController button bits for the input applied
+        last frame, so it can be recorded and replayed.
     """
 
+    STEERING_KEYS = (pygame.K_RIGHT, pygame.K_LEFT, pygame.K_UP, pygame.K_DOWN)
+
+    def __init__(self, game, width, height, pacer=None):
+        """
+        Initialize ArrowController.
+
+        Args:
+            game: An instance of the captain forever class
+            that gives the state of the game.
+            width: Int, representing width of the screen.
+            height: Int, representing height of the screen.
+            pacer: FramePacer instance that stamps events and measures
+            input latency, or None.
+        """
+        super().__init__(game, width, height)
+        self._pacer = pacer
+        self._buttons = 0
+
+    @property
+    def buttons(self):
+        """
+        Return _buttons.
+
+        Returns:
+            _buttons: Int, RemoteController button bits for the input
+            applied last frame.
+        """
+        return self._buttons
+
     def maneuver_player_ship(self):
         """
         Move the player ship based on user input.
         """
+        if self._pacer is not None:
+            self._pacer.before_poll()
+        self._buttons = 0
+        self.handle_events()
+        self.poll_keys()
+
+    def handle_events(self):
+        """
+        Handle every queued event: quitting, shooting, restarting, pausing
+        and the profiling keys.
+        """
         game_state = self.game
-        for event in pygame.event.get():
+        pacer = self._pacer
+        if pacer is not None:
+            events = pacer.events()
+        else:
+            events = [(None, event) for event in pygame.event.get()]
+        for arrival, event in events:
             if event.type == pygame.QUIT or (
                 event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE
             ):
@@ -72,23 +128,449 @@ class ArrowController(CaptainForeverController):
                 and event.type == pygame.KEYDOWN
                 and event.key == pygame.K_SPACE
                 and game_state.is_running
+                and not game_state.paused
             ):
                 game_state.player_ship.shoot()
+                self._buttons |= RemoteController.FIRE
+                if pacer is not None:
+                    pacer.input_applied(arrival)
 
             elif event.type == pygame.KEYDOWN and (
                 event.key == pygame.K_KP_ENTER
                 or event.key == pygame.K_RETURN
                 and not game_state.is_running
             ):
-                game_state.__init__(self._width, self._height)
+                game_state.restart()
+            elif (
+                event.type == pygame.KEYDOWN
+                and event.key == pygame.K_p
+                and game_state.is_running
+            ):
+                game_state.toggle_pause()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                game_state.profiler.toggle()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                path = game_state.profiler.recorder.dump()
+                print(f"Wrote timeline trace to {path}")
+            elif (
+                pacer is not None
+                and event.type == pygame.KEYDOWN
+                and event.key in self.STEERING_KEYS
+                and game_state.is_running
+                and not game_state.paused
+            ):
+                # the key is picked up by poll_keys later this frame
+                pacer.input_applied(arrival)
 
-        if game_state.is_running:
+    def poll_keys(self):
+        """
+        Steer the player ship with the arrow keys currently held down.
+        """
+        game_state = self.game
+        if game_state.is_running and not game_state.paused:
             is_key_pressed = pygame.key.get_pressed()
             if is_key_pressed[pygame.K_RIGHT]:
                 game_state.player_ship.rotate(clockwise=True)
+                self._buttons |= RemoteController.RIGHT
             elif is_key_pressed[pygame.K_LEFT]:
                 game_state.player_ship.rotate(clockwise=False)
+                self._buttons |= RemoteController.LEFT
             if is_key_pressed[pygame.K_UP]:
                 game_state.player_ship.accelerate(acceleration_factor=0.5)
+                self._buttons |= RemoteController.UP
             elif is_key_pressed[pygame.K_DOWN]:
                 game_state.player_ship.deccelerate(deceleration_factor=0.5)
+                self._buttons |= RemoteController.DOWN
+
+
+class BotController(CaptainForeverController):
+    """
+    Define controller that steers the player ship from code instead of the
+    keyboard, for soak and throughput testing.
+
+    Bots call the player ship's rotate, accelerate and shoot methods
+    directly and never read the PyGame event queue, so they run headless
+    and without a window. When a game ends the bot starts a new one, like
+    a player pressing enter.
+
+    Attributes:
+        _tick: Int, number of ticks the bot has played.
+        _restarts: Int, number of games the bot has restarted.
+    """
+
+    def __init__(self, game, width, height):
+        """
+        Initialize BotController.
+
+        Args:
+            game: An instance of the captain forever class
+            that gives the state of the game.
+            width: Int, representing width of the screen.
+            height: Int, representing height of the screen.
+        """
+        super().__init__(game, width, height)
+        self._tick = 0
+        self._restarts = 0
+
+    @property
+    def restarts(self):
+        """
+        Return _restarts.
+
+        Returns:
+            _restarts: Int, number of games the bot has restarted.
+        """
+        return self._restarts
+
+    def maneuver_player_ship(self):
+        """
+        Move the player ship with the bot's chosen action, or restart the
+        game once it is over.
+        """
+        game_state = self.game
+        if game_state.message:
+            game_state.restart()
+            self._restarts += 1
+        elif game_state.is_running:
+            turn, thrust, fire = self.choose_action(game_state.player_ship)
+            self.apply_action(game_state.player_ship, turn, thrust, fire)
+        self._tick += 1
+
+    @staticmethod
+    def apply_action(player_ship, turn, thrust, fire):
+        """
+        Steer a ship the same way the arrow keys and space bar would.
+
+        Args:
+            player_ship: Ship instance to steer.
+            turn: Int, 1 to turn clockwise, -1 anticlockwise, 0 not at all.
+            thrust: Int, 1 to accelerate, -1 to decelerate, 0 to coast.
+            fire: Bool, whether to shoot.
+        """
+        if turn:
+            player_ship.rotate(clockwise=turn > 0)
+        if thrust > 0:
+            player_ship.accelerate(acceleration_factor=0.5)
+        elif thrust < 0:
+            player_ship.deccelerate(deceleration_factor=0.5)
+        if fire:
+            player_ship.shoot()
+
+    @abstractmethod
+    def choose_action(self, player_ship):
+        """
+        Choose what the player ship does this tick.
+
+        Args:
+            player_ship: Ship instance controlled by the bot.
+
+        Returns:
+            Tuple of turn, thrust and fire as taken by apply_action.
+        """
+
+
+class RandomBotController(BotController):
+    """
+    Define bot that holds a random action for a few ticks at a time.
+
+    Attributes:
+        _random: Random instance the actions are drawn from.
+        _hold_ticks: Int, number of ticks each action is held for.
+        _fire_chance: Float, chance that an action includes shooting.
+        _action: Tuple, action currently held.
+    """
+
+    def __init__(
+        self, game, width, height, seed=None, hold_ticks=10, fire_chance=0.2
+    ):
+        """
+        Initialize RandomBotController.
+
+        Args:
+            game: An instance of the captain forever class
+            that gives the state of the game.
+            width: Int, representing width of the screen.
+            height: Int, representing height of the screen.
+            seed: Int, seed for the bot's actions, or None.
+            hold_ticks: Int, number of ticks each action is held for.
+            fire_chance: Float, chance that an action includes shooting.
+        """
+        super().__init__(game, width, height)
+        self._random = random.Random(seed)
+        self._hold_ticks = hold_ticks
+        self._fire_chance = fire_chance
+        self._action = (0, 0, False)
+
+    def choose_action(self, player_ship):
+        """
+        Pick a new random action every _hold_ticks ticks.
+
+        Args:
+            player_ship: Ship instance controlled by the bot.
+
+        Returns:
+            Tuple of turn, thrust and fire as taken by apply_action.
+        """
+        if self._tick % self._hold_ticks == 0:
+            self._action = (
+                self._random.choice((-1, 0, 1)),
+                self._random.choice((-1, 0, 1, 1)),
+                self._random.random() < self._fire_chance,
+            )
+        return self._action
+
+
+def parse_script(lines):
+    """
+    Parse a bot script into steps.
+
+    Each line holds a number of ticks followed by the actions taken during
+    them, any of "left", "right", "up", "down" and "fire", for example
+    "30 right up" or "1 fire". A line with only a number of ticks coasts.
+    Blank lines and anything after a "#" are ignored.
+
+    Args:
+        lines: Iterable of strings, lines of the script.
+
+    Returns:
+        List of (ticks, turn, thrust, fire) tuples.
+
+    Raises:
+        ValueError: If a line has an unknown action or a bad tick count.
+    """
+    actions = {"left", "right", "up", "down", "fire"}
+    steps = []
+    for number, line in enumerate(lines, 1):
+        words = line.split("#")[0].split()
+        if not words:
+            continue
+        unknown = set(words[1:]) - actions
+        if not words[0].isdigit() or int(words[0]) < 1 or unknown:
+            raise ValueError(f"Bad bot script line {number}: {line.strip()!r}")
+        steps.append(
+            (
+                int(words[0]),
+                ("right" in words) - ("left" in words),
+                ("up" in words) - ("down" in words),
+                "fire" in words,
+            )
+        )
+    return steps
+
+
+class ScriptedBotController(BotController):
+    """
+    Define bot that plays a script of actions, starting over at the end.
+
+    Actions other than firing are held for every tick of their step, while
+    "fire" shoots once at the start of the step.
+
+    Attributes:
+        _steps: List of (ticks, turn, thrust, fire) tuples.
+        _step: Int, index of the current step.
+        _step_tick: Int, ticks played of the current step.
+    """
+
+    def __init__(self, game, width, height, steps):
+        """
+        Initialize ScriptedBotController.
+
+        Args:
+            game: An instance of the captain forever class
+            that gives the state of the game.
+            width: Int, representing width of the screen.
+            height: Int, representing height of the screen.
+            steps: List of steps as returned by parse_script.
+
+        Raises:
+            ValueError: If there are no steps.
+        """
+        if not steps:
+            raise ValueError("A bot script needs at least one step")
+        super().__init__(game, width, height)
+        self._steps = steps
+        self._step = 0
+        self._step_tick = 0
+
+    @classmethod
+    def from_file(cls, game, width, height, path):
+        """
+        Create a ScriptedBotController from a script file.
+
+        Args:
+            game: An instance of the captain forever class
+            that gives the state of the game.
+            width: Int, representing width of the screen.
+            height: Int, representing height of the screen.
+            path: String, path of the script file.
+
+        Returns:
+            A ScriptedBotController instance.
+        """
+        with open(path, encoding="utf-8") as script_file:
+            return cls(game, width, height, parse_script(script_file))
+
+    def choose_action(self, player_ship):
+        """
+        Return the current step's action and move through the script.
+
+        Args:
+            player_ship: Ship instance controlled by the bot.
+
+        Returns:
+            Tuple of turn, thrust and fire as taken by apply_action.
+        """
+        ticks, turn, thrust, fire = self._steps[self._step]
+        fire = fire and self._step_tick == 0
+        self._step_tick += 1
+        if self._step_tick >= ticks:
+            self._step_tick = 0
+            self._step = (self._step + 1) % len(self._steps)
+        return turn, thrust, fire
+
+
+class AimBotController(BotController):
+    """
+    Define bot that turns towards the nearest NPC ship, closes in on it and
+    shoots when it is lined up.
+
+    Attributes:
+        _aim_tolerance: Float, degrees off target the bot still shoots at.
+        _fire_interval: Int, ticks between shots.
+        _standoff: Float, distance in pixels the bot stops closing in at.
+        _last_shot: Int, tick of the bot's last shot.
+    """
+
+    def __init__(
+        self,
+        game,
+        width,
+        height,
+        aim_tolerance=6,
+        fire_interval=8,
+        standoff=200,
+    ):
+        """
+        Initialize AimBotController.
+
+        Args:
+            game: An instance of the captain forever class
+            that gives the state of the game.
+            width: Int, representing width of the screen.
+            height: Int, representing height of the screen.
+            aim_tolerance: Float, degrees off target the bot still shoots at.
+            fire_interval: Int, ticks between shots.
+            standoff: Float, distance in pixels the bot stops closing in at.
+        """
+        super().__init__(game, width, height)
+        self._aim_tolerance = aim_tolerance
+        self._fire_interval = fire_interval
+        self._standoff = standoff
+        self._last_shot = -fire_interval
+
+    def choose_action(self, player_ship):
+        """
+        Aim at the nearest NPC ship.
+
+        Args:
+            player_ship: Ship instance controlled by the bot.
+
+        Returns:
+            Tuple of turn, thrust and fire as taken by apply_action.
+        """
+        position = player_ship.position
+        npc_ships = self.game.npc_ships
+        if not npc_ships:
+            return 0, 0, False
+        target = min(
+            npc_ships,
+            key=lambda ship: position.distance_squared_to(ship.position),
+        )
+        offset = target.position - position
+        # signed angle in (-180, 180], positive when the target is clockwise
+        angle = (player_ship.direction.angle_to(offset) + 180) % 360 - 180
+        turn = 0
+        if abs(angle) > player_ship.MANEUVERABILITY / 2:
+            turn = 1 if angle > 0 else -1
+        thrust = 1 if offset.length() > self._standoff else -1
+        fire = (
+            abs(angle) <= self._aim_tolerance
+            and self._tick - self._last_shot >= self._fire_interval
+        )
+        if fire:
+            self._last_shot = self._tick
+        return turn, thrust, fire
+
+
+class RemoteController(CaptainForeverController):
+    """
+    Define controller that steers the player ship with buttons sent by a
+    network client.
+
+    Constants:
+        LEFT, RIGHT, UP, DOWN, FIRE, RESTART: Int, bits of the button mask.
+
+    Attributes:
+        _buttons: Int, bits of the buttons currently held down.
+        _fire_held: Bool, whether fire was held last tick, so holding it
+        shoots once like the space bar.
+    """
+
+    LEFT = 1
+    RIGHT = 2
+    UP = 4
+    DOWN = 8
+    FIRE = 16
+    RESTART = 32
+
+    def __init__(self, game, width, height):
+        """
+        Initialize RemoteController.
+
+        Args:
+            game: An instance of the captain forever class
+            that gives the state of the game.
+            width: Int, representing width of the screen.
+            height: Int, representing height of the screen.
+        """
+        super().__init__(game, width, height)
+        self._buttons = 0
+        self._fire_held = False
+
+    def set_buttons(self, buttons):
+        """
+        Set the buttons held down, as last sent by the client.
+
+        Args:
+            buttons: Int, bits of the buttons held down.
+        """
+        self._buttons = buttons
+
+    @property
+    def buttons(self):
+        """
+        Return _buttons.
+
+        Returns:
+            _buttons: Int, bits of the buttons held down.
+        """
+        return self._buttons
+
+    def maneuver_player_ship(self):
+        """
+        Move the player ship with the held buttons, or restart the game
+        once it is over if restart is held.
+        """
+        game_state = self.game
+        buttons = self._buttons
+        fire = bool(buttons & self.FIRE)
+        if game_state.message and buttons & self.RESTART:
+            game_state.restart()
+        elif game_state.is_running:
+            BotController.apply_action(
+                game_state.player_ship,
+                bool(buttons & self.RIGHT) - bool(buttons & self.LEFT),
+                bool(buttons & self.UP) - bool(buttons & self.DOWN),
+                fire and not self._fire_held,
+            )
+        self._fire_held = fire
@@ -0,0 +1,184 @@
+"""
+Grid flow field that NPC ships sample to pursue the player and keep apart
+from each other, so steering a swarm costs the same per ship however many
+ships there are.
+"""
+from itertools import chain
+import numpy as np
+
+
+def positions_of(game_objects):
+    """
+    Gather the positions of game objects into an array.
+
+    Args:
+        game_objects: Sequence of GameObject instances.
+
+    Returns:
+        Float32 array of shape (len(game_objects), 2).
+    """
+    return np.fromiter(
+        chain.from_iterable(
+            game_object.position for game_object in game_objects
+        ),
+        np.float32,
+        count=len(game_objects) * 2,
+    ).reshape(-1, 2)
+
+
+class FlowField:
+    """
+    Directions towards a target and pushes away from crowds for every cell
+    of a grid over the screen, rebuilt once per tick.
+
+    The heading and distance of a cell are taken from its center, except
+    in the target's own cell, where ships use their direct offset to the
+    target. The push of a cell comes from how crowded it and its neighbours
+    are: ships are pushed down the slope of the blurred crowd density, and
+    ships sharing a cell are pushed away from its center. The grid wraps
+    around the screen edges like the ships do.
+
+    Attributes:
+        _cell_size: Int, width and height of a cell in pixels.
+        _columns: Int, number of cells across the screen.
+        _rows: Int, number of cells down the screen.
+        _separation: Float, push in pixels per tick per unit of crowding.
+        _max_push: Float, longest push in pixels per tick.
+        _centers: Float32 array of shape (rows, columns, 2), cell centers.
+        _headings: Float32 array of shape (rows, columns, 2), unit vectors
+        from each cell towards the target.
+        _distances: Float32 array of shape (rows, columns), distance from
+        each cell to the target.
+        _density: Float32 array of shape (rows, columns), ships per cell,
+        blurred over its neighbours.
+    """
+
+    def __init__(
+        self, width, height, cell_size=48, separation=1.0, max_push=1.5
+    ):
+        """
+        Initialize FlowField.
+
+        Args:
+            width: Int, width of the screen.
+            height: Int, height of the screen.
+            cell_size: Int, width and height of a cell in pixels.
+            separation: Float, push in pixels per tick per unit of crowding.
+            max_push: Float, longest push in pixels per tick.
+        """
+        self._cell_size = cell_size
+        self._columns = -(-width // cell_size)
+        self._rows = -(-height // cell_size)
+        self._separation = separation
+        self._max_push = max_push
+        columns, rows = np.meshgrid(
+            np.arange(self._columns, dtype=np.float32),
+            np.arange(self._rows, dtype=np.float32),
+        )
+        self._centers = (np.stack((columns, rows), axis=-1) + 0.5) * cell_size
+        self._headings = np.zeros((self._rows, self._columns, 2), np.float32)
+        self._distances = np.zeros((self._rows, self._columns), np.float32)
+        self._density = np.zeros((self._rows, self._columns), np.float32)
+
+    @property
+    def shape(self):
+        """
+        Return the number of rows and columns of the grid.
+
+        Returns:
+            Tuple of two ints.
+        """
+        return (self._rows, self._columns)
+
+    @property
+    def density(self):
+        """
+        Return _density.
+
+        Returns:
+            _density: Float32 array of shape (rows, columns), ships per
+            cell, blurred over its neighbours.
+        """
+        return self._density
+
+    def _cells(self, positions):
+        """
+        Return the row and column of the cell each position is in.
+
+        Args:
+            positions: Float32 array of shape (n, 2).
+
+        Returns:
+            Tuple of two int arrays of shape (n,).
+        """
+        cells = (positions // self._cell_size).astype(np.intp)
+        rows = np.clip(cells[:, 1], 0, self._rows - 1)
+        columns = np.clip(cells[:, 0], 0, self._columns - 1)
+        return rows, columns
+
+    def update(self, target, positions):
+        """
+        Rebuild the field for a target and the ships following it.
+
+        Args:
+            target: Vector2 or tuple, x and y the ships pursue.
+            positions: Float32 array of shape (n, 2), x and y of each ship.
+
+        Returns:
+            Tuple of (headings, distances, pushes) for each ship: a float32
+            array of shape (n, 2) of unit vectors towards the target, one
+            of shape (n,) of distances to it and one of shape (n, 2) of
+            pushes away from other ships in pixels per tick.
+        """
+        offsets = np.array(target, np.float32) - self._centers
+        np.hypot(offsets[..., 0], offsets[..., 1], out=self._distances)
+        np.divide(
+            offsets,
+            np.maximum(self._distances, 1e-6)[..., None],
+            out=self._headings,
+        )
+
+        rows, columns = self._cells(positions)
+        flat_cells = rows * self._columns + columns
+        counts = (
+            np.bincount(flat_cells, minlength=self._rows * self._columns)
+            .reshape(self.shape)
+            .astype(np.float32)
+        )
+        # 3x3 box blur that wraps around the edges like the ships do
+        blurred = counts + np.roll(counts, 1, 0) + np.roll(counts, -1, 0)
+        blurred += np.roll(blurred, 1, 1) + np.roll(blurred, -1, 1)
+        self._density[:] = blurred / 9
+        slope_x = np.roll(self._density, -1, 1) - np.roll(self._density, 1, 1)
+        slope_y = np.roll(self._density, -1, 0) - np.roll(self._density, 1, 0)
+
+        pushes = np.empty_like(positions)
+        pushes[:, 0] = -slope_x[rows, columns]
+        pushes[:, 1] = -slope_y[rows, columns]
+        # ships sharing a cell spread out from its center
+        crowd = (counts[rows, columns] - 1)[:, None]
+        pushes += (
+            crowd * (positions - self._centers[rows, columns]) / self._cell_size
+        )
+        pushes *= self._separation
+        lengths = np.hypot(pushes[:, 0], pushes[:, 1])
+        too_long = lengths > self._max_push
+        pushes[too_long] *= (self._max_push / lengths[too_long])[:, None]
+        headings = self._headings[rows, columns]
+        distances = self._distances[rows, columns]
+        # the center of the target's own cell can be right on the target,
+        # so ships in that cell head straight for it instead
+        target_rows, target_columns = self._cells(
+            np.array([target], np.float32)
+        )
+        in_target_cell = (rows == target_rows[0]) & (
+            columns == target_columns[0]
+        )
+        if in_target_cell.any():
+            offsets = np.array(target, np.float32) - positions[in_target_cell]
+            lengths = np.hypot(offsets[:, 0], offsets[:, 1])
+            distances[in_target_cell] = lengths
+            headings[in_target_cell] = (
+                offsets / np.maximum(lengths, 1e-6)[:, None]
+            )
+        return headings, distances, pushes
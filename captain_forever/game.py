@@ -1,11 +1,23 @@
 # pylint: disable=no-member
 # pylint: disable=no-name-in-module
+# pylint: disable=import-outside-toplevel
 # Disabling pylint warnings related to PyGame that aren't valid
+# Disabling import outside toplevel because the flow field and modular
+# ships, and numpy with them, are only imported by games that use them
 """
 Game class that processes the game logic in our model.
 """
-from utils import get_random_position
-from models import Ship, NPCShip, StaticObject
+import random
+from pygame.math import Vector2
+from utils import get_random_position, rotated_mask
+from models import GameObject, Ship, NPCShip, StaticObject
+from spatial import SpatialGrid
+from profiler import FrameProfiler
+from particles import ParticleSystem
+
+END_GAME_MESSAGE = (
+    "You {}! \n To exit, press escape \n To start a new game, press enter"
+)
 
 
 class CaptainForever:
@@ -16,6 +28,16 @@ class CaptainForever:
     Attributes:
         counter: Int, counter that helps delay when fire disappears.
         _fires: List, elements are StaticObject instances.
+        _debris: List, elements are drifting StaticObject instances that
+        stop bullets, only found in a sector world.
+        _awake: Dict, maps the fires and debris that are awake, the only
+        ones moved each tick, to whether they are debris in _debris_grid.
+        _debris_grid: SpatialGrid instance holding every piece of debris,
+        asleep or awake, so bullets only test the debris near them.
+        _debris_radius: Float, largest radius of the debris in
+        _debris_grid.
+        _debris_set: Set of every piece of debris, to tell debris from
+        fires without searching _debris.
         _npc_ships: List, elements are NPCShip instances.
         _npc_bullets: List, elements are Bullet instances from NPCShip instances.
         _bullets: List, elements are Bullet instances from player_ship.
@@ -23,43 +45,134 @@ class CaptainForever:
         _enemy_spawn_counter: Int, iterated counter to keep track of spawning.
         _message_flag: String, tells you if you have won or lost the game.
         _message: A string representing the message to be displayed at end.
+        _profiler: FrameProfiler instance, collects per-phase frame timings.
+        _particles: ParticleSystem instance, explosions currently playing.
+        _sound_bank: SoundBank instance that plays sound effects, or None
+        to play none.
+        _random: random.Random instance every random choice in the game is
+        drawn from, so a seeded game always plays out the same way.
+        _replaying: Bool, whether the current tick is being simulated again,
+        in which case explosions and sounds are skipped.
+        _precise_collisions: Bool, whether collisions that pass the circle
+        test are checked pixel by pixel.
+        _flow_field: FlowField instance NPC ships steer by, or None for
+        each ship to steer towards the player itself.
+        _ai_scheduler: AIScheduler instance that spreads NPC ship decisions
+        over ticks, or None for every ship to decide every tick.
+        _paused: Bool, whether the player paused the game.
+        _world: SectorWorld instance the game is played in, or None to play
+        on one screen that wraps around.
+        _modular_parts: Int, number of parts NPC ships are built from, or 0
+        for NPC ships of one sprite.
     """
 
     ENEMY_SPAWN_DISTANCE = 400
+    COLLISION_CELL_SIZE = 128
+    # fraction of a bullet's velocity passed on to the debris it hits
+    BULLET_IMPULSE = 0.05
 
-    def __init__(self, width, height):
+    def __init__(
+        self,
+        width,
+        height,
+        profiler=None,
+        sound_bank=None,
+        seed=None,
+        precise_collisions=False,
+        flow_field=False,
+        ai_scheduler=None,
+        world=None,
+        modular_parts=0,
+    ):
         """
         Initialize captain forever game attributes.
 
         Args:
             width: Int, represents width of screen.
             height: Int, represents height of screen.
+            profiler: FrameProfiler instance to record frame timings with, a
+            disabled one is created if not given.
+            sound_bank: SoundBank instance to play sound effects with, or
+            None to play none.
+            seed: Int, seed for the game's random numbers, or None.
+            precise_collisions: Bool, whether to check collisions against
+            the sprites' opaque pixels after the circle test passes.
+            flow_field: Bool, whether NPC ships steer by a flow field that
+            also keeps them apart, which scales to large swarms.
+            ai_scheduler: AIScheduler instance to spread NPC ship decisions
+            over ticks with, or None for every ship to decide every tick.
+            world: SectorWorld instance to play in, where flying off the
+            screen enters the next sector, or None to wrap around one
+            screen.
+            modular_parts: Int, number of parts to build NPC ships from,
+            which bullets break off one at a time, or 0 for NPC ships of
+            one sprite.
+        """
+        self._width = width
+        self._height = height
+        self._profiler = profiler if profiler is not None else FrameProfiler()
+        self._particles = ParticleSystem()
+        self._sound_bank = sound_bank
+        self._random = random.Random(seed)
+        self._replaying = False
+        self._precise_collisions = precise_collisions
+        self._flow_field = None
+        if flow_field:
+            from flowfield import FlowField
+
+            self._flow_field = FlowField(width, height)
+        self._ai_scheduler = ai_scheduler
+        self._world = world
+        self._modular_parts = modular_parts
+        self.restart()
+
+    def restart(self):
+        """
+        Reset the world to the start of a new game.
+
+        The screen size, profiler and sound bank are kept so instrumentation
+        survives from one game to the next.
         """
+        recorder = self._profiler.recorder
+        recorder.begin("restart")
         self._message = ""
+        self._paused = False
         self._fires = []
+        self._debris = []
+        self._awake = {}
+        self._debris_grid = SpatialGrid(self.COLLISION_CELL_SIZE)
+        self._debris_radius = 0
+        self._debris_set = set()
         self._npc_ships = []
         self._npc_bullets = []
         self._bullets = []
         self.counter = 0
+        self._particles.clear()
         self.player_ship = Ship(
-            (400, 400), self._bullets.append, "player", True, False
+            (400, 400), self._fire_player_bullet, "player", True, False
         )
-        self._width = width
-        self._height = height
         self._enemy_spawn_counter = 0
         self._message_flag = ""
-        for _ in range(3):
+        if self._world is not None:
+            npc_ships, fires, debris = self._world.start(
+                self.player_ship.position, self._fire_npc_bullet
+            )
+            self._npc_ships.extend(npc_ships)
+            self._fires.extend(fires)
+            self._debris.extend(debris)
+        for _ in range(0 if self._world is not None else 3):
             while True:
-                position = get_random_position(width, height)
+                position = get_random_position(
+                    self._width, self._height, self._random
+                )
                 if (
                     position.distance_to(self.player_ship.position)
                     > self.ENEMY_SPAWN_DISTANCE
                 ):
                     break
-            # second argument specifies ship and not fire
-            self._npc_ships.append(
-                NPCShip(position, "ship", self._npc_bullets.append)
-            )
+            self._npc_ships.append(self._new_npc_ship(position))
+        self._sort_sleepers()
+        recorder.end("restart")
 
     @property
     def message(self):
@@ -81,6 +194,16 @@ class CaptainForever:
         """
         return self._fires
 
+    @property
+    def debris(self):
+        """
+        Return _debris.
+
+        Returns:
+            _debris: List, elements are drifting StaticObject instances.
+        """
+        return self._debris
+
     @property
     def bullets(self):
         """
@@ -101,6 +224,79 @@ class CaptainForever:
         """
         return self._npc_bullets
 
+    @property
+    def particles(self):
+        """
+        Return _particles.
+
+        Returns:
+            _particles: ParticleSystem instance, explosions currently playing.
+        """
+        return self._particles
+
+    @property
+    def precise_collisions(self):
+        """
+        Return _precise_collisions.
+
+        Returns:
+            _precise_collisions: Bool, whether collisions are checked pixel
+            by pixel.
+        """
+        return self._precise_collisions
+
+    @property
+    def flow_field(self):
+        """
+        Return _flow_field.
+
+        Returns:
+            _flow_field: FlowField instance NPC ships steer by, or None.
+        """
+        return self._flow_field
+
+    @property
+    def world(self):
+        """
+        Return _world.
+
+        Returns:
+            _world: SectorWorld instance, or None.
+        """
+        return self._world
+
+    @property
+    def modular_parts(self):
+        """
+        Return _modular_parts.
+
+        Returns:
+            _modular_parts: Int, number of parts NPC ships are built from,
+            or 0 for NPC ships of one sprite.
+        """
+        return self._modular_parts
+
+    @property
+    def ai_scheduler(self):
+        """
+        Return _ai_scheduler.
+
+        Returns:
+            _ai_scheduler: AIScheduler instance, or None.
+        """
+        return self._ai_scheduler
+
+    def prepare_collision_masks(self):
+        """
+        Build the collision masks of every heading ships turn through ahead
+        of time, so the first collisions at each heading do not build them
+        mid-game.
+        """
+        for ship in (self.player_ship, *self._npc_ships[:1]):
+            if isinstance(ship, Ship):
+                for angle in range(0, 360, Ship.MANEUVERABILITY):
+                    rotated_mask(ship.sprite, ship.sprite_key, angle)
+
     @property
     def npc_ships(self):
         """
@@ -133,6 +329,47 @@ class CaptainForever:
         """
         return self._message_flag
 
+    @property
+    def paused(self):
+        """
+        Return _paused.
+
+        Returns:
+            _paused: Bool, whether the player paused the game.
+        """
+        return self._paused
+
+    def toggle_pause(self):
+        """
+        Pause the game, or carry on if it is paused.
+        """
+        self._paused = not self._paused
+
+    def idle_reason(self, in_background=False):
+        """
+        Return why there is nothing to simulate or draw, if there is not.
+
+        The end screen is only idle once every bullet, fire and explosion
+        has finished, since those keep moving after the game ends.
+
+        Args:
+            in_background: Bool, whether the window is unfocused or
+            minimized.
+
+        Returns:
+            String, "background", "paused" or "end_screen", or None if the
+            game should run.
+        """
+        if in_background:
+            return "background"
+        if self._paused:
+            return "paused"
+        if self._message and not (
+            self._bullets or self._npc_bullets or self._fires or self._particles
+        ):
+            return "end_screen"
+        return None
+
     @property
     def is_running(self):
         """
@@ -162,9 +399,36 @@ class CaptainForever:
         Returns:
             _height: Int, height of screen.
         """
-        return self.height
+        return self._height
+
+    @property
+    def sound_bank(self):
+        """
+        Return _sound_bank.
+
+        Returns:
+            _sound_bank: SoundBank instance that plays sound effects, or None.
+        """
+        return self._sound_bank
 
-    def main_loop(self, controller, view):
+    @property
+    def profiler(self):
+        """
+        Return _profiler.
+
+        Returns:
+            _profiler: FrameProfiler instance, collects per-phase frame timings.
+        """
+        return self._profiler
+
+    def main_loop(
+        self,
+        controller,
+        view,
+        max_frames=None,
+        frame_hooks=(),
+        idle_timeout_ms=None,
+    ):
         """
         Run main loop that updates PyGame screen frames
         to keep game running, updating the screen based
@@ -173,11 +437,47 @@ class CaptainForever:
         Args:
             controller: An instance of ArrowController.
             view: An instance of PyGame view.
+            max_frames: Int, number of frames to run before returning, or
+            None to run until the player quits.
+            frame_hooks: Iterable of functions called with the number of
+            frames run so far after each frame. The loop returns once any
+            of them returns True.
+            idle_timeout_ms: Int, longest time in ms to block waiting for
+            events while the game is paused, over, or in the background,
+            instead of simulating and drawing, or None to never idle. Idle
+            waits count as frames. Needs a controller with handle_events
+            and a view with a pacer.
         """
-        while True:
-            controller.maneuver_player_ship()
-            self._process_game_logic()
-            view.draw()
+        profiler = self._profiler
+        pacer = view.pacer if idle_timeout_ms is not None else None
+        frame = 0
+        while max_frames is None or frame < max_frames:
+            if (
+                pacer is not None
+                and self.idle_reason(pacer.in_background) is not None
+            ):
+                # the screen already shows this state, so wait for input
+                pacer.wait_for_event(idle_timeout_ms)
+                controller.handle_events()
+            else:
+                profiler.begin_frame()
+                profiler.start("controller")
+                controller.maneuver_player_ship()
+                profiler.stop("controller")
+                profiler.start("logic")
+                if not self._paused:
+                    self._process_game_logic()
+                profiler.stop("logic")
+                view.draw()
+                profiler.end_frame(self)
+            frame += 1
+            # every hook runs even if an earlier one asks to stop
+            stop = False
+            for hook in frame_hooks:
+                if hook(frame):
+                    stop = True
+            if stop:
+                break
 
     def get_game_objects(self):
         """
@@ -187,6 +487,7 @@ class CaptainForever:
             game_objects: List of all game objects as class instances.
         """
         game_objects = [
+            *self._debris,
             *self._npc_ships,
             *self._bullets,
             *self._npc_bullets,
@@ -197,105 +498,604 @@ class CaptainForever:
             game_objects.append(self.player_ship)
         return game_objects
 
+    def entity_counts(self):
+        """
+        Return the number of live game objects of each kind.
+
+        Returns:
+            Dict mapping entity kind names to ints.
+        """
+        return {
+            "player": int(self.is_running),
+            "npc_ships": len(self._npc_ships),
+            "bullets": len(self._bullets),
+            "npc_bullets": len(self._npc_bullets),
+            "fires": len(self._fires),
+            "debris": len(self._debris),
+            "awake": len(self._awake),
+            "particles": len(self._particles),
+        }
+
+    def _play_sound(self, name):
+        """
+        Play a sound effect if the game has a sound bank.
+
+        Args:
+            name: String, name of the effect in the sound bank.
+        """
+        if self._sound_bank is not None and not self._replaying:
+            self._sound_bank.play(name)
+
+    def _explode(self, position, sound):
+        """
+        Set off an explosion and play its sound, unless replaying.
+
+        Args:
+            position: Vector2, center of the explosion.
+            sound: String, name of the effect in the sound bank.
+        """
+        if not self._replaying:
+            self._particles.emit_explosion(position)
+            self._play_sound(sound)
+
+    def _fire_player_bullet(self, bullet):
+        """
+        Add a bullet shot by the player and play its sound.
+
+        Args:
+            bullet: Bullet instance shot by player_ship.
+        """
+        self._bullets.append(bullet)
+        self._play_sound("player_laser")
+
+    def _fire_npc_bullet(self, bullet):
+        """
+        Add a bullet shot by an NPC ship and play its sound.
+
+        Args:
+            bullet: Bullet instance shot by an NPCShip.
+        """
+        self._npc_bullets.append(bullet)
+        self._play_sound("npc_laser")
+
+    def step(self, replaying=False):
+        """
+        Run the game logic for one tick.
+
+        Args:
+            replaying: Bool, whether the tick has been simulated before, as
+            when rolling back. Explosions, sounds and particles only play
+            the first time so replaying leaves them alone.
+        """
+        self._replaying = replaying
+        try:
+            self._process_game_logic()
+        finally:
+            self._replaying = False
+
+    def save_state(self):
+        """
+        Return a copy of everything the game logic depends on.
+
+        Particles and sounds are not saved since they do not affect the
+        game. Objects keep their callbacks into this game, so the state can
+        only be restored into this game. The sector world's state is saved
+        too, so a rollback can undo entering a sector, and so is where the
+        AI scheduler's round robin of turns has got to.
+
+        Returns:
+            Tuple that can be passed to load_state.
+        """
+        return (
+            self.counter,
+            self._enemy_spawn_counter,
+            self._message,
+            self._message_flag,
+            self._random.getstate(),
+            self.player_ship.save_state(),
+            [npc_ship.save_state() for npc_ship in self._npc_ships],
+            [bullet.save_state() for bullet in self._bullets],
+            [bullet.save_state() for bullet in self._npc_bullets],
+            [fire.save_state() for fire in self._fires],
+            [rock.save_state() for rock in self._debris],
+            self._world.save_state() if self._world is not None else None,
+            (
+                self._ai_scheduler.save_state()
+                if self._ai_scheduler is not None
+                else None
+            ),
+        )
+
+    def load_state(self, state):
+        """
+        Put the game back to a state returned by save_state.
+
+        Args:
+            state: Tuple returned by save_state.
+        """
+        (
+            self.counter,
+            self._enemy_spawn_counter,
+            self._message,
+            self._message_flag,
+            random_state,
+            player_ship,
+            npc_ships,
+            bullets,
+            npc_bullets,
+            fires,
+            debris,
+            world,
+            ai_scheduler,
+        ) = state
+        self._random.setstate(random_state)
+        from_state = GameObject.from_state
+        self.player_ship = from_state(player_ship)
+        # lists are updated in place since other code may hold them
+        self._npc_ships[:] = [from_state(saved) for saved in npc_ships]
+        self._bullets[:] = [from_state(saved) for saved in bullets]
+        self._npc_bullets[:] = [from_state(saved) for saved in npc_bullets]
+        self._fires[:] = [from_state(saved) for saved in fires]
+        self._debris[:] = [from_state(saved) for saved in debris]
+        self._sort_sleepers()
+        if world is not None:
+            self._world.load_state(world)
+        if ai_scheduler is not None:
+            self._ai_scheduler.load_state(ai_scheduler)
+
     def _process_game_logic(self):
         """
         Process movement, collisions, and game state on non-destroyed game objects.
         """
+        profiler = self._profiler
         if not self._message:
-            for game_object in self.get_game_objects():
-                if (
-                    game_object in self._npc_ships
-                ):  # or game_object in self._fires:
-                    game_object.move(
-                        self.player_ship, self._width, self._height
-                    )
-                elif (
-                    game_object in self._bullets
-                    or game_object in self._npc_bullets
-                ):
-                    game_object.move()
-                else:
-                    game_object.move(self._width, self._height)
-            for npc_ship in self._npc_ships:
-                if npc_ship.collides_with(self.player_ship):
-                    self.player_ship = StaticObject(
-                        self.player_ship.position, "fire"
-                    )
-                    self._message_flag = "lost"
-                    self._end_game_message()
-                    # What would be nice is if it paused for a sec and returned to a start menu
-                    break
-            if len(self._npc_ships) < 8:
+            profiler.start("move")
+            self._move_game_objects()
+            profiler.stop("move")
+            profiler.start("collision")
+            self._check_player_rammed()
+            profiler.stop("collision")
+            # sectors bring their own enemies
+            if self._world is None and len(self._npc_ships) < 8:
                 self._enemy_spawn_counter += 5
                 # enemy spawning scales with number of enemies left
                 if self._enemy_spawn_counter > len(self._npc_ships) * 125:
                     self._enemy_spawn_counter = 0
                     self._spawn_enemy()
 
-        # Check for bullet not hitting anything
-        for bullet in self._bullets[:]:
-            if (
-                bullet.position.x > self._width
-                or bullet.position.y > self._height
-                or bullet.position.x < 0
-                or bullet.position.y < 0
+        profiler.start("cull")
+        self._cull_bullets()
+        profiler.stop("cull")
+        profiler.start("collision")
+        self._check_bullet_collisions()
+        profiler.stop("collision")
+        self._expire_fires()
+        if not self._replaying:
+            profiler.start("particles")
+            self._particles.update()
+            profiler.stop("particles")
+
+    def _move_game_objects(self):
+        """
+        Move every non-destroyed game object by one tick.
+
+        Bullets and fires are moved before the NPC ships so bullets fired
+        this tick do not move until the next one, and the player moves last
+        so NPC ships steer towards where it was at the start of the tick.
+        """
+        width = self._width
+        height = self._height
+        for bullet in self._bullets:
+            bullet.move()
+        for bullet in self._npc_bullets:
+            bullet.move()
+        if self._awake:
+            debris_grid = self._debris_grid
+            for game_object, in_grid in self._awake.items():
+                x, y = game_object.position
+                game_object.move(width, height)
+                if in_grid:
+                    debris_grid.remove(game_object, x, y)
+                    debris_grid.insert(game_object, *game_object.position)
+            self._settle()
+        if self._ai_scheduler is not None:
+            self._schedule_npc_ships(width, height)
+        elif self._flow_field is None:
+            for npc_ship in self._npc_ships:
+                npc_ship.move(self.player_ship, width, height)
+        elif self._npc_ships:
+            from flowfield import positions_of
+
+            headings, distances, pushes = self._flow_field.update(
+                self.player_ship.position, positions_of(self._npc_ships)
+            )
+            for npc_ship, heading, distance, push in zip(
+                self._npc_ships,
+                headings.tolist(),
+                distances.tolist(),
+                pushes.tolist(),
             ):
-                self._bullets.remove(bullet)
+                npc_ship.follow(heading, distance, push, width, height)
+        # the player's wreck sleeps like any other fire
+        if self.player_ship and not self.player_ship.asleep:
+            step = None
+            if self._world is not None:
+                position = self.player_ship.position + self.player_ship.velocity
+                step = (position.x // width, position.y // height)
+            self.player_ship.move(width, height)
+            if step is not None and step != (0, 0):
+                self._enter_sector((int(step[0]), int(step[1])))
 
-        for bullet in self._npc_bullets[:]:
-            if (
-                bullet.position.x > self._width
-                or bullet.position.y > self._height
-                or bullet.position.x < 0
-                or bullet.position.y < 0
+    def _enter_sector(self, step):
+        """
+        Freeze the sector the player flew out of and bring in the one they
+        flew into. Bullets and explosions are left behind.
+
+        Args:
+            step: Tuple of ints, columns and rows the player moved by.
+        """
+        recorder = self._profiler.recorder
+        recorder.begin("sector")
+        npc_ships, fires, debris = self._world.enter(
+            step,
+            self._npc_ships,
+            self._fires,
+            self._debris,
+            self.player_ship.position,
+            self._fire_npc_bullet,
+        )
+        # lists are updated in place since ships hold their append methods
+        self._npc_ships[:] = npc_ships
+        self._fires[:] = fires
+        self._debris[:] = debris
+        self._sort_sleepers()
+        self._bullets.clear()
+        self._npc_bullets.clear()
+        if not self._replaying:
+            self._particles.clear()
+        recorder.end("sector")
+
+    def _sort_sleepers(self):
+        """
+        Put the fires and debris that are awake in the update pass and
+        every piece of debris in the collision grid, after they have been
+        replaced.
+        """
+        self._awake.clear()
+        self._debris_grid.clear()
+        self._debris_radius = 0
+        self._debris_set = set(self._debris)
+        for fire in self._fires:
+            if not fire.asleep:
+                self._awake[fire] = False
+        for rock in self._debris:
+            self._debris_grid.insert(rock, rock.position.x, rock.position.y)
+            self._debris_radius = max(self._debris_radius, rock.radius)
+            if not rock.asleep:
+                self._awake[rock] = True
+
+    def _settle(self):
+        """
+        Take the fires and debris that fell asleep this tick out of the
+        update pass. Debris stays in the collision grid.
+        """
+        settled = [
+            game_object for game_object in self._awake if game_object.asleep
+        ]
+        for game_object in settled:
+            del self._awake[game_object]
+
+    def _wake(self, game_object, impulse, in_grid):
+        """
+        Push a fire or piece of debris and put it in the update pass.
+
+        Args:
+            game_object: StaticObject instance in _fires or _debris.
+            impulse: Vector2, x and y added to its velocity.
+            in_grid: Bool, whether it is debris, which is in the collision
+            grid.
+        """
+        game_object.push(impulse)
+        self._awake[game_object] = in_grid
+
+    def push(self, game_object, impulse):
+        """
+        Push a fire or piece of debris, waking it up if it is asleep.
+
+        Args:
+            game_object: StaticObject instance in fires or debris.
+            impulse: Vector2, x and y added to its velocity.
+        """
+        self._wake(game_object, impulse, game_object in self._debris_set)
+
+    def _schedule_npc_ships(self, width, height):
+        """
+        Let the AI scheduler pick which NPC ships decide this tick, then
+        move every NPC ship.
+
+        Args:
+            width: Int, represents width of screen.
+            height: Int, represents height of screen.
+        """
+        npc_ships = self._npc_ships
+        if not npc_ships:
+            return
+        player_position = self.player_ship.position
+        if self._flow_field is None:
+            pushes = None
+            distances = None
+
+            def decide(index):
+                npc_ships[index].aim_at(player_position)
+
+        else:
+            from flowfield import positions_of
+
+            headings, distances, pushes = self._flow_field.update(
+                player_position, positions_of(npc_ships)
+            )
+            headings = headings.tolist()
+            distance_list = distances.tolist()
+            pushes = pushes.tolist()
+
+            def decide(index):
+                npc_ships[index].decide(
+                    Vector2(headings[index]), distance_list[index]
+                )
+
+        self._ai_scheduler.run(npc_ships, player_position, decide, distances)
+        if pushes is None:
+            for npc_ship in npc_ships:
+                npc_ship.coast(width, height)
+        else:
+            for npc_ship, push in zip(npc_ships, pushes):
+                npc_ship.coast(width, height, push)
+
+    def _check_player_rammed(self):
+        """
+        End the game if an NPC ship has flown into the player.
+        """
+        for npc_ship in self._npc_ships:
+            if npc_ship.collides_with(
+                self.player_ship, self._precise_collisions
             ):
-                self._npc_bullets.remove(bullet)
+                self._explode(self.player_ship.position, "player_destroyed")
+                self.player_ship = StaticObject(
+                    self.player_ship.position, "fire"
+                )
+                self._message_flag = "lost"
+                self._end_game_message()
+                # What would be nice is if it paused for a sec and returned to a start menu
+                break
+
+    def _expire_fires(self):
+        """
+        Remove the newest fire every 50 ticks so wrecks burn out.
+
+        This is part of the game logic rather than drawing so games run
+        without a view do not keep every fire forever.
+        """
+        self.counter += 1
+        if self.counter % 50 == 0 and self._fires:
+            # a fire burning out while pushed stops being moved too
+            self._awake.pop(self._fires.pop(), None)
+
+    def _cull_bullets(self):
+        """
+        Remove bullets that have left the screen without hitting anything.
+        """
+        width = self._width
+        height = self._height
+        # lists are updated in place since ships hold their append methods
+        for bullets in (self._bullets, self._npc_bullets):
+            bullets[:] = [
+                bullet
+                for bullet in bullets
+                if 0 <= bullet.position.x <= width
+                and 0 <= bullet.position.y <= height
+            ]
 
+    def _check_bullet_collisions(self):
+        """
+        Destroy ships hit by bullets and check whether the game is over.
+        Debris stops bullets first.
+        """
+        if self._debris:
+            self._check_debris_shot()
         # Check for bullet collisions with npc ships
-        for bullet in self._bullets[:]:
-            for npc_ship in self._npc_ships[:]:
-                if npc_ship.collides_with(bullet):
-                    position_on_screen = npc_ship.position
-                    self._npc_ships.remove(npc_ship)
-                    fire = StaticObject(position_on_screen, "fire")
-                    self._fires.append(fire)
-
-        for bullet in self._npc_bullets[:]:
-            if self.player_ship.collides_with(bullet) and self.is_running:
-                self._npc_bullets.remove(bullet)
+        self._check_npc_ships_shot()
+
+        if self.is_running and self._npc_bullets:
+            stopped = set()
+            for bullet in self.player_ship.colliding(
+                self._npc_bullets, self._precise_collisions
+            ):
+                stopped.add(bullet)
                 self.player_ship.reduce_health()
                 if self.player_ship.get_health() == 0:
+                    self._explode(self.player_ship.position, "player_destroyed")
                     self.player_ship = StaticObject(
                         self.player_ship.position, "fire"
                     )
                     self._message_flag = "lost"
                     self._end_game_message()
+                    break
+            if stopped:
+                # lists are updated in place since ships hold their append
+                # methods
+                self._npc_bullets[:] = [
+                    bullet
+                    for bullet in self._npc_bullets
+                    if bullet not in stopped
+                ]
 
-        if not self._npc_ships and self.player_ship:
+        # a sector world never runs out of enemies to fight
+        if not self._npc_ships and self.player_ship and self._world is None:
             self._message_flag = "won"
             self._end_game_message()
 
+    def _debris_hit_by(self, bullet):
+        """
+        Return the piece of debris a bullet hits, found in the collision
+        grid.
+
+        Args:
+            bullet: Bullet instance.
+
+        Returns:
+            A StaticObject instance in _debris, or None.
+        """
+        x, y = bullet.position
+        reach = self._debris_radius + bullet.radius
+        for rock in self._debris_grid.query(
+            x - reach, y - reach, 2 * reach, 2 * reach
+        ):
+            if rock.collides_with(bullet, self._precise_collisions):
+                return rock
+        return None
+
+    def _check_debris_shot(self):
+        """
+        Stop bullets that hit debris and push the debris they hit.
+
+        Whether any debris is around a cell of the collision grid is looked
+        up once per cell, so bullets far from the debris skip the grid
+        query.
+        """
+        debris_grid = self._debris_grid
+        near = {}
+        for bullets in (self._bullets, self._npc_bullets):
+            stopped = set()
+            for bullet in bullets:
+                cell = debris_grid.cell_of(*bullet.position)
+                debris_near = near.get(cell)
+                if debris_near is None:
+                    # the cells around only hold every hit if debris is
+                    # smaller than a cell
+                    debris_near = near[cell] = (
+                        self._debris_radius + bullet.radius
+                        > debris_grid.cell_size
+                        or debris_grid.near(cell)
+                    )
+                if not debris_near:
+                    continue
+                rock = self._debris_hit_by(bullet)
+                if rock is not None:
+                    stopped.add(bullet)
+                    self._wake(
+                        rock, bullet.velocity * self.BULLET_IMPULSE, True
+                    )
+            if stopped:
+                # lists are updated in place since ships hold their append
+                # methods
+                bullets[:] = [
+                    bullet for bullet in bullets if bullet not in stopped
+                ]
+
+    def _check_npc_ships_shot(self):
+        """
+        Destroy NPC ships hit by player bullets. Bullets are put in a
+        spatial grid first, so each ship only tests the bullets near it.
+        """
+        bullets = self._bullets
+        if not bullets or not self._npc_ships:
+            return
+        grid = SpatialGrid(self.COLLISION_CELL_SIZE)
+        for bullet in bullets:
+            grid.insert(bullet, bullet.position.x, bullet.position.y)
+        bullet_radius = bullets[0].radius
+        stopped = set()
+        for npc_ship in self._npc_ships[:]:
+            x, y = npc_ship.position
+            reach = npc_ship.radius + bullet_radius
+            for bullet in grid.query(
+                x - reach, y - reach, 2 * reach, 2 * reach
+            ):
+                if bullet in stopped or not npc_ship.collides_with(
+                    bullet, self._precise_collisions
+                ):
+                    continue
+                # parts stop bullets, plain ships let them fly on
+                if npc_ship.HAS_PARTS:
+                    stopped.add(bullet)
+                    if not self._hit_modular_ship(npc_ship, bullet):
+                        continue
+                position_on_screen = npc_ship.position
+                self._npc_ships.remove(npc_ship)
+                self._explode(position_on_screen, "npc_destroyed")
+                fire = StaticObject(position_on_screen, "fire")
+                self._fires.append(fire)
+                break
+        if stopped:
+            # lists are updated in place since ships hold their append methods
+            bullets[:] = [bullet for bullet in bullets if bullet not in stopped]
+
+    def _hit_modular_ship(self, npc_ship, bullet):
+        """
+        Damage the part of a modular ship a bullet hit, which stops the
+        bullet. A part that runs out of health breaks off, along with
+        everything attached to it.
+
+        Args:
+            npc_ship: ModularShip instance the bullet hit.
+            bullet: Bullet instance shot by the player.
+
+        Returns:
+            Bool, whether the ship's core was destroyed, and so the ship.
+        """
+        part = npc_ship.part_hit_by(bullet)
+        part.reduce_health()
+        if part.health > 0:
+            return False
+        if part is npc_ship.core:
+            return True
+        position_on_screen = npc_ship.to_screen(part)
+        npc_ship.detach(part)
+        self._explode(position_on_screen, "npc_destroyed")
+        return False
+
     def _end_game_message(self):
         """
         Create the game _message and indicate whether the player won or lost.
         """
-        self._message = (
-            f"You {self._message_flag}! \n To exit, press escape \n To start a"
-            " new game, press enter"
-        )
+        self._message = END_GAME_MESSAGE.format(self._message_flag)
 
     def _spawn_enemy(self):
         """
         Spawn in new enememy ship.
         """
+        recorder = self._profiler.recorder
+        recorder.begin("spawn")
         while True:
-            position = get_random_position(self._width, self._height)
+            position = get_random_position(
+                self._width, self._height, self._random
+            )
             if (
                 position.distance_to(self.player_ship.position)
                 < self.ENEMY_SPAWN_DISTANCE
             ):
                 break
-            # second argument specifies ship and not fire
-            self._npc_ships.append(
-                NPCShip(position, "ship", self._npc_bullets.append)
+            self._npc_ships.append(self._new_npc_ship(position))
+        recorder.end("spawn")
+
+    def _new_npc_ship(self, position):
+        """
+        Create an NPC ship, built from parts if the game has modular ships.
+
+        Args:
+            position: Vector2, x and y position on the screen.
+
+        Returns:
+            An NPCShip instance.
+        """
+        if self._modular_parts:
+            from modular import build_modular_ship
+
+            return build_modular_ship(
+                position,
+                self._fire_npc_bullet,
+                self._modular_parts,
+                self._random,
             )
+        # second argument specifies ship and not fire
+        return NPCShip(position, "ship", self._fire_npc_bullet)
@@ -0,0 +1,224 @@
+"""
+Garbage collector policy that keeps collection pauses out of play.
+
+CPython's cyclic collector runs whenever enough objects have been
+allocated, which can land a pause in the middle of any frame. During play
+the policy raises the generation 0 threshold, or turns automatic
+collection off, and collects young objects itself in the slack the frame
+pacer has before the next frame is due. Long-lived objects like sprites
+and the game itself are frozen once the game has started, so collections
+never walk them again, and full collections are left until a game is
+over.
+"""
+from collections import deque
+import gc
+from time import perf_counter
+
+
+class GCPolicy:
+    """
+    Decide when the garbage collector runs and time every collection.
+
+    Collections are timed through gc.callbacks and reported to a
+    FrameProfiler as the "gc" phase, so they show on the overlay and in
+    the timeline, whoever started them.
+
+    Attributes:
+        _profiler: FrameProfiler instance collections are reported to.
+        _gen0_threshold: Int, generation 0 threshold during play, 0 to turn
+        automatic collection off.
+        _max_gen0: Int, young objects after which a frame collects them even
+        without slack, so memory cannot grow unbounded.
+        _min_gen0: Int, young objects needed before slack is spent on them.
+        _slack_ms: Float, least time before the next frame worth collecting
+        in.
+        _original_threshold: Tuple of ints, thresholds to restore on stop,
+        or None while the policy is not started.
+        _started_at: Float, perf_counter value the running collection
+        started at, or None.
+        _frame_pause: Float, ms spent collecting this frame.
+        _frame_pauses: Deque, ms spent collecting in each past frame.
+        _collections: List of ints, collections run of each generation.
+        _pause_ms: Float, total ms spent collecting.
+        _worst_ms: Float, longest single collection in ms.
+        _slack_collections: Int, collections run in frame slack.
+        _forced_collections: Int, collections run because young objects
+        passed _max_gen0.
+        _game_over_collected: Bool, whether the game on the end screen has
+        had its full collection.
+    """
+
+    def __init__(
+        self,
+        profiler,
+        gen0_threshold=0,
+        max_gen0=50_000,
+        min_gen0=500,
+        slack_ms=2.0,
+        history=120,
+    ):
+        """
+        Initialize GCPolicy.
+
+        Args:
+            profiler: FrameProfiler instance collections are reported to.
+            gen0_threshold: Int, generation 0 threshold during play, 0 to
+            turn automatic collection off.
+            max_gen0: Int, young objects after which a frame collects them
+            even without slack.
+            min_gen0: Int, young objects needed before slack is spent on
+            them.
+            slack_ms: Float, least time before the next frame worth
+            collecting in.
+            history: Int, number of frames whose pauses are kept.
+        """
+        self._profiler = profiler
+        self._gen0_threshold = gen0_threshold
+        self._max_gen0 = max_gen0
+        self._min_gen0 = min_gen0
+        self._slack_ms = slack_ms
+        self._original_threshold = None
+        self._started_at = None
+        self._frame_pause = 0.0
+        self._frame_pauses = deque(maxlen=history)
+        self._collections = [0, 0, 0]
+        self._pause_ms = 0.0
+        self._worst_ms = 0.0
+        self._slack_collections = 0
+        self._forced_collections = 0
+        self._game_over_collected = False
+
+    @property
+    def frame_pauses(self):
+        """
+        Return _frame_pauses.
+
+        Returns:
+            _frame_pauses: Deque, ms spent collecting in each past frame.
+        """
+        return self._frame_pauses
+
+    def stats(self):
+        """
+        Summarize the collections run since the policy started.
+
+        Returns:
+            Dict with the collections of each generation, the total and
+            worst pause in ms, the collections run in slack and forced, and
+            the number of frozen objects.
+        """
+        return {
+            "collections": list(self._collections),
+            "pause_ms": self._pause_ms,
+            "worst_ms": self._worst_ms,
+            "slack": self._slack_collections,
+            "forced": self._forced_collections,
+            "frozen": gc.get_freeze_count(),
+        }
+
+    def _on_collection(self, phase, info):
+        """
+        Time a collection. Called by the garbage collector.
+
+        Args:
+            phase: String, "start" or "stop".
+            info: Dict, holds the generation being collected.
+        """
+        if phase == "start":
+            self._profiler.start("gc")
+            self._started_at = perf_counter()
+            return
+        # the policy may have been started partway through the collection
+        if self._started_at is None:
+            return
+        self._profiler.stop("gc")
+        pause = (perf_counter() - self._started_at) * 1000
+        self._started_at = None
+        self._collections[info["generation"]] += 1
+        self._frame_pause += pause
+        self._pause_ms += pause
+        self._worst_ms = max(self._worst_ms, pause)
+
+    def start(self):
+        """
+        Start timing collections and switch to the play thresholds.
+        """
+        if self._original_threshold is not None:
+            return
+        self._original_threshold = gc.get_threshold()
+        gc.callbacks.append(self._on_collection)
+        gc.set_threshold(self._gen0_threshold, *self._original_threshold[1:])
+
+    def stop(self):
+        """
+        Stop timing collections, restore the original thresholds and
+        unfreeze everything frozen.
+        """
+        if self._original_threshold is None:
+            return
+        gc.callbacks.remove(self._on_collection)
+        gc.set_threshold(*self._original_threshold)
+        gc.unfreeze()
+        self._original_threshold = None
+
+    def freeze(self):
+        """
+        Collect everything, then move every object left into the permanent
+        generation so later collections skip it. Objects frozen before are
+        thawed first, so cycles left behind by an old game are still freed.
+        """
+        gc.unfreeze()
+        gc.collect()
+        gc.freeze()
+
+    def collect_in_slack(self, remaining):
+        """
+        Collect young objects if there is time before the next frame.
+        Generation 1 is collected instead once enough generation 0
+        collections have piled up in it.
+
+        Args:
+            remaining: Float, seconds until the next frame is due.
+        """
+        if remaining * 1000 < self._slack_ms:
+            return
+        young, middle, _ = gc.get_count()
+        if middle >= gc.get_threshold()[1]:
+            gc.collect(1)
+        elif young >= self._min_gen0:
+            gc.collect(0)
+        else:
+            return
+        self._slack_collections += 1
+
+    def frame_hook(self, game):
+        """
+        Create a frame hook that freezes the game once it has started,
+        collects young objects if slack has not kept up, does a full
+        collection once a game is over and records each frame's pauses.
+
+        Args:
+            game: An instance of CaptainForever.
+
+        Returns:
+            A function for CaptainForever.main_loop's frame_hooks.
+        """
+
+        def hook(frame):
+            if frame == 1:
+                self.freeze()
+            if gc.get_count()[0] > self._max_gen0:
+                gc.collect(0)
+                self._forced_collections += 1
+            if game.message_flag and not self._game_over_collected:
+                # nothing is moving on the end screen, so a full pause there
+                # goes unnoticed
+                self.freeze()
+                self._game_over_collected = True
+            elif not game.message_flag:
+                self._game_over_collected = False
+            self._frame_pauses.append(self._frame_pause)
+            self._frame_pause = 0.0
+            return False
+
+        return hook
@@ -0,0 +1,561 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# pylint: disable=protected-access
+# Disabling pylint warnings related to PyGame that aren't valid
+# Disabling protected access because sys._current_frames is the only way to
+# read another thread's stack
+"""
+Hitch detector that keeps a rolling record of recent frames and writes a
+capture bundle whenever a frame takes too long, and a replayer that plays
+a bundle back headless to reproduce the spike.
+
+A bundle is a directory holding hitch.json (the recent frames' phase
+timings, entity counts and input), replay.cfst (the game state from up to
+two windows of frames before the hitch and the input of every tick since,
+in the replay format from serialization.py), and optionally stacks.txt
+(sampled stacks of the slow frame, one collapsed stack and its sample
+count per line) and trace.json (the timeline recorder's Chrome trace).
+
+A game in a sector world records the world's settings in hitch.json and
+its sector in replay.cfst. Sectors frozen before the saved state are not
+kept, so the replay generates them afresh from the seed.
+
+Replay a bundle with
+
+    python hitch.py hitch-001234
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+from collections import Counter, deque
+from time import perf_counter
+import pygame
+import timeline
+from game import CaptainForever
+from controller import RemoteController
+from profiler import FrameProfiler
+from rollback import apply_buttons
+from scheduler import AIScheduler
+from sectors import SectorWorld
+from serialization import (
+    StateReader,
+    encode_document,
+    encode_game_sections,
+    encode_inputs_section,
+    load_game,
+)
+from view import PyGameView
+
+
+class StackSampler:
+    """
+    Sample the Python stack of one thread from a background thread, and
+    keep the samples of the last few seconds.
+
+    Attributes:
+        _interval: Float, seconds between samples.
+        _samples: Deque of (perf_counter value, tuple of code objects from
+        the outermost call in) tuples.
+        _thread_id: Int, identifier of the thread being sampled.
+        _stopped: threading.Event, set to stop sampling.
+        _thread: threading.Thread taking the samples, or None.
+    """
+
+    def __init__(self, interval_ms=2.0, history_s=5.0):
+        """
+        Initialize StackSampler.
+
+        Args:
+            interval_ms: Float, ms between samples.
+            history_s: Float, seconds of samples kept.
+        """
+        self._interval = interval_ms / 1000
+        self._samples = deque(maxlen=max(1, int(history_s / self._interval)))
+        self._thread_id = threading.get_ident()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Start sampling the thread this is called from.
+        """
+        self._thread_id = threading.get_ident()
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="stack-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop sampling and wait for the sampling thread to finish.
+        """
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        """
+        Take samples until stopped.
+        """
+        while not self._stopped.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)
+            codes = []
+            while frame is not None:
+                codes.append(frame.f_code)
+                frame = frame.f_back
+            self._samples.append((perf_counter(), tuple(reversed(codes))))
+
+    def collapsed(self, start, end):
+        """
+        Count the stacks sampled in a window of time.
+
+        Args:
+            start: Float, perf_counter value the window starts at.
+            end: Float, perf_counter value the window ends at.
+
+        Returns:
+            List of (collapsed stack, count) tuples, most sampled first.
+            Each stack is its functions from the outermost in, joined with
+            semicolons.
+        """
+        # copied first, the sampling thread appends while this runs
+        samples = list(self._samples)
+        counts = Counter(
+            codes for taken, codes in samples if start <= taken <= end
+        )
+        return [
+            (
+                ";".join(
+                    f"{code.co_name} ({os.path.basename(code.co_filename)}"
+                    f":{code.co_firstlineno})"
+                    for code in codes
+                ),
+                count,
+            )
+            for codes, count in counts.most_common()
+        ]
+
+
+class HitchDetector:
+    """
+    Keep the phase timings, entity counts and input of the last frames, and
+    write a capture bundle when a frame takes longer than a threshold.
+
+    Instances are frame hooks, so they are passed to
+    CaptainForever.main_loop and called after every frame. A frame lasts
+    from one call to the next, minus any time the pacer spent idle. Phase
+    timings are read from the timeline recorder, so they are there whether
+    or not the profiler overlay is shown.
+
+    To replay up to a hitch, the game state is kept every history ticks
+    along with the input of every tick since. A restart starts the record
+    afresh.
+
+    Attributes:
+        _game: CaptainForever instance being played.
+        _controller: Controller with a buttons property, the
+        RemoteController bits of the input applied last frame.
+        _threshold_ms: Float, frames longer than this are hitches.
+        _history: Int, number of frames kept and ticks between kept states.
+        _output_dir: String, directory bundles are written to.
+        _sampler: StackSampler instance, or None for no stacks.
+        _pacer: FramePacer instance whose idle time is left out of frames,
+        or None.
+        _max_bundles: Int, most bundles written in one run.
+        _warm_up_frames: Int, frames at the start that are never hitches.
+        _stream: File object bundle paths are printed to, or None.
+        _frames: Deque of dicts, the record of each recent frame.
+        _keyframes: Deque of (tick, game sections, input list) tuples, the
+        last two kept states and the button bits of each tick after them.
+        _bundles: List of strings, paths of the bundles written.
+        _last_time: Float, perf_counter value at the end of the last frame.
+        _last_idle: Float, pacer idle seconds at the end of the last frame.
+        _last_counter: Int, game counter at the end of the last frame.
+        _held: Int, button bits of the last frame that had a tick.
+    """
+
+    def __init__(
+        self,
+        game,
+        controller,
+        threshold_ms=50.0,
+        history=120,
+        output_dir=".",
+        sampler=None,
+        pacer=None,
+        max_bundles=10,
+        warm_up_frames=2,
+        stream=None,
+    ):
+        """
+        Initialize HitchDetector.
+
+        Args:
+            game: CaptainForever instance being played.
+            controller: Controller with a buttons property, like
+            ArrowController or RemoteController.
+            threshold_ms: Float, frames longer than this are hitches.
+            history: Int, number of frames kept and ticks between kept
+            states.
+            output_dir: String, directory bundles are written to.
+            sampler: StackSampler instance, or None for no stacks.
+            pacer: FramePacer instance whose idle time is left out of
+            frames, or None.
+            max_bundles: Int, most bundles written in one run.
+            warm_up_frames: Int, frames at the start that are never hitches,
+            since they load resources.
+            stream: File object bundle paths are printed to, or None.
+        """
+        self._game = game
+        self._controller = controller
+        self._threshold_ms = threshold_ms
+        self._history = history
+        self._output_dir = output_dir
+        self._sampler = sampler
+        self._pacer = pacer
+        self._max_bundles = max_bundles
+        self._warm_up_frames = warm_up_frames
+        self._stream = stream
+        self._frames = deque(maxlen=history)
+        self._keyframes = deque(maxlen=2)
+        self._bundles = []
+        self._last_time = perf_counter()
+        self._last_idle = self._idle_seconds()
+        self._last_counter = game.counter
+        self._held = 0
+
+    @property
+    def frames(self):
+        """
+        Return _frames.
+
+        Returns:
+            _frames: Deque of dicts, the record of each recent frame.
+        """
+        return self._frames
+
+    @property
+    def bundles(self):
+        """
+        Return _bundles.
+
+        Returns:
+            _bundles: List of strings, paths of the bundles written.
+        """
+        return self._bundles
+
+    def _idle_seconds(self):
+        """
+        Return how long the pacer has spent idle.
+
+        Returns:
+            Float, seconds, 0 without a pacer.
+        """
+        return self._pacer.idle_seconds if self._pacer is not None else 0.0
+
+    def _keep_state(self):
+        """
+        Keep the game's current state as the start of a new stretch of
+        input.
+        """
+        self._keyframes.append(
+            (self._game.counter, encode_game_sections(self._game), [])
+        )
+
+    def __call__(self, frame):
+        """
+        Record the frame that just finished and write a bundle if it was a
+        hitch.
+
+        Args:
+            frame: Int, number of frames run so far.
+
+        Returns:
+            False, hitch detection never ends the game loop.
+        """
+        now = perf_counter()
+        idle = self._idle_seconds()
+        game = self._game
+        counter = game.counter
+        ticked = counter != self._last_counter
+        buttons = self._controller.buttons if ticked else 0
+        record = {
+            "frame": frame,
+            "ms": (now - self._last_time - (idle - self._last_idle)) * 1000,
+            "idle": idle > self._last_idle,
+            "ticked": ticked,
+            "buttons": buttons,
+            "phases": (
+                {} if idle > self._last_idle else timeline.recorder.last_frame()
+            ),
+            "entities": game.entity_counts(),
+        }
+        self._frames.append(record)
+
+        if counter < self._last_counter:
+            # restarted, so earlier input no longer applies
+            self._keyframes.clear()
+        elif ticked and self._keyframes:
+            self._keyframes[-1][2].append(buttons)
+        if ticked:
+            self._held = buttons
+        # replays start with fire released, so a state is only kept after a
+        # tick that did not hold it
+        if (
+            not self._keyframes or len(self._keyframes[-1][2]) >= self._history
+        ) and not self._held & RemoteController.FIRE:
+            self._keep_state()
+
+        if (
+            frame > self._warm_up_frames
+            and record["ms"] > self._threshold_ms
+            and len(self._bundles) < self._max_bundles
+        ):
+            path = self.write_bundle(now - record["ms"] / 1000, now)
+            if self._stream is not None:
+                print(
+                    (
+                        f"Frame {frame} took {record['ms']:.1f} ms, wrote hitch"
+                        f" bundle to {path}"
+                    ),
+                    file=self._stream,
+                )
+        self._last_time = perf_counter()
+        self._last_idle = idle
+        self._last_counter = counter
+        return False
+
+    def write_bundle(self, start, end):
+        """
+        Write a capture bundle for the last frame.
+
+        Args:
+            start: Float, perf_counter value the frame started at.
+            end: Float, perf_counter value the frame ended at.
+
+        Returns:
+            String path of the bundle directory.
+        """
+        game = self._game
+        hitch = self._frames[-1]
+        path = os.path.join(self._output_dir, f"hitch-{hitch['frame']:06d}")
+        os.makedirs(path, exist_ok=True)
+
+        replay = None
+        # no state is kept until fire is first released after a restart
+        if self._keyframes:
+            replay = "replay.cfst"
+            first_tick, sections, _ = self._keyframes[0]
+            buttons = [
+                held for _, _, inputs in self._keyframes for held in inputs
+            ]
+            with open(os.path.join(path, replay), "wb") as replay_file:
+                replay_file.write(
+                    encode_document(
+                        sections + [encode_inputs_section(first_tick, buttons)]
+                    )
+                )
+
+        stacks = None
+        if self._sampler is not None:
+            stacks = "stacks.txt"
+            with open(
+                os.path.join(path, stacks), "w", encoding="utf-8"
+            ) as stacks_file:
+                for stack, count in self._sampler.collapsed(start, end):
+                    stacks_file.write(f"{stack} {count}\n")
+        trace = None
+        if timeline.recorder.enabled:
+            trace = "trace.json"
+            timeline.recorder.dump(os.path.join(path, trace), reason="hitch")
+
+        ai_scheduler = game.ai_scheduler
+        world = game.world
+        bundle = {
+            "frame": hitch["frame"],
+            "frame_ms": hitch["ms"],
+            "threshold_ms": self._threshold_ms,
+            "game": {
+                "width": game.width,
+                "height": game.height,
+                "precise_collisions": game.precise_collisions,
+                "flow_field": game.flow_field is not None,
+                "ai_scheduler": ai_scheduler is not None,
+                "ai_budget_us": (
+                    ai_scheduler.budget_us if ai_scheduler else None
+                ),
+                "modular_parts": game.modular_parts,
+                "world": world.settings() if world is not None else None,
+            },
+            "replay": (
+                {
+                    "file": replay,
+                    "first_tick": first_tick,
+                    "ticks": len(buttons),
+                    # the hitch's own tick, if it had one, is the last one
+                    "hitch_ticked": hitch["ticked"],
+                }
+                if replay
+                else None
+            ),
+            "stacks": stacks,
+            "trace": trace,
+            "frames": list(self._frames),
+        }
+        with open(
+            os.path.join(path, "hitch.json"), "w", encoding="utf-8"
+        ) as bundle_file:
+            json.dump(bundle, bundle_file, indent=2)
+        self._bundles.append(path)
+        return path
+
+
+def replay_bundle(path, draw=True, repeat=3):
+    """
+    Play a capture bundle's input back from its saved state, timing every
+    tick, to reproduce a hitch.
+
+    The bundle is played several times and each tick keeps its fastest
+    time, so slow ticks caused by caches being cold on the first play are
+    not mistaken for the hitch.
+
+    Args:
+        path: String, bundle directory.
+        draw: Bool, whether to draw each tick as well.
+        repeat: Int, number of times to play the bundle.
+
+    Returns:
+        Dict with the bundle's recorded frame time, the number of ticks
+        played, the time and phases of each tick in ms, and the index of
+        the slowest tick.
+
+    Raises:
+        ValueError: If the bundle has no replay or it is not valid.
+    """
+    with open(os.path.join(path, "hitch.json"), encoding="utf-8") as file:
+        bundle = json.load(file)
+    if bundle["replay"] is None:
+        raise ValueError("Bundle has no replay")
+    with open(os.path.join(path, bundle["replay"]["file"]), "rb") as file:
+        data = file.read()
+    options = bundle["game"]
+    # sprites are converted for the display, so one is needed either way
+    screen = pygame.display.set_mode((options["width"], options["height"]))
+    # phases are read back from the timeline recorder, since an enabled
+    # profiler would draw its overlay into every tick
+    profiler = FrameProfiler()
+    # bundles from before worlds were recorded have no world
+    world = options.get("world")
+    game = CaptainForever(
+        options["width"],
+        options["height"],
+        profiler,
+        precise_collisions=options["precise_collisions"],
+        flow_field=options["flow_field"],
+        modular_parts=options.get("modular_parts", 0),
+        ai_scheduler=(
+            AIScheduler(options["ai_budget_us"])
+            if options["ai_scheduler"]
+            else None
+        ),
+        world=(
+            SectorWorld(options["width"], options["height"], **world)
+            if world is not None
+            else None
+        ),
+    )
+    view = PyGameView(game, screen, max_fps=0) if draw else None
+    _, buttons = StateReader(data).inputs()
+
+    ticks = [None] * len(buttons)
+    for _ in range(repeat):
+        load_game(game, data)
+        previous = 0
+        for index, held in enumerate(buttons):
+            start = perf_counter()
+            profiler.begin_frame()
+            profiler.start("controller")
+            apply_buttons(game, held, previous)
+            profiler.stop("controller")
+            profiler.start("logic")
+            game.step()
+            profiler.stop("logic")
+            if view is not None:
+                view.draw()
+            profiler.end_frame(game)
+            elapsed = (perf_counter() - start) * 1000
+            if ticks[index] is None or elapsed < ticks[index]["ms"]:
+                ticks[index] = {
+                    "ms": elapsed,
+                    "phases": timeline.recorder.last_frame(),
+                }
+            previous = held
+    return {
+        "recorded_ms": bundle["frame_ms"],
+        "ticks": ticks,
+        "slowest": (
+            max(range(len(ticks)), key=lambda index: ticks[index]["ms"])
+            if ticks
+            else None
+        ),
+    }
+
+
+def main(argv=None):
+    """
+    Replay a capture bundle from the command line.
+
+    Args:
+        argv: List of strings, command line arguments without the program
+        name, or None to use sys.argv.
+
+    Returns:
+        Int, exit status.
+    """
+    parser = argparse.ArgumentParser(
+        description="Replay a hitch capture bundle headless."
+    )
+    parser.add_argument("bundle", help="bundle directory")
+    parser.add_argument(
+        "--no-draw",
+        action="store_true",
+        help="only run the game logic, without drawing",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="times to play the bundle, keeping each tick's best (default: 3)",
+    )
+    args = parser.parse_args(argv)
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.init()
+
+    result = replay_bundle(args.bundle, not args.no_draw, args.repeat)
+    ticks = result["ticks"]
+    print(
+        f"Recorded frame: {result['recorded_ms']:.1f} ms,"
+        f" replayed {len(ticks)} ticks"
+    )
+    if ticks:
+        slowest = ticks[result["slowest"]]
+        print(
+            f"Slowest tick: {result['slowest']} at {slowest['ms']:.1f} ms,"
+            f" last tick {ticks[-1]['ms']:.1f} ms"
+        )
+        for phase, duration in sorted(
+            slowest["phases"].items(), key=lambda item: -item[1]
+        ):
+            if duration:
+                print(f"  {phase}: {duration:.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
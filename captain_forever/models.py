@@ -1,22 +1,52 @@
 # pylint: disable=no-member
 # pylint: disable=no-name-in-module
+# pylint: disable=global-statement
 # Disabling pylint warnings related to PyGame that aren't valid
+# Disabling global statement because the entity id counter is module state
 """
 Define the classes corresponding to our model architecture and update
 their properties to reflect game state.
 """
+from itertools import count
 import pygame
 from pygame.math import Vector2
-from pygame.transform import rotozoom
+from pygame.mask import from_surface
 from pygame.locals import *
 from utils import (
+    dimensions,
     load_sprite,
+    rotate_sprite,
+    rotated_mask,
+    sprite_mask,
+    tint_sprite,
     wrap_position,
+    zoom_sprite,
 )
 
 # Because pygame has inverted y axis, this vector points UP (used for calculations)
 UP = Vector2(0, -1)
 
+# every game object gets a unique id so it can be tracked across snapshots
+_entity_ids = count(1)
+
+
+def reserve_entity_ids(last_id):
+    """
+    Make sure ids given out from now on are above an id already in use,
+    such as one loaded from a save file.
+
+    Args:
+        last_id: Int, highest id in use.
+    """
+    global _entity_ids
+    next_id = next(_entity_ids)
+    _entity_ids = count(max(next_id, last_id + 1))
+
+
+# attributes holding Vector2s, or the hull of a modular ship, which are
+# changed in place and must be copied
+_COPIED_ATTRIBUTES = ("_position", "_velocity", "_direction", "_hull")
+
 
 class GameObject:
     """
@@ -28,18 +58,33 @@ class GameObject:
         _radius: int, radius of the sprite.
         _velocity: Vector2, rate of change in x and y of the sprite.
         _method_flag: Int, used to identify which function was called during testing.
+        _entity_id: Int, unique id of the object.
+        _sprite_key: Tuple, asset name and variant of the sprite, used to
+        cache its collision masks, or None to not cache them.
     """
 
-    def __init__(self, position, sprite, velocity):
+    def __init__(self, position, sprite, velocity, sprite_key=None):
         """
         Initialize a GameObject instance.
         """
+        self._entity_id = next(_entity_ids)
         self._position = Vector2(position)
         self._sprite = sprite
+        self._sprite_key = sprite_key
         self._radius = sprite.get_width() / 2
         self._velocity = Vector2(velocity)
         self._method_flag = 0
 
+    @property
+    def entity_id(self):
+        """
+        Return _entity_id.
+
+        Returns:
+            _entity_id: Int, unique id of the object.
+        """
+        return self._entity_id
+
     @property
     def position(self):
         """
@@ -60,6 +105,17 @@ class GameObject:
         """
         return self._sprite
 
+    @property
+    def sprite_key(self):
+        """
+        Return _sprite_key.
+
+        Returns:
+            _sprite_key: Tuple, asset name and variant of the sprite, or
+            None.
+        """
+        return self._sprite_key
+
     @property
     def radius(self):
         """
@@ -81,6 +137,17 @@ class GameObject:
         """
         return self._velocity
 
+    @property
+    def asleep(self):
+        """
+        Return whether the object is asleep and can be left out of the
+        update passes. Only static objects fall asleep.
+
+        Returns:
+            Bool, whether the object is asleep.
+        """
+        return False
+
     @property
     def method_flag(self):
         """
@@ -92,15 +159,59 @@ class GameObject:
         """
         return self._method_flag
 
-    def draw(self, surface):
+    def save_state(self):
+        """
+        Return a copy of the object's state that later changes do not touch.
+
+        Sprites and callbacks are shared rather than copied, so the state
+        can only be restored into the game it was saved from.
+
+        Returns:
+            Tuple of the object's class and a dict of its attributes.
+        """
+        state = self.__dict__.copy()
+        for name in _COPIED_ATTRIBUTES:
+            if name in state:
+                state[name] = state[name].copy()
+        return type(self), state
+
+    @staticmethod
+    def from_state(saved):
+        """
+        Create a game object from a state returned by save_state.
+
+        The saved state is copied, so it can be restored more than once.
+
+        Args:
+            saved: Tuple returned by save_state.
+
+        Returns:
+            An instance of the saved object's class.
+        """
+        cls, state = saved
+        game_object = cls.__new__(cls)
+        attributes = game_object.__dict__
+        attributes.update(state)
+        for name in _COPIED_ATTRIBUTES:
+            if name in attributes:
+                attributes[name] = attributes[name].copy()
+        return game_object
+
+    def draw(self, surface, zoom=1.0):
         """
         Draw the game object onto a surface at its current position.
 
         Args:
             surface: PyGame surface on which the sprite will be drawn.
+            zoom: Float, scale of the surface relative to the screen.
         """
-        blit_position = self._position - Vector2(self._radius)
-        surface.blit(self._sprite, blit_position)
+        if zoom == 1:
+            blit_position = self._position - Vector2(self._radius)
+            surface.blit(self._sprite, blit_position)
+            return
+        sprite = zoom_sprite(self._sprite, self._sprite_key, zoom)
+        blit_position = self._position * zoom - Vector2(sprite.get_size()) * 0.5
+        surface.blit(sprite, blit_position)
 
     def move(self, width, height):
         """
@@ -114,24 +225,115 @@ class GameObject:
             self._position + self._velocity, width, height
         )
 
-    def collides_with(self, other_obj):
+    def get_mask(self):
+        """
+        Return the collision mask of the sprite as it is drawn.
+
+        Returns:
+            Tuple of a pygame.mask.Mask and the Vector2 position of its top
+            left corner on the screen.
+        """
+        if self._sprite_key is None:
+            mask = from_surface(self._sprite)
+        else:
+            mask = sprite_mask(self._sprite, self._sprite_key)
+        return mask, self._position - Vector2(self._radius)
+
+    def collides_with(self, other_obj, precise=False):
         """
         Return whether a collision has occured between two game objects (bool)
 
+        The circle test is always done first. If precise is True, objects
+        that pass it only collide if their masks have overlapping pixels.
+
         Args:
             other_obj: class instance inherited from GameObject with radius attribute
+            precise: Bool, whether to check that the sprites' opaque pixels
+            overlap.
 
         Returns:
             Bool representing whether the objects are colliding or not.
         """
         distance = self._position.distance_to(other_obj.position)
-        return distance < self._radius + other_obj.radius
+        if distance >= self._radius + other_obj.radius:
+            return False
+        if not precise:
+            return True
+        mask, corner = self.get_mask()
+        other_mask, other_corner = other_obj.get_mask()
+        offset = other_corner - corner
+        return (
+            mask.overlap(other_mask, (round(offset.x), round(offset.y)))
+            is not None
+        )
+
+    def colliding(self, others, precise=False):
+        """
+        Return the objects among others that collide with this one, as
+        collides_with decides.
+
+        The mask of this object, and of each sprite others share an
+        unrotated mask of, is only looked up once, so checking many objects
+        against it is cheaper than calling collides_with on each.
+
+        Args:
+            others: Iterable of instances inherited from GameObject.
+            precise: Bool, whether to check that the sprites' opaque pixels
+            overlap.
+
+        Returns:
+            List of the colliding objects, in the order of others.
+        """
+        position = self._position
+        radius = self._radius
+        near = [
+            other
+            for other in others
+            if position.distance_to(other.position) < radius + other.radius
+        ]
+        if not precise or not near:
+            return near
+        mask, (corner_x, corner_y) = self.get_mask()
+        overlap = mask.overlap
+        shared_masks = {}
+        hits = []
+        for other in near:
+            sprite_key = other.sprite_key
+            if (
+                sprite_key is None
+                or type(other).get_mask is not GameObject.get_mask
+            ):
+                other_mask, (other_x, other_y) = other.get_mask()
+            else:
+                other_mask = shared_masks.get(sprite_key)
+                if other_mask is None:
+                    other_mask = shared_masks[sprite_key] = sprite_mask(
+                        other.sprite, sprite_key
+                    )
+                other_x, other_y = other.position
+                other_x -= other.radius
+                other_y -= other.radius
+            if overlap(
+                other_mask,
+                (round(other_x - corner_x), round(other_y - corner_y)),
+            ):
+                hits.append(other)
+        return hits
 
 
 class StaticObject(GameObject):
     """
-    Create an object that does not move.
+    Create an object that does not move, or only drifts, like debris.
 
+    A static object at rest is asleep: it is left out of the update passes
+    until a push wakes it. Once awake it slows down by DRAG every tick and
+    falls asleep again when it is slower than SLEEP_SPEED.
+
+    Constants:
+        DRAG: Float, fraction of its velocity an awake object keeps each
+        tick.
+        SLEEP_SPEED: Float, pixels per tick below which an object stops and
+        falls asleep.
 
     Attributes:
         _position: Vector2, x and y position on the screen.
@@ -139,19 +341,65 @@ class StaticObject(GameObject):
         _radius: int, radius of the sprite.
         _velocity: Vector2, rate of change in x and y of the sprite.
         _method_flag: Int, used to identify which function was called during testing.
+        _asleep: Bool, whether the object is at rest.
     """
 
-    def __init__(self, position, name):
+    DRAG = 0.98
+    SLEEP_SPEED = 0.05
+
+    def __init__(self, position, name, velocity=(0, 0)):
         """
         Initializes static object.
 
         Args:
             position: Vector2, x and y position on the screen
             name: Str, name of the file which the ship png is located in.
+            velocity: Tuple, x and y drift per tick, for debris.
         """
         super().__init__(
-            position, load_sprite(f"{name}", True, True), Vector2(0)
+            position,
+            load_sprite(f"{name}", True, True),
+            Vector2(velocity),
+            (name, "scaled" if name in dimensions else "original"),
         )
+        self._asleep = self._velocity == Vector2(0)
+
+    @property
+    def asleep(self):
+        """
+        Return _asleep.
+
+        Returns:
+            _asleep: Bool, whether the object is at rest.
+        """
+        return self._asleep
+
+    def push(self, impulse):
+        """
+        Add to the object's velocity and wake it up.
+
+        Args:
+            impulse: Vector2, x and y added to the velocity.
+        """
+        self._velocity += impulse
+        self._asleep = False
+
+    def move(self, width, height):
+        """
+        Drift by the velocity, slow down and fall asleep once nearly still.
+        An object that is asleep stays where it is.
+
+        Args:
+            width: Int, represents width of screen.
+            height: Int, represents height of screen.
+        """
+        if self._asleep:
+            return
+        super().move(width, height)
+        self._velocity *= self.DRAG
+        if self._velocity.length_squared() < self.SLEEP_SPEED**2:
+            self._velocity.update(0, 0)
+            self._asleep = True
 
 
 class Ship(GameObject):
@@ -167,6 +415,8 @@ class Ship(GameObject):
         _direction: Vector2, x and y vector that shows orientation of sprite.
         _health: Int, number of hits before the ship will die.
         _create_bullet_callback: Function, function to add bullets to list to be processed.
+        _sprite_key: Tuple, asset name and variant of the sprite, used to
+        cache its rotations.
         _position: Vector2, x and y position on the screen
         _sprite: Pygame surface, image with some width and height
         _radius: int, radius of the sprite
@@ -197,10 +447,12 @@ class Ship(GameObject):
 
         # initialize unit vector upwards initial direction
         self._direction = Vector2(UP)
+        variant = "scaled" if with_scaling else "original"
         super().__init__(
             position,
             load_sprite(f"{name}", with_alpha, with_scaling),
             Vector2(0),
+            (name, variant if with_alpha else f"{variant} opaque"),
         )
 
     @property
@@ -258,19 +510,35 @@ class Ship(GameObject):
         bullet = Bullet(self._position, bullet_velocity)
         self._create_bullet_callback(bullet)
 
-    def draw(self, surface):
+    def draw(self, surface, zoom=1.0):
         """
         Draw the ship sprite on a surface with an applied rotation.
 
         Args:
             surface: PyGame surface, surface on which object will be drawn.
+            zoom: Float, scale of the surface relative to the screen.
         """
         angle_to_transform = self._direction.angle_to(UP)
-        rotated_surface = rotozoom(self._sprite, angle_to_transform, 1.0)
+        rotated_surface = rotate_sprite(
+            self._sprite, self._sprite_key, angle_to_transform, zoom
+        )
         rotated_surface_size = Vector2(rotated_surface.get_size())
-        blit_position = self._position - rotated_surface_size * 0.5
+        blit_position = self._position * zoom - rotated_surface_size * 0.5
         surface.blit(rotated_surface, blit_position)
 
+    def get_mask(self):
+        """
+        Return the collision mask of the ship at its current heading.
+
+        Returns:
+            Tuple of a pygame.mask.Mask and the Vector2 position of its top
+            left corner on the screen.
+        """
+        mask = rotated_mask(
+            self._sprite, self._sprite_key, self._direction.angle_to(UP)
+        )
+        return mask, self._position - Vector2(mask.get_size()) * 0.5
+
     def reduce_health(self):
         """
         Reduce the ship health attribute by 1.
@@ -290,12 +558,19 @@ class NPCShip(Ship):
     """
     Define ship controlled by the computer.
 
+    Constants:
+        BULLET_DELAY: Int, scales how long the ship waits between shots.
+        HAS_PARTS: Bool, whether the ship is built from parts that stop
+        bullets, as modular ships are.
+
     Attributes:
         _shooting_delay: Int, represents amt of time to wait before shotting
         player.
         _direction: Vector2, x and y vector that shows orientation of sprite.
         _health: Int, number of hits before the ship will die.
         _create_bullet_callback: Function, function to add bullets to list to be processed.
+        _sprite_key: Tuple, asset name and variant of the sprite, used to
+        cache its rotations.
         _position: Vector2, x and y position on the screen.
         _sprite: Pygame surface, image with some width and height.
         _radius: int, radius of the sprite.
@@ -304,6 +579,7 @@ class NPCShip(Ship):
     """
 
     BULLET_DELAY = 1
+    HAS_PARTS = False
 
     def __init__(self, position, name, create_bullet_callback):
         """
@@ -322,14 +598,9 @@ class NPCShip(Ship):
         self._health = 2
         self._shooting_delay = 0
 
-        # creating new surface to recolor sprite
-        recolor_surface = pygame.Surface(
-            self._sprite.get_size(), pygame.SRCALPHA
-        )
-        recolor_surface.fill(pygame.color.Color("green"))
-        self._sprite.blit(
-            recolor_surface, (0, 0), special_flags=pygame.BLEND_ADD
-        )
+        # every NPC shares one recolored copy of the sprite
+        self._sprite = tint_sprite(name, "green")
+        self._sprite_key = (name, "green")
 
     def move(self, player, width, height):
         """
@@ -340,12 +611,51 @@ class NPCShip(Ship):
             width: Int, represents width of screen.
             height: Int, represents height of screen.
         """
+        self.aim_at(player.position)
+        self.coast(width, height)
+
+    def follow(self, heading, distance, push, width, height):
+        """
+        Steer by a sample of a flow field instead of looking at the player.
+
+        Args:
+            heading: Tuple, x and y of the unit vector towards the player.
+            distance: Float, distance to the player.
+            push: Tuple, x and y pixels to move away from nearby ships.
+            width: Int, represents width of screen.
+            height: Int, represents height of screen.
+        """
+        self.decide(Vector2(heading), distance)
+        self.coast(width, height, push)
+
+    def aim_at(self, player_position):
+        """
+        Decide how to steer and whether to shoot by looking at the player.
+
+        Args:
+            player_position: Vector2, x and y of the player ship.
+        """
         # Find direction vector (dx, dy) between enemy and player.
-        player_position = player.position
         dirvect = pygame.math.Vector2(
             player_position[0] - self._position[0],
             player_position[1] - self._position[1],
         )
+        self.decide(dirvect, dirvect.magnitude())
+
+    def decide(self, dirvect, distance):
+        """
+        Turn towards the player, or shoot and set a velocity that keeps at a
+        distance once facing it.
+
+        A ship right on top of the player has no way to turn or back off,
+        so it leaves its heading and velocity as they are.
+
+        Args:
+            dirvect: Vector2, points towards the player.
+            distance: Float, distance to the player.
+        """
+        if not dirvect:
+            return
         error_angle = self._direction.angle_to(dirvect)
         if error_angle > 3 or error_angle < -3:
             self.rotate(clockwise=error_angle > 0)
@@ -353,15 +663,27 @@ class NPCShip(Ship):
             self._velocity = Vector2(0)
             self.shoot()
             self._method_flag = 8
-            if dirvect.magnitude() > 300:
+            if distance > 300:
                 self._velocity = dirvect.normalize() * 2
-            if dirvect.magnitude() < 150:
+            if distance < 150:
                 self._velocity = dirvect.normalize() * -2
 
+    def coast(self, width, height, push=None):
+        """
+        Move by the current velocity, whether or not the ship decided
+        anything this tick.
+
+        Args:
+            width: Int, represents width of screen.
+            height: Int, represents height of screen.
+            push: Tuple, x and y pixels to move away from nearby ships, or
+            None.
+        """
         # Move along this normalized vector towards the player at current speed.
-        self._position = wrap_position(
-            self._position + self._velocity, width, height
-        )
+        position = self._position + self._velocity
+        if push is not None:
+            position += push
+        self._position = wrap_position(position, width, height)
 
     def shoot(self):
         """
@@ -397,7 +719,9 @@ class Bullet(GameObject):
             position: Vector2 tuple of x and y initial position.
             velocity: Vector2 tuple of x and y velocity.
         """
-        super().__init__(position, load_sprite("bullet"), velocity)
+        super().__init__(
+            position, load_sprite("bullet"), velocity, ("bullet", "original")
+        )
 
     def move(self):
         """
@@ -0,0 +1,800 @@
+# pylint: disable=no-name-in-module
+# pylint: disable=protected-access
+# Disabling pylint warnings related to PyGame that aren't valid
+# Disabling protected access because a hull links and copies the parts and
+# nodes it owns
+"""
+Modular ships built from a tree of attached parts, with a bounding volume
+hierarchy per ship so collisions stay cheap however many parts there are.
+
+Parts are laid out in ship coordinates, where the ship is at the origin
+facing UP. A query is turned into ship coordinates once, so the hierarchy
+never has to be rebuilt as the ship moves or turns. It only changes when
+parts attach or detach, and then only along the path from the changed leaf
+to the root.
+"""
+from math import hypot
+from pygame.math import Vector2
+from models import UP, NPCShip
+from utils import rotate_sprite
+
+
+def merge_circles(first, second):
+    """
+    Return the smallest circle enclosing two circles.
+
+    Args:
+        first: Tuple of floats, x, y and radius of a circle.
+        second: Tuple of floats, x, y and radius of a circle.
+
+    Returns:
+        Tuple of floats, x, y and radius of the enclosing circle.
+    """
+    x1, y1, r1 = first
+    x2, y2, r2 = second
+    distance = hypot(x2 - x1, y2 - y1)
+    if distance + r2 <= r1:
+        return first
+    if distance + r1 <= r2:
+        return second
+    radius = (distance + r1 + r2) / 2
+    share = (radius - r1) / distance
+    return (x1 + (x2 - x1) * share, y1 + (y2 - y1) * share, radius)
+
+
+class Part:
+    """
+    One part of a modular ship, attached to the part it grew from.
+
+    Attributes:
+        _name: String, name of the sprite the part is drawn with.
+        _offset: Vector2, x and y of the part in ship coordinates.
+        _radius: Float, radius of the part.
+        _health: Int, number of hits before the part breaks off.
+        _parent: Part instance the part is attached to, or None for the
+        core.
+        _children: List of Part instances attached to the part.
+    """
+
+    def __init__(self, name, offset, radius, health=1):
+        """
+        Initialize a Part that is not attached to anything yet.
+
+        Args:
+            name: String, name of the sprite the part is drawn with.
+            offset: Tuple, x and y of the part in ship coordinates.
+            radius: Float, radius of the part.
+            health: Int, number of hits before the part breaks off.
+        """
+        self._name = name
+        self._offset = Vector2(offset)
+        self._radius = radius
+        self._health = health
+        self._parent = None
+        self._children = []
+
+    @property
+    def name(self):
+        """
+        Return _name.
+
+        Returns:
+            _name: String, name of the sprite the part is drawn with.
+        """
+        return self._name
+
+    @property
+    def offset(self):
+        """
+        Return _offset.
+
+        Returns:
+            _offset: Vector2, x and y of the part in ship coordinates.
+        """
+        return self._offset
+
+    @property
+    def radius(self):
+        """
+        Return _radius.
+
+        Returns:
+            _radius: Float, radius of the part.
+        """
+        return self._radius
+
+    @property
+    def health(self):
+        """
+        Return _health.
+
+        Returns:
+            _health: Int, number of hits before the part breaks off.
+        """
+        return self._health
+
+    @property
+    def parent(self):
+        """
+        Return _parent.
+
+        Returns:
+            _parent: Part instance the part is attached to, or None.
+        """
+        return self._parent
+
+    @property
+    def children(self):
+        """
+        Return _children.
+
+        Returns:
+            _children: List of Part instances attached to the part.
+        """
+        return self._children
+
+    def circle(self):
+        """
+        Return the part's bounding circle in ship coordinates.
+
+        Returns:
+            Tuple of floats, x, y and radius.
+        """
+        return (self._offset.x, self._offset.y, self._radius)
+
+    def reduce_health(self):
+        """
+        Reduce the part's health by 1.
+        """
+        self._health -= 1
+
+    def subtree(self):
+        """
+        Return the part and every part attached to it, parents first.
+
+        Returns:
+            List of Part instances.
+        """
+        parts = [self]
+        for part in parts:
+            parts.extend(part.children)
+        return parts
+
+
+class _Node:
+    """
+    Node of a BoundingVolumeHierarchy. Leaves hold a part, branches hold
+    two children, and every node holds a circle enclosing its leaves.
+
+    Attributes:
+        circle: Tuple of floats, x, y and radius of the bounding circle.
+        parent: _Node instance above the node, or None at the root.
+        children: List of two _Node instances, or None for a leaf.
+        part: Part instance of a leaf, or None for a branch.
+        height: Int, number of branches on the longest path down to a
+        leaf, 0 for a leaf.
+    """
+
+    def __init__(self, circle, part=None):
+        """
+        Initialize a _Node.
+
+        Args:
+            circle: Tuple of floats, x, y and radius of the bounding circle.
+            part: Part instance of a leaf, or None for a branch.
+        """
+        self.circle = circle
+        self.parent = None
+        self.children = None
+        self.part = part
+        self.height = 0
+
+    def fit(self):
+        """
+        Recompute a branch's circle and height from its children.
+        """
+        left, right = self.children
+        self.circle = merge_circles(left.circle, right.circle)
+        self.height = 1 + max(left.height, right.height)
+
+
+class BoundingVolumeHierarchy:
+    """
+    Binary tree of bounding circles over the parts of one ship.
+
+    Parts are inserted next to the node whose circle grows least by taking
+    them in, and removed by putting their sibling in their parent's place.
+    Either way only the circles between the changed leaf and the root are
+    refitted, and branches whose children differ in height by more than
+    one are rotated on the way up, so the tree stays balanced however the
+    parts are attached.
+
+    Attributes:
+        _root: _Node instance at the top of the tree, or None while empty.
+        _leaves: Dict, maps parts to their leaf nodes.
+        _tests: Int, number of circles the last query tested.
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty BoundingVolumeHierarchy.
+        """
+        self._root = None
+        self._leaves = {}
+        self._tests = 0
+
+    def __len__(self):
+        """
+        Return the number of parts in the hierarchy.
+
+        Returns:
+            Int, number of parts.
+        """
+        return len(self._leaves)
+
+    @property
+    def tests(self):
+        """
+        Return _tests.
+
+        Returns:
+            _tests: Int, number of circles the last query tested.
+        """
+        return self._tests
+
+    def bounds(self):
+        """
+        Return the circle enclosing every part.
+
+        Returns:
+            Tuple of floats, x, y and radius, or None while empty.
+        """
+        return None if self._root is None else self._root.circle
+
+    def depth(self):
+        """
+        Return the number of nodes on the longest path from the root.
+
+        Returns:
+            Int, depth of the tree, 0 while empty.
+        """
+        deepest = 0
+        stack = [(self._root, 1)] if self._root is not None else []
+        while stack:
+            node, depth = stack.pop()
+            deepest = max(deepest, depth)
+            if node.children is not None:
+                stack.extend((child, depth + 1) for child in node.children)
+        return deepest
+
+    def _replace(self, node, replacement):
+        """
+        Put a node in another node's place under its parent.
+
+        Args:
+            node: _Node instance to take out.
+            replacement: _Node instance to put in its place.
+        """
+        parent = node.parent
+        replacement.parent = parent
+        if parent is None:
+            self._root = replacement
+        else:
+            siblings = parent.children
+            siblings[siblings.index(node)] = replacement
+
+    def _rotate(self, node):
+        """
+        Lift the taller child of a branch into the branch's place if it is
+        more than one taller than the other child.
+
+        Args:
+            node: _Node instance of a branch whose children are fitted.
+
+        Returns:
+            The _Node instance now in the branch's place.
+        """
+        short, tall = sorted(node.children, key=lambda child: child.height)
+        if tall.height - short.height < 2:
+            return node
+        # the branch keeps its short child and the tall child's shorter
+        # child, and the tall child keeps its taller child and the branch
+        low, high = sorted(tall.children, key=lambda child: child.height)
+        self._replace(node, tall)
+        node.children = [short, low]
+        low.parent = node
+        tall.children = [high, node]
+        node.parent = tall
+        node.fit()
+        tall.fit()
+        return tall
+
+    def _refit(self, node):
+        """
+        Recompute the circles and heights from a branch up to the root,
+        rotating branches that are out of balance.
+
+        Args:
+            node: _Node instance to start from, or None.
+        """
+        while node is not None:
+            node.fit()
+            node = self._rotate(node).parent
+
+    def insert(self, part):
+        """
+        Add a part to the hierarchy.
+
+        Args:
+            part: Part instance to add.
+        """
+        leaf = _Node(part.circle(), part)
+        self._leaves[part] = leaf
+        if self._root is None:
+            self._root = leaf
+            return
+        circle = leaf.circle
+        sibling = self._root
+        while sibling.children is not None:
+            # descend into the child that grows least by taking the part in
+            sibling = min(
+                sibling.children,
+                key=lambda child: merge_circles(child.circle, circle)[2]
+                - child.circle[2],
+            )
+        branch = _Node(circle)
+        self._replace(sibling, branch)
+        branch.children = [sibling, leaf]
+        sibling.parent = branch
+        leaf.parent = branch
+        self._refit(branch)
+
+    def remove(self, part):
+        """
+        Take a part out of the hierarchy.
+
+        Args:
+            part: Part instance to remove.
+        """
+        leaf = self._leaves.pop(part)
+        branch = leaf.parent
+        if branch is None:
+            self._root = None
+            return
+        sibling = branch.children[0 if branch.children[1] is leaf else 1]
+        self._replace(branch, sibling)
+        self._refit(sibling.parent)
+
+    def query(self, x, y, radius):
+        """
+        Return the parts a circle overlaps, skipping every subtree whose
+        bounding circle it misses.
+
+        Args:
+            x: Float, x of the circle in ship coordinates.
+            y: Float, y of the circle in ship coordinates.
+            radius: Float, radius of the circle.
+
+        Returns:
+            List of Part instances.
+        """
+        parts = []
+        tests = 0
+        stack = [self._root] if self._root is not None else []
+        while stack:
+            node = stack.pop()
+            tests += 1
+            node_x, node_y, node_radius = node.circle
+            reach = node_radius + radius
+            if (node_x - x) ** 2 + (node_y - y) ** 2 >= reach * reach:
+                continue
+            if node.children is None:
+                parts.append(node.part)
+            else:
+                stack.extend(node.children)
+        self._tests = tests
+        return parts
+
+    def copy(self, parts):
+        """
+        Return a copy of the hierarchy over copies of its parts, with the
+        same shape, so nothing has to be reinserted.
+
+        Args:
+            parts: Dict, maps each part to its copy.
+
+        Returns:
+            A BoundingVolumeHierarchy instance.
+        """
+        hierarchy = BoundingVolumeHierarchy()
+        if self._root is None:
+            return hierarchy
+        hierarchy._root = _Node(self._root.circle)
+        stack = [(self._root, hierarchy._root)]
+        while stack:
+            node, copied = stack.pop()
+            if node.children is None:
+                copied.part = parts[node.part]
+                hierarchy._leaves[copied.part] = copied
+                continue
+            copied.children = []
+            copied.height = node.height
+            for child in node.children:
+                copied_child = _Node(child.circle)
+                copied_child.parent = copied
+                copied.children.append(copied_child)
+                stack.append((child, copied_child))
+        return hierarchy
+
+
+class Hull:
+    """
+    Tree of parts of a modular ship and the hierarchy of their bounding
+    circles, kept in step as parts attach and detach.
+
+    Attributes:
+        _core: Part instance every other part is attached to, directly or
+        through other parts.
+        _hierarchy: BoundingVolumeHierarchy instance over every part.
+    """
+
+    def __init__(self, core):
+        """
+        Initialize a Hull of just its core.
+
+        Args:
+            core: Part instance at the center of the ship.
+        """
+        self._core = core
+        self._hierarchy = BoundingVolumeHierarchy()
+        self._hierarchy.insert(core)
+
+    def __len__(self):
+        """
+        Return the number of parts in the hull.
+
+        Returns:
+            Int, number of parts.
+        """
+        return len(self._hierarchy)
+
+    @property
+    def core(self):
+        """
+        Return _core.
+
+        Returns:
+            _core: Part instance at the center of the ship.
+        """
+        return self._core
+
+    @property
+    def hierarchy(self):
+        """
+        Return _hierarchy.
+
+        Returns:
+            _hierarchy: BoundingVolumeHierarchy instance over every part.
+        """
+        return self._hierarchy
+
+    def parts(self):
+        """
+        Return every part, parents first.
+
+        Returns:
+            List of Part instances.
+        """
+        return self._core.subtree()
+
+    def reach(self):
+        """
+        Return how far from the ship's center its parts reach.
+
+        Returns:
+            Float, radius of a circle around the center enclosing every
+            part.
+        """
+        x, y, radius = self._hierarchy.bounds()
+        return hypot(x, y) + radius
+
+    def attach(self, part, parent):
+        """
+        Attach a part to a part already in the hull.
+
+        Args:
+            part: Part instance to attach.
+            parent: Part instance in the hull to attach it to.
+        """
+        part._parent = parent
+        parent._children.append(part)
+        self._hierarchy.insert(part)
+
+    def detach(self, part):
+        """
+        Break a part off the hull, along with everything attached to it.
+        The core cannot be detached.
+
+        Args:
+            part: Part instance in the hull other than the core.
+
+        Returns:
+            List of the Part instances that broke off, parents first.
+
+        Raises:
+            ValueError: If part is the core.
+        """
+        if part is self._core:
+            raise ValueError("the core of a hull cannot be detached")
+        part._parent._children.remove(part)
+        part._parent = None
+        broken = part.subtree()
+        for broken_part in broken:
+            self._hierarchy.remove(broken_part)
+        return broken
+
+    def fits(self, offset, radius):
+        """
+        Return whether a part would fit at an offset without overlapping
+        any part already in the hull.
+
+        Args:
+            offset: Vector2, x and y of the part in ship coordinates.
+            radius: Float, radius of the part.
+
+        Returns:
+            Bool, whether the part fits.
+        """
+        # parts attached edge to edge touch, so a little overlap is allowed
+        return not self._hierarchy.query(offset.x, offset.y, radius - 0.5)
+
+    def hit(self, x, y, radius):
+        """
+        Return the part a circle hits, the nearest if it overlaps several.
+
+        Args:
+            x: Float, x of the circle in ship coordinates.
+            y: Float, y of the circle in ship coordinates.
+            radius: Float, radius of the circle.
+
+        Returns:
+            A Part instance, or None if the circle misses every part.
+        """
+        parts = self._hierarchy.query(x, y, radius)
+        if not parts:
+            return None
+        return min(
+            parts,
+            key=lambda part: (part.offset.x - x) ** 2
+            + (part.offset.y - y) ** 2,
+        )
+
+    def copy(self):
+        """
+        Return a copy of the hull that later changes to either do not touch.
+
+        Returns:
+            A Hull instance.
+        """
+        copies = {}
+        for part in self.parts():
+            copied = Part(part.name, part.offset, part.radius, part.health)
+            copies[part] = copied
+            if part.parent is not None:
+                copied._parent = copies[part.parent]
+                copied._parent._children.append(copied)
+        hull = Hull.__new__(Hull)
+        hull._core = copies[self._core]
+        hull._hierarchy = self._hierarchy.copy(copies)
+        return hull
+
+
+class ModularShip(NPCShip):
+    """
+    NPC ship built from parts. Bullets break parts off one at a time, and
+    the ship is only destroyed once its core is.
+
+    Collisions first test the circle reaching around every part, then the
+    hierarchy's circles in ship coordinates, down to the parts.
+
+    Constants:
+        CORE_HEALTH: Int, number of hits the core takes.
+        HAS_PARTS: Bool, True since bullets hit the ship's parts.
+
+    Attributes:
+        _hull: Hull instance, the ship's parts and their hierarchy.
+        _shooting_delay: Int, represents amt of time to wait before
+        shooting player.
+        _direction: Vector2, x and y vector that shows orientation of sprite.
+        _health: Int, unused, the core's health is the ship's health.
+        _create_bullet_callback: Function, function to add bullets to list
+        to be processed.
+        _sprite_key: Tuple, asset name and variant of the sprite, used to
+        cache its rotations.
+        _position: Vector2, x and y position on the screen.
+        _sprite: Pygame surface, image with some width and height.
+        _radius: Float, how far from the center the parts reach.
+        _velocity: Vector2, rate of change in x and y of the sprite.
+        _method_flag: Int, used to identify which function was called
+        during testing.
+    """
+
+    CORE_HEALTH = 2
+    HAS_PARTS = True
+
+    def __init__(self, position, name, create_bullet_callback):
+        """
+        Initialize a ModularShip of just its core.
+
+        Args:
+            position: Vector2, x and y position on the screen.
+            name: String, name of png every part is drawn with.
+            create_bullet_callback: Function, function to add bullets
+            to list to be processed.
+        """
+        super().__init__(position, name, create_bullet_callback)
+        self._hull = Hull(
+            Part(name, (0, 0), self._radius, health=self.CORE_HEALTH)
+        )
+
+    @property
+    def hull(self):
+        """
+        Return _hull.
+
+        Returns:
+            _hull: Hull instance, the ship's parts and their hierarchy.
+        """
+        return self._hull
+
+    def attach(self, part, parent=None):
+        """
+        Attach a part to the ship.
+
+        Args:
+            part: Part instance to attach.
+            parent: Part instance of the ship to attach it to, the core if
+            not given.
+        """
+        self._hull.attach(part, parent if parent is not None else self.core)
+        self._radius = self._hull.reach()
+
+    def detach(self, part):
+        """
+        Break a part off the ship, along with everything attached to it.
+
+        Args:
+            part: Part instance of the ship other than the core.
+
+        Returns:
+            List of the Part instances that broke off, parents first.
+        """
+        broken = self._hull.detach(part)
+        self._radius = self._hull.reach()
+        return broken
+
+    @property
+    def core(self):
+        """
+        Return the core of the hull.
+
+        Returns:
+            Part instance at the center of the ship.
+        """
+        return self._hull.core
+
+    def get_health(self):
+        """
+        Return the health of the ship's core.
+
+        Returns: Int, hits the core can still take.
+        """
+        return self._hull.core.health
+
+    def to_screen(self, part):
+        """
+        Return where a part is on the screen.
+
+        Args:
+            part: Part instance of the ship.
+
+        Returns:
+            Vector2, x and y of the part's center.
+        """
+        return self._position + part.offset.rotate(
+            -self._direction.angle_to(UP)
+        )
+
+    def part_hit_by(self, other_obj):
+        """
+        Return the part of the ship another object overlaps.
+
+        Args:
+            other_obj: class instance inherited from GameObject with
+            position and radius attributes.
+
+        Returns:
+            A Part instance, or None if the object misses the ship.
+        """
+        offset = other_obj.position - self._position
+        reach = self._radius + other_obj.radius
+        if offset.x * offset.x + offset.y * offset.y >= reach * reach:
+            return None
+        # turn the object into ship coordinates rather than every part out
+        local = offset.rotate(self._direction.angle_to(UP))
+        return self._hull.hit(local.x, local.y, other_obj.radius)
+
+    def collides_with(self, other_obj, precise=False):
+        """
+        Return whether another object overlaps any part of the ship.
+
+        Parts are circles, so precise collisions make no difference.
+
+        Args:
+            other_obj: class instance inherited from GameObject with
+            position and radius attributes.
+            precise: Bool, ignored.
+
+        Returns:
+            Bool representing whether the objects are colliding or not.
+        """
+        return self.part_hit_by(other_obj) is not None
+
+    def draw(self, surface, zoom=1.0):
+        """
+        Draw every part of the ship, each with the sprite scaled to its
+        size and rotated to the ship's heading.
+
+        Args:
+            surface: PyGame surface, surface on which object will be drawn.
+            zoom: Float, scale of the surface relative to the screen.
+        """
+        angle = self._direction.angle_to(UP)
+        width = self._sprite.get_width()
+        for part in self._hull.parts():
+            rotated_surface = rotate_sprite(
+                self._sprite,
+                self._sprite_key,
+                angle,
+                round(2 * part.radius / width * zoom, 3),
+            )
+            center = self._position + part.offset.rotate(-angle)
+            surface.blit(
+                rotated_surface,
+                center * zoom - Vector2(rotated_surface.get_size()) * 0.5,
+            )
+
+
+def build_modular_ship(
+    position, create_bullet_callback, part_count, generator, name="ship"
+):
+    """
+    Grow a modular ship by attaching parts edge to edge to random parts
+    already on it, wherever they fit.
+
+    Args:
+        position: Vector2, x and y position on the screen.
+        create_bullet_callback: Function, function to add bullets to list to
+        be processed.
+        part_count: Int, number of parts besides the core to try to attach.
+        generator: random.Random instance the layout is drawn from.
+        name: String, name of png every part is drawn with.
+
+    Returns:
+        A ModularShip instance.
+    """
+    ship = ModularShip(position, name, create_bullet_callback)
+    parts = [ship.core]
+    for _ in range(part_count * 4):
+        if len(parts) > part_count:
+            break
+        parent = generator.choice(parts)
+        radius = generator.choice((8, 10, 12))
+        offset = parent.offset + Vector2(0, -1).rotate(
+            60 * generator.randrange(6)
+        ) * (parent.radius + radius)
+        if ship.hull.fits(offset, radius):
+            part = Part(name, offset, radius)
+            ship.attach(part, parent)
+            parts.append(part)
+    return ship
@@ -0,0 +1,258 @@
+"""
+Fixed-size NumPy observations of a game for agents to learn from, built
+straight from the entities' positions rather than from drawn frames.
+
+Two forms are available: low-resolution occupancy grids with one channel
+per kind of entity, and padded lists of entity feature vectors. Both can be
+made for many games at once, which costs little more than for one:
+
+    rasterizer = ObservationRasterizer(WIDTH, HEIGHT)
+    grids = rasterizer.rasterize_batch(games)
+"""
+from itertools import chain
+import numpy as np
+from models import Ship
+
+KINDS = ("player", "npc_ships", "bullets", "npc_bullets")
+FEATURES = (
+    "present",
+    "player",
+    "npc_ship",
+    "bullet",
+    "npc_bullet",
+    "x",
+    "y",
+    "velocity_x",
+    "velocity_y",
+    "heading_x",
+    "heading_y",
+)
+# columns of the arrays entity_arrays returns
+STATE_COLUMNS = 6
+
+
+def _ship_states(ships):
+    """
+    Yield the position, velocity and heading of each ship.
+
+    Args:
+        ships: Iterable of Ship instances.
+
+    Yields:
+        Tuples of six floats.
+    """
+    for ship in ships:
+        position = ship.position
+        velocity = ship.velocity
+        direction = ship.direction
+        yield (
+            position.x,
+            position.y,
+            velocity.x,
+            velocity.y,
+            direction.x,
+            direction.y,
+        )
+
+
+def _bullet_states(bullets):
+    """
+    Yield the position and velocity of each bullet, with no heading.
+
+    Args:
+        bullets: Iterable of Bullet instances.
+
+    Yields:
+        Tuples of six floats.
+    """
+    for bullet in bullets:
+        position = bullet.position
+        velocity = bullet.velocity
+        yield (position.x, position.y, velocity.x, velocity.y, 0.0, 0.0)
+
+
+def entity_arrays(game):
+    """
+    Gather the state of every entity of a game into arrays.
+
+    Entities are ordered by kind as in KINDS. A destroyed player is the
+    burning wreck left in its place, which has no heading.
+
+    Args:
+        game: CaptainForever instance.
+
+    Returns:
+        Tuple of an int8 array of each entity's index in KINDS and a float32
+        array with a row of x, y, velocity x, velocity y, heading x and
+        heading y per entity.
+    """
+    player_ship = game.player_ship
+    if isinstance(player_ship, Ship):
+        player_states = _ship_states((player_ship,))
+    else:
+        player_states = _bullet_states((player_ship,))
+    counts = (1, len(game.npc_ships), len(game.bullets), len(game.npc_bullets))
+    total = sum(counts)
+    states = np.fromiter(
+        chain.from_iterable(
+            chain(
+                player_states,
+                _ship_states(game.npc_ships),
+                _bullet_states(game.bullets),
+                _bullet_states(game.npc_bullets),
+            )
+        ),
+        np.float32,
+        count=total * STATE_COLUMNS,
+    ).reshape(total, STATE_COLUMNS)
+    kinds = np.repeat(np.arange(len(KINDS), dtype=np.int8), counts)
+    return kinds, states
+
+
+class ObservationRasterizer:
+    """
+    Turn games into fixed-size observation arrays.
+
+    Attributes:
+        _width: Int, width of the games' screen.
+        _height: Int, height of the games' screen.
+        _columns: Int, number of cells across an occupancy grid.
+        _rows: Int, number of cells down an occupancy grid.
+        _max_entities: Int, number of rows in a feature array, entities
+        past it are left out.
+    """
+
+    def __init__(self, width, height, columns=64, rows=40, max_entities=64):
+        """
+        Initialize ObservationRasterizer.
+
+        Args:
+            width: Int, width of the games' screen.
+            height: Int, height of the games' screen.
+            columns: Int, number of cells across an occupancy grid.
+            rows: Int, number of cells down an occupancy grid.
+            max_entities: Int, number of rows in a feature array.
+        """
+        self._width = width
+        self._height = height
+        self._columns = columns
+        self._rows = rows
+        self._max_entities = max_entities
+
+    @property
+    def grid_shape(self):
+        """
+        Return the shape of one game's occupancy grids.
+
+        Returns:
+            Tuple of the number of channels, rows and columns.
+        """
+        return (len(KINDS), self._rows, self._columns)
+
+    @property
+    def features_shape(self):
+        """
+        Return the shape of one game's entity features.
+
+        Returns:
+            Tuple of the number of entities and features.
+        """
+        return (self._max_entities, len(FEATURES))
+
+    def _cells(self, kinds, states):
+        """
+        Return the flat index of the grid cell each entity is in.
+
+        Args:
+            kinds: Int8 array of each entity's index in KINDS.
+            states: Float32 array of entity states from entity_arrays.
+
+        Returns:
+            Int array of indexes into a flattened grid_shape array.
+        """
+        columns = (states[:, 0] * (self._columns / self._width)).astype(np.intp)
+        rows = (states[:, 1] * (self._rows / self._height)).astype(np.intp)
+        np.clip(columns, 0, self._columns - 1, out=columns)
+        np.clip(rows, 0, self._rows - 1, out=rows)
+        return (kinds * self._rows + rows) * self._columns + columns
+
+    def rasterize(self, game):
+        """
+        Count the entities of each kind in every cell of a coarse grid
+        over the screen.
+
+        Args:
+            game: CaptainForever instance.
+
+        Returns:
+            Float32 array of shape grid_shape.
+        """
+        return self.rasterize_batch((game,))[0]
+
+    def rasterize_batch(self, games, out=None):
+        """
+        Rasterize many games with one pass over all their entities.
+
+        Args:
+            games: Sequence of CaptainForever instances.
+            out: Float32 array of shape (len(games), *grid_shape) to write
+            to, or None to allocate one.
+
+        Returns:
+            Float32 array of shape (len(games), *grid_shape).
+        """
+        grid_size = len(KINDS) * self._rows * self._columns
+        cells = []
+        for index, game in enumerate(games):
+            cells.append(self._cells(*entity_arrays(game)) + index * grid_size)
+        counts = np.bincount(
+            np.concatenate(cells), minlength=len(games) * grid_size
+        ).reshape(len(games), *self.grid_shape)
+        if out is None:
+            return counts.astype(np.float32)
+        np.copyto(out, counts)
+        return out
+
+    def features(self, game):
+        """
+        List the features of each entity, padded with zero rows.
+
+        Args:
+            game: CaptainForever instance.
+
+        Returns:
+            Float32 array of shape features_shape.
+        """
+        return self.features_batch((game,))[0]
+
+    def features_batch(self, games, out=None):
+        """
+        List the features of each entity of many games.
+
+        Each row has the columns in FEATURES: whether the row holds an
+        entity, a one-hot kind, the position as a fraction of the screen,
+        the velocity in pixels per tick and the heading of ships. Entities
+        past max_entities are left out, in reverse order of KINDS.
+
+        Args:
+            games: Sequence of CaptainForever instances.
+            out: Float32 array of shape (len(games), *features_shape) to
+            write to, or None to allocate one.
+
+        Returns:
+            Float32 array of shape (len(games), *features_shape).
+        """
+        if out is None:
+            out = np.zeros((len(games), *self.features_shape), np.float32)
+        else:
+            out.fill(0.0)
+        scale = np.array(
+            (1 / self._width, 1 / self._height, 1, 1, 1, 1), np.float32
+        )
+        for rows, game in zip(out, games):
+            kinds, states = entity_arrays(game)
+            count = min(len(kinds), self._max_entities)
+            rows[:count, 0] = 1.0
+            rows[np.arange(count), 1 + kinds[:count]] = 1.0
+            np.multiply(states[:count], scale, out=rows[:count, 5:])
+        return out
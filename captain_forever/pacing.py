@@ -0,0 +1,275 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# Disabling pylint warnings related to PyGame that aren't valid
+"""
+Frame pacing that timestamps input as it arrives and measures how long it
+takes for input to reach the screen.
+"""
+from collections import deque
+from time import perf_counter, sleep
+import pygame
+from timeline import recorder
+
+
+class FramePacer:
+    """
+    Cap the frame rate and measure input-to-photon latency.
+
+    Instead of one long sleep, the pacer sleeps in short slices and drains
+    the PyGame event queue after each one, stamping every event with the
+    time it was seen. Input that arrives while the game is waiting for the
+    next frame keeps its real arrival time rather than the time the
+    controller gets round to it.
+
+    By default the pacer sleeps after the frame is presented, like
+    pygame.time.Clock.tick. With sleep_before_poll the sleep happens
+    before the controller polls input instead, so input is sampled right
+    before the simulation step and shown by the flip that follows it.
+
+    The controller reports the arrival time of each input it applies, and
+    the latency of that input is the time from its arrival to the end of
+    the next flip.
+
+    The pacer also follows the window's focus from the events it drains.
+    When there is nothing to simulate or draw, the game loop can block in
+    wait_for_event until an event arrives instead of running frames.
+
+    Slack tasks are handed the time left before the next frame is due
+    whenever the pacer is about to sleep, so they can do deferred work
+    that fits, like collecting garbage.
+
+    Attributes:
+        _frame_time: Float, seconds between frames, 0 for uncapped.
+        _sleep_before_poll: Bool, whether to sleep before input is polled
+        instead of after the frame is presented.
+        _slice: Float, longest single sleep in seconds.
+        _deadline: Float, perf_counter value the next frame may start at.
+        _events: List of (arrival time, PyGame event) tuples drained while
+        sleeping and not yet handled.
+        _applied: List, arrival times of input applied this frame.
+        _latencies: Deque, latencies of past inputs in ms.
+        _focused: Bool, whether the window has input focus.
+        _minimized: Bool, whether the window is minimized.
+        _idle_seconds: Float, total time spent blocked in wait_for_event.
+        _slack_tasks: List of functions taking the seconds left before the
+        next frame, called before the pacer sleeps.
+    """
+
+    def __init__(
+        self, max_fps=60, sleep_before_poll=False, history=120, slice_ms=1
+    ):
+        """
+        Initialize FramePacer.
+
+        Args:
+            max_fps: Int, frame rate to cap to, 0 for uncapped.
+            sleep_before_poll: Bool, whether to sleep before input is polled
+            instead of after the frame is presented.
+            history: Int, number of input latencies kept.
+            slice_ms: Float, longest single sleep in ms.
+        """
+        self._frame_time = 1 / max_fps if max_fps else 0
+        self._sleep_before_poll = sleep_before_poll
+        self._slice = slice_ms / 1000
+        self._deadline = None
+        self._events = []
+        self._applied = []
+        self._latencies = deque(maxlen=history)
+        self._focused = True
+        self._minimized = False
+        self._idle_seconds = 0.0
+        self._slack_tasks = []
+
+    @property
+    def sleep_before_poll(self):
+        """
+        Return _sleep_before_poll.
+
+        Returns:
+            _sleep_before_poll: Bool, whether the pacer sleeps before input
+            is polled instead of after the frame is presented.
+        """
+        return self._sleep_before_poll
+
+    @property
+    def latencies(self):
+        """
+        Return _latencies.
+
+        Returns:
+            _latencies: Deque, latencies of past inputs in ms.
+        """
+        return self._latencies
+
+    def latency_summary(self):
+        """
+        Return the average and worst of the recent input latencies.
+
+        Returns:
+            Tuple of the average and worst latency in ms, or None if no
+            input has been shown yet.
+        """
+        if not self._latencies:
+            return None
+        return (
+            sum(self._latencies) / len(self._latencies),
+            max(self._latencies),
+        )
+
+    @property
+    def in_background(self):
+        """
+        Return whether the window is unfocused or minimized.
+
+        Returns:
+            Bool, True if the player is not looking at the game.
+        """
+        return self._minimized or not self._focused
+
+    @property
+    def idle_seconds(self):
+        """
+        Return _idle_seconds.
+
+        Returns:
+            _idle_seconds: Float, total time spent blocked waiting for
+            events.
+        """
+        return self._idle_seconds
+
+    def add_slack_task(self, task):
+        """
+        Run a task whenever the pacer is about to sleep.
+
+        Args:
+            task: Function taking the seconds left before the next frame is
+            due, which should only do work that fits in them.
+        """
+        self._slack_tasks.append(task)
+
+    def _run_slack_tasks(self, remaining):
+        """
+        Hand the time left before the next frame to the slack tasks.
+
+        Args:
+            remaining: Float, seconds until the next frame is due.
+        """
+        for task in self._slack_tasks:
+            task(remaining)
+
+    def wait_for_event(self, timeout_ms):
+        """
+        Block until an event arrives or the timeout passes, without using
+        the CPU in between.
+
+        Args:
+            timeout_ms: Int, longest time to block in ms.
+        """
+        self._run_slack_tasks(timeout_ms / 1000)
+        recorder.begin("idle")
+        start = perf_counter()
+        event = pygame.event.wait(timeout_ms)
+        now = perf_counter()
+        self._idle_seconds += now - start
+        if event.type != pygame.NOEVENT:
+            self._track_window(event)
+            self._events.append((now, event))
+        self._stamp_events()
+        # the next frame starts afresh rather than catching up
+        self._deadline = None
+        recorder.end("idle")
+
+    def _track_window(self, event):
+        """
+        Follow the window's focus and minimized state.
+
+        Args:
+            event: PyGame event.
+        """
+        if event.type == pygame.WINDOWFOCUSLOST:
+            self._focused = False
+        elif event.type == pygame.WINDOWFOCUSGAINED:
+            self._focused = True
+        elif event.type == pygame.WINDOWMINIMIZED:
+            self._minimized = True
+        elif event.type in (pygame.WINDOWRESTORED, pygame.WINDOWMAXIMIZED):
+            self._minimized = False
+
+    def wait(self):
+        """
+        Sleep until the next frame may start, draining events as they come.
+        """
+        now = perf_counter()
+        if not self._frame_time:
+            return
+        if self._deadline is None or now - self._deadline > self._frame_time:
+            # first frame, or too far behind to catch up
+            self._deadline = now
+        self._run_slack_tasks(self._deadline - now)
+        recorder.begin("wait")
+        start = perf_counter()
+        while True:
+            remaining = self._deadline - perf_counter()
+            if remaining <= 0:
+                break
+            sleep(min(self._slice, remaining))
+            self._stamp_events()
+        # the frame budget only covers work, not sleeping until the deadline
+        recorder.add_wait(int((perf_counter() - start) * 1e9))
+        recorder.end("wait")
+        self._deadline += self._frame_time
+
+    def _stamp_events(self):
+        """
+        Move waiting PyGame events into _events with the current time.
+        """
+        events = pygame.event.get()
+        if events:
+            now = perf_counter()
+            for event in events:
+                self._track_window(event)
+            self._events.extend((now, event) for event in events)
+
+    def before_poll(self):
+        """
+        Sleep if pacing before input is polled. Called by the controller.
+        """
+        if self._sleep_before_poll:
+            self.wait()
+
+    def events(self):
+        """
+        Return every event that arrived since the last call.
+
+        Returns:
+            List of (arrival time, PyGame event) tuples in arrival order.
+        """
+        self._stamp_events()
+        events = self._events
+        self._events = []
+        return events
+
+    def input_applied(self, arrival):
+        """
+        Note that input which arrived at a time changed the game this frame.
+
+        Args:
+            arrival: Float, perf_counter value when the input arrived.
+        """
+        self._applied.append(arrival)
+
+    def present(self):
+        """
+        Record the latency of input shown by the flip that just finished,
+        then sleep if pacing after the frame is presented. Called by the
+        view after flipping.
+        """
+        if self._applied:
+            now = perf_counter()
+            for arrival in self._applied:
+                latency = (now - arrival) * 1000
+                self._latencies.append(latency)
+                recorder.instant("input_latency", f"{latency:.2f} ms")
+            self._applied.clear()
+        if not self._sleep_before_poll:
+            self.wait()
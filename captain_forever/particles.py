@@ -0,0 +1,292 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# Disabling pylint warnings related to PyGame that aren't valid
+"""
+Particle system for explosions, stored in NumPy arrays so every particle is
+updated in one vectorized step and drawn with one batched blit.
+"""
+import numpy as np
+from pygame.transform import rotozoom
+from assets import registry
+from utils import load_sprite
+
+
+def explosion_frames(name, size, frame_count, spin):
+    """
+    Pre-render the animation frames of one kind of particle.
+
+    Each frame is the sprite cropped to its visible pixels, scaled to size,
+    turned a little further than the last frame and more transparent, so a
+    particle shrinks and fades out as it ages. Frames are cached in the
+    surface registry.
+
+    Args:
+        name: String, name of the sprite in assets/sprites.
+        size: Int, width in pixels of the first frame.
+        frame_count: Int, number of frames in the animation.
+        spin: Int, degrees the particle turns between frames.
+
+    Returns:
+        List of PyGame surfaces, one per frame.
+    """
+    frames = []
+    extension = "png" if name == "fire" else "gif"
+    # the fire sprite is far larger than any frame, so the copy scaled down
+    # for fires on screen is used rather than keeping the original loaded
+    sprite = load_sprite(name, True, True, extension)
+    # the explosion gifs only use the middle of their canvas
+    sprite = sprite.subsurface(sprite.get_bounding_rect())
+    for index in range(frame_count):
+        key = (name, size, frame_count, spin, index)
+        frame = registry.get("particles", key)
+        if frame is None:
+            progress = index / frame_count
+            frame = rotozoom(
+                sprite,
+                spin * index,
+                size * (1 - 0.6 * progress) / sprite.get_width(),
+            )
+            frame.set_alpha(int(255 * (1 - progress)))
+            registry.put("particles", key, name, "particle frame", frame)
+        frames.append(frame)
+    return frames
+
+
+class ParticleSystem:
+    """
+    Fixed budget of particles whose state lives in NumPy arrays.
+
+    Live particles are kept packed at the front of the arrays, so updating
+    and drawing only touch the first _count rows and expired particles are
+    removed by compacting the arrays with a boolean mask.
+
+    Constants:
+        KINDS: Tuple of (sprite name, size, lifetime in ticks, spin) for
+        each kind of particle.
+        FRAME_COUNT: Int, number of animation frames per kind.
+        DRAG: Float, fraction of velocity kept each tick.
+
+    Attributes:
+        _budget: Int, maximum number of live particles.
+        _count: Int, number of live particles.
+        _positions: Array of shape (budget, 2), x and y of each particle.
+        _velocities: Array of shape (budget, 2), velocity of each particle.
+        _ages: Array of shape (budget,), ticks each particle has lived.
+        _kinds: Array of shape (budget,), index into KINDS of each particle.
+        _frame_indices: Array of shape (budget,), frame each particle shows.
+        _lifetimes: Array, lifetime in ticks of each kind.
+        _frames: List of PyGame surfaces, every kind's frames in order, or
+        None until they are first needed.
+        _half_sizes: Array of shape (frames, 2), half the size of each
+        frame, or None until the frames are rendered.
+        _zoomed_frames: Dict, maps zooms below 1 to tuples of the frames
+        rendered at that scale and their half sizes.
+        _rng: NumPy random generator used for burst directions.
+        _dropped: Int, number of particles not emitted for lack of budget.
+    """
+
+    KINDS = (
+        ("fire", 40, 24, 0),
+        ("explosion", 26, 40, 45),
+        ("grey_explosion", 30, 56, -30),
+    )
+    FRAME_COUNT = 8
+    DRAG = 0.94
+
+    def __init__(self, budget=4096, seed=None):
+        """
+        Initialize ParticleSystem.
+
+        Frames are rendered by load_frames, which is called the first time
+        particles are drawn if it was not called before, so creating a
+        particle system does not slow down startup.
+
+        Args:
+            budget: Int, maximum number of live particles.
+            seed: Int, seed for burst directions, or None.
+        """
+        self._budget = budget
+        self._count = 0
+        self._positions = np.zeros((budget, 2), np.float32)
+        self._velocities = np.zeros((budget, 2), np.float32)
+        self._ages = np.zeros(budget, np.int32)
+        self._kinds = np.zeros(budget, np.int32)
+        self._frame_indices = np.zeros(budget, np.int32)
+        self._lifetimes = np.array([kind[2] for kind in self.KINDS], np.int32)
+        self._frames = None
+        self._half_sizes = None
+        self._zoomed_frames = {}
+        self._rng = np.random.default_rng(seed)
+        self._dropped = 0
+
+    def __len__(self):
+        """
+        Return the number of live particles.
+
+        Returns:
+            Int, number of live particles.
+        """
+        return self._count
+
+    @property
+    def budget(self):
+        """
+        Return _budget.
+
+        Returns:
+            _budget: Int, maximum number of live particles.
+        """
+        return self._budget
+
+    @property
+    def dropped(self):
+        """
+        Return _dropped.
+
+        Returns:
+            _dropped: Int, number of particles not emitted for lack of budget.
+        """
+        return self._dropped
+
+    def load_frames(self):
+        """
+        Pre-render every frame, unless they already are.
+        """
+        if self._frames is not None:
+            return
+        self._frames, self._half_sizes = self._render_frames(1.0)
+
+    def _render_frames(self, zoom):
+        """
+        Render every kind's frames at a scale.
+
+        Args:
+            zoom: Float, scale of the frames relative to the screen.
+
+        Returns:
+            Tuple of a list of PyGame surfaces and an array of shape
+            (frames, 2) of half the size of each.
+        """
+        frames = []
+        for name, size, _, spin in self.KINDS:
+            frames.extend(
+                explosion_frames(name, size * zoom, self.FRAME_COUNT, spin)
+            )
+        half_sizes = (
+            np.array([frame.get_size() for frame in frames], np.float32) / 2
+        )
+        return frames, half_sizes
+
+    def emit(self, position, count, kind, min_speed, max_speed):
+        """
+        Emit particles of one kind from a point in random directions.
+
+        Particles beyond the budget are dropped rather than replacing older
+        ones, so a burst never costs more than the budget allows.
+
+        Args:
+            position: Vector2 or tuple, x and y the particles start at.
+            count: Int, number of particles to emit.
+            kind: Int, index into KINDS of the particles.
+            min_speed: Float, slowest starting speed in pixels per tick.
+            max_speed: Float, fastest starting speed in pixels per tick.
+        """
+        emitted = min(count, self._budget - self._count)
+        self._dropped += count - emitted
+        if emitted <= 0:
+            return
+        start = self._count
+        end = start + emitted
+        angles = self._rng.uniform(0, 2 * np.pi, emitted)
+        speeds = self._rng.uniform(min_speed, max_speed, emitted)
+        self._positions[start:end] = (position[0], position[1])
+        self._velocities[start:end, 0] = np.cos(angles) * speeds
+        self._velocities[start:end, 1] = np.sin(angles) * speeds
+        # staggered ages so a burst does not vanish all at once
+        self._ages[start:end] = self._rng.integers(0, 6, emitted)
+        self._kinds[start:end] = kind
+        self._frame_indices[start:end] = (
+            kind * self.FRAME_COUNT
+            + self._ages[start:end] * self.FRAME_COUNT // self._lifetimes[kind]
+        )
+        self._count = end
+
+    def emit_explosion(self, position):
+        """
+        Emit a burst of flames, debris and smoke.
+
+        Args:
+            position: Vector2 or tuple, x and y of the explosion's center.
+        """
+        # smoke first so the flames are drawn over it
+        self.emit(position, 6, 2, 0.5, 2.0)
+        self.emit(position, 8, 1, 2.5, 6.0)
+        self.emit(position, 10, 0, 1.0, 3.5)
+
+    def update(self):
+        """
+        Move and age every live particle and remove expired ones.
+        """
+        count = self._count
+        if not count:
+            return
+        positions = self._positions[:count]
+        velocities = self._velocities[:count]
+        ages = self._ages[:count]
+        kinds = self._kinds[:count]
+        positions += velocities
+        velocities *= self.DRAG
+        ages += 1
+        lifetimes = self._lifetimes[kinds]
+        alive = ages < lifetimes
+        live_count = int(np.count_nonzero(alive))
+        if live_count < count:
+            self._positions[:live_count] = positions[alive]
+            self._velocities[:live_count] = velocities[alive]
+            self._ages[:live_count] = ages[alive]
+            self._kinds[:live_count] = kinds[alive]
+            lifetimes = lifetimes[alive]
+            self._count = live_count
+        self._frame_indices[: self._count] = (
+            self._kinds[: self._count] * self.FRAME_COUNT
+            + self._ages[: self._count] * self.FRAME_COUNT // lifetimes
+        )
+
+    def draw(self, surface, zoom=1.0):
+        """
+        Draw every live particle with a single batched blit.
+
+        Args:
+            surface: PyGame surface, surface on which particles are drawn.
+            zoom: Float, scale of the surface relative to the screen.
+        """
+        count = self._count
+        if not count:
+            return
+        if zoom == 1:
+            self.load_frames()
+            frames, half_sizes = self._frames, self._half_sizes
+        else:
+            if zoom not in self._zoomed_frames:
+                self._zoomed_frames[zoom] = self._render_frames(zoom)
+            frames, half_sizes = self._zoomed_frames[zoom]
+        frame_indices = self._frame_indices[:count]
+        positions = self._positions[:count]
+        if zoom != 1:
+            positions = positions * zoom
+        corners = (positions - half_sizes[frame_indices]).astype(np.int32)
+        surface.blits(
+            [
+                (frames[index], corner)
+                for index, corner in zip(
+                    frame_indices.tolist(), corners.tolist()
+                )
+            ],
+            False,
+        )
+
+    def clear(self):
+        """
+        Remove every particle.
+        """
+        self._count = 0
@@ -0,0 +1,210 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# Disabling pylint warnings related to PyGame that aren't valid
+"""
+Frame profiler that keeps rolling timings for each phase of the game loop.
+"""
+from collections import deque
+from time import perf_counter
+import timeline
+from assets import registry
+
+
+class FrameProfiler:
+    """
+    Collect rolling per-phase timings, entity counts and frame times.
+
+    Phases can be started and stopped several times in one frame and their
+    durations are summed, so a phase split across the game logic (like
+    collision) is still reported as one number. While the profiler is
+    disabled, start and stop return straight away so the overhead on the
+    game loop is a method call.
+
+    Every phase is also forwarded to a TimelineRecorder, so the same calls
+    feed the Chrome trace export whether or not the overlay is shown.
+
+    Constants:
+        PHASES: Tuple of strings, phases reported by the overlay in order.
+
+    Attributes:
+        _enabled: Bool, whether timings are currently being collected.
+        _history: Int, number of frames kept for each rolling timing.
+        _timings: Dict, maps phase names to deques of past durations in ms.
+        _frame_times: Deque, total durations of past frames in ms.
+        _entity_counts: Dict, maps entity kinds to their count last frame.
+        _surface_usage: Dict, maps surface caches to bytes held last frame.
+        _current: Dict, maps phase names to durations summed this frame.
+        _starts: Dict, maps running phase names to their start times.
+        _frame_start: Float, perf_counter value when the frame began.
+        _recorder: TimelineRecorder instance that phases are forwarded to.
+    """
+
+    PHASES = (
+        "controller",
+        "logic",
+        "move",
+        "cull",
+        "collision",
+        "particles",
+        "draw",
+        "background",
+        "sprites",
+        "upscale",
+        "text",
+        "flip",
+        "gc",
+    )
+
+    def __init__(self, history=120, enabled=False, recorder=None):
+        """
+        Initialize FrameProfiler.
+
+        Args:
+            history: Int, number of frames kept for each rolling timing.
+            enabled: Bool, whether timings are collected from the start.
+            recorder: TimelineRecorder instance to forward phases to, the
+            shared timeline recorder is used if not given.
+        """
+        self._enabled = enabled
+        self._history = history
+        self._timings = {phase: deque(maxlen=history) for phase in self.PHASES}
+        self._frame_times = deque(maxlen=history)
+        self._entity_counts = {}
+        self._surface_usage = {}
+        self._current = {}
+        self._starts = {}
+        self._frame_start = None
+        self._recorder = recorder if recorder is not None else timeline.recorder
+
+    @property
+    def enabled(self):
+        """
+        Return _enabled.
+
+        Returns:
+            _enabled: Bool, whether timings are currently being collected.
+        """
+        return self._enabled
+
+    @property
+    def frame_times(self):
+        """
+        Return _frame_times.
+
+        Returns:
+            _frame_times: Deque, total durations of past frames in ms.
+        """
+        return self._frame_times
+
+    @property
+    def entity_counts(self):
+        """
+        Return _entity_counts.
+
+        Returns:
+            _entity_counts: Dict, maps entity kinds to their count last frame.
+        """
+        return self._entity_counts
+
+    @property
+    def surface_usage(self):
+        """
+        Return _surface_usage.
+
+        Returns:
+            _surface_usage: Dict, maps surface caches to bytes held last frame.
+        """
+        return self._surface_usage
+
+    @property
+    def recorder(self):
+        """
+        Return _recorder.
+
+        Returns:
+            _recorder: TimelineRecorder instance that phases are forwarded to.
+        """
+        return self._recorder
+
+    def toggle(self):
+        """
+        Switch timing collection on or off, dropping any partial frame.
+        """
+        self._enabled = not self._enabled
+        self._current = {}
+        self._starts = {}
+        self._frame_start = None
+
+    def begin_frame(self):
+        """
+        Mark the start of a frame.
+        """
+        self._recorder.begin_frame()
+        if not self._enabled:
+            return
+        self._current = {}
+        self._frame_start = perf_counter()
+
+    def start(self, phase):
+        """
+        Start timing a phase.
+
+        Args:
+            phase: String, name of the phase being timed.
+        """
+        self._recorder.begin(phase)
+        if not self._enabled:
+            return
+        self._starts[phase] = perf_counter()
+
+    def stop(self, phase):
+        """
+        Stop timing a phase and add its duration to the current frame.
+
+        Args:
+            phase: String, name of the phase being timed.
+        """
+        self._recorder.end(phase)
+        if not self._enabled:
+            return
+        started = self._starts.pop(phase, None)
+        # the profiler may have been switched on partway through the phase
+        if started is None:
+            return
+        self._current[phase] = (
+            self._current.get(phase, 0.0) + perf_counter() - started
+        )
+
+    def end_frame(self, game):
+        """
+        Commit the timings of the current frame to the rolling history.
+
+        Args:
+            game: An instance of CaptainForever to count entities from.
+        """
+        self._recorder.end_frame()
+        if not self._enabled:
+            return
+        if self._frame_start is not None:
+            self._frame_times.append(
+                (perf_counter() - self._frame_start) * 1000
+            )
+        for phase in self.PHASES:
+            self._timings[phase].append(self._current.get(phase, 0.0) * 1000)
+        self._entity_counts = game.entity_counts()
+        self._surface_usage = registry.usage_by_cache()
+
+    def average(self, phase):
+        """
+        Return the rolling average duration of a phase.
+
+        Args:
+            phase: String, name of the phase.
+
+        Returns:
+            Float, average duration of the phase in ms, 0 with no history.
+        """
+        timings = self._timings[phase]
+        if not timings:
+            return 0.0
+        return sum(timings) / len(timings)
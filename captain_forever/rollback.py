@@ -0,0 +1,491 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# pylint: disable=protected-access
+# Disabling pylint warnings related to PyGame that aren't valid
+# Disabling protected access because extra NPC ships shoot through the game
+"""
+Rollback session for peer-to-peer play, and a harness that measures the
+worst-case cost of rolling back.
+
+Measure rolling back 8 ticks on every frame with
+
+    python rollback.py --max-rollback 8 --ticks 600
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+from collections import deque
+from time import perf_counter
+import pygame
+from game import CaptainForever
+from controller import BotController, RemoteController
+from models import NPCShip
+from snapshots import capture_snapshot, quantize_position
+
+WIDTH = 1082
+HEIGHT = 720
+
+
+def apply_buttons(game, buttons, previous_buttons):
+    """
+    Steer a game's player ship with buttons the way RemoteController does,
+    taking whether fire was held from the previous tick's buttons so that
+    no controller state needs saving.
+
+    Args:
+        game: CaptainForever instance.
+        buttons: Int, RemoteController button bits held this tick.
+        previous_buttons: Int, button bits held the tick before.
+    """
+    if game.message and buttons & RemoteController.RESTART:
+        game.restart()
+    elif game.is_running:
+        BotController.apply_action(
+            game.player_ship,
+            bool(buttons & RemoteController.RIGHT)
+            - bool(buttons & RemoteController.LEFT),
+            bool(buttons & RemoteController.UP)
+            - bool(buttons & RemoteController.DOWN),
+            bool(buttons & RemoteController.FIRE)
+            and not previous_buttons & RemoteController.FIRE,
+        )
+
+
+class RollbackSession:
+    """
+    Run a game shared by several peers, predicting inputs that have not
+    arrived yet and rolling back when a prediction turns out wrong.
+
+    CaptainForever has one player ship, so the buttons of every peer are
+    combined to steer it. Each tick the game state is saved before it is
+    simulated. A remote input for a past tick that differs from what was
+    predicted marks that tick, and the next advance restores the state
+    saved before it and simulates the ticks since then again with the
+    corrected inputs. Inputs that have not arrived are predicted to repeat
+    the latest input from that peer.
+
+    The game must be seeded and stepped only through the session for every
+    peer to stay in step. An AI scheduler with a time budget decides by the
+    clock which ships think each tick, so games using one are refused.
+
+    Attributes:
+        _game: CaptainForever instance being simulated.
+        _players: Int, number of peers.
+        _local_player: Int, index of the peer on this machine.
+        _max_rollback: Int, most ticks a rollback can go back.
+        _frame_budget_ms: Float, time an advance should fit in.
+        _tick: Int, next tick to simulate.
+        _confirmed: List of dicts per peer, mapping ticks to the buttons
+        received for them.
+        _latest: List per peer of the buttons of their newest input.
+        _used: Dict, maps ticks to the tuple of buttons each peer was
+        simulated with.
+        _states: Dict, maps ticks to the game state saved before them.
+        _rollback_to: Int, earliest tick simulated with a wrong
+        prediction, or None.
+        _rollback_times: Deque, ms taken by recent rollbacks.
+        _rollbacks: Int, number of rollbacks so far.
+        _max_resimulated: Int, most ticks simulated again in one rollback.
+        _over_budget: Int, number of advances that took longer than the
+        frame budget.
+    """
+
+    def __init__(
+        self,
+        game,
+        players=2,
+        local_player=0,
+        max_rollback=8,
+        frame_budget_ms=1000 / 60,
+        history=600,
+    ):
+        """
+        Initialize RollbackSession.
+
+        Args:
+            game: CaptainForever instance to simulate, seeded the same way
+            on every peer.
+            players: Int, number of peers.
+            local_player: Int, index of the peer on this machine.
+            max_rollback: Int, most ticks a rollback can go back.
+            frame_budget_ms: Float, time an advance should fit in.
+            history: Int, number of rollback times kept.
+
+        Raises:
+            ValueError: If the game's AI scheduler has a time budget.
+        """
+        if (
+            game.ai_scheduler is not None
+            and game.ai_scheduler.budget_us is not None
+        ):
+            raise ValueError(
+                "A rollback session needs an AI scheduler without a time"
+                " budget, since a budget makes ticks depend on the clock"
+            )
+        self._game = game
+        self._players = players
+        self._local_player = local_player
+        self._max_rollback = max_rollback
+        self._frame_budget_ms = frame_budget_ms
+        self._tick = 0
+        self._confirmed = [{} for _ in range(players)]
+        self._latest = [0] * players
+        self._used = {}
+        self._states = {}
+        self._rollback_to = None
+        self._rollback_times = deque(maxlen=history)
+        self._rollbacks = 0
+        self._max_resimulated = 0
+        self._over_budget = 0
+
+    @property
+    def game(self):
+        """
+        Return _game.
+
+        Returns:
+            _game: CaptainForever instance being simulated.
+        """
+        return self._game
+
+    @property
+    def tick(self):
+        """
+        Return _tick.
+
+        Returns:
+            _tick: Int, next tick to simulate.
+        """
+        return self._tick
+
+    @property
+    def rollback_times(self):
+        """
+        Return _rollback_times.
+
+        Returns:
+            _rollback_times: Deque, ms taken by recent rollbacks.
+        """
+        return self._rollback_times
+
+    @property
+    def rollbacks(self):
+        """
+        Return _rollbacks.
+
+        Returns:
+            _rollbacks: Int, number of rollbacks so far.
+        """
+        return self._rollbacks
+
+    @property
+    def max_resimulated(self):
+        """
+        Return _max_resimulated.
+
+        Returns:
+            _max_resimulated: Int, most ticks simulated again in one
+            rollback.
+        """
+        return self._max_resimulated
+
+    @property
+    def over_budget(self):
+        """
+        Return _over_budget.
+
+        Returns:
+            _over_budget: Int, number of advances that took longer than the
+            frame budget.
+        """
+        return self._over_budget
+
+    def add_local_input(self, buttons):
+        """
+        Set this peer's buttons for the next tick.
+
+        Args:
+            buttons: Int, RemoteController button bits held down.
+
+        Returns:
+            Int, the tick the input is for, to send to the other peers.
+        """
+        self._confirmed[self._local_player][self._tick] = buttons
+        self._latest[self._local_player] = buttons
+        return self._tick
+
+    def add_remote_input(self, player, tick, buttons):
+        """
+        Record another peer's buttons for a tick, rolling back on the next
+        advance if the tick was already simulated with a wrong prediction.
+
+        Args:
+            player: Int, index of the peer.
+            tick: Int, tick the input is for.
+            buttons: Int, RemoteController button bits held down.
+
+        Raises:
+            ValueError: If the tick is further back than max_rollback.
+        """
+        if tick < self._tick - self._max_rollback:
+            raise ValueError(
+                f"Input for tick {tick} is more than {self._max_rollback}"
+                f" ticks behind tick {self._tick}"
+            )
+        confirmed = self._confirmed[player]
+        confirmed[tick] = buttons
+        if tick >= max(confirmed):
+            self._latest[player] = buttons
+        used = self._used.get(tick)
+        if used is not None and used[player] != buttons:
+            if self._rollback_to is None or tick < self._rollback_to:
+                self._rollback_to = tick
+
+    def _inputs_for(self, tick):
+        """
+        Return each peer's buttons for a tick, predicting missing ones.
+
+        Args:
+            tick: Int, tick to get inputs for.
+
+        Returns:
+            Tuple of each peer's button bits.
+        """
+        return tuple(
+            confirmed.get(tick, latest)
+            for confirmed, latest in zip(self._confirmed, self._latest)
+        )
+
+    def _simulate(self, tick, replaying):
+        """
+        Save the state before a tick, then simulate it.
+
+        Args:
+            tick: Int, tick to simulate.
+            replaying: Bool, whether the tick was simulated before.
+        """
+        self._states[tick] = self._game.save_state()
+        inputs = self._inputs_for(tick)
+        buttons = 0
+        for player_buttons in inputs:
+            buttons |= player_buttons
+        previous_buttons = 0
+        for player_buttons in self._used.get(tick - 1, ()):
+            previous_buttons |= player_buttons
+        apply_buttons(self._game, buttons, previous_buttons)
+        self._game.step(replaying)
+        self._used[tick] = inputs
+
+    def advance(self):
+        """
+        Roll back if a prediction was wrong, then simulate the next tick.
+
+        Returns:
+            Float, ms the advance took.
+        """
+        start = perf_counter()
+        if self._rollback_to is not None:
+            rollback_to = self._rollback_to
+            self._rollback_to = None
+            self._game.load_state(self._states[rollback_to])
+            for tick in range(rollback_to, self._tick):
+                self._simulate(tick, True)
+            resimulated = self._tick - rollback_to
+            self._rollbacks += 1
+            self._max_resimulated = max(self._max_resimulated, resimulated)
+            self._rollback_times.append((perf_counter() - start) * 1000)
+        self._simulate(self._tick, False)
+        self._tick += 1
+        # forget ticks too old to roll back to
+        oldest = self._tick - self._max_rollback - 1
+        self._states.pop(oldest, None)
+        self._used.pop(oldest - 1, None)
+        for confirmed in self._confirmed:
+            confirmed.pop(oldest - 1, None)
+        elapsed = (perf_counter() - start) * 1000
+        if elapsed > self._frame_budget_ms:
+            self._over_budget += 1
+        return elapsed
+
+
+def _world_state(game):
+    """
+    Return the state of a game's entities without their ids, which differ
+    between runs, for checking that two runs match.
+
+    Args:
+        game: CaptainForever instance.
+
+    Returns:
+        Sorted list of (kind, x, y, heading) tuples, sorted list of the
+        debris' quantized x and y tuples and the message flag.
+    """
+    return (
+        sorted(capture_snapshot(game, 0).entities.values()),
+        sorted(
+            (
+                quantize_position(rock.position.x),
+                quantize_position(rock.position.y),
+            )
+            for rock in game.debris
+        ),
+        game.message_flag,
+    )
+
+
+def _new_game(seed, extra_npcs):
+    """
+    Create a seeded game with extra NPC ships spread over the screen.
+
+    Args:
+        seed: Int, seed for the game.
+        extra_npcs: Int, number of NPC ships added to the usual three.
+
+    Returns:
+        A CaptainForever instance.
+    """
+    game = CaptainForever(WIDTH, HEIGHT, seed=seed)
+    for index in range(extra_npcs):
+        game.npc_ships.append(
+            NPCShip(
+                pygame.Vector2(
+                    (index * 97) % WIDTH, 40 + (index * 53) % (HEIGHT - 80)
+                ),
+                "ship",
+                game._fire_npc_bullet,
+            )
+        )
+    return game
+
+
+def measure_worst_case(
+    max_rollback=8, ticks=600, seed=0, extra_npcs=0, frame_budget_ms=1000 / 60
+):
+    """
+    Measure the cost of rolling back max_rollback ticks on every advance.
+
+    The remote peer's inputs always arrive max_rollback ticks late and are
+    never what was predicted, which is the worst case a session allows.
+    The final state is checked against a game run once with the same
+    inputs, without rolling back.
+
+    Args:
+        max_rollback: Int, ticks every remote input arrives late by.
+        ticks: Int, number of ticks to advance.
+        seed: Int, seed for the game and the inputs.
+        extra_npcs: Int, NPC ships added to make each tick more expensive.
+        frame_budget_ms: Float, time an advance should fit in.
+
+    Returns:
+        Dict with the advance, save and load times in ms, the number of
+        advances over budget and whether both runs ended the same.
+    """
+    inputs = random.Random(seed)
+    local = [inputs.getrandbits(5) for _ in range(ticks)]
+    remote = [inputs.getrandbits(5) for _ in range(ticks)]
+
+    session = RollbackSession(
+        _new_game(seed, extra_npcs), 2, 0, max_rollback, frame_budget_ms
+    )
+    advance_times = []
+    for tick in range(ticks):
+        late_tick = tick - max_rollback
+        if late_tick >= 0:
+            # random buttons almost never match the predicted ones
+            session.add_remote_input(1, late_tick, remote[late_tick])
+        session.add_local_input(local[tick])
+        advance_times.append(session.advance())
+    game = session.game
+
+    reference = _new_game(seed, extra_npcs)
+    previous_buttons = 0
+    for tick in range(ticks):
+        buttons = local[tick]
+        # remote inputs after the last late tick are still predictions
+        if tick < ticks - max_rollback:
+            buttons |= remote[tick]
+        else:
+            buttons |= remote[ticks - max_rollback - 1]
+        apply_buttons(reference, buttons, previous_buttons)
+        reference.step()
+        previous_buttons = buttons
+
+    save_times = []
+    load_times = []
+    for _ in range(100):
+        start = perf_counter()
+        state = game.save_state()
+        save_times.append((perf_counter() - start) * 1000)
+        start = perf_counter()
+        game.load_state(state)
+        load_times.append((perf_counter() - start) * 1000)
+
+    ordered = sorted(advance_times)
+    return {
+        "max_rollback": max_rollback,
+        "ticks": ticks,
+        "entities": sum(game.entity_counts().values()),
+        "frame_budget_ms": frame_budget_ms,
+        "advance_ms": {
+            "mean": statistics.mean(advance_times),
+            "p99": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+            "max": ordered[-1],
+        },
+        "rollbacks": session.rollbacks,
+        "max_resimulated": session.max_resimulated,
+        "over_budget": session.over_budget,
+        "save_ms": statistics.mean(save_times),
+        "load_ms": statistics.mean(load_times),
+        "deterministic": _world_state(game) == _world_state(reference),
+    }
+
+
+def main(argv=None):
+    """
+    Measure the worst-case rollback cost from the command line.
+
+    Args:
+        argv: List of strings, command line arguments without the program
+        name, or None to use sys.argv.
+
+    Returns:
+        Int, exit status, 1 if the rolled back game diverged.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--max-rollback", type=int, default=8)
+    parser.add_argument("--ticks", type=int, default=600)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--extra-npcs", type=int, default=0)
+    parser.add_argument("--frame-budget-ms", type=float, default=1000 / 60)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.init()
+    pygame.display.set_mode((WIDTH, HEIGHT))
+    report = measure_worst_case(
+        args.max_rollback,
+        args.ticks,
+        args.seed,
+        args.extra_npcs,
+        args.frame_budget_ms,
+    )
+    advance = report["advance_ms"]
+    print(
+        f"rolling back {report['max_rollback']} ticks every tick with"
+        f" {report['entities']} entities:\n"
+        f"advance {advance['mean']:.2f} ms mean, {advance['p99']:.2f} ms p99,"
+        f" {advance['max']:.2f} ms max,"
+        f" {report['over_budget']}/{report['ticks']} over the"
+        f" {report['frame_budget_ms']:.1f} ms budget\n"
+        f"save {report['save_ms'] * 1000:.0f} us,"
+        f" load {report['load_ms'] * 1000:.0f} us,"
+        f" deterministic: {report['deterministic']}"
+    )
+    return 0 if report["deterministic"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+Scheduler that spreads NPC ship decisions over ticks, so a large fleet
+does not have to think every tick.
+
+Ships near the player decide every tick. The rest take turns in round
+robin, a share of them per tick, for as long as the tick's time budget
+allows. Every ship still moves every tick by the velocity it last decided
+on.
+"""
+from time import perf_counter
+import numpy as np
+from flowfield import positions_of
+
+
+class AIScheduler:
+    """
+    Pick which NPC ships decide each tick, within a time budget.
+
+    Attributes:
+        _budget_us: Float, microseconds decisions may take per tick, or None
+        for no budget, which keeps games deterministic.
+        _near_distance: Float, ships closer than this to the player decide
+        every tick.
+        _buckets: Int, far ships decide once every this many ticks when the
+        budget allows.
+        _cursor: Int, index among the far ships the next turn starts at.
+        _ticks: Int, number of ticks scheduled.
+        _over_budget: Int, number of ticks whose decisions took longer than
+        the budget.
+        _decisions: Int, number of decisions made.
+        _deferred: Int, number of far ships whose turn was pushed to a later
+        tick for lack of time.
+        _last_us: Float, microseconds decisions took last tick.
+        _worst_us: Float, most microseconds decisions took in one tick.
+    """
+
+    def __init__(self, budget_us=1000, near_distance=400, buckets=4):
+        """
+        Initialize AIScheduler.
+
+        Args:
+            budget_us: Float, microseconds decisions may take per tick, or
+            None for no budget.
+            near_distance: Float, ships closer than this to the player
+            decide every tick.
+            buckets: Int, far ships decide once every this many ticks when
+            the budget allows.
+        """
+        self._budget_us = budget_us
+        self._near_distance = near_distance
+        self._buckets = buckets
+        self._cursor = 0
+        self._ticks = 0
+        self._over_budget = 0
+        self._decisions = 0
+        self._deferred = 0
+        self._last_us = 0.0
+        self._worst_us = 0.0
+
+    @property
+    def budget_us(self):
+        """
+        Return _budget_us.
+
+        Returns:
+            _budget_us: Float, microseconds decisions may take per tick, or
+            None.
+        """
+        return self._budget_us
+
+    def save_state(self):
+        """
+        Return the part of the scheduler's state that decides which ships
+        take their turns next.
+
+        Returns:
+            Int that can be passed to load_state.
+        """
+        return self._cursor
+
+    def load_state(self, state):
+        """
+        Put the scheduler back to a state returned by save_state.
+
+        Args:
+            state: Int returned by save_state.
+        """
+        self._cursor = state
+
+    def stats(self):
+        """
+        Summarize how the scheduler has kept to its budget.
+
+        Returns:
+            Dict with the number of ticks, ticks over budget, decisions and
+            deferred turns, and the last and worst microseconds per tick.
+        """
+        return {
+            "ticks": self._ticks,
+            "over_budget": self._over_budget,
+            "decisions": self._decisions,
+            "deferred": self._deferred,
+            "last_us": self._last_us,
+            "worst_us": self._worst_us,
+        }
+
+    def run(self, npc_ships, player_position, decide, distances=None):
+        """
+        Make this tick's decisions.
+
+        Near ships decide first, whatever the budget. Then far ships take
+        their turns, a bucket's worth from where the last tick stopped, for
+        as long as there is time left. At least one far ship decides each
+        tick so none waits forever.
+
+        Args:
+            npc_ships: List of NPCShip instances.
+            player_position: Vector2, x and y of the player ship.
+            decide: Function taking an index into npc_ships that makes that
+            ship's decision.
+            distances: Array of each ship's distance to the player, or None
+            to measure them.
+
+        Returns:
+            Int, number of ships that decided.
+        """
+        start = perf_counter()
+        if distances is None:
+            offsets = positions_of(npc_ships) - np.array(
+                player_position, np.float32
+            )
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        near = np.asarray(distances) < self._near_distance
+        far_indices = np.flatnonzero(~near).tolist()
+        for index in np.flatnonzero(near).tolist():
+            decide(index)
+        decided = len(npc_ships) - len(far_indices)
+
+        if far_indices:
+            turns = -(-len(far_indices) // self._buckets)
+            self._cursor %= len(far_indices)
+            deadline = (
+                None
+                if self._budget_us is None
+                else start + self._budget_us / 1_000_000
+            )
+            taken = 0
+            while taken < turns:
+                if taken and deadline is not None and perf_counter() > deadline:
+                    self._deferred += turns - taken
+                    break
+                decide(far_indices[(self._cursor + taken) % len(far_indices)])
+                taken += 1
+            self._cursor += taken
+            decided += taken
+
+        elapsed_us = (perf_counter() - start) * 1_000_000
+        self._ticks += 1
+        self._decisions += decided
+        self._last_us = elapsed_us
+        self._worst_us = max(self._worst_us, elapsed_us)
+        if self._budget_us is not None and elapsed_us > self._budget_us:
+            self._over_budget += 1
+        return decided
@@ -0,0 +1,368 @@
+# pylint: disable=no-name-in-module
+# pylint: disable=protected-access
+# Disabling pylint warnings related to PyGame that aren't valid
+# Disabling protected access because NPC ships are moved away from the
+# player without steering them there
+"""
+Sector world: an endless grid of screen-sized sectors generated from a
+seed, so the player can fly in any direction for as long as they like.
+
+The sector the player is in is the screen the game simulates and draws.
+Flying off an edge enters the neighbouring sector instead of wrapping
+around. The sector left behind is frozen into a compact document (see
+serialization.py) and the one entered is thawed, or generated if it has
+never been visited or was evicted. Frozen sectors are kept in least
+recently used order and the oldest are dropped once they go over a memory
+budget, after which they are generated afresh. Only one sector is ever
+simulated, so the cost of a tick and the memory held stay the same
+however far the player travels.
+"""
+import random
+from collections import OrderedDict
+from pygame import Vector2
+from models import NPCShip, StaticObject
+from serialization import encode_sector, load_sector
+
+
+class SectorWorld:
+    """
+    Generate, freeze and thaw the sectors of an endless world.
+
+    Constants:
+        STAR_LAYERS: Tuple of (count, radius, brightness) tuples, the
+        background star layers of each sector from the farthest in.
+
+    Attributes:
+        _width: Int, width of a sector, the width of the screen.
+        _height: Int, height of a sector, the height of the screen.
+        _seed: Int, seed every sector is generated from.
+        _budget_bytes: Int, most bytes frozen sectors may take up.
+        _max_enemies: Int, most NPC ships a sector is generated with.
+        _max_debris: Int, most pieces of debris a sector is generated with.
+        _safe_distance: Float, NPC ships closer than this to where the
+        player enters a sector are moved to the far side of it.
+        _sector: Tuple of ints, column and row of the current sector.
+        _frozen: OrderedDict, maps sectors to their frozen documents, least
+        recently left first.
+        _frozen_bytes: Int, bytes the frozen sectors take up.
+        _generated: Int, number of sectors generated.
+        _thawed: Int, number of sectors thawed.
+        _evictions: Int, number of frozen sectors dropped for the budget.
+    """
+
+    STAR_LAYERS = ((120, 1, 70), (60, 1, 140), (20, 2, 220))
+
+    def __init__(
+        self,
+        width,
+        height,
+        seed=0,
+        budget_bytes=256 * 1024,
+        max_enemies=4,
+        max_debris=6,
+        safe_distance=300,
+    ):
+        """
+        Initialize SectorWorld.
+
+        Args:
+            width: Int, width of a sector, the width of the screen.
+            height: Int, height of a sector, the height of the screen.
+            seed: Int, seed every sector is generated from.
+            budget_bytes: Int, most bytes frozen sectors may take up.
+            max_enemies: Int, most NPC ships a sector is generated with.
+            max_debris: Int, most pieces of debris a sector is generated
+            with.
+            safe_distance: Float, NPC ships closer than this to where the
+            player enters a sector are moved to the far side of it.
+        """
+        self._width = width
+        self._height = height
+        self._seed = seed
+        self._budget_bytes = budget_bytes
+        self._max_enemies = max_enemies
+        self._max_debris = max_debris
+        self._safe_distance = safe_distance
+        self._sector = (0, 0)
+        self._frozen = OrderedDict()
+        self._frozen_bytes = 0
+        self._generated = 0
+        self._thawed = 0
+        self._evictions = 0
+
+    @property
+    def sector(self):
+        """
+        Return _sector.
+
+        Returns:
+            _sector: Tuple of ints, column and row of the current sector.
+        """
+        return self._sector
+
+    @property
+    def frozen_bytes(self):
+        """
+        Return _frozen_bytes.
+
+        Returns:
+            _frozen_bytes: Int, bytes the frozen sectors take up.
+        """
+        return self._frozen_bytes
+
+    def settings(self):
+        """
+        Return the settings the world was created with besides its size,
+        so an identical world can be created.
+
+        Returns:
+            Dict of the keyword arguments to create the world with.
+        """
+        return {
+            "seed": self._seed,
+            "budget_bytes": self._budget_bytes,
+            "max_enemies": self._max_enemies,
+            "max_debris": self._max_debris,
+            "safe_distance": self._safe_distance,
+        }
+
+    def stats(self):
+        """
+        Summarize the sectors generated, frozen and evicted.
+
+        Returns:
+            Dict with the current sector, the number of frozen sectors and
+            the bytes they take up, and the number of sectors generated,
+            thawed and evicted.
+        """
+        return {
+            "sector": self._sector,
+            "frozen": len(self._frozen),
+            "frozen_bytes": self._frozen_bytes,
+            "generated": self._generated,
+            "thawed": self._thawed,
+            "evictions": self._evictions,
+        }
+
+    def _random(self, sector, stream):
+        """
+        Return the random numbers of one part of a sector.
+
+        Args:
+            sector: Tuple of ints, column and row of the sector.
+            stream: String, which part of the sector the numbers are for.
+
+        Returns:
+            A random.Random instance seeded by the world seed, the sector
+            and the stream.
+        """
+        return random.Random(f"{self._seed}:{sector[0]}:{sector[1]}:{stream}")
+
+    def generate(self, sector, fire_npc_bullet):
+        """
+        Create the contents of a sector as they were before anyone visited.
+
+        Args:
+            sector: Tuple of ints, column and row of the sector.
+            fire_npc_bullet: Function the NPC ships shoot bullets into.
+
+        Returns:
+            Tuple of lists of the NPC ships, fires and debris.
+        """
+        generator = self._random(sector, "contents")
+        width = self._width
+        height = self._height
+        npc_ships = [
+            NPCShip(
+                Vector2(
+                    generator.randrange(width), generator.randrange(height)
+                ),
+                "ship",
+                fire_npc_bullet,
+            )
+            for _ in range(generator.randint(1, self._max_enemies))
+        ]
+        debris = [
+            StaticObject(
+                Vector2(
+                    generator.randrange(width), generator.randrange(height)
+                ),
+                "asteroid",
+                (generator.uniform(-0.5, 0.5), generator.uniform(-0.5, 0.5)),
+            )
+            for _ in range(generator.randint(0, self._max_debris))
+        ]
+        self._generated += 1
+        return npc_ships, [], debris
+
+    def stars(self, sector=None):
+        """
+        Return the background star layers of a sector.
+
+        Args:
+            sector: Tuple of ints, column and row of the sector, the
+            current one if not given.
+
+        Returns:
+            List of (radius, brightness, positions) tuples from the farthest
+            layer in, where positions is a list of x and y tuples.
+        """
+        generator = self._random(
+            self._sector if sector is None else sector, "stars"
+        )
+        return [
+            (
+                radius,
+                brightness,
+                [
+                    (
+                        generator.randrange(self._width),
+                        generator.randrange(self._height),
+                    )
+                    for _ in range(count)
+                ],
+            )
+            for count, radius, brightness in self.STAR_LAYERS
+        ]
+
+    def _freeze(self, npc_ships, fires, debris):
+        """
+        Freeze the current sector, then drop the least recently left
+        sectors until the frozen ones fit the budget.
+
+        Args:
+            npc_ships: List of NPCShip instances in the sector.
+            fires: List of StaticObject instances, wrecks in the sector.
+            debris: List of drifting StaticObject instances in the sector.
+        """
+        data = encode_sector(npc_ships, fires, debris)
+        self._frozen[self._sector] = data
+        self._frozen_bytes += len(data)
+        while self._frozen_bytes > self._budget_bytes:
+            _, evicted = self._frozen.popitem(last=False)
+            self._frozen_bytes -= len(evicted)
+            self._evictions += 1
+
+    def _thaw(self, player_position, fire_npc_bullet):
+        """
+        Bring the current sector back to life, generating it if it is not
+        frozen, and move NPC ships away from the player.
+
+        Args:
+            player_position: Vector2, x and y of the player ship.
+            fire_npc_bullet: Function the NPC ships shoot bullets into.
+
+        Returns:
+            Tuple of lists of the NPC ships, fires and debris.
+        """
+        data = self._frozen.pop(self._sector, None)
+        if data is None:
+            npc_ships, fires, debris = self.generate(
+                self._sector, fire_npc_bullet
+            )
+        else:
+            self._frozen_bytes -= len(data)
+            self._thawed += 1
+            npc_ships, fires, debris = load_sector(data, fire_npc_bullet)
+        half = Vector2(self._width / 2, self._height / 2)
+        for npc_ship in npc_ships:
+            if npc_ship.position.distance_to(player_position) < (
+                self._safe_distance
+            ):
+                # the far side of a sector is at least half a screen away
+                position = npc_ship.position + half
+                npc_ship._position = Vector2(
+                    position.x % self._width, position.y % self._height
+                )
+        return npc_ships, fires, debris
+
+    def start(self, player_position, fire_npc_bullet):
+        """
+        Forget every sector and start again in the first one.
+
+        Args:
+            player_position: Vector2, x and y of the player ship.
+            fire_npc_bullet: Function the NPC ships shoot bullets into.
+
+        Returns:
+            Tuple of lists of the NPC ships, fires and debris of the first
+            sector.
+        """
+        self._sector = (0, 0)
+        self._frozen.clear()
+        self._frozen_bytes = 0
+        return self._thaw(player_position, fire_npc_bullet)
+
+    def save_state(self):
+        """
+        Return a copy of the world's state that later changes do not touch.
+
+        Frozen documents are bytes, which never change, so they are shared
+        rather than copied.
+
+        Returns:
+            Tuple that can be passed to load_state.
+        """
+        return (
+            self._sector,
+            self._frozen.copy(),
+            self._frozen_bytes,
+            self._generated,
+            self._thawed,
+            self._evictions,
+        )
+
+    def load_state(self, state):
+        """
+        Put the world back to a state returned by save_state.
+
+        Args:
+            state: Tuple returned by save_state.
+        """
+        (
+            self._sector,
+            frozen,
+            self._frozen_bytes,
+            self._generated,
+            self._thawed,
+            self._evictions,
+        ) = state
+        # copied so the state can be loaded more than once
+        self._frozen = frozen.copy()
+
+    def resume(self, sector):
+        """
+        Forget every frozen sector and carry on in a given one, as when a
+        saved game is loaded, without generating its contents.
+
+        Args:
+            sector: Tuple of ints, column and row of the sector.
+        """
+        self._sector = (int(sector[0]), int(sector[1]))
+        self._frozen.clear()
+        self._frozen_bytes = 0
+
+    def enter(
+        self, step, npc_ships, fires, debris, player_position, fire_npc_bullet
+    ):
+        """
+        Freeze the current sector and move to a neighbouring one.
+
+        Args:
+            step: Tuple of ints, columns and rows to move by.
+            npc_ships: List of NPCShip instances in the sector left.
+            fires: List of StaticObject instances, wrecks in the sector
+            left.
+            debris: List of drifting StaticObject instances in the sector
+            left.
+            player_position: Vector2, where the player enters the new
+            sector.
+            fire_npc_bullet: Function the NPC ships shoot bullets into.
+
+        Returns:
+            Tuple of lists of the NPC ships, fires and debris of the sector
+            entered.
+        """
+        self._freeze(npc_ships, fires, debris)
+        self._sector = (self._sector[0] + step[0], self._sector[1] + step[1])
+        return self._thaw(player_position, fire_npc_bullet)
@@ -0,0 +1,1274 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# pylint: disable=protected-access
+# Disabling pylint warnings related to PyGame that aren't valid
+# Disabling protected access because saving reads and restores the private
+# state of the game and its objects
+"""
+Versioned binary format for game state, used for save files, replays,
+recorded snapshots and test fixtures.
+
+A document is a header followed by sections. A section holds the game's
+scalar state, the entities of one kind, a quantized snapshot or the inputs
+of a replay. Frozen sectors of the sector world are documents too, and a
+game in a sector world saves which sector it is in. Entities are stored as
+packed columns, one array of ids, one of floats and one of ints per kind,
+so StateReader hands them out as memoryviews into the document without
+copying or unpacking each entity.
+
+Save the state of a game, then restore it into another game with
+
+    data = save_game(game)
+    load_game(other_game, data)
+"""
+import gc
+import random
+import struct
+import sys
+from array import array
+from pygame import Vector2
+import models
+from models import Bullet, NPCShip, Ship, StaticObject
+from modular import ModularShip, Part
+from rollback import apply_buttons
+from snapshots import MESSAGE_FLAGS, Snapshot
+from utils import dimensions, load_sprite
+
+MAGIC = b"CFST"
+VERSION = 1
+
+GAME_SECTION = 1
+SNAPSHOT_SECTION = 2
+INPUTS_SECTION = 3
+# the sector of the sector world the game is in
+SECTOR_SECTION = 4
+PLAYER_SECTION = 16
+NPC_SHIP_SECTION = 17
+BULLET_SECTION = 18
+NPC_BULLET_SECTION = 19
+FIRE_SECTION = 20
+# the player ship after it is destroyed, which is a fire
+PLAYER_FIRE_SECTION = 21
+DEBRIS_SECTION = 22
+# the parts of modular NPC ships, each with the id of its ship
+PART_SECTION = 23
+# the velocity of fires that were pushed and are still moving, by id
+FIRE_VELOCITY_SECTION = 24
+
+# floats and ints stored per entity in each entity section
+LAYOUTS = {
+    # position, velocity and direction; health
+    PLAYER_SECTION: (6, 1),
+    # position, velocity and direction; health and shooting delay
+    NPC_SHIP_SECTION: (6, 2),
+    # position and velocity
+    BULLET_SECTION: (4, 0),
+    NPC_BULLET_SECTION: (4, 0),
+    # position
+    FIRE_SECTION: (2, 0),
+    PLAYER_FIRE_SECTION: (2, 0),
+    # position and velocity
+    DEBRIS_SECTION: (4, 0),
+    # offset and radius; index of the part it is attached to and health
+    PART_SECTION: (3, 2),
+    # velocity
+    FIRE_VELOCITY_SECTION: (2, 0),
+}
+
+_HEADER = struct.Struct("<4sHH")
+_SECTION = struct.Struct("<HHI")
+_COUNT = struct.Struct("<I4x")
+_GAME = struct.Struct("<IiBB?xd")
+_SNAPSHOT = struct.Struct("<IBxH")
+_SECTOR = struct.Struct("<ii")
+_RANDOM_STATE_LENGTH = 625
+_NATIVE_LITTLE_ENDIAN = sys.byteorder == "little"
+
+
+def _padded(data):
+    """
+    Pad bytes with zeros to a multiple of 8 so the next column is aligned.
+
+    Args:
+        data: Bytes to pad.
+
+    Returns:
+        Bytes whose length is a multiple of 8.
+    """
+    return data + bytes(-len(data) % 8)
+
+
+def _column_bytes(typecode, values):
+    """
+    Pack values into a little endian column.
+
+    Args:
+        typecode: String, array typecode of the column.
+        values: Iterable of numbers, or an array of that typecode.
+
+    Returns:
+        Bytes of the column padded to a multiple of 8.
+    """
+    column = values if isinstance(values, array) else array(typecode, values)
+    if not _NATIVE_LITTLE_ENDIAN:
+        column = array(typecode, column)
+        column.byteswap()
+    return _padded(column.tobytes())
+
+
+def _section(section_type, payload):
+    """
+    Prefix a section's payload with its type and length.
+
+    Args:
+        section_type: Int, one of the *_SECTION constants.
+        payload: Bytes of the section, a multiple of 8 long.
+
+    Returns:
+        Bytes of the section.
+    """
+    return _SECTION.pack(section_type, 0, len(payload)) + payload
+
+
+def encode_document(sections):
+    """
+    Join sections into a document with the format header.
+
+    Args:
+        sections: List of bytes from the encode_*_section functions.
+
+    Returns:
+        Bytes of the document.
+    """
+    return b"".join((_HEADER.pack(MAGIC, VERSION, len(sections)), *sections))
+
+
+def encode_entity_section(section_type, ids, floats, ints=()):
+    """
+    Encode the entities of one kind as packed columns.
+
+    Args:
+        section_type: Int, one of the entity sections in LAYOUTS.
+        ids: Sequence of ints, the entity ids.
+        floats: Sequence of floats, the float fields of every entity one
+        entity after another.
+        ints: Sequence of ints, the int fields of every entity one entity
+        after another.
+
+    Returns:
+        Bytes of the section.
+
+    Raises:
+        ValueError: If the number of fields does not match the layout.
+    """
+    float_count, int_count = LAYOUTS[section_type]
+    count = len(ids)
+    if len(floats) != count * float_count or len(ints) != count * int_count:
+        raise ValueError(f"Wrong number of fields for section {section_type}")
+    return _section(
+        section_type,
+        _COUNT.pack(count)
+        + _column_bytes("I", ids)
+        + _column_bytes("d", floats)
+        + _column_bytes("i", ints),
+    )
+
+
+def _ship_columns(ships, with_delay):
+    """
+    Gather the columns of ships.
+
+    Args:
+        ships: List of Ship instances.
+        with_delay: Bool, whether to store the NPC shooting delay.
+
+    Returns:
+        Tuple of the id, float and int columns.
+    """
+    ids = array("I", [ship._entity_id for ship in ships])
+    floats = array("d")
+    ints = array("i")
+    for ship in ships:
+        position = ship._position
+        velocity = ship._velocity
+        direction = ship._direction
+        floats.extend(
+            (
+                position.x,
+                position.y,
+                velocity.x,
+                velocity.y,
+                direction.x,
+                direction.y,
+            )
+        )
+        if with_delay:
+            ints.extend((ship._health, ship._shooting_delay))
+        else:
+            ints.append(ship._health)
+    return ids, floats, ints
+
+
+def _bullet_columns(bullets):
+    """
+    Gather the columns of bullets, or of anything else stored by position
+    and velocity.
+
+    Args:
+        bullets: List of Bullet or drifting StaticObject instances.
+
+    Returns:
+        Tuple of the id and float columns.
+    """
+    ids = array("I", [bullet._entity_id for bullet in bullets])
+    floats = array("d")
+    for bullet in bullets:
+        position = bullet._position
+        velocity = bullet._velocity
+        floats.extend((position.x, position.y, velocity.x, velocity.y))
+    return ids, floats
+
+
+def _part_columns(ships):
+    """
+    Gather the columns of the parts of modular ships, parents before the
+    parts attached to them. The core is attached to nothing, stored as -1.
+
+    Args:
+        ships: List of NPCShip instances, of which only the ModularShip
+        instances have parts.
+
+    Returns:
+        Tuple of the id, float and int columns, with each part's id the id
+        of its ship.
+    """
+    ids = array("I")
+    floats = array("d")
+    ints = array("i")
+    for ship in ships:
+        if not isinstance(ship, ModularShip):
+            continue
+        parts = ship.hull.parts()
+        indices = {part: index for index, part in enumerate(parts)}
+        for part in parts:
+            ids.append(ship._entity_id)
+            floats.extend((part.offset.x, part.offset.y, part.radius))
+            ints.extend((indices.get(part.parent, -1), part.health))
+    return ids, floats, ints
+
+
+def _part_sections(ships):
+    """
+    Encode the parts of modular ships, if there are any.
+
+    Args:
+        ships: List of NPCShip instances.
+
+    Returns:
+        List of bytes of the part section, empty without modular ships so
+        documents of games without them are unchanged.
+    """
+    columns = _part_columns(ships)
+    if not columns[0]:
+        return []
+    return [encode_entity_section(PART_SECTION, *columns)]
+
+
+def _fire_columns(fires):
+    """
+    Gather the columns of fires.
+
+    Args:
+        fires: List of StaticObject instances.
+
+    Returns:
+        Tuple of the id and float columns.
+    """
+    ids = array("I", [fire._entity_id for fire in fires])
+    floats = array("d")
+    for fire in fires:
+        position = fire._position
+        floats.extend((position.x, position.y))
+    return ids, floats
+
+
+def _fire_velocity_sections(fires):
+    """
+    Encode the velocity of the fires that are moving, if any are.
+
+    Fires are nearly always at rest, so their velocity is kept out of the
+    fire sections and only stored for the few that were pushed.
+
+    Args:
+        fires: List of StaticObject instances.
+
+    Returns:
+        List of bytes of the fire velocity section, empty if every fire is
+        at rest so documents without moving fires are unchanged.
+    """
+    moving = [fire for fire in fires if not fire.asleep]
+    if not moving:
+        return []
+    ids = array("I", [fire._entity_id for fire in moving])
+    floats = array("d")
+    for fire in moving:
+        floats.extend((fire._velocity.x, fire._velocity.y))
+    return [encode_entity_section(FIRE_VELOCITY_SECTION, ids, floats)]
+
+
+def encode_game_sections(game):
+    """
+    Encode everything the game logic depends on as sections.
+
+    Args:
+        game: CaptainForever instance.
+
+    Returns:
+        List of bytes of the sections.
+    """
+    version, internal_state, gauss_next = game._random.getstate()
+    player_ship = game.player_ship
+    player_alive = isinstance(player_ship, Ship)
+    sections = [
+        _section(
+            GAME_SECTION,
+            _GAME.pack(
+                game.counter,
+                game._enemy_spawn_counter,
+                MESSAGE_FLAGS.index(game._message_flag),
+                version,
+                gauss_next is not None,
+                gauss_next or 0.0,
+            )
+            + _column_bytes("I", internal_state),
+        )
+    ]
+    if player_alive:
+        sections.append(
+            encode_entity_section(
+                PLAYER_SECTION, *_ship_columns([player_ship], False)
+            )
+        )
+    else:
+        sections.append(
+            encode_entity_section(
+                PLAYER_FIRE_SECTION, *_fire_columns([player_ship])
+            )
+        )
+    sections.extend(
+        (
+            encode_entity_section(
+                NPC_SHIP_SECTION, *_ship_columns(game._npc_ships, True)
+            ),
+            encode_entity_section(
+                BULLET_SECTION, *_bullet_columns(game._bullets)
+            ),
+            encode_entity_section(
+                NPC_BULLET_SECTION, *_bullet_columns(game._npc_bullets)
+            ),
+            encode_entity_section(FIRE_SECTION, *_fire_columns(game._fires)),
+            *_part_sections(game._npc_ships),
+            *_fire_velocity_sections(
+                [*game._fires, *([] if player_alive else [player_ship])]
+            ),
+        )
+    )
+    # games without debris or a world leave the sections out, so their
+    # documents stay as they were
+    if game._debris:
+        sections.append(
+            encode_entity_section(
+                DEBRIS_SECTION, *_bullet_columns(game._debris)
+            )
+        )
+    if game.world is not None:
+        sections.append(
+            _section(SECTOR_SECTION, _SECTOR.pack(*game.world.sector))
+        )
+    return sections
+
+
+def save_game(game):
+    """
+    Encode everything the game logic depends on.
+
+    Particles and sounds are not saved since they do not affect the game.
+
+    Args:
+        game: CaptainForever instance.
+
+    Returns:
+        Bytes of the document.
+    """
+    return encode_document(encode_game_sections(game))
+
+
+def encode_snapshot_section(snapshot):
+    """
+    Encode a quantized snapshot as packed columns.
+
+    Args:
+        snapshot: Snapshot instance.
+
+    Returns:
+        Bytes of the section.
+    """
+    entities = snapshot.entities
+    states = list(entities.values())
+    return _section(
+        SNAPSHOT_SECTION,
+        _SNAPSHOT.pack(
+            snapshot.tick,
+            MESSAGE_FLAGS.index(snapshot.message_flag),
+            snapshot.player_health,
+        )
+        + _COUNT.pack(len(states))
+        + _column_bytes("I", entities)
+        + _column_bytes("B", [state[0] for state in states])
+        + _column_bytes("h", [state[1] for state in states])
+        + _column_bytes("h", [state[2] for state in states])
+        + _column_bytes("B", [state[3] for state in states]),
+    )
+
+
+def encode_inputs_section(first_tick, buttons):
+    """
+    Encode the buttons held on consecutive ticks.
+
+    Args:
+        first_tick: Int, tick of the first buttons.
+        buttons: Sequence of ints, RemoteController button bits per tick.
+
+    Returns:
+        Bytes of the section.
+    """
+    return _section(
+        INPUTS_SECTION,
+        _COUNT.pack(len(buttons))
+        + _padded(struct.pack("<I", first_tick))
+        + _column_bytes("B", buttons),
+    )
+
+
+def save_replay(game, buttons, first_tick=0):
+    """
+    Encode a replay: the state of a game and the buttons held on every
+    tick after it.
+
+    Args:
+        game: CaptainForever instance in the state the replay starts from.
+        buttons: Sequence of ints, RemoteController button bits per tick.
+        first_tick: Int, tick the replay starts at.
+
+    Returns:
+        Bytes of the document.
+    """
+    return encode_document(
+        encode_game_sections(game)
+        + [encode_inputs_section(first_tick, buttons)]
+    )
+
+
+class EntityColumns:
+    """
+    The entities of one kind in a document, as views into it.
+
+    Attributes:
+        _ids: memoryview of unsigned ints, the entity ids.
+        _floats: memoryview of doubles, the float fields of every entity.
+        _ints: memoryview of ints, the int fields of every entity.
+        _float_count: Int, floats per entity.
+        _int_count: Int, ints per entity.
+    """
+
+    def __init__(self, ids, floats, ints, float_count, int_count):
+        """
+        Initialize EntityColumns.
+
+        Args:
+            ids: memoryview or array of the entity ids.
+            floats: memoryview or array of the float fields.
+            ints: memoryview or array of the int fields.
+            float_count: Int, floats per entity.
+            int_count: Int, ints per entity.
+        """
+        self._ids = ids
+        self._floats = floats
+        self._ints = ints
+        self._float_count = float_count
+        self._int_count = int_count
+
+    def __len__(self):
+        """
+        Return the number of entities.
+
+        Returns:
+            Int, number of entities.
+        """
+        return len(self._ids)
+
+    @property
+    def ids(self):
+        """
+        Return _ids.
+
+        Returns:
+            _ids: memoryview of unsigned ints, the entity ids.
+        """
+        return self._ids
+
+    @property
+    def floats(self):
+        """
+        Return _floats.
+
+        Returns:
+            _floats: memoryview of doubles, the float fields of every
+            entity.
+        """
+        return self._floats
+
+    @property
+    def ints(self):
+        """
+        Return _ints.
+
+        Returns:
+            _ints: memoryview of ints, the int fields of every entity.
+        """
+        return self._ints
+
+    def records(self):
+        """
+        Return every entity as one tuple.
+
+        Returns:
+            List of (id, float fields..., int fields...) tuples.
+        """
+        floats = self._floats.tolist()
+        ints = self._ints.tolist()
+        float_count = self._float_count
+        int_count = self._int_count
+        columns = [floats[index::float_count] for index in range(float_count)]
+        columns.extend(ints[index::int_count] for index in range(int_count))
+        return list(zip(self._ids.tolist(), *columns))
+
+
+class StateReader:
+    """
+    Read a document without copying it.
+
+    The document is checked and indexed when the reader is created.
+    Sections are returned as memoryviews into the data, which must not
+    change while the reader is used.
+
+    Attributes:
+        _view: memoryview of the document.
+        _version: Int, format version of the document.
+        _sections: Dict, maps section types to memoryviews of their
+        payloads.
+    """
+
+    def __init__(self, data):
+        """
+        Initialize StateReader and index the document's sections.
+
+        Args:
+            data: Bytes-like object holding a document.
+
+        Raises:
+            ValueError: If the data is not a document of a supported
+            version or is truncated.
+        """
+        view = memoryview(data).cast("B")
+        if len(view) < _HEADER.size:
+            raise ValueError("Document is truncated")
+        magic, version, section_count = _HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError("Not a game state document")
+        if version > VERSION:
+            raise ValueError(f"Unsupported version: {version}")
+        self._view = view
+        self._version = version
+        self._sections = {}
+        offset = _HEADER.size
+        for _ in range(section_count):
+            if offset + _SECTION.size > len(view):
+                raise ValueError("Document is truncated")
+            section_type, _, length = _SECTION.unpack_from(view, offset)
+            offset += _SECTION.size
+            if offset + length > len(view):
+                raise ValueError("Document is truncated")
+            self._sections[section_type] = view[offset : offset + length]
+            offset += length
+
+    @property
+    def version(self):
+        """
+        Return _version.
+
+        Returns:
+            _version: Int, format version of the document.
+        """
+        return self._version
+
+    def __contains__(self, section_type):
+        """
+        Return whether the document has a section.
+
+        Args:
+            section_type: Int, one of the *_SECTION constants.
+
+        Returns:
+            Bool, whether the section is present.
+        """
+        return section_type in self._sections
+
+    def _section(self, section_type):
+        """
+        Return a section's payload.
+
+        Args:
+            section_type: Int, one of the *_SECTION constants.
+
+        Returns:
+            memoryview of the payload.
+
+        Raises:
+            ValueError: If the document has no such section.
+        """
+        try:
+            return self._sections[section_type]
+        except KeyError:
+            raise ValueError(f"Missing section {section_type}") from None
+
+    @staticmethod
+    def _columns(payload, offset, layout):
+        """
+        Return views of consecutive columns in a payload.
+
+        Args:
+            payload: memoryview of a section's payload.
+            offset: Int, offset of the first column.
+            layout: List of (typecode, length) pairs, one per column.
+
+        Returns:
+            List of memoryviews, or of arrays on big endian machines.
+
+        Raises:
+            ValueError: If the payload is too short for the columns.
+        """
+        columns = []
+        for typecode, length in layout:
+            size = length * array(typecode).itemsize
+            if offset + size > len(payload):
+                raise ValueError("Section is truncated")
+            column = payload[offset : offset + size].cast(typecode)
+            if not _NATIVE_LITTLE_ENDIAN:
+                column = array(typecode, column)
+                column.byteswap()
+            columns.append(column)
+            offset += size + -size % 8
+        return columns
+
+    def _count(self, payload, offset=0):
+        """
+        Return the entity count stored at an offset of a payload.
+
+        Args:
+            payload: memoryview of a section's payload.
+            offset: Int, offset of the count.
+
+        Returns:
+            Int, the count.
+
+        Raises:
+            ValueError: If the payload is too short.
+        """
+        if offset + _COUNT.size > len(payload):
+            raise ValueError("Section is truncated")
+        return _COUNT.unpack_from(payload, offset)[0]
+
+    def entities(self, section_type):
+        """
+        Return the entities of one kind.
+
+        Args:
+            section_type: Int, one of the entity sections in LAYOUTS.
+
+        Returns:
+            EntityColumns instance viewing the section.
+
+        Raises:
+            ValueError: If the section is missing or truncated.
+        """
+        payload = self._section(section_type)
+        float_count, int_count = LAYOUTS[section_type]
+        count = self._count(payload)
+        ids, floats, ints = self._columns(
+            payload,
+            _COUNT.size,
+            (
+                ("I", count),
+                ("d", count * float_count),
+                ("i", count * int_count),
+            ),
+        )
+        return EntityColumns(ids, floats, ints, float_count, int_count)
+
+    def game(self):
+        """
+        Return the game's scalar state.
+
+        Returns:
+            Tuple of the tick counter, enemy spawn counter, message flag and
+            random number generator state.
+
+        Raises:
+            ValueError: If the section is missing or truncated.
+        """
+        payload = self._section(GAME_SECTION)
+        if len(payload) < _GAME.size:
+            raise ValueError("Section is truncated")
+        (
+            counter,
+            spawn_counter,
+            message_flag,
+            version,
+            has_gauss,
+            gauss_next,
+        ) = _GAME.unpack_from(payload)
+        if message_flag >= len(MESSAGE_FLAGS):
+            raise ValueError(f"Unknown message flag: {message_flag}")
+        (internal_state,) = self._columns(
+            payload, _GAME.size, (("I", _RANDOM_STATE_LENGTH),)
+        )
+        random_state = (
+            version,
+            tuple(internal_state),
+            gauss_next if has_gauss else None,
+        )
+        return counter, spawn_counter, MESSAGE_FLAGS[message_flag], random_state
+
+    def sector(self):
+        """
+        Return the sector of the sector world a saved game is in.
+
+        Returns:
+            Tuple of ints, column and row of the sector.
+
+        Raises:
+            ValueError: If the section is missing or truncated.
+        """
+        payload = self._section(SECTOR_SECTION)
+        if len(payload) < _SECTOR.size:
+            raise ValueError("Section is truncated")
+        return _SECTOR.unpack_from(payload)
+
+    def snapshot(self):
+        """
+        Return the document's snapshot.
+
+        Returns:
+            A Snapshot instance.
+
+        Raises:
+            ValueError: If the section is missing or truncated.
+        """
+        payload = self._section(SNAPSHOT_SECTION)
+        if len(payload) < _SNAPSHOT.size:
+            raise ValueError("Section is truncated")
+        tick, message_flag, player_health = _SNAPSHOT.unpack_from(payload)
+        if message_flag >= len(MESSAGE_FLAGS):
+            raise ValueError(f"Unknown message flag: {message_flag}")
+        count = self._count(payload, _SNAPSHOT.size)
+        ids, kinds, xs, ys, headings = self._columns(
+            payload,
+            _SNAPSHOT.size + _COUNT.size,
+            (
+                ("I", count),
+                ("B", count),
+                ("h", count),
+                ("h", count),
+                ("B", count),
+            ),
+        )
+        return Snapshot(
+            tick,
+            dict(
+                zip(
+                    ids.tolist(),
+                    zip(
+                        kinds.tolist(),
+                        xs.tolist(),
+                        ys.tolist(),
+                        headings.tolist(),
+                    ),
+                )
+            ),
+            MESSAGE_FLAGS[message_flag],
+            player_health,
+        )
+
+    def inputs(self):
+        """
+        Return the buttons of a replay.
+
+        Returns:
+            Tuple of the first tick and a memoryview of the button bits per
+            tick.
+
+        Raises:
+            ValueError: If the section is missing or truncated.
+        """
+        payload = self._section(INPUTS_SECTION)
+        count = self._count(payload)
+        if _COUNT.size + 8 > len(payload):
+            raise ValueError("Section is truncated")
+        (first_tick,) = struct.unpack_from("<I", payload, _COUNT.size)
+        (buttons,) = self._columns(payload, _COUNT.size + 8, (("B", count),))
+        return first_tick, buttons
+
+
+def encode_snapshot_document(snapshot):
+    """
+    Encode a snapshot as a document, for recording snapshots to disk.
+
+    Args:
+        snapshot: Snapshot instance.
+
+    Returns:
+        Bytes of the document.
+    """
+    return encode_document([encode_snapshot_section(snapshot)])
+
+
+def read_snapshot_document(data):
+    """
+    Decode a document holding a snapshot.
+
+    Args:
+        data: Bytes-like object from encode_snapshot_document.
+
+    Returns:
+        A Snapshot instance.
+
+    Raises:
+        ValueError: If the data is not a snapshot document.
+    """
+    return StateReader(data).snapshot()
+
+
+def encode_sector(npc_ships, fires, debris):
+    """
+    Encode the contents of a sector of the sector world as a document.
+
+    Args:
+        npc_ships: List of NPCShip instances.
+        fires: List of StaticObject instances, wrecks.
+        debris: List of drifting StaticObject instances.
+
+    Returns:
+        Bytes of the document.
+    """
+    return encode_document(
+        [
+            encode_entity_section(
+                NPC_SHIP_SECTION, *_ship_columns(npc_ships, True)
+            ),
+            encode_entity_section(FIRE_SECTION, *_fire_columns(fires)),
+            encode_entity_section(DEBRIS_SECTION, *_bullet_columns(debris)),
+            *_part_sections(npc_ships),
+            *_fire_velocity_sections(fires),
+        ]
+    )
+
+
+def load_sector(data, fire_npc_bullet):
+    """
+    Recreate the contents of a sector encoded by encode_sector.
+
+    Args:
+        data: Bytes-like object from encode_sector.
+        fire_npc_bullet: Function the NPC ships shoot bullets into.
+
+    Returns:
+        Tuple of lists of the NPC ships, fires and debris.
+
+    Raises:
+        ValueError: If the data is not a valid sector document.
+    """
+    reader = StateReader(data)
+    npc_columns = reader.entities(NPC_SHIP_SECTION)
+    fire_columns = reader.entities(FIRE_SECTION)
+    debris_columns = reader.entities(DEBRIS_SECTION)
+    _reserve_ids([npc_columns, fire_columns, debris_columns])
+    return (
+        _load_npc_ships(npc_columns, fire_npc_bullet, _parts_by_ship(reader)),
+        _load_fires(fire_columns, _fire_velocities(reader)),
+        _load_debris(debris_columns),
+    )
+
+
+def _reserve_ids(columns_list):
+    """
+    Make sure objects created after loading get ids not already loaded.
+
+    Args:
+        columns_list: List of EntityColumns instances being loaded.
+    """
+    last_id = max(
+        (max(columns.ids) for columns in columns_list if len(columns)),
+        default=0,
+    )
+    models.reserve_entity_ids(last_id)
+
+
+def load_game(game, data):
+    """
+    Put a game back to a state returned by save_game.
+
+    Objects are recreated with the game's callbacks and keep their saved
+    ids, so a state saved in one game or process can be loaded into
+    another. A game in a sector world is moved to the saved sector and
+    forgets its frozen sectors, which are not saved.
+
+    Args:
+        game: CaptainForever instance to restore into.
+        data: Bytes-like object from save_game or save_replay.
+
+    Raises:
+        ValueError: If the data is not a valid game state document.
+    """
+    reader = StateReader(data)
+    counter, spawn_counter, message_flag, random_state = reader.game()
+    player_dead = PLAYER_FIRE_SECTION in reader
+    player_columns = reader.entities(
+        PLAYER_FIRE_SECTION if player_dead else PLAYER_SECTION
+    )
+    if len(player_columns) != 1:
+        raise ValueError("The document must hold exactly one player ship")
+    npc_columns = reader.entities(NPC_SHIP_SECTION)
+    bullet_columns = reader.entities(BULLET_SECTION)
+    npc_bullet_columns = reader.entities(NPC_BULLET_SECTION)
+    fire_columns = reader.entities(FIRE_SECTION)
+    columns_list = [
+        player_columns,
+        npc_columns,
+        bullet_columns,
+        npc_bullet_columns,
+        fire_columns,
+    ]
+    debris_columns = None
+    if DEBRIS_SECTION in reader:
+        debris_columns = reader.entities(DEBRIS_SECTION)
+        columns_list.append(debris_columns)
+    sector = reader.sector() if SECTOR_SECTION in reader else None
+    fire_velocities = _fire_velocities(reader)
+    parts = _parts_by_ship(reader)
+    try:
+        random.Random().setstate(random_state)
+    except (TypeError, ValueError) as error:
+        raise ValueError(f"Invalid random state: {error}") from error
+
+    # every object is rebuilt before the game is touched, so a document
+    # that is not valid leaves the game as it was. The cyclic collector is
+    # paused meanwhile, since it would otherwise run again and again over
+    # tens of thousands of new objects that cannot be garbage.
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        if player_dead:
+            (player_ship,) = _load_fires(player_columns, fire_velocities)
+        else:
+            ((entity_id, *floats, health),) = player_columns.records()
+            player_ship = Ship(
+                (floats[0], floats[1]),
+                game._fire_player_bullet,
+                "player",
+                True,
+                False,
+            )
+            _restore_ship(player_ship, entity_id, floats)
+            player_ship._health = health
+        npc_ships = _load_npc_ships(npc_columns, game._fire_npc_bullet, parts)
+        bullets = _load_bullets(bullet_columns)
+        npc_bullets = _load_bullets(npc_bullet_columns)
+        fires = _load_fires(fire_columns, fire_velocities)
+        debris = (
+            _load_debris(debris_columns) if debris_columns is not None else []
+        )
+    finally:
+        if collecting:
+            gc.enable()
+
+    game._random.setstate(random_state)
+    game.counter = counter
+    game._enemy_spawn_counter = spawn_counter
+    game._message_flag = message_flag
+    if message_flag:
+        game._end_game_message()
+    else:
+        game._message = ""
+    game.player_ship = player_ship
+    # lists are updated in place since other code may hold them
+    game._npc_ships[:] = npc_ships
+    game._bullets[:] = bullets
+    game._npc_bullets[:] = npc_bullets
+    game._fires[:] = fires
+    game._debris[:] = debris
+    game._sort_sleepers()
+    if sector is not None and game.world is not None:
+        game.world.resume(sector)
+    _reserve_ids(columns_list)
+
+
+def _restore_ship(ship, entity_id, floats):
+    """
+    Set a ship's id, position, velocity and direction.
+
+    Args:
+        ship: Ship instance.
+        entity_id: Int, saved id.
+        floats: List of the six saved floats.
+    """
+    ship._entity_id = entity_id
+    ship._position = Vector2(floats[0], floats[1])
+    ship._velocity = Vector2(floats[2], floats[3])
+    ship._direction = Vector2(floats[4], floats[5])
+
+
+def _parts_by_ship(reader):
+    """
+    Return the saved parts of each modular ship in a document.
+
+    Args:
+        reader: StateReader instance of the document.
+
+    Returns:
+        Dict, maps ship ids to lists of (x, y, radius, parent index,
+        health) tuples, parents first. Empty if the document has no parts.
+    """
+    parts = {}
+    if PART_SECTION in reader:
+        for entity_id, *fields in reader.entities(PART_SECTION).records():
+            parts.setdefault(entity_id, []).append(fields)
+    return parts
+
+
+def _restore_hull(ship, records):
+    """
+    Rebuild the parts of a modular ship, which holds only its core.
+
+    Args:
+        ship: ModularShip instance.
+        records: List of (x, y, radius, parent index, health) tuples,
+        parents first, the core first of all.
+
+    Raises:
+        ValueError: If the parts do not form a tree around the core.
+    """
+    parts = [ship.core]
+    for index, (x, y, radius, parent, health) in enumerate(records):
+        if index == 0:
+            if parent != -1:
+                raise ValueError("The first part of a ship must be its core")
+            ship.core._health = health
+            continue
+        if not 0 <= parent < index:
+            raise ValueError(f"Part attached to unknown part {parent}")
+        part = Part(ship.core.name, (x, y), radius, health)
+        ship.attach(part, parts[parent])
+        parts.append(part)
+
+
+def _load_npc_ships(columns, fire_npc_bullet, parts=None):
+    """
+    Recreate NPC ships, as modular ships if they have saved parts.
+
+    Args:
+        columns: EntityColumns instance of an NPC ship section.
+        fire_npc_bullet: Function the ships shoot bullets into.
+        parts: Dict from _parts_by_ship, or None if no ship has parts.
+
+    Returns:
+        List of NPCShip instances.
+
+    Raises:
+        ValueError: If the saved parts of a ship are not valid.
+    """
+    parts = parts or {}
+    npc_ships = []
+    for entity_id, *floats, health, shooting_delay in columns.records():
+        position = Vector2(floats[0], floats[1])
+        if entity_id in parts:
+            npc_ship = ModularShip(position, "ship", fire_npc_bullet)
+            _restore_hull(npc_ship, parts[entity_id])
+        else:
+            npc_ship = NPCShip(position, "ship", fire_npc_bullet)
+        _restore_ship(npc_ship, entity_id, floats)
+        npc_ship._health = health
+        npc_ship._shooting_delay = shooting_delay
+        npc_ships.append(npc_ship)
+    return npc_ships
+
+
+def _shared_attributes(sprite, sprite_key):
+    """
+    Return the attributes GameObject.__init__ gives every object drawn with
+    one sprite, so loaded objects can be created without running __init__
+    and looking the sprite up once each.
+
+    Args:
+        sprite: PyGame surface the objects are drawn with.
+        sprite_key: Tuple, asset name and variant of the sprite.
+
+    Returns:
+        Dict of attribute names to values.
+    """
+    return {
+        "_sprite": sprite,
+        "_sprite_key": sprite_key,
+        "_radius": sprite.get_width() / 2,
+        "_method_flag": 0,
+    }
+
+
+def _load_static_objects(name, records):
+    """
+    Recreate static objects drawn with one sprite, as StaticObject.__init__
+    would, awake if they are moving.
+
+    Args:
+        name: String, name of the sprite.
+        records: Iterable of (id, x, y, x velocity, y velocity) tuples.
+
+    Returns:
+        List of StaticObject instances.
+    """
+    shared = _shared_attributes(
+        load_sprite(name, True, True),
+        (name, "scaled" if name in dimensions else "original"),
+    )
+    new = StaticObject.__new__
+    static_objects = []
+    for entity_id, x, y, velocity_x, velocity_y in records:
+        static_object = new(StaticObject)
+        static_object.__dict__.update(
+            shared,
+            _entity_id=entity_id,
+            _position=Vector2(x, y),
+            _velocity=Vector2(velocity_x, velocity_y),
+            _asleep=velocity_x == velocity_y == 0,
+        )
+        static_objects.append(static_object)
+    return static_objects
+
+
+def _load_bullets(columns):
+    """
+    Recreate bullets, as Bullet.__init__ would but without running it for
+    each one, since there can be many thousands.
+
+    Args:
+        columns: EntityColumns instance of a bullet section.
+
+    Returns:
+        List of Bullet instances.
+    """
+    shared = _shared_attributes(load_sprite("bullet"), ("bullet", "original"))
+    new = Bullet.__new__
+    bullets = []
+    for entity_id, x, y, velocity_x, velocity_y in columns.records():
+        bullet = new(Bullet)
+        bullet.__dict__.update(
+            shared,
+            _entity_id=entity_id,
+            _position=Vector2(x, y),
+            _velocity=Vector2(velocity_x, velocity_y),
+        )
+        bullets.append(bullet)
+    return bullets
+
+
+def _fire_velocities(reader):
+    """
+    Return the velocity of the fires that were moving in a document.
+
+    Args:
+        reader: StateReader instance of the document.
+
+    Returns:
+        Dict, maps fire ids to x and y velocity tuples. Fires not in it
+        are at rest.
+    """
+    if FIRE_VELOCITY_SECTION not in reader:
+        return {}
+    return {
+        entity_id: (velocity_x, velocity_y)
+        for entity_id, velocity_x, velocity_y in reader.entities(
+            FIRE_VELOCITY_SECTION
+        ).records()
+    }
+
+
+def _load_fires(columns, velocities=None):
+    """
+    Recreate fires, awake if they were moving.
+
+    Args:
+        columns: EntityColumns instance of a fire section.
+        velocities: Dict from _fire_velocities, or None if every fire is
+        at rest.
+
+    Returns:
+        List of StaticObject instances.
+    """
+    velocities = velocities or {}
+    return _load_static_objects(
+        "fire",
+        (
+            (entity_id, x, y, *velocities.get(entity_id, (0, 0)))
+            for entity_id, x, y in columns.records()
+        ),
+    )
+
+
+def _load_debris(columns):
+    """
+    Recreate debris.
+
+    Args:
+        columns: EntityColumns instance of a debris section.
+
+    Returns:
+        List of drifting StaticObject instances.
+    """
+    return _load_static_objects("asteroid", columns.records())
+
+
+def play_replay(game, data, stop_tick=None):
+    """
+    Load the state a replay starts from and play its inputs.
+
+    Args:
+        game: CaptainForever instance to play the replay in.
+        data: Bytes-like object from save_replay.
+        stop_tick: Int, number of inputs to play, or None for all.
+
+    Returns:
+        Int, number of ticks played.
+
+    Raises:
+        ValueError: If the data is not a valid replay.
+    """
+    load_game(game, data)
+    _, buttons = StateReader(data).inputs()
+    previous = 0
+    played = 0
+    for held in buttons[:stop_tick]:
+        apply_buttons(game, held, previous)
+        game.step()
+        previous = held
+        played += 1
+    return played
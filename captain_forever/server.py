@@ -0,0 +1,654 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# pylint: disable=protected-access
+# Disabling pylint warnings related to PyGame that aren't valid
+# Disabling protected access because the server steps the game logic itself
+"""
+Authoritative game server that simulates games at a fixed tick rate and
+streams delta-compressed snapshots to thin clients over TCP.
+
+Serve games on localhost, play one of them in a window, or measure the
+server with 50 local clients:
+
+    python server.py serve --port 7777
+    python server.py play --port 7777
+    python server.py measure --clients 50 --seconds 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+from collections import OrderedDict, deque
+from time import perf_counter
+import pygame
+from game import CaptainForever
+from controller import RemoteController
+from view import SnapshotView
+from snapshots import (
+    NO_BASELINE,
+    capture_snapshot,
+    decode_input,
+    decode_snapshot,
+    encode_input,
+    encode_snapshot,
+    frame,
+    read_frame,
+)
+
+WIDTH = 1082
+HEIGHT = 720
+
+
+class ClientSession:
+    """
+    A connected client and the game it plays.
+
+    Every client gets its own game, which it steers with its inputs. The
+    server keeps the last snapshots of that game so it can send each one as
+    a delta from the newest snapshot the client has acknowledged.
+
+    Attributes:
+        _writer: asyncio.StreamWriter snapshots are sent on.
+        _game: CaptainForever instance the client plays.
+        _controller: RemoteController instance steering the player ship.
+        _history: OrderedDict, maps ticks to recent Snapshot instances.
+        _history_size: Int, number of snapshots kept in _history.
+        _acked_tick: Int, newest tick the client acknowledged, or
+        NO_BASELINE.
+        _bytes_sent: Int, bytes of snapshots sent so far.
+        _snapshots_sent: Int, number of snapshots sent so far.
+        _full_snapshots: Int, snapshots sent without a baseline.
+        _skipped: Int, snapshots not sent because the client fell behind.
+    """
+
+    def __init__(self, writer, history_size=64, seed=None):
+        """
+        Initialize ClientSession with a new game.
+
+        Args:
+            writer: asyncio.StreamWriter snapshots are sent on.
+            history_size: Int, number of snapshots kept as baselines.
+            seed: Int, seed for the game, or None.
+        """
+        self._writer = writer
+        self._game = CaptainForever(WIDTH, HEIGHT, seed=seed)
+        self._controller = RemoteController(self._game, WIDTH, HEIGHT)
+        self._history = OrderedDict()
+        self._history_size = history_size
+        self._acked_tick = NO_BASELINE
+        self._bytes_sent = 0
+        self._snapshots_sent = 0
+        self._full_snapshots = 0
+        self._skipped = 0
+
+    @property
+    def game(self):
+        """
+        Return _game.
+
+        Returns:
+            _game: CaptainForever instance the client plays.
+        """
+        return self._game
+
+    @property
+    def bytes_sent(self):
+        """
+        Return _bytes_sent.
+
+        Returns:
+            _bytes_sent: Int, bytes of snapshots sent so far.
+        """
+        return self._bytes_sent
+
+    @property
+    def snapshots_sent(self):
+        """
+        Return _snapshots_sent.
+
+        Returns:
+            _snapshots_sent: Int, number of snapshots sent so far.
+        """
+        return self._snapshots_sent
+
+    @property
+    def full_snapshots(self):
+        """
+        Return _full_snapshots.
+
+        Returns:
+            _full_snapshots: Int, snapshots sent without a baseline.
+        """
+        return self._full_snapshots
+
+    @property
+    def skipped(self):
+        """
+        Return _skipped.
+
+        Returns:
+            _skipped: Int, snapshots not sent because the client fell
+            behind.
+        """
+        return self._skipped
+
+    def receive_input(self, data):
+        """
+        Apply an input message from the client.
+
+        Args:
+            data: Bytes of an input message.
+        """
+        ack_tick, buttons = decode_input(data)
+        if ack_tick != NO_BASELINE and (
+            self._acked_tick == NO_BASELINE or ack_tick > self._acked_tick
+        ):
+            self._acked_tick = ack_tick
+        self._controller.set_buttons(buttons)
+
+    def simulate(self):
+        """
+        Run the client's game for one tick.
+        """
+        self._controller.maneuver_player_ship()
+        self._game._process_game_logic()
+
+    def send_snapshot(self, tick, max_buffer=2**16):
+        """
+        Snapshot the game and send it as a delta from the acknowledged
+        baseline, or in full if the client has no baseline still kept.
+
+        A client whose connection is already holding more than max_buffer
+        bytes is skipped this tick. Nothing is lost, since the next
+        snapshot is a delta from what the client acknowledged.
+
+        Args:
+            tick: Int, current server tick.
+            max_buffer: Int, bytes of unsent data above which the client is
+            skipped.
+        """
+        snapshot = capture_snapshot(self._game, tick)
+        self._history[tick] = snapshot
+        while len(self._history) > self._history_size:
+            self._history.popitem(last=False)
+        if self._writer.transport.get_write_buffer_size() > max_buffer:
+            self._skipped += 1
+            return
+        baseline = self._history.get(self._acked_tick)
+        if baseline is None:
+            self._full_snapshots += 1
+        message = frame(encode_snapshot(snapshot, baseline))
+        self._writer.write(message)
+        self._bytes_sent += len(message)
+        self._snapshots_sent += 1
+
+
+class GameServer:
+    """
+    Serve a game to every client that connects and step them all at a fixed
+    tick rate.
+
+    Attributes:
+        _tick_rate: Int, ticks simulated per second.
+        _history_size: Int, snapshots kept per client as baselines.
+        _seed: Int, seed for the first client's game, each later client's
+        game is seeded with the next number, or None.
+        _connections: Int, number of clients that have connected.
+        _sessions: List of ClientSession instances currently connected.
+        _handlers: Set of asyncio tasks handling connected clients.
+        _server: asyncio.Server accepting connections, or None.
+        _tick: Int, number of ticks run.
+        _simulate_times: Deque, ms spent simulating in recent ticks.
+        _send_times: Deque, ms spent snapshotting, encoding and sending in
+        recent ticks.
+    """
+
+    def __init__(
+        self, tick_rate=60, history_size=64, stats_history=3600, seed=None
+    ):
+        """
+        Initialize GameServer.
+
+        Args:
+            tick_rate: Int, ticks simulated per second.
+            history_size: Int, snapshots kept per client as baselines.
+            stats_history: Int, number of ticks kept for timing stats.
+            seed: Int, seed for the first client's game, or None.
+        """
+        self._tick_rate = tick_rate
+        self._history_size = history_size
+        self._seed = seed
+        self._connections = 0
+        self._sessions = []
+        self._handlers = set()
+        self._server = None
+        self._tick = 0
+        self._simulate_times = deque(maxlen=stats_history)
+        self._send_times = deque(maxlen=stats_history)
+
+    @property
+    def sessions(self):
+        """
+        Return _sessions.
+
+        Returns:
+            _sessions: List of ClientSession instances currently connected.
+        """
+        return self._sessions
+
+    @property
+    def simulate_times(self):
+        """
+        Return _simulate_times.
+
+        Returns:
+            _simulate_times: Deque, ms spent simulating in recent ticks.
+        """
+        return self._simulate_times
+
+    @property
+    def send_times(self):
+        """
+        Return _send_times.
+
+        Returns:
+            _send_times: Deque, ms spent snapshotting, encoding and sending
+            in recent ticks.
+        """
+        return self._send_times
+
+    async def start(self, host="127.0.0.1", port=0):
+        """
+        Start accepting connections.
+
+        Args:
+            host: String, address to listen on.
+            port: Int, port to listen on, 0 to pick a free one.
+
+        Returns:
+            Int, port the server listens on.
+        """
+        self._server = await asyncio.start_server(
+            self._handle_client, host, port
+        )
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        """
+        Stop accepting connections and close every client connection.
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for session in self._sessions:
+            session._writer.close()
+        # handlers see the closed connections and finish
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+
+    async def _handle_client(self, reader, writer):
+        """
+        Give a new client a game and apply its inputs until it disconnects.
+
+        Args:
+            reader: asyncio.StreamReader inputs arrive on.
+            writer: asyncio.StreamWriter snapshots are sent on.
+        """
+        seed = None if self._seed is None else self._seed + self._connections
+        self._connections += 1
+        session = ClientSession(writer, self._history_size, seed)
+        self._sessions.append(session)
+        handler = asyncio.current_task()
+        self._handlers.add(handler)
+        try:
+            while True:
+                session.receive_input(await read_frame(reader))
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self._sessions.remove(session)
+            self._handlers.discard(handler)
+            writer.close()
+
+    def tick(self):
+        """
+        Simulate every game for one tick and send each client a snapshot.
+        """
+        self._tick += 1
+        start = perf_counter()
+        for session in self._sessions:
+            session.simulate()
+        simulated = perf_counter()
+        for session in self._sessions:
+            session.send_snapshot(self._tick)
+        self._simulate_times.append((simulated - start) * 1000)
+        self._send_times.append((perf_counter() - simulated) * 1000)
+
+    async def run(self, seconds=None):
+        """
+        Tick at the fixed tick rate.
+
+        Args:
+            seconds: Float, seconds to run for, or None to run forever.
+        """
+        loop = asyncio.get_running_loop()
+        period = 1 / self._tick_rate
+        start = loop.time()
+        deadline = start
+        while seconds is None or loop.time() - start < seconds:
+            self.tick()
+            deadline += period
+            delay = deadline - loop.time()
+            if delay < -period:
+                # too far behind to catch up
+                deadline = loop.time()
+            await asyncio.sleep(max(0, delay))
+
+
+class SnapshotClient:
+    """
+    Thin client that receives snapshots and sends inputs and acks.
+
+    Attributes:
+        _reader: asyncio.StreamReader snapshots arrive on, or None.
+        _writer: asyncio.StreamWriter inputs are sent on, or None.
+        _baselines: OrderedDict, maps ticks to recent decoded snapshots.
+        _baseline_count: Int, number of snapshots kept as baselines.
+        _snapshot: Latest Snapshot instance, or None.
+        _buttons: Int, RemoteController button bits held down.
+        _bytes_received: Int, bytes of snapshots received so far.
+    """
+
+    def __init__(self, baseline_count=64):
+        """
+        Initialize SnapshotClient.
+
+        Args:
+            baseline_count: Int, number of snapshots kept as baselines. Must
+            be at least the server's history size.
+        """
+        self._reader = None
+        self._writer = None
+        self._baselines = OrderedDict()
+        self._baseline_count = baseline_count
+        self._snapshot = None
+        self._buttons = 0
+        self._bytes_received = 0
+
+    @property
+    def snapshot(self):
+        """
+        Return _snapshot.
+
+        Returns:
+            _snapshot: Latest Snapshot instance, or None.
+        """
+        return self._snapshot
+
+    @property
+    def bytes_received(self):
+        """
+        Return _bytes_received.
+
+        Returns:
+            _bytes_received: Int, bytes of snapshots received so far.
+        """
+        return self._bytes_received
+
+    def set_buttons(self, buttons):
+        """
+        Set the buttons sent with the next ack.
+
+        Args:
+            buttons: Int, RemoteController button bits held down.
+        """
+        self._buttons = buttons
+
+    async def connect(self, host="127.0.0.1", port=7777):
+        """
+        Connect to a server and send an empty input so it starts sending.
+
+        Args:
+            host: String, address of the server.
+            port: Int, port of the server.
+        """
+        self._reader, self._writer = await asyncio.open_connection(host, port)
+        self._writer.write(frame(encode_input(NO_BASELINE, 0)))
+
+    async def receive(self):
+        """
+        Wait for the next snapshot, then acknowledge it along with the
+        buttons held down.
+
+        Returns:
+            The decoded Snapshot instance.
+        """
+        data = await read_frame(self._reader)
+        self._bytes_received += len(data) + 4
+        snapshot = decode_snapshot(data, self._baselines)
+        self._baselines[snapshot.tick] = snapshot
+        while len(self._baselines) > self._baseline_count:
+            self._baselines.popitem(last=False)
+        self._snapshot = snapshot
+        self._writer.write(frame(encode_input(snapshot.tick, self._buttons)))
+        return snapshot
+
+    async def close(self):
+        """
+        Close the connection.
+        """
+        if self._writer is not None:
+            self._writer.close()
+
+
+def percentile(values, fraction):
+    """
+    Return a percentile of some values.
+
+    Args:
+        values: List of floats.
+        fraction: Float between 0 and 1.
+
+    Returns:
+        Float, the value below which that fraction of values fall.
+    """
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def measure(clients=50, seconds=10.0, tick_rate=60, seed=0):
+    """
+    Run a server with local clients pressing random buttons and measure
+    bandwidth per client and server time per tick.
+
+    The clients run in the same event loop as the server, so only time
+    spent in GameServer.tick counts towards server time.
+
+    Args:
+        clients: Int, number of clients to connect.
+        seconds: Float, seconds to run the server for once all connect.
+        tick_rate: Int, ticks simulated per second.
+        seed: Int, seed for the games and the clients' buttons.
+
+    Returns:
+        Dict with the settings, bandwidth and server tick times.
+    """
+    buttons_random = random.Random(seed)
+    server = GameServer(tick_rate, seed=seed)
+    port = await server.start()
+    snapshot_clients = [SnapshotClient() for _ in range(clients)]
+
+    async def play(client):
+        while True:
+            await client.receive()
+            if buttons_random.random() < 0.1:
+                client.set_buttons(buttons_random.getrandbits(6))
+
+    for client in snapshot_clients:
+        await client.connect(port=port)
+    while len(server.sessions) < clients:
+        await asyncio.sleep(0.01)
+    tasks = [asyncio.create_task(play(client)) for client in snapshot_clients]
+    await server.run(seconds)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    sessions = list(server.sessions)
+    for client in snapshot_clients:
+        await client.close()
+    await server.stop()
+
+    sent = [session.bytes_sent for session in sessions]
+    snapshots = sum(session.snapshots_sent for session in sessions)
+    tick_times = [
+        simulate + send
+        for simulate, send in zip(server.simulate_times, server.send_times)
+    ]
+    return {
+        "clients": clients,
+        "seconds": seconds,
+        "tick_rate": tick_rate,
+        "ticks": len(tick_times),
+        "bytes_per_client_per_second": statistics.mean(sent) / seconds,
+        "bytes_per_snapshot": sum(sent) / snapshots if snapshots else 0,
+        "full_snapshots": sum(session.full_snapshots for session in sessions),
+        "delta_snapshots": snapshots - sum(
+            session.full_snapshots for session in sessions
+        ),
+        "skipped_snapshots": sum(session.skipped for session in sessions),
+        "tick_ms": {
+            "mean": statistics.mean(tick_times),
+            "p99": percentile(tick_times, 0.99),
+            "max": max(tick_times),
+            "simulate_mean": statistics.mean(server.simulate_times),
+            "send_mean": statistics.mean(server.send_times),
+        },
+    }
+
+
+async def play_in_window(host, port):
+    """
+    Connect to a server and play in a window.
+
+    Args:
+        host: String, address of the server.
+        port: Int, port of the server.
+    """
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Captain Forever")
+    client = SnapshotClient()
+    await client.connect(host, port)
+    view = SnapshotView(client, screen)
+    keys = (
+        (pygame.K_LEFT, RemoteController.LEFT),
+        (pygame.K_RIGHT, RemoteController.RIGHT),
+        (pygame.K_UP, RemoteController.UP),
+        (pygame.K_DOWN, RemoteController.DOWN),
+        (pygame.K_SPACE, RemoteController.FIRE),
+        (pygame.K_RETURN, RemoteController.RESTART),
+    )
+    try:
+        while True:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT or (
+                    event.type == pygame.KEYDOWN
+                    and event.key == pygame.K_ESCAPE
+                ):
+                    return
+            pressed = pygame.key.get_pressed()
+            client.set_buttons(sum(bit for key, bit in keys if pressed[key]))
+            await client.receive()
+            view.draw()
+    finally:
+        await client.close()
+
+
+async def serve(host, port, tick_rate):
+    """
+    Serve games until interrupted.
+
+    Args:
+        host: String, address to listen on.
+        port: Int, port to listen on.
+        tick_rate: Int, ticks simulated per second.
+    """
+    server = GameServer(tick_rate)
+    port = await server.start(host, port)
+    print(f"Serving Captain Forever on {host}:{port}")
+    try:
+        await server.run()
+    finally:
+        await server.stop()
+
+
+def main(argv=None):
+    """
+    Serve, play or measure from the command line.
+
+    Args:
+        argv: List of strings, command line arguments without the program
+        name, or None to use sys.argv.
+
+    Returns:
+        Int, exit status.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="serve games")
+    play_parser = commands.add_parser("play", help="play a served game")
+    for command_parser in (serve_parser, play_parser):
+        command_parser.add_argument("--host", default="127.0.0.1")
+        command_parser.add_argument("--port", type=int, default=7777)
+    serve_parser.add_argument("--tick-rate", type=int, default=60)
+    measure_parser = commands.add_parser(
+        "measure", help="measure bandwidth and server time with local clients"
+    )
+    measure_parser.add_argument("--clients", type=int, default=50)
+    measure_parser.add_argument("--seconds", type=float, default=10.0)
+    measure_parser.add_argument("--tick-rate", type=int, default=60)
+    measure_parser.add_argument("--output", help="file to write JSON to")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+        pygame.init()
+        pygame.display.set_mode((WIDTH, HEIGHT))
+        try:
+            asyncio.run(serve(args.host, args.port, args.tick_rate))
+        except KeyboardInterrupt:
+            pass
+        return 0
+    if args.command == "play":
+        asyncio.run(play_in_window(args.host, args.port))
+        return 0
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.init()
+    pygame.display.set_mode((WIDTH, HEIGHT))
+    report = asyncio.run(measure(args.clients, args.seconds, args.tick_rate))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(report, output_file, indent=2)
+    tick_ms = report["tick_ms"]
+    print(
+        f"{report['clients']} clients at {report['tick_rate']} Hz for"
+        f" {report['seconds']} s: {report['ticks']} ticks\nbandwidth per client"
+        f" {report['bytes_per_client_per_second'] / 1024:.1f} KiB/s,"
+        f" {report['bytes_per_snapshot']:.0f} bytes per snapshot"
+        f" ({report['full_snapshots']} full, {report['delta_snapshots']} delta,"
+        f" {report['skipped_snapshots']} skipped)\nserver tick"
+        f" {tick_ms['mean']:.2f} ms mean"
+        f" ({tick_ms['simulate_mean']:.2f} simulate,"
+        f" {tick_ms['send_mean']:.2f} snapshot and send),"
+        f" {tick_ms['p99']:.2f} ms p99, {tick_ms['max']:.2f} ms max"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
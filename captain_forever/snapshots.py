@@ -0,0 +1,394 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# Disabling pylint warnings related to PyGame that aren't valid
+"""
+Quantized snapshots of a game's entities and the wire format used to send
+them, either in full or as a delta from a snapshot the client already has.
+"""
+import struct
+from array import array
+from models import UP, Ship, Bullet
+
+KINDS = ("player", "npc_ship", "bullet", "npc_bullet", "fire")
+MESSAGE_FLAGS = ("", "won", "lost")
+# positions are sent in 1/16 pixel steps and headings in 256ths of a turn
+POSITION_SCALE = 16
+HEADING_STEPS = 256
+NO_BASELINE = 0xFFFFFFFF
+
+SNAPSHOT_MESSAGE = 1
+INPUT_MESSAGE = 2
+SUBSCRIBE_MESSAGE = 3
+
+# bits of an entity's field mask, set for fields that differ from baseline
+KIND_FIELD = 1
+X_FIELD = 2
+Y_FIELD = 4
+HEADING_FIELD = 8
+ALL_FIELDS = KIND_FIELD | X_FIELD | Y_FIELD | HEADING_FIELD
+
+_HEADER = struct.Struct("<BIIBBHH")
+_ENTITY = struct.Struct("<IB")
+_INPUT = struct.Struct("<BIB")
+_SUBSCRIBE = struct.Struct("<Bhhhh")
+_FRAME_LENGTH = struct.Struct("<I")
+_FIELD_FORMATS = (
+    (KIND_FIELD, struct.Struct("<B")),
+    (X_FIELD, struct.Struct("<h")),
+    (Y_FIELD, struct.Struct("<h")),
+    (HEADING_FIELD, struct.Struct("<B")),
+)
+
+
+def quantize_position(value):
+    """
+    Quantize a coordinate to a signed 16 bit number of 1/16 pixels.
+
+    Args:
+        value: Float, coordinate in pixels.
+
+    Returns:
+        Int, coordinate in 1/16 pixels, clamped to the int16 range.
+    """
+    return max(-32768, min(32767, round(value * POSITION_SCALE)))
+
+
+def quantize_heading(direction):
+    """
+    Quantize a direction to one of HEADING_STEPS headings.
+
+    Args:
+        direction: Vector2, direction the entity faces.
+
+    Returns:
+        Int, heading counter-clockwise from up in 256ths of a turn.
+    """
+    if not direction:
+        return 0
+    return round(direction.angle_to(UP) % 360 * HEADING_STEPS / 360) % (
+        HEADING_STEPS
+    )
+
+
+def heading_angle(heading):
+    """
+    Return the angle a quantized heading stands for.
+
+    Args:
+        heading: Int, heading as returned by quantize_heading.
+
+    Returns:
+        Float, degrees counter-clockwise from up.
+    """
+    return heading * 360 / HEADING_STEPS
+
+
+class Snapshot:
+    """
+    State of a game at one tick, as seen by clients.
+
+    Attributes:
+        _tick: Int, tick the snapshot was taken at.
+        _entities: Dict, maps entity ids to (kind, x, y, heading) tuples,
+        with kind an index into KINDS and x, y and heading quantized.
+        _message_flag: String, "won", "lost" or "" while playing.
+        _player_health: Int, health of the player ship, 0 once destroyed.
+    """
+
+    def __init__(self, tick, entities, message_flag="", player_health=0):
+        """
+        Initialize Snapshot.
+
+        Args:
+            tick: Int, tick the snapshot was taken at.
+            entities: Dict, maps entity ids to (kind, x, y, heading) tuples.
+            message_flag: String, "won", "lost" or "" while playing.
+            player_health: Int, health of the player ship.
+        """
+        self._tick = tick
+        self._entities = entities
+        self._message_flag = message_flag
+        self._player_health = player_health
+
+    @property
+    def tick(self):
+        """
+        Return _tick.
+
+        Returns:
+            _tick: Int, tick the snapshot was taken at.
+        """
+        return self._tick
+
+    @property
+    def entities(self):
+        """
+        Return _entities.
+
+        Returns:
+            _entities: Dict, maps entity ids to (kind, x, y, heading) tuples.
+        """
+        return self._entities
+
+    @property
+    def message_flag(self):
+        """
+        Return _message_flag.
+
+        Returns:
+            _message_flag: String, "won", "lost" or "" while playing.
+        """
+        return self._message_flag
+
+    @property
+    def player_health(self):
+        """
+        Return _player_health.
+
+        Returns:
+            _player_health: Int, health of the player ship.
+        """
+        return self._player_health
+
+
+def capture_snapshot(game, tick):
+    """
+    Take a quantized snapshot of every entity in a game.
+
+    Args:
+        game: CaptainForever instance.
+        tick: Int, tick the snapshot is taken at.
+
+    Returns:
+        A Snapshot instance.
+    """
+    entities = {}
+    groups = (
+        (1, game.npc_ships),
+        (2, game.bullets),
+        (3, game.npc_bullets),
+        (4, game.fires),
+        (0 if game.is_running else 4, (game.player_ship,)),
+    )
+    for kind, game_objects in groups:
+        for game_object in game_objects:
+            if isinstance(game_object, Ship):
+                direction = game_object.direction
+            elif isinstance(game_object, Bullet):
+                direction = game_object.velocity
+            else:
+                direction = UP
+            position = game_object.position
+            entities[game_object.entity_id] = (
+                kind,
+                quantize_position(position.x),
+                quantize_position(position.y),
+                quantize_heading(direction),
+            )
+    player_ship = game.player_ship
+    return Snapshot(
+        tick,
+        entities,
+        game.message_flag,
+        player_ship.get_health() if isinstance(player_ship, Ship) else 0,
+    )
+
+
+def encode_snapshot(snapshot, baseline=None):
+    """
+    Encode a snapshot, as a delta from a baseline if one is given.
+
+    Only entities that are new or changed since the baseline are written,
+    and of those only the fields that changed. Entities in the baseline but
+    not in the snapshot are listed as removed.
+
+    Args:
+        snapshot: Snapshot instance to encode.
+        baseline: Snapshot instance the client already has, or None to
+        encode every entity.
+
+    Returns:
+        Bytes of the encoded snapshot.
+    """
+    entities = snapshot.entities
+    base_entities = baseline.entities if baseline is not None else {}
+    removed = array("I", [eid for eid in base_entities if eid not in entities])
+    changed = []
+    changed_count = 0
+    for entity_id, state in entities.items():
+        old_state = base_entities.get(entity_id)
+        if old_state == state:
+            continue
+        if old_state is None:
+            mask = ALL_FIELDS
+        else:
+            mask = (
+                (state[0] != old_state[0]) * KIND_FIELD
+                | (state[1] != old_state[1]) * X_FIELD
+                | (state[2] != old_state[2]) * Y_FIELD
+                | (state[3] != old_state[3]) * HEADING_FIELD
+            )
+        changed_count += 1
+        changed.append(_ENTITY.pack(entity_id, mask))
+        for index, (field, field_format) in enumerate(_FIELD_FORMATS):
+            if mask & field:
+                changed.append(field_format.pack(state[index]))
+    header = _HEADER.pack(
+        SNAPSHOT_MESSAGE,
+        snapshot.tick,
+        baseline.tick if baseline is not None else NO_BASELINE,
+        MESSAGE_FLAGS.index(snapshot.message_flag),
+        snapshot.player_health,
+        len(removed),
+        changed_count,
+    )
+    return b"".join((header, removed.tobytes(), *changed))
+
+
+def decode_snapshot(data, baselines):
+    """
+    Decode a snapshot, applying it to its baseline if it is a delta.
+
+    Args:
+        data: Bytes of a snapshot from encode_snapshot.
+        baselines: Dict, maps ticks to Snapshot instances the client has.
+
+    Returns:
+        A Snapshot instance.
+
+    Raises:
+        ValueError: If the data is not a snapshot or its baseline is missing.
+    """
+    (
+        message_type,
+        tick,
+        baseline_tick,
+        message_flag,
+        player_health,
+        removed_count,
+        changed_count,
+    ) = _HEADER.unpack_from(data)
+    if message_type != SNAPSHOT_MESSAGE:
+        raise ValueError(f"Not a snapshot message: {message_type}")
+    if baseline_tick == NO_BASELINE:
+        entities = {}
+    elif baseline_tick in baselines:
+        entities = dict(baselines[baseline_tick].entities)
+    else:
+        raise ValueError(f"Missing baseline for tick {baseline_tick}")
+    offset = _HEADER.size
+    removed = array("I")
+    removed.frombytes(data[offset : offset + removed_count * removed.itemsize])
+    offset += removed_count * removed.itemsize
+    for entity_id in removed:
+        del entities[entity_id]
+    for _ in range(changed_count):
+        entity_id, mask = _ENTITY.unpack_from(data, offset)
+        offset += _ENTITY.size
+        state = list(entities.get(entity_id, (0, 0, 0, 0)))
+        for index, (field, field_format) in enumerate(_FIELD_FORMATS):
+            if mask & field:
+                (state[index],) = field_format.unpack_from(data, offset)
+                offset += field_format.size
+        entities[entity_id] = tuple(state)
+    return Snapshot(tick, entities, MESSAGE_FLAGS[message_flag], player_health)
+
+
+def encode_input(ack_tick, buttons):
+    """
+    Encode a client's input and the latest snapshot it received.
+
+    Args:
+        ack_tick: Int, tick of the latest snapshot received, or NO_BASELINE.
+        buttons: Int, RemoteController button bits held down.
+
+    Returns:
+        Bytes of the encoded input.
+    """
+    return _INPUT.pack(INPUT_MESSAGE, ack_tick, buttons)
+
+
+def decode_input(data):
+    """
+    Decode a client's input.
+
+    Args:
+        data: Bytes from encode_input.
+
+    Returns:
+        Tuple of the acknowledged tick and the button bits.
+
+    Raises:
+        ValueError: If the data is not an input message.
+    """
+    message_type, ack_tick, buttons = _INPUT.unpack(data)
+    if message_type != INPUT_MESSAGE:
+        raise ValueError(f"Not an input message: {message_type}")
+    return ack_tick, buttons
+
+
+def encode_subscribe(left, top, width, height):
+    """
+    Encode a spectator's request for the entities inside a camera region.
+
+    Args:
+        left: Int, x coordinate of the region's left edge in pixels.
+        top: Int, y coordinate of the region's top edge in pixels.
+        width: Int, width of the region in pixels.
+        height: Int, height of the region in pixels.
+
+    Returns:
+        Bytes of the encoded request.
+    """
+    return _SUBSCRIBE.pack(SUBSCRIBE_MESSAGE, left, top, width, height)
+
+
+def decode_subscribe(data):
+    """
+    Decode a spectator's request for a camera region.
+
+    Args:
+        data: Bytes from encode_subscribe.
+
+    Returns:
+        Tuple of the region's left, top, width and height in pixels.
+
+    Raises:
+        ValueError: If the data is not a subscribe message.
+    """
+    message_type, *region = _SUBSCRIBE.unpack(data)
+    if message_type != SUBSCRIBE_MESSAGE:
+        raise ValueError(f"Not a subscribe message: {message_type}")
+    return tuple(region)
+
+
+def frame(message):
+    """
+    Prefix a message with its length so it can be sent over a stream.
+
+    Args:
+        message: Bytes of the message.
+
+    Returns:
+        Bytes of the framed message.
+    """
+    return _FRAME_LENGTH.pack(len(message)) + message
+
+
+async def read_frame(reader):
+    """
+    Read one length prefixed message from a stream.
+
+    Args:
+        reader: asyncio.StreamReader to read from.
+
+    Returns:
+        Bytes of the message.
+
+    Raises:
+        asyncio.IncompleteReadError: If the stream ends mid message.
+    """
+    (length,) = _FRAME_LENGTH.unpack(
+        await reader.readexactly(_FRAME_LENGTH.size)
+    )
+    return await reader.readexactly(length)
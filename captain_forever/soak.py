@@ -0,0 +1,275 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# pylint: disable=protected-access
+# pylint: disable=broad-except
+# Disabling pylint warnings related to PyGame that aren't valid
+# Disabling protected access because the runner steps the game logic itself
+# Disabling broad except because every exception in a tick is recorded
+"""
+Soak runner that plays the game headless with a bot for many ticks.
+
+Play a million ticks with the aiming bot and write the report as JSON with
+
+    python soak.py --bot aim --ticks 1000000 --output soak.json
+
+The report has the ticks per second, the most entities of each kind alive
+at once, how memory grew and every exception raised. The exit status is 1
+if any exception was raised.
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import traceback
+import tracemalloc
+from time import perf_counter
+import pygame
+from game import CaptainForever
+from controller import AimBotController, RandomBotController
+from controller import ScriptedBotController
+from view import PyGameView
+
+WIDTH = 1082
+HEIGHT = 720
+BOTS = ("aim", "random", "scripted")
+
+
+def peak_rss_kb():
+    """
+    Return the peak resident memory of this process.
+
+    Returns:
+        Int, peak resident set size in KB (bytes on macOS).
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def make_bot(bot, game, seed=None, script=None):
+    """
+    Create a bot controller.
+
+    Args:
+        bot: String, one of BOTS.
+        game: CaptainForever instance the bot plays.
+        seed: Int, seed for the random bot, or None.
+        script: String, path of the script for the scripted bot.
+
+    Returns:
+        A BotController instance.
+
+    Raises:
+        ValueError: If the bot is unknown or the scripted bot has no script.
+    """
+    if bot == "aim":
+        return AimBotController(game, WIDTH, HEIGHT)
+    if bot == "random":
+        return RandomBotController(game, WIDTH, HEIGHT, seed)
+    if bot == "scripted":
+        if script is None:
+            raise ValueError("The scripted bot needs a script file")
+        return ScriptedBotController.from_file(game, WIDTH, HEIGHT, script)
+    raise ValueError(f"Unknown bot: {bot}")
+
+
+def _traced_bytes(trace_memory):
+    """
+    Return the bytes currently allocated by Python if tracing memory.
+
+    Args:
+        trace_memory: Bool, whether tracemalloc is running.
+
+    Returns:
+        Int, bytes traced by tracemalloc, or None.
+    """
+    return tracemalloc.get_traced_memory()[0] if trace_memory else None
+
+
+def run_soak(
+    bot="aim",
+    ticks=1_000_000,
+    seed=None,
+    script=None,
+    draw=False,
+    report_every=100_000,
+    max_exceptions=10,
+    trace_memory=False,
+    stream=None,
+):
+    """
+    Play the game with a bot for a number of ticks under the SDL dummy
+    drivers.
+
+    An exception raised during a tick is recorded with its traceback and
+    the game is restarted, so one bug does not end the run. Exceptions
+    with the same traceback are counted together.
+
+    Args:
+        bot: String, one of BOTS.
+        ticks: Int, number of ticks to play.
+        seed: Int, seed for the game's and the bot's random numbers, or
+        None.
+        script: String, path of the script for the scripted bot.
+        draw: Bool, whether to draw every tick as well.
+        report_every: Int, ticks between progress lines and memory samples.
+        max_exceptions: Int, the run stops once this many exceptions have
+        been raised.
+        trace_memory: Bool, whether to measure Python allocations with
+        tracemalloc, which is accurate but slows the run down.
+        stream: File object progress is printed to, or None for no output.
+
+    Returns:
+        Dict describing the run, see the module docstring.
+    """
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    game = CaptainForever(WIDTH, HEIGHT, seed=seed)
+    controller = make_bot(bot, game, seed, script)
+    view = PyGameView(game, screen, max_fps=0) if draw else None
+
+    high_water = dict.fromkeys(game.entity_counts(), 0)
+    exceptions = {}
+    exception_count = 0
+    if trace_memory:
+        tracemalloc.start()
+    memory = [(0, peak_rss_kb(), _traced_bytes(trace_memory))]
+    start = perf_counter()
+    tick = 0
+    while tick < ticks and exception_count < max_exceptions:
+        try:
+            controller.maneuver_player_ship()
+            game._process_game_logic()
+            if view is not None:
+                view.draw()
+        except Exception as error:
+            exception_count += 1
+            text = traceback.format_exc()
+            if text in exceptions:
+                exceptions[text]["count"] += 1
+            else:
+                exceptions[text] = {
+                    "type": type(error).__name__,
+                    "message": str(error),
+                    "first_tick": tick,
+                    "count": 1,
+                    "traceback": text,
+                }
+            game.restart()
+        for kind, count in game.entity_counts().items():
+            if count > high_water[kind]:
+                high_water[kind] = count
+        tick += 1
+        if tick % report_every == 0:
+            memory.append((tick, peak_rss_kb(), _traced_bytes(trace_memory)))
+            if stream is not None:
+                rate = tick / (perf_counter() - start)
+                print(
+                    (
+                        f"{tick:>10} ticks {rate:10.0f} ticks/s"
+                        f" peak rss {memory[-1][1]} KB"
+                        f" exceptions {exception_count}"
+                    ),
+                    file=stream,
+                )
+    seconds = perf_counter() - start
+    if memory[-1][0] != tick:
+        memory.append((tick, peak_rss_kb(), _traced_bytes(trace_memory)))
+    if trace_memory:
+        tracemalloc.stop()
+
+    return {
+        "bot": bot,
+        "seed": seed,
+        "draw": draw,
+        "ticks": tick,
+        "seconds": seconds,
+        "ticks_per_second": tick / seconds if seconds else 0.0,
+        "restarts": controller.restarts,
+        "high_water": high_water,
+        "memory": {
+            "samples": [
+                {
+                    "tick": sample_tick,
+                    "peak_rss_kb": rss,
+                    "traced_bytes": traced,
+                }
+                for sample_tick, rss, traced in memory
+            ],
+            "peak_rss_growth_kb": memory[-1][1] - memory[0][1],
+            "traced_growth_bytes": (
+                memory[-1][2] - memory[0][2] if trace_memory else None
+            ),
+        },
+        "exception_count": exception_count,
+        "exceptions": list(exceptions.values()),
+    }
+
+
+def main(argv=None):
+    """
+    Run a soak test from the command line.
+
+    Args:
+        argv: List of strings, command line arguments without the program
+        name, or None to use sys.argv.
+
+    Returns:
+        Int, exit status.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--bot", choices=BOTS, default="aim")
+    parser.add_argument("--script", help="script file for the scripted bot")
+    parser.add_argument("--ticks", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument(
+        "--draw", action="store_true", help="draw every tick as well"
+    )
+    parser.add_argument("--report-every", type=int, default=100_000)
+    parser.add_argument("--max-exceptions", type=int, default=10)
+    parser.add_argument(
+        "--tracemalloc",
+        action="store_true",
+        help="measure Python allocations, slower but more precise",
+    )
+    parser.add_argument("--output", help="file to write the JSON report to")
+    args = parser.parse_args(argv)
+
+    report = run_soak(
+        args.bot,
+        args.ticks,
+        args.seed,
+        args.script,
+        args.draw,
+        args.report_every,
+        args.max_exceptions,
+        args.tracemalloc,
+        sys.stdout,
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(report, output_file, indent=2)
+    print(
+        f"{report['ticks']} ticks in {report['seconds']:.1f} s"
+        f" ({report['ticks_per_second']:.0f} ticks/s),"
+        f" {report['restarts']} restarts"
+    )
+    print(
+        "high water "
+        + " ".join(
+            f"{kind}={count}" for kind, count in report["high_water"].items()
+        )
+    )
+    print(f"peak rss growth {report['memory']['peak_rss_growth_kb']} KB")
+    for exception in report["exceptions"]:
+        print(
+            f"{exception['count']}x {exception['type']}: {exception['message']}"
+            f" (first at tick {exception['first_tick']})\n"
+            f"{exception['traceback']}"
+        )
+    return 1 if report["exception_count"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# Disabling pylint warnings related to PyGame that aren't valid
+"""
+Sound effects decoded once at load time and played on a fixed pool of mixer
+channels.
+"""
+from time import perf_counter
+import pygame
+from timeline import recorder
+
+# effect name: (file in assets/sounds, priority, minimum ms between plays,
+# volume). Higher priority effects can steal channels from lower ones.
+EFFECTS = {
+    "player_laser": ("laser.mp3", 3, 60, 0.6),
+    "npc_laser": ("laser.mp3", 1, 120, 0.25),
+    "npc_destroyed": ("rock.mp3", 2, 50, 0.8),
+    "player_destroyed": ("rock.mp3", 4, 0, 1.0),
+}
+
+
+class SoundBank:
+    """
+    Play pre-decoded sound effects on a fixed pool of mixer channels.
+
+    Every effect is decoded into a pygame.mixer.Sound buffer when the bank
+    is created, so playing one never touches the disk or an MP3 decoder.
+    Finding a channel only looks at the fixed pool, and each effect can be
+    played at most once per interval, so triggering a sound costs the same
+    however many ships are shooting.
+
+    When every channel is busy, a new sound takes over the channel playing
+    the lowest priority sound, the oldest one if there is a tie, as long as
+    that priority is not higher than its own. Otherwise it is dropped.
+
+    Attributes:
+        _effects: Dict, maps effect names to (Sound, priority, min interval
+        in ms, volume from 0 to 1) tuples.
+        _channels: List of pygame.mixer.Channel instances in the pool.
+        _channel_priorities: List, priority of the sound each channel last
+        started.
+        _channel_starts: List, time in ms each channel last started a sound.
+        _last_played: Dict, maps effect names to the time in ms they were
+        last played.
+        _stats: Dict, counts of "played", "stolen", "rate_limited" and
+        "dropped" triggers.
+    """
+
+    def __init__(self, effects=None, channels=8, sound_dir="../assets/sounds"):
+        """
+        Initialize SoundBank, decoding every effect.
+
+        Args:
+            effects: Dict in the same form as EFFECTS, which is used if not
+            given.
+            channels: Int, number of mixer channels in the pool.
+            sound_dir: String, directory the sound files are in.
+
+        Raises:
+            pygame.error: If the mixer cannot be initialized.
+        """
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+        pygame.mixer.set_num_channels(channels)
+        decoded = {}
+        self._effects = {}
+        for name, (filename, priority, interval, volume) in (
+            effects or EFFECTS
+        ).items():
+            if filename not in decoded:
+                recorder.begin("load_sound", filename)
+                decoded[filename] = pygame.mixer.Sound(
+                    f"{sound_dir}/{filename}"
+                )
+                recorder.end("load_sound")
+            self._effects[name] = (
+                decoded[filename],
+                priority,
+                interval,
+                volume,
+            )
+        self._channels = [pygame.mixer.Channel(i) for i in range(channels)]
+        self._channel_priorities = [0] * channels
+        self._channel_starts = [0] * channels
+        self._last_played = {}
+        self._stats = dict.fromkeys(
+            ("played", "stolen", "rate_limited", "dropped"), 0
+        )
+
+    @property
+    def stats(self):
+        """
+        Return _stats.
+
+        Returns:
+            _stats: Dict, counts of "played", "stolen", "rate_limited" and
+            "dropped" triggers.
+        """
+        return self._stats
+
+    def _free_channel(self, priority):
+        """
+        Return the index of the channel a new sound should play on.
+
+        Args:
+            priority: Int, priority of the new sound.
+
+        Returns:
+            Int index into the pool, or None if every channel is playing a
+            higher priority sound.
+        """
+        victim = None
+        for index, channel in enumerate(self._channels):
+            if not channel.get_busy():
+                return index
+            if self._channel_priorities[index] <= priority and (
+                victim is None
+                or (
+                    self._channel_priorities[index],
+                    self._channel_starts[index],
+                )
+                < (
+                    self._channel_priorities[victim],
+                    self._channel_starts[victim],
+                )
+            ):
+                victim = index
+        if victim is not None:
+            self._stats["stolen"] += 1
+        return victim
+
+    def play(self, name, now=None):
+        """
+        Play an effect unless it is rate limited or no channel is free.
+
+        Args:
+            name: String, name of the effect.
+            now: Float, current time in ms, read from perf_counter if not
+            given. pygame.time.get_ticks is not used since it stays at 0
+            unless pygame.init was called.
+
+        Returns:
+            Int index of the channel the effect plays on, or None.
+        """
+        sound, priority, interval, volume = self._effects[name]
+        if now is None:
+            now = perf_counter() * 1000
+        last_played = self._last_played.get(name)
+        if last_played is not None and now - last_played < interval:
+            self._stats["rate_limited"] += 1
+            return None
+        index = self._free_channel(priority)
+        if index is None:
+            self._stats["dropped"] += 1
+            return None
+        channel = self._channels[index]
+        channel.set_volume(volume)
+        channel.play(sound)
+        self._channel_priorities[index] = priority
+        self._channel_starts[index] = now
+        self._last_played[name] = now
+        self._stats["played"] += 1
+        return index
@@ -0,0 +1,154 @@
+"""
+Uniform grid for finding the points inside a rectangle without checking
+every point.
+"""
+
+
+class SpatialGrid:
+    """
+    Bucket points into square cells so a rectangle query only looks at the
+    points in the cells the rectangle overlaps.
+
+    Attributes:
+        _cell_size: Number, width and height of a cell.
+        _cells: Dict, maps (column, row) cells to lists of (key, x, y)
+        tuples.
+        _count: Int, number of points in the grid.
+    """
+
+    def __init__(self, cell_size=128):
+        """
+        Initialize an empty SpatialGrid.
+
+        Args:
+            cell_size: Number, width and height of a cell.
+        """
+        self._cell_size = cell_size
+        self._cells = {}
+        self._count = 0
+
+    def __len__(self):
+        """
+        Return the number of points in the grid.
+
+        Returns:
+            Int, number of points.
+        """
+        return self._count
+
+    @property
+    def cell_size(self):
+        """
+        Return _cell_size.
+
+        Returns:
+            _cell_size: Number, width and height of a cell.
+        """
+        return self._cell_size
+
+    def clear(self):
+        """
+        Remove every point.
+        """
+        self._cells.clear()
+        self._count = 0
+
+    def insert(self, key, x, y):
+        """
+        Add a point.
+
+        Args:
+            key: Hashable value returned by queries that find the point.
+            x: Number, x coordinate of the point.
+            y: Number, y coordinate of the point.
+        """
+        cell = self.cell_of(x, y)
+        bucket = self._cells.get(cell)
+        if bucket is None:
+            self._cells[cell] = [(key, x, y)]
+        else:
+            bucket.append((key, x, y))
+        self._count += 1
+
+    def cell_of(self, x, y):
+        """
+        Return the cell a point falls in.
+
+        Args:
+            x: Number, x coordinate of the point.
+            y: Number, y coordinate of the point.
+
+        Returns:
+            Tuple of ints, column and row of the cell.
+        """
+        return (int(x // self._cell_size), int(y // self._cell_size))
+
+    def near(self, cell):
+        """
+        Return whether a cell or any cell around it holds points.
+
+        Args:
+            cell: Tuple of ints, column and row of the cell.
+
+        Returns:
+            Bool, whether any of the 9 cells holds a point.
+        """
+        column, row = cell
+        cells = self._cells
+        return any(
+            (column + dx, row + dy) in cells
+            for dx in (-1, 0, 1)
+            for dy in (-1, 0, 1)
+        )
+
+    def remove(self, key, x, y):
+        """
+        Remove a point added with the same key and coordinates.
+
+        Args:
+            key: Hashable value the point was added with.
+            x: Number, x coordinate the point was added at.
+            y: Number, y coordinate the point was added at.
+
+        Raises:
+            KeyError: If no such point is in the grid.
+        """
+        cell = self.cell_of(x, y)
+        bucket = self._cells.get(cell, ())
+        for index, point in enumerate(bucket):
+            if point[0] == key:
+                del bucket[index]
+                if not bucket:
+                    del self._cells[cell]
+                self._count -= 1
+                return
+        raise KeyError(key)
+
+    def query(self, left, top, width, height):
+        """
+        Return the keys of every point inside a rectangle.
+
+        Args:
+            left: Number, x coordinate of the rectangle's left edge.
+            top: Number, y coordinate of the rectangle's top edge.
+            width: Number, width of the rectangle.
+            height: Number, height of the rectangle.
+
+        Returns:
+            List of keys of points with left <= x < left + width and
+            top <= y < top + height.
+        """
+        right = left + width
+        bottom = top + height
+        size = self._cell_size
+        cells = self._cells
+        found = []
+        for column in range(int(left // size), int((right - 1) // size) + 1):
+            for row in range(int(top // size), int((bottom - 1) // size) + 1):
+                bucket = cells.get((column, row))
+                if bucket is None:
+                    continue
+                for key, x, y in bucket:
+                    if left <= x < right and top <= y < bottom:
+                        found.append(key)
+        return found
@@ -0,0 +1,1050 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# pylint: disable=protected-access
+# Disabling pylint warnings related to PyGame that aren't valid
+# Disabling protected access because the service steps the game logic itself
+"""
+Spectator service that streams a live match to many subscribers, each of
+which only receives the entities inside its camera region.
+
+Spectators looking at the same region share one encoded frame, so encoding
+costs grow with the number of regions being watched rather than the number
+of spectators. Spectators that cannot keep up are sent fewer frames and
+finally dropped, without ever making the match wait.
+
+Serve a match with the aiming bot, watch part of it in a window, or measure
+the service with 300 spectators spread over 8 subscriber processes:
+
+    python spectator.py serve --port 7778
+    python spectator.py watch --port 7778 --region 0,0,540,360
+    python spectator.py measure --spectators 300 --processes 8 --regions 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+from collections import deque
+from time import perf_counter
+import pygame
+from game import CaptainForever
+from controller import AimBotController
+from server import percentile
+from snapshots import (
+    POSITION_SCALE,
+    Snapshot,
+    capture_snapshot,
+    decode_snapshot,
+    decode_subscribe,
+    encode_snapshot,
+    encode_subscribe,
+    frame,
+    read_frame,
+)
+from spatial import SpatialGrid
+from view import SnapshotView
+
+WIDTH = 1082
+HEIGHT = 720
+# camera regions are widened to multiples of this so that spectators with
+# almost the same view share a region
+REGION_SNAP = 60
+# entities this far outside a region are included so sprites crossing its
+# edge are drawn
+REGION_MARGIN = 32
+
+
+def snap_region(left, top, width, height):
+    """
+    Widen a camera region to the region grid.
+
+    Args:
+        left: Int, x coordinate of the region's left edge in pixels.
+        top: Int, y coordinate of the region's top edge in pixels.
+        width: Int, width of the region in pixels.
+        height: Int, height of the region in pixels.
+
+    Returns:
+        Tuple of the snapped left, top, width and height.
+    """
+    snapped_left = left // REGION_SNAP * REGION_SNAP
+    snapped_top = top // REGION_SNAP * REGION_SNAP
+    right = -(-(left + width) // REGION_SNAP) * REGION_SNAP
+    bottom = -(-(top + height) // REGION_SNAP) * REGION_SNAP
+    return (
+        snapped_left,
+        snapped_top,
+        max(REGION_SNAP, right - snapped_left),
+        max(REGION_SNAP, bottom - snapped_top),
+    )
+
+
+class Subscriber:
+    """
+    A connected spectator.
+
+    Attributes:
+        _writer: asyncio.StreamWriter frames are sent on.
+        _region: Tuple of the snapped camera region watched, or None before
+        the spectator subscribed.
+        _last_tick: Int, tick of the last frame sent, or None.
+        _stride: Int, only ticks divisible by this are sent.
+        _frames_sent: Int, number of frames sent so far.
+        _bytes_sent: Int, bytes of frames sent so far.
+        _skipped: Int, frames not sent because of the stride.
+    """
+
+    def __init__(self, writer):
+        """
+        Initialize Subscriber.
+
+        Args:
+            writer: asyncio.StreamWriter frames are sent on.
+        """
+        self._writer = writer
+        self._region = None
+        self._last_tick = None
+        self._stride = 1
+        self._frames_sent = 0
+        self._bytes_sent = 0
+        self._skipped = 0
+
+    @property
+    def region(self):
+        """
+        Return _region.
+
+        Returns:
+            _region: Tuple of the snapped camera region, or None.
+        """
+        return self._region
+
+    @property
+    def stride(self):
+        """
+        Return _stride.
+
+        Returns:
+            _stride: Int, only ticks divisible by this are sent.
+        """
+        return self._stride
+
+    @property
+    def frames_sent(self):
+        """
+        Return _frames_sent.
+
+        Returns:
+            _frames_sent: Int, number of frames sent so far.
+        """
+        return self._frames_sent
+
+    @property
+    def bytes_sent(self):
+        """
+        Return _bytes_sent.
+
+        Returns:
+            _bytes_sent: Int, bytes of frames sent so far.
+        """
+        return self._bytes_sent
+
+    @property
+    def skipped(self):
+        """
+        Return _skipped.
+
+        Returns:
+            _skipped: Int, frames not sent because of the stride.
+        """
+        return self._skipped
+
+
+class Region:
+    """
+    A camera region at least one spectator watches, with the frames encoded
+    for it this tick.
+
+    Frames are encoded as deltas from the region's previous frame, which
+    every spectator that was sent the previous tick has. Spectators that
+    missed it share one full frame, encoded only if one of them needs it.
+
+    Attributes:
+        _bounds: Tuple of the region's left, top, width and height.
+        _subscribers: List of Subscriber instances watching the region.
+        _previous: Snapshot instance of the previous tick, or None.
+        _snapshot: Snapshot instance of the current tick, or None.
+        _delta: Bytes of the current frame as a delta, or None.
+        _full: Bytes of the current frame in full, or None until needed.
+    """
+
+    def __init__(self, bounds):
+        """
+        Initialize Region.
+
+        Args:
+            bounds: Tuple of the region's left, top, width and height.
+        """
+        self._bounds = bounds
+        self._subscribers = []
+        self._previous = None
+        self._snapshot = None
+        self._delta = None
+        self._full = None
+
+    @property
+    def bounds(self):
+        """
+        Return _bounds.
+
+        Returns:
+            _bounds: Tuple of the region's left, top, width and height.
+        """
+        return self._bounds
+
+    @property
+    def subscribers(self):
+        """
+        Return _subscribers.
+
+        Returns:
+            _subscribers: List of Subscriber instances watching the region.
+        """
+        return self._subscribers
+
+    def encode(self, snapshot):
+        """
+        Make a snapshot of the region the current frame and encode it as a
+        delta from the previous one.
+
+        Args:
+            snapshot: Snapshot instance holding the region's entities.
+        """
+        self._previous = self._snapshot
+        self._snapshot = snapshot
+        self._delta = (
+            None
+            if self._previous is None
+            else frame(encode_snapshot(snapshot, self._previous))
+        )
+        self._full = None
+
+    def frame_for(self, subscriber):
+        """
+        Return the current frame to send a subscriber.
+
+        Args:
+            subscriber: Subscriber instance watching the region.
+
+        Returns:
+            Bytes of the delta if the subscriber has the previous frame,
+            otherwise of the full frame.
+        """
+        if (
+            self._delta is not None
+            and subscriber._last_tick == self._previous.tick
+        ):
+            return self._delta
+        if self._full is None:
+            self._full = frame(encode_snapshot(self._snapshot))
+        return self._full
+
+
+class SpectatorService:
+    """
+    Stream a game to spectators, sending each only the entities inside its
+    camera region.
+
+    Every tick the service snapshots the game once, puts the entities in a
+    spatial grid and encodes a frame for each watched region. Sending never
+    waits: a spectator whose connection holds more than slow_buffer unsent
+    bytes has its stride doubled, so it gets every second, fourth, ... frame,
+    and one holding more than drop_buffer is disconnected.
+
+    Attributes:
+        _game: CaptainForever instance streamed.
+        _slow_buffer: Int, unsent bytes above which a spectator is sent
+        fewer frames.
+        _drop_buffer: Int, unsent bytes above which a spectator is dropped.
+        _max_stride: Int, most frames a slow spectator's stride skips.
+        _send_buffer: Int, size of each connection's kernel send buffer.
+        _grid: SpatialGrid instance holding the entities each tick.
+        _regions: Dict, maps snapped bounds to Region instances.
+        _subscribers: List of Subscriber instances connected.
+        _handlers: Set of asyncio tasks handling connected spectators.
+        _server: asyncio.Server accepting connections, or None.
+        _tick: Int, number of ticks broadcast.
+        _encode_times: Deque, ms spent snapshotting, querying and encoding
+        in recent ticks.
+        _send_times: Deque, ms spent sending in recent ticks.
+        _region_counts: Deque, number of regions encoded in recent ticks.
+        _downsampled: Int, number of times a spectator's stride was raised.
+        _dropped: Int, number of spectators dropped for being too slow.
+    """
+
+    def __init__(
+        self,
+        game,
+        slow_buffer=2**15,
+        drop_buffer=2**18,
+        max_stride=8,
+        send_buffer=2**14,
+        stats_history=3600,
+    ):
+        """
+        Initialize SpectatorService.
+
+        Args:
+            game: CaptainForever instance to stream.
+            slow_buffer: Int, unsent bytes above which a spectator is sent
+            fewer frames.
+            drop_buffer: Int, unsent bytes above which a spectator is
+            dropped.
+            max_stride: Int, most frames a slow spectator's stride skips.
+            send_buffer: Int, size of each connection's kernel send buffer
+            in bytes.
+            stats_history: Int, number of ticks kept for timing stats.
+        """
+        self._game = game
+        self._slow_buffer = slow_buffer
+        self._drop_buffer = drop_buffer
+        self._max_stride = max_stride
+        self._send_buffer = send_buffer
+        self._grid = SpatialGrid(128 * POSITION_SCALE)
+        self._regions = {}
+        self._subscribers = []
+        self._handlers = set()
+        self._server = None
+        self._tick = 0
+        self._encode_times = deque(maxlen=stats_history)
+        self._send_times = deque(maxlen=stats_history)
+        self._region_counts = deque(maxlen=stats_history)
+        self._downsampled = 0
+        self._dropped = 0
+
+    @property
+    def regions(self):
+        """
+        Return _regions.
+
+        Returns:
+            _regions: Dict, maps snapped bounds to Region instances.
+        """
+        return self._regions
+
+    @property
+    def subscribers(self):
+        """
+        Return _subscribers.
+
+        Returns:
+            _subscribers: List of Subscriber instances connected.
+        """
+        return self._subscribers
+
+    @property
+    def encode_times(self):
+        """
+        Return _encode_times.
+
+        Returns:
+            _encode_times: Deque, ms spent snapshotting, querying and
+            encoding in recent ticks.
+        """
+        return self._encode_times
+
+    @property
+    def send_times(self):
+        """
+        Return _send_times.
+
+        Returns:
+            _send_times: Deque, ms spent sending in recent ticks.
+        """
+        return self._send_times
+
+    @property
+    def region_counts(self):
+        """
+        Return _region_counts.
+
+        Returns:
+            _region_counts: Deque, number of regions encoded in recent
+            ticks.
+        """
+        return self._region_counts
+
+    @property
+    def downsampled(self):
+        """
+        Return _downsampled.
+
+        Returns:
+            _downsampled: Int, number of times a spectator's stride was
+            raised.
+        """
+        return self._downsampled
+
+    @property
+    def dropped(self):
+        """
+        Return _dropped.
+
+        Returns:
+            _dropped: Int, number of spectators dropped for being too slow.
+        """
+        return self._dropped
+
+    async def start(self, host="127.0.0.1", port=0):
+        """
+        Start accepting spectators.
+
+        Args:
+            host: String, address to listen on.
+            port: Int, port to listen on, 0 to pick a free one.
+
+        Returns:
+            Int, port the service listens on.
+        """
+        self._server = await asyncio.start_server(
+            self._handle_spectator, host, port
+        )
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        """
+        Stop accepting spectators and close every connection.
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for subscriber in self._subscribers:
+            subscriber._writer.close()
+        # handlers see the closed connections and finish
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+
+    def subscribe(self, subscriber, left, top, width, height):
+        """
+        Move a spectator to the region around a camera rectangle.
+
+        Args:
+            subscriber: Subscriber instance.
+            left: Int, x coordinate of the camera's left edge in pixels.
+            top: Int, y coordinate of the camera's top edge in pixels.
+            width: Int, width of the camera in pixels.
+            height: Int, height of the camera in pixels.
+        """
+        self.unsubscribe(subscriber)
+        bounds = snap_region(left, top, width, height)
+        region = self._regions.get(bounds)
+        if region is None:
+            region = self._regions[bounds] = Region(bounds)
+        region.subscribers.append(subscriber)
+        subscriber._region = bounds
+        subscriber._last_tick = None
+
+    def unsubscribe(self, subscriber):
+        """
+        Stop sending a spectator frames, forgetting regions nobody watches.
+
+        Args:
+            subscriber: Subscriber instance.
+        """
+        region = self._regions.get(subscriber.region)
+        if region is None:
+            return
+        region.subscribers.remove(subscriber)
+        if not region.subscribers:
+            del self._regions[subscriber.region]
+        subscriber._region = None
+
+    async def _handle_spectator(self, reader, writer):
+        """
+        Register a new spectator and apply its region requests until it
+        disconnects.
+
+        Args:
+            reader: asyncio.StreamReader region requests arrive on.
+            writer: asyncio.StreamWriter frames are sent on.
+        """
+        # a small kernel buffer makes a slow spectator show up in the write
+        # buffer soon, rather than after megabytes queue up in the kernel
+        writer.get_extra_info("socket").setsockopt(
+            socket.SOL_SOCKET, socket.SO_SNDBUF, self._send_buffer
+        )
+        subscriber = Subscriber(writer)
+        self._subscribers.append(subscriber)
+        handler = asyncio.current_task()
+        self._handlers.add(handler)
+        try:
+            while True:
+                region = decode_subscribe(await read_frame(reader))
+                self.subscribe(subscriber, *region)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self.unsubscribe(subscriber)
+            self._subscribers.remove(subscriber)
+            self._handlers.discard(handler)
+            writer.close()
+
+    def encode_regions(self, tick):
+        """
+        Snapshot the game and encode a frame for every watched region.
+
+        Args:
+            tick: Int, tick the frames are for.
+        """
+        snapshot = capture_snapshot(self._game, tick)
+        entities = snapshot.entities
+        grid = self._grid
+        grid.clear()
+        for entity_id, (_, x, y, _) in entities.items():
+            grid.insert(entity_id, x, y)
+        margin = REGION_MARGIN * POSITION_SCALE
+        for (left, top, width, height), region in self._regions.items():
+            found = grid.query(
+                left * POSITION_SCALE - margin,
+                top * POSITION_SCALE - margin,
+                width * POSITION_SCALE + 2 * margin,
+                height * POSITION_SCALE + 2 * margin,
+            )
+            region.encode(
+                Snapshot(
+                    tick,
+                    {entity_id: entities[entity_id] for entity_id in found},
+                    snapshot.message_flag,
+                    snapshot.player_health,
+                )
+            )
+
+    def send_frames(self, tick):
+        """
+        Send every spectator its region's frame, slowing down or dropping
+        spectators that fall behind.
+
+        Args:
+            tick: Int, tick the frames are for.
+        """
+        for region in self._regions.values():
+            for subscriber in list(region.subscribers):
+                buffered = subscriber._writer.transport.get_write_buffer_size()
+                if buffered > self._drop_buffer:
+                    self._dropped += 1
+                    self.unsubscribe(subscriber)
+                    subscriber._writer.close()
+                    continue
+                if buffered > self._slow_buffer:
+                    if subscriber._stride < self._max_stride:
+                        subscriber._stride *= 2
+                        self._downsampled += 1
+                    subscriber._skipped += 1
+                    continue
+                if tick % subscriber._stride:
+                    subscriber._skipped += 1
+                    continue
+                if buffered == 0 and subscriber._stride > 1:
+                    subscriber._stride //= 2
+                message = region.frame_for(subscriber)
+                subscriber._writer.write(message)
+                subscriber._last_tick = tick
+                subscriber._frames_sent += 1
+                subscriber._bytes_sent += len(message)
+
+    def broadcast(self):
+        """
+        Send every spectator a frame of the game's current state.
+        """
+        self._tick += 1
+        start = perf_counter()
+        self.encode_regions(self._tick)
+        encoded = perf_counter()
+        self.send_frames(self._tick)
+        self._encode_times.append((encoded - start) * 1000)
+        self._send_times.append((perf_counter() - encoded) * 1000)
+        self._region_counts.append(len(self._regions))
+
+
+async def run_match(service, controller, seconds=None, tick_rate=60):
+    """
+    Play a match with a bot at a fixed tick rate, broadcasting every tick.
+
+    Args:
+        service: SpectatorService instance streaming the bot's game.
+        controller: BotController instance playing the game.
+        seconds: Float, seconds to run for, or None to run forever.
+        tick_rate: Int, ticks simulated per second.
+    """
+    loop = asyncio.get_running_loop()
+    period = 1 / tick_rate
+    start = loop.time()
+    deadline = start
+    while seconds is None or loop.time() - start < seconds:
+        controller.maneuver_player_ship()
+        controller._game._process_game_logic()
+        service.broadcast()
+        deadline += period
+        delay = deadline - loop.time()
+        if delay < -period:
+            # too far behind to catch up
+            deadline = loop.time()
+        await asyncio.sleep(max(0, delay))
+
+
+class SpectatorClient:
+    """
+    Spectator that subscribes to a camera region and decodes its frames.
+
+    Attributes:
+        _reader: asyncio.StreamReader frames arrive on, or None.
+        _writer: asyncio.StreamWriter region requests are sent on, or None.
+        _snapshot: Latest Snapshot instance, or None.
+        _frames_received: Int, number of frames received so far.
+        _bytes_received: Int, bytes of frames received so far.
+    """
+
+    def __init__(self):
+        """
+        Initialize SpectatorClient.
+        """
+        self._reader = None
+        self._writer = None
+        self._snapshot = None
+        self._frames_received = 0
+        self._bytes_received = 0
+
+    @property
+    def snapshot(self):
+        """
+        Return _snapshot.
+
+        Returns:
+            _snapshot: Latest Snapshot instance, or None.
+        """
+        return self._snapshot
+
+    @property
+    def frames_received(self):
+        """
+        Return _frames_received.
+
+        Returns:
+            _frames_received: Int, number of frames received so far.
+        """
+        return self._frames_received
+
+    @property
+    def bytes_received(self):
+        """
+        Return _bytes_received.
+
+        Returns:
+            _bytes_received: Int, bytes of frames received so far.
+        """
+        return self._bytes_received
+
+    async def connect(self, region, host="127.0.0.1", port=7778, buffer=None):
+        """
+        Connect to a spectator service and subscribe to a region.
+
+        Args:
+            region: Tuple of the camera's left, top, width and height.
+            host: String, address of the service.
+            port: Int, port of the service.
+            buffer: Int, size of the socket's receive buffer in bytes, or
+            None for the system default.
+        """
+        if buffer is None:
+            connection = await asyncio.open_connection(host, port)
+        else:
+            # the buffer has to be set before connecting to limit the window
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, buffer)
+            sock.setblocking(False)
+            await asyncio.get_running_loop().sock_connect(sock, (host, port))
+            connection = await asyncio.open_connection(sock=sock, limit=buffer)
+        self._reader, self._writer = connection
+        self.look_at(region)
+
+    def look_at(self, region):
+        """
+        Move the camera to another region.
+
+        Args:
+            region: Tuple of the camera's left, top, width and height.
+        """
+        self._writer.write(frame(encode_subscribe(*region)))
+
+    async def receive(self):
+        """
+        Wait for the next frame.
+
+        Returns:
+            The decoded Snapshot instance.
+        """
+        data = await read_frame(self._reader)
+        self._bytes_received += len(data) + 4
+        baselines = (
+            {}
+            if self._snapshot is None
+            else {self._snapshot.tick: self._snapshot}
+        )
+        self._snapshot = decode_snapshot(data, baselines)
+        self._frames_received += 1
+        return self._snapshot
+
+    async def close(self):
+        """
+        Close the connection.
+        """
+        if self._writer is not None:
+            self._writer.close()
+
+
+def camera_regions(count):
+    """
+    Split the screen into camera regions, overlapping if there are many.
+
+    Args:
+        count: Int, number of regions.
+
+    Returns:
+        List of (left, top, width, height) tuples.
+    """
+    columns = 1
+    while columns * columns < count:
+        columns += 1
+    rows = -(-count // columns)
+    width = WIDTH // columns
+    height = HEIGHT // rows
+    return [
+        ((index % columns) * width, (index // columns) * height, width, height)
+        for index in range(count)
+    ]
+
+
+async def spectate(port, regions, count, seconds, slow=False):
+    """
+    Connect spectators to a service and count what they receive.
+
+    Args:
+        port: Int, port of the service on localhost.
+        regions: List of camera regions, spectators are spread over them.
+        count: Int, number of spectators.
+        seconds: Float, seconds to spectate for.
+        slow: Bool, whether the spectators read slowly through a small
+        receive buffer.
+
+    Returns:
+        Dict with the frames and bytes received.
+    """
+    clients = [SpectatorClient() for _ in range(count)]
+
+    async def watch(client):
+        while True:
+            await client.receive()
+            if slow:
+                await asyncio.sleep(1)
+
+    for index, client in enumerate(clients):
+        await client.connect(
+            regions[index % len(regions)],
+            port=port,
+            buffer=4096 if slow else None,
+        )
+    tasks = [asyncio.create_task(watch(client)) for client in clients]
+    await asyncio.wait(tasks, timeout=seconds)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    for client in clients:
+        await client.close()
+    return {
+        "spectators": count,
+        "frames": sum(client.frames_received for client in clients),
+        "bytes": sum(client.bytes_received for client in clients),
+        "disconnected": sum(task.done() for task in tasks),
+    }
+
+
+async def measure(
+    spectators=300,
+    processes=8,
+    regions=4,
+    slow_processes=0,
+    seconds=10.0,
+    tick_rate=60,
+    seed=0,
+):
+    """
+    Stream a bot match to spectators in local subscriber processes and
+    measure encoding and sending time per tick.
+
+    Args:
+        spectators: Int, number of spectators across all processes.
+        processes: Int, number of subscriber processes.
+        regions: Int, number of camera regions the spectators spread over.
+        slow_processes: Int, how many of the processes read slowly.
+        seconds: Float, seconds to stream for once all are subscribed.
+        tick_rate: Int, ticks simulated per second.
+        seed: Int, seed for the match.
+
+    Returns:
+        Dict with the settings, tick times and what the spectators got.
+    """
+    game = CaptainForever(WIDTH, HEIGHT, seed=seed)
+    service = SpectatorService(game)
+    port = await service.start()
+    counts = [
+        spectators // processes + (index < spectators % processes)
+        for index in range(processes)
+    ]
+    children = []
+    for index, count in enumerate(counts):
+        command = [
+            sys.executable,
+            os.path.abspath(__file__),
+            "subscribe",
+            "--port",
+            str(port),
+            "--count",
+            str(count),
+            "--regions",
+            str(regions),
+            "--seconds",
+            str(seconds + 5),
+        ]
+        if index < slow_processes:
+            command.append("--slow")
+        children.append(
+            await asyncio.create_subprocess_exec(
+                *command,
+                stdout=subprocess.PIPE,
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                env={**os.environ, "PYGAME_HIDE_SUPPORT_PROMPT": "1"},
+            )
+        )
+    while sum(
+        len(region.subscribers) for region in service.regions.values()
+    ) < spectators and all(child.returncode is None for child in children):
+        await asyncio.sleep(0.05)
+    await run_match(
+        service, AimBotController(game, WIDTH, HEIGHT), seconds, tick_rate
+    )
+    subscribers = list(service.subscribers)
+    await service.stop()
+    results = []
+    for child in children:
+        output, _ = await child.communicate()
+        # the report is the last line, after anything pygame printed
+        results.append(json.loads(output.splitlines()[-1]))
+
+    tick_times = [
+        encode + send
+        for encode, send in zip(service.encode_times, service.send_times)
+    ]
+    return {
+        "spectators": spectators,
+        "processes": processes,
+        "regions": regions,
+        "seconds": seconds,
+        "tick_rate": tick_rate,
+        "ticks": len(tick_times),
+        "encodes_per_tick": statistics.mean(service.region_counts),
+        "tick_ms": {
+            "mean": statistics.mean(tick_times),
+            "p99": percentile(tick_times, 0.99),
+            "max": max(tick_times),
+            "encode_mean": statistics.mean(service.encode_times),
+            "send_mean": statistics.mean(service.send_times),
+        },
+        "frames_sent": sum(
+            subscriber.frames_sent for subscriber in subscribers
+        ),
+        "frames_skipped": sum(subscriber.skipped for subscriber in subscribers),
+        "frames_received": sum(result["frames"] for result in results),
+        "bytes_received": sum(result["bytes"] for result in results),
+        "downsampled": service.downsampled,
+        "dropped": service.dropped,
+    }
+
+
+async def serve(host, port, tick_rate):
+    """
+    Stream a bot match until interrupted.
+
+    Args:
+        host: String, address to listen on.
+        port: Int, port to listen on.
+        tick_rate: Int, ticks simulated per second.
+    """
+    game = CaptainForever(WIDTH, HEIGHT)
+    service = SpectatorService(game)
+    port = await service.start(host, port)
+    print(f"Streaming Captain Forever to spectators on {host}:{port}")
+    try:
+        await run_match(
+            service, AimBotController(game, WIDTH, HEIGHT), None, tick_rate
+        )
+    finally:
+        await service.stop()
+
+
+async def watch_in_window(host, port, region):
+    """
+    Spectate a region in a window.
+
+    Args:
+        host: String, address of the service.
+        port: Int, port of the service.
+        region: Tuple of the camera's left, top, width and height.
+    """
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Captain Forever spectator")
+    client = SpectatorClient()
+    await client.connect(region, host, port)
+    view = SnapshotView(client, screen)
+    try:
+        while True:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT or (
+                    event.type == pygame.KEYDOWN
+                    and event.key == pygame.K_ESCAPE
+                ):
+                    return
+            await client.receive()
+            view.draw()
+    finally:
+        await client.close()
+
+
+def _region(text):
+    """
+    Parse a camera region given on the command line.
+
+    Args:
+        text: String, "left,top,width,height".
+
+    Returns:
+        Tuple of four ints.
+
+    Raises:
+        argparse.ArgumentTypeError: If the text is not four integers.
+    """
+    try:
+        region = tuple(int(part) for part in text.split(","))
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error)) from error
+    if len(region) != 4:
+        raise argparse.ArgumentTypeError("expected left,top,width,height")
+    return region
+
+
+def main(argv=None):
+    """
+    Serve, watch, subscribe or measure from the command line.
+
+    Args:
+        argv: List of strings, command line arguments without the program
+        name, or None to use sys.argv.
+
+    Returns:
+        Int, exit status.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="stream a bot match")
+    watch_parser = commands.add_parser("watch", help="watch a region")
+    for command_parser in (serve_parser, watch_parser):
+        command_parser.add_argument("--host", default="127.0.0.1")
+        command_parser.add_argument("--port", type=int, default=7778)
+    serve_parser.add_argument("--tick-rate", type=int, default=60)
+    watch_parser.add_argument(
+        "--region", type=_region, default=(0, 0, WIDTH, HEIGHT)
+    )
+    subscribe_parser = commands.add_parser(
+        "subscribe", help="run spectators and print what they received"
+    )
+    subscribe_parser.add_argument("--port", type=int, default=7778)
+    subscribe_parser.add_argument("--count", type=int, default=1)
+    subscribe_parser.add_argument("--regions", type=int, default=4)
+    subscribe_parser.add_argument("--seconds", type=float, default=10.0)
+    subscribe_parser.add_argument(
+        "--slow", action="store_true", help="read slowly"
+    )
+    measure_parser = commands.add_parser(
+        "measure", help="measure the service with local subscriber processes"
+    )
+    measure_parser.add_argument("--spectators", type=int, default=300)
+    measure_parser.add_argument("--processes", type=int, default=8)
+    measure_parser.add_argument("--regions", type=int, default=4)
+    measure_parser.add_argument("--slow-processes", type=int, default=0)
+    measure_parser.add_argument("--seconds", type=float, default=10.0)
+    measure_parser.add_argument("--tick-rate", type=int, default=60)
+    measure_parser.add_argument("--output", help="file to write JSON to")
+    args = parser.parse_args(argv)
+
+    if args.command == "watch":
+        asyncio.run(watch_in_window(args.host, args.port, args.region))
+        return 0
+    if args.command == "subscribe":
+        result = asyncio.run(
+            spectate(
+                args.port,
+                camera_regions(args.regions),
+                args.count,
+                args.seconds,
+                args.slow,
+            )
+        )
+        print(json.dumps(result))
+        return 0
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.init()
+    pygame.display.set_mode((WIDTH, HEIGHT))
+    if args.command == "serve":
+        try:
+            asyncio.run(serve(args.host, args.port, args.tick_rate))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    report = asyncio.run(
+        measure(
+            args.spectators,
+            args.processes,
+            args.regions,
+            args.slow_processes,
+            args.seconds,
+            args.tick_rate,
+        )
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(report, output_file, indent=2)
+    tick_ms = report["tick_ms"]
+    print(
+        f"{report['spectators']} spectators in {report['processes']}"
+        f" processes watching {report['regions']} regions for"
+        f" {report['seconds']} s: {report['ticks']} ticks\n"
+        f"{report['encodes_per_tick']:.1f} region encodes per tick,"
+        f" tick {tick_ms['mean']:.2f} ms mean"
+        f" ({tick_ms['encode_mean']:.2f} encode,"
+        f" {tick_ms['send_mean']:.2f} send), {tick_ms['p99']:.2f} ms p99,"
+        f" {tick_ms['max']:.2f} ms max\n{report['frames_sent']} frames sent,"
+        f" {report['frames_skipped']} skipped,"
+        f" {report['frames_received']} received"
+        f" ({report['bytes_received'] / 1024:.0f} KiB),"
+        f" {report['downsampled']} downsamples, {report['dropped']} dropped"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+"""
+Startup timeline that marks how long each phase of launching the game takes,
+from the first import to the first frame on screen.
+
+Import this module before anything else so the clock starts as early as
+possible, then mark the end of each phase:
+
+    from startup import startup_timeline
+    ...
+    startup_timeline.mark("display")
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from time import perf_counter
+from timeline import recorder
+
+PHASES = ("import", "display", "assets", "first_frame", "warm_up")
+
+
+class StartupTimeline:
+    """
+    Record when each startup phase ended.
+
+    Attributes:
+        _start: Float, perf_counter value the timeline starts from.
+        _marks: List of (phase, ms since start) tuples in the order marked.
+    """
+
+    def __init__(self, start=None):
+        """
+        Initialize StartupTimeline.
+
+        Args:
+            start: Float, perf_counter value to measure from, or None to
+            start now.
+        """
+        self._start = perf_counter() if start is None else start
+        self._marks = []
+
+    @property
+    def marks(self):
+        """
+        Return _marks.
+
+        Returns:
+            _marks: List of (phase, ms since start) tuples.
+        """
+        return self._marks
+
+    def mark(self, phase):
+        """
+        Mark the end of a phase, unless it was already marked.
+
+        Args:
+            phase: String, name of the phase that just ended.
+        """
+        if any(marked == phase for marked, _ in self._marks):
+            return
+        self._marks.append((phase, (perf_counter() - self._start) * 1000))
+        recorder.instant("startup", phase)
+
+    def elapsed(self, phase):
+        """
+        Return when a phase ended.
+
+        Args:
+            phase: String, name of a marked phase.
+
+        Returns:
+            Float, ms from the start to the end of the phase, or None if it
+            was not marked.
+        """
+        for marked, elapsed in self._marks:
+            if marked == phase:
+                return elapsed
+        return None
+
+    def durations(self):
+        """
+        Return how long each phase took.
+
+        Returns:
+            List of (phase, ms spent in the phase) tuples.
+        """
+        durations = []
+        previous = 0.0
+        for phase, elapsed in self._marks:
+            durations.append((phase, elapsed - previous))
+            previous = elapsed
+        return durations
+
+    def report(self):
+        """
+        Format the timeline as text.
+
+        Returns:
+            String with one line per phase.
+        """
+        lines = ["Startup timeline:"]
+        for (phase, duration), (_, elapsed) in zip(
+            self.durations(), self._marks
+        ):
+            lines.append(
+                f"  {phase:<12} {duration:8.1f} ms  (at {elapsed:8.1f} ms)"
+            )
+        return "\n".join(lines)
+
+    def write(self, path):
+        """
+        Write the timeline to a JSON file.
+
+        Args:
+            path: String, file to write.
+        """
+        with open(path, "w", encoding="utf-8") as timeline_file:
+            json.dump(
+                {
+                    "marks": dict(self._marks),
+                    "durations": dict(self.durations()),
+                },
+                timeline_file,
+                indent=2,
+            )
+
+    def first_frame_hook(self, output=None, warm_ups=()):
+        """
+        Create a frame hook that marks the first frame, reports the
+        timeline and then prepares resources that were left until after
+        the first frame.
+
+        Args:
+            output: String, "-" to print the report, a path to write it as
+            JSON, or None to only mark the frame.
+            warm_ups: Iterable of functions with no arguments, called once
+            the first frame is on screen.
+
+        Returns:
+            A function for CaptainForever.main_loop's frame_hooks.
+        """
+
+        def hook(frame):
+            if frame == 1:
+                self.mark("first_frame")
+                for warm_up in warm_ups:
+                    warm_up()
+                self.mark("warm_up")
+                if output == "-":
+                    print(self.report())
+                elif output is not None:
+                    self.write(output)
+            return False
+
+        return hook
+
+
+def measure_startup(extra_args=(), timeout=60):
+    """
+    Launch the game headless in a new process and return its startup
+    timeline.
+
+    Args:
+        extra_args: Iterable of strings, more command line arguments.
+        timeout: Float, seconds to wait for the game to exit.
+
+    Returns:
+        Dict, maps each phase to the ms from the start to its end.
+
+    Raises:
+        subprocess.CalledProcessError: If the game exits with an error.
+    """
+    directory = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "startup.json")
+        subprocess.run(
+            [
+                sys.executable,
+                os.path.join(directory, "__main__.py"),
+                "--headless",
+                "--frames",
+                "1",
+                "--no-trace",
+                "--startup-timeline",
+                path,
+                *extra_args,
+            ],
+            cwd=directory,
+            check=True,
+            stdout=subprocess.DEVNULL,
+            timeout=timeout,
+        )
+        with open(path, encoding="utf-8") as timeline_file:
+            return json.load(timeline_file)["marks"]
+
+
+startup_timeline = StartupTimeline()
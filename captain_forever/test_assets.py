@@ -0,0 +1,150 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# Disabling pylint warnings related to PyGame that aren't valid
+"""
+Test the SurfaceRegistry accounting and budgets and the cached sprite loaders.
+"""
+import pytest
+import pygame
+from assets import SurfaceRegistry, registry, surface_bytes
+from models import NPCShip
+from utils import (
+    load_sprite,
+    rotate_sprite,
+    rotated_mask,
+    sprite_mask,
+    tint_sprite,
+)
+
+pygame.init()
+WIDTH = 1082
+HEIGHT = 720
+screen = pygame.display.set_mode((WIDTH, HEIGHT))
+
+# a 10x10 32 bit surface holds 400 bytes of pixels
+budget_cases = [
+    # Check that the least recently used surfaces are evicted over budget
+    (1000, 2),
+    (800, 2),
+    (500, 1),
+    (None, 3),
+]
+
+
+def make_surface():
+    """
+    Create a small 32 bit surface.
+
+    Returns:
+        A 10x10 PyGame surface.
+    """
+    return pygame.Surface((10, 10), pygame.SRCALPHA)
+
+
+@pytest.mark.parametrize("budget, kept", budget_cases)
+def test_budget_evicts_least_recently_used(budget, kept):
+    """
+    Check that a derived cache over budget drops its oldest surfaces.
+
+    Args:
+        budget: Int, budget of the rotations cache in bytes, or None.
+        kept: Int, number of surfaces expected to remain cached.
+    """
+    surfaces = SurfaceRegistry({"rotations": budget})
+    for angle in range(3):
+        surfaces.put("rotations", angle, "ship", "rotated", make_surface())
+    assert surfaces.get("rotations", 2) is not None
+    assert surfaces.usage_by_cache()["rotations"] == kept * 400
+    assert surfaces.evictions["rotations"] == 3 - kept
+
+
+def test_budget_keeps_surfaces_in_use():
+    """
+    Check that surfaces something still holds are not evicted over budget,
+    so the registry never under reports the memory they take up.
+    """
+    surfaces = SurfaceRegistry({"tints": 500})
+    held = surfaces.put("tints", "green", "ship", "green", make_surface())
+    surfaces.put("tints", "red", "ship", "red", make_surface())
+    surfaces.put("tints", "blue", "ship", "blue", make_surface())
+    assert surfaces.get("tints", "green") is held
+    assert surfaces.get("tints", "red") is None
+    assert surfaces.usage_by_cache()["tints"] == 800
+    del held
+    surfaces.put("tints", "white", "ship", "white", make_surface())
+    assert surfaces.get("tints", "green") is None
+    assert surfaces.usage_by_cache()["tints"] == 400
+
+
+def test_usage_breakdown():
+    """
+    Check that usage is broken down by cache, asset and variant.
+    """
+    surfaces = SurfaceRegistry()
+    surfaces.put("sprites", "ship", "ship", "scaled", make_surface())
+    surfaces.put("tints", "ship green", "ship", "green", make_surface())
+    usage = surfaces.usage()
+    assert usage["total"] == 800
+    assert usage["cache"]["tints"] == 400
+    assert usage["asset"] == {"ship": 800}
+    assert usage["variant"] == {"ship/scaled": 400, "ship/green": 400}
+
+
+def test_sprites_cache_has_no_budget():
+    """
+    Check that assets loaded from disk cannot be given a budget.
+    """
+    with pytest.raises(ValueError):
+        SurfaceRegistry().set_budget("sprites", 0)
+
+
+def test_load_sprite_is_cached():
+    """
+    Check that loading a sprite twice returns the same surface.
+    """
+    sprite = load_sprite("fire", True, True)
+    assert load_sprite("fire", True, True) is sprite
+    assert surface_bytes(sprite) == 100 * 100 * 4
+
+
+def test_tint_does_not_change_sprite():
+    """
+    Check that NPC ships share a tinted copy instead of drawing on the
+    shared ship sprite.
+    """
+    sprite = load_sprite("ship", True, True)
+    original_pixels = pygame.image.tostring(sprite, "RGBA")
+    first = NPCShip((0, 0), "ship", [].append)
+    second = NPCShip((0, 0), "ship", [].append)
+    assert first.sprite is second.sprite is tint_sprite("ship", "green")
+    assert first.sprite is not sprite
+    assert pygame.image.tostring(sprite, "RGBA") == original_pixels
+
+
+def test_rotations_are_cached_per_degree():
+    """
+    Check that headings within half a degree share one rotated surface.
+    """
+    sprite = load_sprite("ship", True, True)
+    rotated = rotate_sprite(sprite, ("ship", "scaled"), 90.2)
+    assert rotate_sprite(sprite, ("ship", "scaled"), 89.8) is rotated
+    assert rotate_sprite(sprite, ("ship", "scaled"), 450) is rotated
+    assert registry.usage()["variant"]["ship/scaled rotated"] > 0
+
+
+def test_masks_are_cached_alongside_rotations():
+    """
+    Check that collision masks are cached per degree under the same keys as
+    the rotations they are made from.
+    """
+    sprite = load_sprite("ship", True, True)
+    mask = rotated_mask(sprite, ("ship", "scaled"), 45.3)
+    assert rotated_mask(sprite, ("ship", "scaled"), 405) is mask
+    assert (
+        mask.get_size()
+        == rotate_sprite(sprite, ("ship", "scaled"), 45).get_size()
+    )
+    assert (
+        sprite_mask(sprite, ("ship", "scaled")).get_size() == sprite.get_size()
+    )
+    assert registry.usage()["variant"]["ship/scaled rotated mask"] > 0
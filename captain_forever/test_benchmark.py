@@ -0,0 +1,75 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# Disabling pylint warnings related to PyGame that aren't valid
+"""
+Test the benchmark suite's statistics, scenarios and regression check.
+"""
+import json
+import pytest
+from benchmark import compare_results, main, run_benchmarks, summarize
+
+compare_cases = [
+    # Check that only slowdowns beyond the threshold are regressions
+    (1.0, 1.05, False),
+    (1.0, 1.2, True),
+    (1.0, 0.5, False),
+]
+
+
+def test_summarize():
+    """
+    Check that summarize reduces samples to the expected statistics.
+    """
+    summary = summarize([4.0, 1.0, 3.0, 2.0])
+    assert summary["runs"] == 4
+    assert summary["min_ms"] == 1.0
+    assert summary["max_ms"] == 4.0
+    assert summary["median_ms"] == 2.5
+    assert summary["mean_ms"] == 2.5
+
+
+@pytest.mark.parametrize("baseline_ms, current_ms, regressed", compare_cases)
+def test_compare_results(baseline_ms, current_ms, regressed):
+    """
+    Check that compare_results flags regressions against a baseline.
+
+    Args:
+        baseline_ms: Float, median time in the baseline run.
+        current_ms: Float, median time in the current run.
+        regressed: Bool, whether a regression should be flagged.
+    """
+    baseline = {"results": {"idle_world.view_draw": {"median_ms": baseline_ms}}}
+    current = {"results": {"idle_world.view_draw": {"median_ms": current_ms}}}
+    ((name, _, _, _, flagged),) = compare_results(baseline, current, 0.10)
+    assert name == "idle_world.view_draw"
+    assert flagged == regressed
+
+
+def test_run_benchmarks():
+    """
+    Check that a short run times the game logic and the view.
+    """
+    report = run_benchmarks(("idle_world", "rapid_restarts"), ticks=2)
+    assert report["results"]["idle_world.process_game_logic"]["runs"] == 2
+    assert "idle_world.view_draw" in report["results"]
+    assert "idle_world.print_text" in report["results"]
+    assert "rapid_restarts.restart" in report["results"]
+
+
+def test_compare_command_exit_status(tmp_path):
+    """
+    Check that the compare command exits with 1 when there is a regression.
+
+    Args:
+        tmp_path: Pytest fixture, temporary directory for result files.
+    """
+    baseline_path = tmp_path / "baseline.json"
+    current_path = tmp_path / "current.json"
+    baseline_path.write_text(
+        json.dumps({"results": {"restart": {"median_ms": 1.0}}})
+    )
+    current_path.write_text(
+        json.dumps({"results": {"restart": {"median_ms": 2.0}}})
+    )
+    assert main(["compare", str(baseline_path), str(baseline_path)]) == 0
+    assert main(["compare", str(baseline_path), str(current_path)]) == 1
@@ -0,0 +1,105 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# pylint: disable=protected-access
+# Disabling pylint warnings related to PyGame that aren't valid
+# Disabling protected access because we need to read the profile directly
+"""
+Test the cProfile and tracemalloc captures and the command line entry point.
+"""
+import io
+import pstats
+from capture import CProfileCapture, TracemallocCapture, write_callgrind
+from cli import main
+
+
+def busy_work():
+    """
+    Do some work for the profiler to see.
+
+    Returns:
+        Int, sum of a range.
+    """
+    return sum(range(1000))
+
+
+def test_cprofile_capture_stops_after_frames(tmp_path):
+    """
+    Check that profiling stops and writes its files once the frame window
+    has passed.
+
+    Args:
+        tmp_path: Pytest fixture, temporary directory for output files.
+    """
+    pstats_path = str(tmp_path / "run.pstats")
+    callgrind_path = str(tmp_path / "callgrind.out")
+    capture = CProfileCapture(
+        frames=2, pstats_path=pstats_path, callgrind_path=callgrind_path
+    )
+    capture.start()
+    busy_work()
+    assert capture(1) is False
+    assert not (tmp_path / "run.pstats").exists()
+    capture(2)
+    stats = pstats.Stats(pstats_path)
+    assert any(function[2] == "busy_work" for function in stats.stats)
+    assert "fn=busy_work" in (tmp_path / "callgrind.out").read_text()
+
+
+def test_write_callgrind_calls(tmp_path):
+    """
+    Check that callgrind output records calls from caller to callee.
+
+    Args:
+        tmp_path: Pytest fixture, temporary directory for output files.
+    """
+    capture = CProfileCapture()
+    capture.start()
+    busy_work()
+    capture._profile.disable()
+    stats = pstats.Stats(capture._profile)
+    path = tmp_path / "callgrind.out"
+    write_callgrind(stats, str(path))
+    text = path.read_text()
+    assert text.startswith("# callgrind format")
+    assert "calls=1" in text
+
+
+def test_tracemalloc_capture_prints_top_allocators():
+    """
+    Check that a snapshot is taken and reported every interval frames.
+    """
+    stream = io.StringIO()
+    capture = TracemallocCapture(interval=2, top=3, stream=stream)
+    capture.start()
+    kept = [bytearray(1000) for _ in range(50)]
+    capture(1)
+    assert stream.getvalue() == ""
+    capture(2)
+    capture.finish()
+    assert "Top allocators per frame, frames 0-2" in stream.getvalue()
+    assert "test_capture.py" in stream.getvalue()
+    assert len(kept) == 50
+
+
+def test_cli_headless_frames(tmp_path):
+    """
+    Check that the command line runs a fixed number of headless frames
+    under cProfile and writes the pstats file.
+
+    Args:
+        tmp_path: Pytest fixture, temporary directory for output files.
+    """
+    pstats_path = tmp_path / "run.pstats"
+    main(
+        [
+            "--headless",
+            "--frames",
+            "3",
+            "--max-fps",
+            "0",
+            "--pstats-out",
+            str(pstats_path),
+        ]
+    )
+    stats = pstats.Stats(str(pstats_path))
+    assert any(function[2] == "draw" for function in stats.stats)
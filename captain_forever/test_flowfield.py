@@ -0,0 +1,139 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# pylint: disable=protected-access
+# Disabling pylint warnings related to PyGame that aren't valid
+# Disabling protected access because we need to modify private vars to test
+# certain conditions
+"""
+Test the flow field NPC ships steer by.
+"""
+import random
+import numpy as np
+import pytest
+import pygame
+from pygame import Vector2
+from game import CaptainForever
+from models import NPCShip
+from flowfield import FlowField, positions_of
+
+pygame.init()
+WIDTH = 1082
+HEIGHT = 720
+screen = pygame.display.set_mode((WIDTH, HEIGHT))
+
+heading_cases = [
+    # Check ships far to each side of the target head towards it
+    ((24, 360), (1, 0)),
+    ((1058, 360), (-1, 0)),
+    ((552, 24), (0, 1)),
+    ((552, 696), (0, -1)),
+]
+
+
+@pytest.mark.parametrize("position, heading", heading_cases)
+def test_headings_point_at_target(position, heading):
+    """
+    Check that a ship is told to head straight for the target.
+
+    Args:
+        position: Tuple, x and y of the ship.
+        heading: Tuple, x and y of the expected heading.
+    """
+    field = FlowField(WIDTH, HEIGHT)
+    headings, distances, pushes = field.update(
+        (552, 360), np.array([position], np.float32)
+    )
+    assert headings[0] == pytest.approx(heading, abs=0.05)
+    assert distances[0] == pytest.approx(
+        Vector2(position).distance_to((552, 360)), abs=40
+    )
+    assert not pushes.any()
+
+
+def test_ships_in_target_cell_head_for_target():
+    """
+    Check that ships in the cell whose center is on the target head
+    straight for it, and that a ship right on the target, with nowhere to
+    head, does not break steering.
+    """
+    field = FlowField(WIDTH, HEIGHT)
+    headings, distances, _ = field.update(
+        (552, 360), np.array([(540, 360), (552, 360)], np.float32)
+    )
+    assert headings[0] == pytest.approx((1, 0))
+    assert distances[0] == pytest.approx(12)
+    assert not headings[1].any() and distances[1] == 0
+    npc_ship = NPCShip(Vector2(552, 360), "ship", [].append)
+    npc_ship.follow(
+        headings[1].tolist(), float(distances[1]), (0, 0), WIDTH, HEIGHT
+    )
+    assert npc_ship.position == Vector2(552, 360)
+
+
+def test_ships_in_one_cell_are_pushed_apart():
+    """
+    Check that ships sharing a cell are pushed away from each other, no
+    further than the longest push.
+    """
+    field = FlowField(WIDTH, HEIGHT, max_push=1.5)
+    positions = np.array([(100, 100), (110, 100), (100, 110)], np.float32)
+    _, _, pushes = field.update((600, 600), positions)
+    assert pushes[1][0] > pushes[0][0]
+    assert pushes[2][1] > pushes[0][1]
+    assert np.hypot(pushes[:, 0], pushes[:, 1]).max() <= 1.5 + 1e-6
+
+
+def test_crowd_pushes_neighbours_away():
+    """
+    Check that a ship next to a crowded cell is pushed away from it.
+    """
+    field = FlowField(WIDTH, HEIGHT, cell_size=48)
+    crowd = [(72, 72)] * 5
+    positions = np.array([*crowd, (120, 72)], np.float32)
+    _, _, pushes = field.update((600, 600), positions)
+    assert pushes[-1][0] > 0
+    assert field.density.sum() == pytest.approx(len(positions))
+
+
+def test_flow_field_spreads_swarm():
+    """
+    Check that a swarm steering by the flow field overlaps less than one
+    where every ship steers itself.
+    """
+    overlaps = []
+    for flow_field in (False, True):
+        game = CaptainForever(WIDTH, HEIGHT, seed=0, flow_field=flow_field)
+        game._enemy_spawn_counter = -(10**9)
+        game.player_ship._health = 10**9
+        position_random = random.Random(1)
+        game._npc_ships[:] = [
+            NPCShip(
+                Vector2(
+                    position_random.uniform(0, WIDTH),
+                    position_random.uniform(0, HEIGHT),
+                ),
+                "ship",
+                game.npc_bullets.append,
+            )
+            for _ in range(300)
+        ]
+        for _ in range(100):
+            game._move_game_objects()
+        positions = positions_of(game.npc_ships)
+        gaps = np.hypot(
+            *(positions[:, None] - positions[None]).transpose(2, 0, 1)
+        )
+        np.fill_diagonal(gaps, np.inf)
+        overlaps.append((gaps < 25).sum())
+    assert overlaps[1] < overlaps[0] * 0.8
+
+
+def test_game_plays_with_flow_field():
+    """
+    Check that a game with a flow field plays on and NPC ships still shoot.
+    """
+    game = CaptainForever(WIDTH, HEIGHT, seed=2, flow_field=True)
+    for _ in range(300):
+        game.step()
+    assert game.flow_field is not None
+    assert game.npc_bullets or game.message_flag
@@ -10,8 +10,10 @@ Test the ArrowController class to respond appropriately to key inputs.
 import unittest
 import pytest
 import pygame
+from pygame import Vector2
 from game import CaptainForever
 from models import Ship, NPCShip, StaticObject
+from serialization import encode_sector, load_game, load_sector, save_game
 
 pygame.init()
 WIDTH = 1082
@@ -169,3 +171,110 @@ class TestEndGameMessage(unittest.TestCase):
 # No tests for get_game_objects and _spawn_enemy_ships have been provided due to the
 # need to use Magic Mock, and Jess is unfamiliar with how to use it and believes it's
 # not expected that softdes students know how to use it.
+
+
+def test_sleeping_debris_is_not_updated():
+    """
+    Check that thousands of pieces of debris at rest are left out of the
+    update pass while staying in the collision grid, and that a bullet
+    wakes the piece it hits until it settles again.
+    """
+    game = CaptainForever(WIDTH, HEIGHT, seed=0)
+    game._debris[:] = [
+        StaticObject(
+            Vector2(20 + 40 * (i % 25), 20 + 40 * (i // 25)), "asteroid"
+        )
+        for i in range(5000)
+    ]
+    game._sort_sleepers()
+    positions = [rock.position for rock in game.debris]
+    game._move_game_objects()
+    assert game.entity_counts()["awake"] == 0
+    assert all(
+        rock.position is position
+        for rock, position in zip(game.debris, positions)
+    )
+    target = game.debris[30]
+    game.player_ship.shoot()
+    game.bullets[0]._position = Vector2(target.position)
+    game._check_bullet_collisions()
+    assert not game.bullets
+    assert game.entity_counts()["awake"] == 1
+    assert not target.asleep
+    while not target.asleep:
+        game._move_game_objects()
+    assert game.entity_counts()["awake"] == 0
+    assert len(game._debris_grid) == 5000
+    assert target in game._debris_grid.query(
+        target.position.x - 1, target.position.y - 1, 2, 2
+    )
+
+
+def test_push_wakes_fires():
+    """
+    Check that pushing a fire puts it in the update pass until it settles,
+    without it ever stopping bullets.
+    """
+    game = CaptainForever(WIDTH, HEIGHT, seed=0)
+    fire = StaticObject(Vector2(600, 600), "fire")
+    game.fires.append(fire)
+    game.push(fire, Vector2(0, -2))
+    assert game.entity_counts()["awake"] == 1
+    game._move_game_objects()
+    assert fire.position.y < 600
+    assert len(game._debris_grid) == 0
+    while not fire.asleep:
+        game._move_game_objects()
+    assert game.entity_counts()["awake"] == 0
+    assert len(game._debris_grid) == 0
+
+
+def test_burnt_out_fire_stops_moving():
+    """
+    Check that a pushed fire that burns out leaves the update pass.
+    """
+    game = CaptainForever(WIDTH, HEIGHT, seed=0)
+    fire = StaticObject(Vector2(600, 600), "fire")
+    game.fires.append(fire)
+    game.push(fire, Vector2(0, -2))
+    game.counter = 49
+    game._expire_fires()
+    assert not game.fires
+    assert game.entity_counts()["awake"] == 0
+
+
+def test_push_moves_debris_in_the_grid():
+    """
+    Check that pushed debris is told apart from fires and moves within the
+    collision grid.
+    """
+    game = CaptainForever(WIDTH, HEIGHT, seed=0)
+    rock = StaticObject(Vector2(300, 300), "asteroid")
+    game._debris[:] = [rock]
+    game._sort_sleepers()
+    game.push(rock, Vector2(200, 0))
+    assert game._awake == {rock: True}
+    game._move_game_objects()
+    assert game._debris_grid.query(295, 295, 10, 10) == []
+    assert game._debris_grid.query(495, 295, 10, 10) == [rock]
+
+
+def test_moving_fire_is_saved():
+    """
+    Check that a pushed fire keeps moving after the game is saved and
+    loaded, or frozen in a sector and thawed.
+    """
+    game = CaptainForever(WIDTH, HEIGHT, seed=0)
+    fire = StaticObject(Vector2(600, 600), "fire")
+    game.fires.extend((StaticObject(Vector2(100, 100), "fire"), fire))
+    game.push(fire, Vector2(0, -2))
+    other = CaptainForever(WIDTH, HEIGHT, seed=1)
+    load_game(other, save_game(game))
+    assert [loaded.velocity for loaded in other.fires] == [
+        Vector2(0),
+        fire.velocity,
+    ]
+    assert other.entity_counts()["awake"] == 1
+    _, fires, _ = load_sector(encode_sector([], game.fires, []), [].append)
+    assert [thawed.velocity for thawed in fires] == [Vector2(0), fire.velocity]
+    assert not fires[1].asleep
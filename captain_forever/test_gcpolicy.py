@@ -0,0 +1,171 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# pylint: disable=protected-access
+# Disabling pylint warnings related to PyGame that aren't valid
+# Disabling protected access because we need to modify private vars to test
+# certain conditions
+"""
+Test the policy that decides when the garbage collector runs.
+"""
+import gc
+import pytest
+import pygame
+from game import CaptainForever
+from gcpolicy import GCPolicy
+from pacing import FramePacer
+from profiler import FrameProfiler
+
+pygame.init()
+WIDTH = 1082
+HEIGHT = 720
+screen = pygame.display.set_mode((WIDTH, HEIGHT))
+
+slack_cases = [
+    # Check that young objects are collected when there is time to spare
+    (10, 1000, 1),
+    # Check that nothing is collected when the next frame is nearly due
+    (1, 1000, 0),
+    # Check that slack is not spent on a handful of young objects
+    (10, 0, 0),
+]
+
+
+def _make_cycles(count):
+    """
+    Create lists that refer to themselves and drop them.
+
+    Args:
+        count: Int, number of lists to create.
+    """
+    for _ in range(count):
+        cycle = []
+        cycle.append(cycle)
+
+
+@pytest.fixture(name="policy")
+def fixture_policy():
+    """
+    Create a started policy reporting to an enabled profiler and stop it
+    afterwards, so other tests get the collector back as it was.
+
+    Yields:
+        A started GCPolicy instance.
+    """
+    policy = GCPolicy(FrameProfiler(enabled=True), min_gen0=500)
+    policy.start()
+    yield policy
+    policy.stop()
+
+
+def test_start_and_stop_restore_thresholds():
+    """
+    Check that automatic collection is off during play and the original
+    thresholds are back afterwards, with nothing left frozen.
+    """
+    original = gc.get_threshold()
+    policy = GCPolicy(FrameProfiler(), gen0_threshold=0)
+    policy.start()
+    assert gc.get_threshold() == (0, *original[1:])
+    assert policy._on_collection in gc.callbacks
+    policy.freeze()
+    assert gc.get_freeze_count() > 0
+    policy.stop()
+    assert gc.get_threshold() == original
+    assert policy._on_collection not in gc.callbacks
+    assert gc.get_freeze_count() == 0
+
+
+def test_pauses_are_reported_per_frame(policy):
+    """
+    Check that collections are timed into the frame they happen in and
+    the profiler's gc phase.
+
+    Args:
+        policy: A started GCPolicy instance.
+    """
+    game = CaptainForever(WIDTH, HEIGHT, seed=0)
+    hook = policy.frame_hook(game)
+    profiler = policy._profiler
+    profiler.begin_frame()
+    _make_cycles(1000)
+    gc.collect(0)
+    profiler.end_frame(game)
+    hook(2)
+    profiler.begin_frame()
+    profiler.end_frame(game)
+    hook(3)
+    assert policy.frame_pauses[0] > 0
+    assert policy.frame_pauses[1] == 0
+    assert profiler.average("gc") > 0
+    assert policy.stats()["collections"][0] >= 1
+
+
+@pytest.mark.parametrize("remaining_ms, garbage, collected", slack_cases)
+def test_collect_in_slack(policy, remaining_ms, garbage, collected):
+    """
+    Check when young objects are collected in the slack before a frame.
+
+    Args:
+        policy: A started GCPolicy instance.
+        remaining_ms: Float, ms until the next frame is due.
+        garbage: Int, number of cycles dropped beforehand.
+        collected: Int, number of collections expected.
+    """
+    gc.collect(1)
+    _make_cycles(garbage)
+    policy.collect_in_slack(remaining_ms / 1000)
+    assert policy.stats()["slack"] == collected
+
+
+def test_pacer_hands_slack_to_tasks():
+    """
+    Check that the pacer runs slack tasks with the time left in the frame.
+    """
+    pacer = FramePacer(max_fps=60)
+    slack = []
+    pacer.add_slack_task(slack.append)
+    for _ in range(3):
+        pacer.wait()
+    assert len(slack) == 3
+    assert all(0 <= remaining <= 1 / 60 for remaining in slack)
+
+
+def test_young_objects_are_forced_out(policy):
+    """
+    Check that a frame collects young objects without slack once there are
+    too many of them.
+
+    Args:
+        policy: A started GCPolicy instance.
+    """
+    policy._max_gen0 = 500
+    hook = policy.frame_hook(CaptainForever(WIDTH, HEIGHT, seed=0))
+    gc.collect(1)
+    _make_cycles(1000)
+    hook(2)
+    assert policy.stats()["forced"] == 1
+    assert gc.get_count()[0] < 500
+
+
+def test_full_collection_once_per_game_over(policy):
+    """
+    Check that the game is frozen on its first frame and collected in full
+    once each time a game is over.
+
+    Args:
+        policy: A started GCPolicy instance.
+    """
+    game = CaptainForever(WIDTH, HEIGHT, seed=0)
+    hook = policy.frame_hook(game)
+    hook(1)
+    assert policy.stats()["collections"][2] == 1
+    assert gc.get_freeze_count() > 0
+    game._message_flag = "lost"
+    for frame in range(2, 5):
+        hook(frame)
+    assert policy.stats()["collections"][2] == 2
+    game.restart()
+    hook(5)
+    game._message_flag = "lost"
+    hook(6)
+    assert policy.stats()["collections"][2] == 3
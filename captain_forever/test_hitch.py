@@ -0,0 +1,255 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# pylint: disable=protected-access
+# Disabling pylint warnings related to PyGame that aren't valid
+# Disabling protected access because we need to check private vars to test
+# certain conditions
+"""
+Test the hitch detector, its capture bundles and replaying them.
+"""
+import json
+import os
+import random
+from time import perf_counter, sleep
+import pytest
+import pygame
+from pygame import Vector2
+from game import CaptainForever
+from controller import RemoteController
+from hitch import HitchDetector, StackSampler, replay_bundle
+from rollback import _world_state
+from sectors import SectorWorld
+from serialization import StateReader, play_replay
+
+pygame.init()
+WIDTH = 1082
+HEIGHT = 720
+screen = pygame.display.set_mode((WIDTH, HEIGHT))
+
+window_cases = [
+    # Check a hitch before a second state has been kept
+    (50, 30),
+    # Check that older input is dropped once later states have been kept
+    (20, 70),
+    (20, 61),
+]
+
+
+def _play(detector, game, controller, frames, slow_frame=None):
+    """
+    Play frames with random buttons, calling the detector after each one.
+
+    Args:
+        detector: HitchDetector instance.
+        game: CaptainForever instance.
+        controller: RemoteController steering the game.
+        frames: Int, number of frames to play.
+        slow_frame: Int, frame made slow by sleeping, or None.
+    """
+    button_random = random.Random(3)
+    for frame in range(1, frames + 1):
+        controller.set_buttons(button_random.randrange(32))
+        controller.maneuver_player_ship()
+        game.step()
+        if frame == slow_frame:
+            sleep(0.06)
+        detector(frame)
+
+
+@pytest.mark.parametrize("history, frames", window_cases)
+def test_bundle_replays_to_hitch(tmp_path, history, frames):
+    """
+    Check that a slow frame writes a bundle whose replay ends in the state
+    the game was in at the hitch.
+
+    Args:
+        tmp_path: Pytest fixture, temporary directory for bundles.
+        history: Int, frames kept and ticks between kept states.
+        frames: Int, frame the hitch happens on.
+    """
+    game = CaptainForever(WIDTH, HEIGHT, seed=1)
+    controller = RemoteController(game, WIDTH, HEIGHT)
+    detector = HitchDetector(
+        game, controller, 50, history, output_dir=str(tmp_path)
+    )
+    _play(detector, game, controller, frames, slow_frame=frames)
+    assert detector.bundles == [os.path.join(tmp_path, f"hitch-{frames:06d}")]
+    with open(
+        os.path.join(detector.bundles[0], "hitch.json"), encoding="utf-8"
+    ) as bundle_file:
+        bundle = json.load(bundle_file)
+    assert bundle["frame_ms"] > 50
+    assert len(bundle["frames"]) == min(history, frames)
+    assert bundle["frames"][-1]["entities"] == game.entity_counts()
+    ticks = bundle["replay"]["ticks"]
+    assert 0 < ticks < frames
+    with open(
+        os.path.join(detector.bundles[0], "replay.cfst"), "rb"
+    ) as replay_file:
+        data = replay_file.read()
+    assert len(StateReader(data).inputs()[1]) == ticks
+    replayed = CaptainForever(WIDTH, HEIGHT)
+    play_replay(replayed, data)
+    assert _world_state(replayed) == _world_state(game)
+
+
+def test_paused_frames_and_restarts():
+    """
+    Check that frames without a tick record no input, and that a restart
+    drops the input from before it.
+    """
+    game = CaptainForever(WIDTH, HEIGHT, seed=1)
+    controller = RemoteController(game, WIDTH, HEIGHT)
+    detector = HitchDetector(game, controller, 50, 20)
+    _play(detector, game, controller, 10)
+    for frame in range(11, 14):
+        detector(frame)
+    assert [record["ticked"] for record in detector.frames][-4:] == [
+        True,
+        False,
+        False,
+        False,
+    ]
+    assert len(detector._keyframes[-1][2]) == 9
+    game.restart()
+    game.step()
+    detector(14)
+    assert len(detector._keyframes) == 1
+    assert detector._keyframes[0][2] == []
+
+
+def test_warm_up_and_bundle_limit(tmp_path):
+    """
+    Check that the first frames are never hitches and no more than the
+    most bundles are written.
+
+    Args:
+        tmp_path: Pytest fixture, temporary directory for bundles.
+    """
+    game = CaptainForever(WIDTH, HEIGHT, seed=1)
+    controller = RemoteController(game, WIDTH, HEIGHT)
+    detector = HitchDetector(
+        game, controller, 0, output_dir=str(tmp_path), max_bundles=2
+    )
+    _play(detector, game, controller, 6)
+    assert [os.path.basename(path) for path in detector.bundles] == [
+        "hitch-000003",
+        "hitch-000004",
+    ]
+
+
+def _busy(seconds):
+    """
+    Keep the CPU busy.
+
+    Args:
+        seconds: Float, how long to keep busy for.
+    """
+    end = perf_counter() + seconds
+    while perf_counter() < end:
+        pass
+
+
+def test_stack_sampler():
+    """
+    Check that stacks sampled during a window are counted and those from
+    outside it are not.
+    """
+    sampler = StackSampler(interval_ms=1)
+    sampler.start()
+    _busy(0.05)
+    start = perf_counter()
+    sleep(0.05)
+    end = perf_counter()
+    sampler.stop()
+    stacks = sampler.collapsed(start, end)
+    assert stacks
+    assert all("_busy" not in stack for stack, _ in stacks)
+    assert "test_stack_sampler" in stacks[0][0]
+
+
+def test_replay_bundle(tmp_path):
+    """
+    Check that replaying a bundle times every tick, with its phases.
+
+    Args:
+        tmp_path: Pytest fixture, temporary directory for bundles.
+    """
+    game = CaptainForever(WIDTH, HEIGHT, seed=1)
+    controller = RemoteController(game, WIDTH, HEIGHT)
+    detector = HitchDetector(game, controller, 50, output_dir=str(tmp_path))
+    _play(detector, game, controller, 40, slow_frame=40)
+    result = replay_bundle(detector.bundles[0], repeat=2)
+    assert len(result["ticks"]) == 39
+    assert result["recorded_ms"] > 50
+    slowest = result["ticks"][result["slowest"]]
+    assert slowest["ms"] == max(tick["ms"] for tick in result["ticks"])
+    assert "logic" in slowest["phases"]
+    assert "draw" in slowest["phases"]
+
+
+def test_bundle_replays_in_its_world(tmp_path):
+    """
+    Check that a bundle from a game in a sector world records the world and
+    replays into the same sectors.
+
+    Args:
+        tmp_path: Pytest fixture, temporary directory for bundles.
+    """
+    game = CaptainForever(
+        WIDTH,
+        HEIGHT,
+        seed=1,
+        world=SectorWorld(WIDTH, HEIGHT, seed=0, budget_bytes=8192),
+    )
+    game.player_ship._position = Vector2(WIDTH - 60, 300)
+    game.player_ship._velocity = Vector2(5, 0)
+    controller = RemoteController(game, WIDTH, HEIGHT)
+    detector = HitchDetector(game, controller, 50, output_dir=str(tmp_path))
+    _play(detector, game, controller, 40, slow_frame=40)
+    assert game.world.sector != (0, 0)
+    with open(
+        os.path.join(detector.bundles[0], "hitch.json"), encoding="utf-8"
+    ) as bundle_file:
+        settings = json.load(bundle_file)["game"]["world"]
+    assert settings == game.world.settings()
+    with open(
+        os.path.join(detector.bundles[0], "replay.cfst"), "rb"
+    ) as replay_file:
+        data = replay_file.read()
+    replayed = CaptainForever(
+        WIDTH, HEIGHT, world=SectorWorld(WIDTH, HEIGHT, **settings)
+    )
+    play_replay(replayed, data)
+    assert replayed.world.sector == game.world.sector
+    assert _world_state(replayed) == _world_state(game)
+    result = replay_bundle(detector.bundles[0], draw=False, repeat=1)
+    assert len(result["ticks"]) == 39
+
+
+def test_bundle_replays_modular_ships(tmp_path):
+    """
+    Check that a bundle from a game of modular ships records their part
+    count and replays with the ships' parts.
+
+    Args:
+        tmp_path: Pytest fixture, temporary directory for bundles.
+    """
+    game = CaptainForever(WIDTH, HEIGHT, seed=1, modular_parts=4)
+    controller = RemoteController(game, WIDTH, HEIGHT)
+    detector = HitchDetector(game, controller, 50, output_dir=str(tmp_path))
+    _play(detector, game, controller, 40, slow_frame=40)
+    with open(
+        os.path.join(detector.bundles[0], "hitch.json"), encoding="utf-8"
+    ) as bundle_file:
+        assert json.load(bundle_file)["game"]["modular_parts"] == 4
+    with open(
+        os.path.join(detector.bundles[0], "replay.cfst"), "rb"
+    ) as replay_file:
+        data = replay_file.read()
+    replayed = CaptainForever(WIDTH, HEIGHT, modular_parts=4)
+    play_replay(replayed, data)
+    assert [len(ship.hull) for ship in replayed.npc_ships] == [
+        len(ship.hull) for ship in game.npc_ships
+    ]
+    assert _world_state(replayed) == _world_state(game)
@@ -199,6 +199,18 @@ npc_move_rotate_cases = [
     ((0.5, 0.5), 8),
 ]
 
+# offsets of a bullet from an NPC ship, whether the circles overlap and
+# whether any opaque pixels do
+precise_collide_cases = [
+    # on top of the ship both tests collide
+    ((0, 0), True, True),
+    # in a transparent corner of the ship only the circles overlap
+    ((-6, -24), True, False),
+    ((-6, 24), True, False),
+    # far from the ship neither test collides
+    ((60, 0), False, False),
+]
+
 # Check NPC velocities are being altered correctly for different cases in move
 npc_move_velocity_cases = [
     # rotates but has zero velocity if not facing the player
@@ -242,6 +254,53 @@ def test_collide_cases(collider, collision_bool):
     assert test_object.collides_with(collider) == collision_bool
 
 
+@pytest.mark.parametrize("offset, circle, precise", precise_collide_cases)
+def test_precise_collide_cases(offset, circle, precise):
+    """
+    Check that precise collisions only count overlapping opaque pixels.
+
+    Args:
+        offset: Tuple, x and y of the bullet relative to the ship.
+        circle: Bool, whether the circle test collides.
+        precise: Bool, whether the precise test collides.
+    """
+    npc_ship = NPCShip(Vector2(200), "ship", test_game.bullets.append)
+    bullet = Bullet(Vector2(200) + Vector2(offset), Vector2(0))
+    assert npc_ship.collides_with(bullet) == circle
+    assert npc_ship.collides_with(bullet, precise=True) == precise
+    assert bullet.collides_with(npc_ship, precise=True) == precise
+
+
+def test_colliding_matches_collides_with():
+    """
+    Check that colliding picks out the same objects as calling
+    collides_with on each of them, with and without precise collisions.
+    """
+    npc_ship = NPCShip(Vector2(200), "ship", test_game.bullets.append)
+    others = [
+        Bullet(Vector2(200) + Vector2(offset), Vector2(0))
+        for offset, _, _ in precise_collide_cases
+    ]
+    others.append(NPCShip(Vector2(230), "ship", test_game.bullets.append))
+    for precise in (False, True):
+        assert npc_ship.colliding(others, precise) == [
+            other for other in others if npc_ship.collides_with(other, precise)
+        ]
+
+
+def test_precise_collisions_follow_heading():
+    """
+    Check that a ship's mask turns with the ship.
+    """
+    npc_ship = NPCShip(Vector2(200), "ship", test_game.bullets.append)
+    bullet = Bullet(Vector2(200) + Vector2(-6, -24), Vector2(0))
+    hits = set()
+    for _ in range(120):
+        npc_ship.rotate(True)
+        hits.add(npc_ship.collides_with(bullet, precise=True))
+    assert hits == {True, False}
+
+
 @pytest.mark.parametrize("velocity, distance_change", GameObject_move_cases)
 def test_move_cases(velocity, distance_change):
     """
@@ -446,3 +505,25 @@ def test_npc_move_velocity_cases(heading, npc_position, velocity_change):
     change_bool = test_game.npc_ship.velocity == Vector2(0)
     # Check if health is the correct value.
     assert velocity_change == change_bool
+
+
+def test_static_object_sleeps_until_pushed():
+    """
+    Check that a static object at rest is asleep and does not move, wakes
+    up when pushed, and slows down until it falls asleep again.
+    """
+    rock = StaticObject(Vector2(300, 300), "asteroid")
+    position = rock.position
+    assert rock.asleep
+    rock.move(WIDTH, HEIGHT)
+    assert rock.position is position
+    rock.push(Vector2(1, 0))
+    assert not rock.asleep
+    ticks = 0
+    while not rock.asleep:
+        rock.move(WIDTH, HEIGHT)
+        ticks += 1
+    assert 0 < ticks < 200
+    assert rock.velocity == Vector2(0)
+    assert rock.position.x > 300
+    assert not NPCShip(Vector2(0), "ship", test_game.npc_bullets.append).asleep
@@ -0,0 +1,284 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# pylint: disable=protected-access
+# Disabling pylint warnings related to PyGame that aren't valid
+# Disabling protected access because we need to modify private vars to test
+# certain conditions
+"""
+Test modular ships and the bounding volume hierarchy over their parts.
+"""
+from math import hypot
+import random
+import pytest
+import pygame
+from pygame import Vector2
+from game import CaptainForever
+from models import Bullet, GameObject, NPCShip
+from modular import (
+    BoundingVolumeHierarchy,
+    ModularShip,
+    Part,
+    build_modular_ship,
+    merge_circles,
+)
+from rollback import _world_state
+from serialization import load_game, save_game
+
+pygame.init()
+WIDTH = 1082
+HEIGHT = 720
+screen = pygame.display.set_mode((WIDTH, HEIGHT))
+
+merge_cases = [
+    # Check that a circle inside another merges into the outer one
+    ((0, 0, 10), (2, 0, 3), (0, 0, 10)),
+    ((2, 0, 3), (0, 0, 10), (0, 0, 10)),
+    # Check that circles side by side merge into one touching both
+    ((0, 0, 5), (20, 0, 5), (10, 0, 15)),
+    ((0, 0, 10), (0, 30, 0), (0, 10, 20)),
+]
+
+
+def _enclosed(node):
+    """
+    Check every circle of a subtree encloses its leaves and every height
+    matches its children, and return the subtree's leaves.
+
+    Args:
+        node: _Node instance at the top of the subtree.
+
+    Returns:
+        List of leaf _Node instances.
+    """
+    if node.children is None:
+        return [node]
+    leaves = []
+    for child in node.children:
+        assert child.parent is node
+        leaves.extend(_enclosed(child))
+    x, y, radius = node.circle
+    for leaf in leaves:
+        leaf_x, leaf_y, leaf_radius = leaf.circle
+        assert hypot(leaf_x - x, leaf_y - y) + leaf_radius <= radius + 1e-6
+    assert node.height == 1 + max(child.height for child in node.children)
+    return leaves
+
+
+def _ship(parts, seed=0):
+    """
+    Grow a modular ship at the middle of the screen.
+
+    Args:
+        parts: Int, number of parts to try to attach besides the core.
+        seed: Int, seed the layout is drawn from.
+
+    Returns:
+        A ModularShip instance.
+    """
+    return build_modular_ship(
+        Vector2(WIDTH / 2, HEIGHT / 2), [].append, parts, random.Random(seed)
+    )
+
+
+@pytest.mark.parametrize("first, second, merged", merge_cases)
+def test_merge_circles(first, second, merged):
+    """
+    Check the smallest circle enclosing two circles.
+
+    Args:
+        first: Tuple, x, y and radius of a circle.
+        second: Tuple, x, y and radius of a circle.
+        merged: Tuple, x, y and radius of the circle expected.
+    """
+    assert merge_circles(first, second) == pytest.approx(merged)
+
+
+def test_hierarchy_stays_fitted_and_balanced():
+    """
+    Check that circles enclose their parts and the tree stays shallow as
+    parts are added in a line and taken out again.
+    """
+    hierarchy = BoundingVolumeHierarchy()
+    parts = [Part("ship", (20 * index, 0), 10) for index in range(64)]
+    for part in parts:
+        hierarchy.insert(part)
+    assert len(_enclosed(hierarchy._root)) == 64
+    assert hierarchy.depth() <= 9
+    for part in parts[::2]:
+        hierarchy.remove(part)
+    assert len(_enclosed(hierarchy._root)) == 32
+    assert hierarchy.depth() <= 8
+    for part in parts[1::2]:
+        hierarchy.remove(part)
+    assert hierarchy.bounds() is None
+    assert hierarchy.depth() == 0
+
+
+def test_query_matches_every_part():
+    """
+    Check that queries find exactly the parts a brute force search finds,
+    while testing fewer circles than there are parts.
+    """
+    hierarchy = _ship(60).hull.hierarchy
+    parts = list(hierarchy._leaves)
+    generator = random.Random(1)
+    tests = []
+    for _ in range(200):
+        x = generator.uniform(-250, 250)
+        y = generator.uniform(-250, 250)
+        radius = generator.uniform(1, 20)
+        expected = {
+            part
+            for part in parts
+            if hypot(part.offset.x - x, part.offset.y - y)
+            < part.radius + radius
+        }
+        assert set(hierarchy.query(x, y, radius)) == expected
+        tests.append(hierarchy.tests)
+    assert sum(tests) / len(tests) < len(parts)
+
+
+def test_detach_breaks_off_the_subtree():
+    """
+    Check that detaching a part takes everything attached to it along,
+    shrinks the ship's reach and leaves the core in place.
+    """
+    ship = ModularShip(Vector2(500, 300), "ship", [].append)
+    chain = [ship.core]
+    for index in range(1, 6):
+        part = Part("ship", (0, -10 - 20 * index), 10)
+        ship.attach(part, chain[-1])
+        chain.append(part)
+    assert len(ship.hull) == 6
+    reach = ship.radius
+    assert ship.detach(chain[3]) == chain[3:]
+    assert len(ship.hull) == 3
+    assert ship.radius < reach
+    assert not chain[2].children
+    assert len(_enclosed(ship.hull.hierarchy._root)) == 3
+    with pytest.raises(ValueError):
+        ship.detach(ship.core)
+
+
+def test_hits_follow_the_ship_heading():
+    """
+    Check that parts are hit where the ship's heading has turned them to.
+    """
+    ship = ModularShip(Vector2(500, 300), "ship", [].append)
+    nose = Part("ship", (0, -40), 10)
+    ship.attach(nose)
+    ahead = Bullet(Vector2(500, 260), Vector2(0))
+    right = Bullet(Vector2(540, 300), Vector2(0))
+    assert ship.part_hit_by(ahead) is nose
+    assert ship.part_hit_by(right) is None
+    ship._direction = Vector2(1, 0)
+    assert ship.part_hit_by(ahead) is None
+    assert ship.part_hit_by(right) is nose
+    assert ship.to_screen(nose) == Vector2(540, 300)
+    assert ship.part_hit_by(Bullet(Vector2(500, 300), Vector2(0))) is (
+        ship.core
+    )
+
+
+def test_build_is_deterministic_without_overlaps():
+    """
+    Check that a ship grows the same from the same seed and its parts do
+    not overlap.
+    """
+    ship = _ship(50, seed=4)
+    again = _ship(50, seed=4)
+    parts = ship.hull.parts()
+    assert len(parts) == 51
+    assert [part.offset for part in parts] == [
+        part.offset for part in again.hull.parts()
+    ]
+    for index, part in enumerate(parts):
+        for other in parts[index + 1 :]:
+            distance = part.offset.distance_to(other.offset)
+            assert distance >= part.radius + other.radius - 0.5
+
+
+def test_saved_state_keeps_parts():
+    """
+    Check that a saved ship gets back parts broken off after it was saved,
+    each time it is restored.
+    """
+    ship = _ship(20)
+    saved = ship.save_state()
+    ship.detach(ship.core.children[0])
+    for _ in range(2):
+        restored = GameObject.from_state(saved)
+        assert len(restored.hull) == 21
+        assert len(_enclosed(restored.hull.hierarchy._root)) == 21
+        restored.detach(restored.core.children[0])
+    assert len(ship.hull) < 21
+
+
+def test_bullets_break_off_parts():
+    """
+    Check that a bullet hitting a part is stopped and breaks the part off,
+    and the ship is only destroyed along with its core.
+    """
+    game = CaptainForever(WIDTH, HEIGHT, seed=0)
+    ship = ModularShip(Vector2(500, 300), "ship", game.npc_bullets.append)
+    nose = Part("ship", (0, -40), 10)
+    ship.attach(nose)
+    game._npc_ships[:] = [ship]
+    game.bullets.append(Bullet(Vector2(500, 260), Vector2(0)))
+    game.bullets.append(Bullet(Vector2(100, 100), Vector2(0)))
+    game._check_bullet_collisions()
+    assert len(game.bullets) == 1
+    assert len(ship.hull) == 1
+    assert game.npc_ships == [ship]
+    for expected_ships in ([ship], []):
+        game.bullets.append(Bullet(Vector2(500, 300), Vector2(0)))
+        game._check_bullet_collisions()
+        assert game.npc_ships == expected_ships
+    assert len(game.fires) == 1
+
+
+def test_game_plays_with_modular_ships():
+    """
+    Check that a game of modular ships plays on and draws at every scale.
+    """
+    game = CaptainForever(WIDTH, HEIGHT, seed=1, modular_parts=30)
+    assert all(isinstance(ship, ModularShip) for ship in game.npc_ships)
+    for _ in range(200):
+        game.player_ship.shoot()
+        game.step()
+    for zoom in (1.0, 0.5):
+        for ship in game.npc_ships:
+            ship.draw(screen, zoom)
+
+
+def test_saved_game_keeps_parts():
+    """
+    Check that a saved game loads back with its modular ships, their
+    damaged parts and broken off parts, and plays on the same.
+    """
+    game = CaptainForever(WIDTH, HEIGHT, seed=2, modular_parts=5)
+    ship = game.npc_ships[0]
+    ship.core.children[0].reduce_health()
+    ship.detach(ship.core.children[-1])
+    ship.core.reduce_health()
+    game._npc_ships.append(NPCShip(Vector2(100, 100), "ship", [].append))
+    other = CaptainForever(WIDTH, HEIGHT, seed=3)
+    load_game(other, save_game(game))
+    assert [type(npc_ship) for npc_ship in other.npc_ships] == [
+        type(npc_ship) for npc_ship in game.npc_ships
+    ]
+    for loaded, saved in zip(other.npc_ships[:-1], game.npc_ships):
+        assert [
+            (part.offset, part.radius, part.health)
+            for part in loaded.hull.parts()
+        ] == [
+            (part.offset, part.radius, part.health)
+            for part in saved.hull.parts()
+        ]
+    assert save_game(other) == save_game(game)
+    for _ in range(100):
+        game.player_ship.shoot()
+        other.player_ship.shoot()
+        game.step()
+        other.step()
+    assert _world_state(other) == _world_state(game)
@@ -0,0 +1,141 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# pylint: disable=protected-access
+# Disabling pylint warnings related to PyGame that aren't valid
+# Disabling protected access because we need to check private vars to test
+# certain conditions
+"""
+Test the occupancy grids and entity features made for agents.
+"""
+from time import perf_counter
+import numpy as np
+import pytest
+import pygame
+from game import CaptainForever
+from controller import AimBotController
+from models import Bullet
+from observations import FEATURES, KINDS, ObservationRasterizer
+
+pygame.init()
+WIDTH = 1082
+HEIGHT = 720
+screen = pygame.display.set_mode((WIDTH, HEIGHT))
+
+cell_cases = [
+    # Check the top left corner
+    ((0, 0), (0, 0)),
+    # Check a point in the middle of the screen
+    ((541, 360), (20, 32)),
+    # Check that points just off the screen are kept on the edges
+    ((-5, HEIGHT + 5), (39, 0)),
+    ((WIDTH, HEIGHT), (39, 63)),
+]
+
+
+def _played_game(seed, ticks):
+    """
+    Create a seeded game and let the aiming bot play it.
+
+    Args:
+        seed: Int, seed for the game.
+        ticks: Int, number of ticks to play.
+
+    Returns:
+        A CaptainForever instance.
+    """
+    game = CaptainForever(WIDTH, HEIGHT, seed=seed)
+    controller = AimBotController(game, WIDTH, HEIGHT)
+    for _ in range(ticks):
+        controller.maneuver_player_ship()
+        game.step()
+    return game
+
+
+def test_grid_counts_every_entity():
+    """
+    Check that each channel counts the entities of its kind.
+    """
+    game = _played_game(1, 300)
+    grid = ObservationRasterizer(WIDTH, HEIGHT).rasterize(game)
+    counts = game.entity_counts()
+    assert grid.dtype == np.float32
+    assert grid.sum(axis=(1, 2)).tolist() == [counts[kind] for kind in KINDS]
+
+
+@pytest.mark.parametrize("position, cell", cell_cases)
+def test_grid_cells(position, cell):
+    """
+    Check which cell a bullet lands in.
+
+    Args:
+        position: Tuple, x and y of the bullet.
+        cell: Tuple, row and column of the cell.
+    """
+    game = CaptainForever(WIDTH, HEIGHT, seed=0)
+    game.bullets.append(Bullet(position, (0, 0)))
+    grid = ObservationRasterizer(WIDTH, HEIGHT).rasterize(game)
+    assert np.argwhere(grid[KINDS.index("bullets")]).tolist() == [list(cell)]
+
+
+def test_batches_match_single_games():
+    """
+    Check that a batch holds the same observations as games done one at a
+    time, and can be written into an existing array.
+    """
+    games = [_played_game(seed, 200) for seed in range(3)]
+    rasterizer = ObservationRasterizer(WIDTH, HEIGHT)
+    grids = np.ones((3, *rasterizer.grid_shape), np.float32)
+    assert rasterizer.rasterize_batch(games, grids) is grids
+    features = rasterizer.features_batch(games)
+    for index, game in enumerate(games):
+        assert np.array_equal(grids[index], rasterizer.rasterize(game))
+        assert np.array_equal(features[index], rasterizer.features(game))
+
+
+def test_features_are_padded_and_truncated():
+    """
+    Check that rows past the entities are zero and entities past the
+    maximum are left out, bullets first.
+    """
+    game = CaptainForever(WIDTH, HEIGHT, seed=0)
+    rasterizer = ObservationRasterizer(WIDTH, HEIGHT, max_entities=8)
+    features = rasterizer.features(game)
+    assert features.shape == (8, len(FEATURES))
+    assert features[:, 0].tolist() == [1.0] * 4 + [0.0] * 4
+    assert not features[4:].any()
+    assert features[0, 5] == pytest.approx(400 / WIDTH)
+    assert features[0, 9:].tolist() == [0.0, -1.0]
+    for _ in range(10):
+        game.npc_bullets.append(Bullet((10, 10), (0, 0)))
+    features = rasterizer.features(game)
+    assert features[:, 0].all()
+    assert features[:, 1 + KINDS.index("npc_bullets")].sum() == 4
+
+
+def test_destroyed_player():
+    """
+    Check that the wreck of a destroyed player is observed without a
+    heading.
+    """
+    game = CaptainForever(WIDTH, HEIGHT, seed=0)
+    game.npc_ships[0]._position = pygame.Vector2(game.player_ship.position)
+    game.step()
+    features = ObservationRasterizer(WIDTH, HEIGHT).features(game)
+    assert features[0, 1] == 1.0
+    assert features[0, 9:].tolist() == [0.0, 0.0]
+
+
+def test_throughput():
+    """
+    Check that thousands of observations of each form are made a second.
+    """
+    game = _played_game(1, 300)
+    games = [game] * 32
+    rasterizer = ObservationRasterizer(WIDTH, HEIGHT)
+    for observe in (rasterizer.rasterize_batch, rasterizer.features_batch):
+        best = float("inf")
+        for _ in range(5):
+            start = perf_counter()
+            observe(games)
+            best = min(best, perf_counter() - start)
+        assert len(games) / best > 2000
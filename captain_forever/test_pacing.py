@@ -0,0 +1,224 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# Disabling pylint warnings related to PyGame that aren't valid
+"""
+Test the FramePacer and the input latency it measures.
+"""
+from time import perf_counter, process_time
+import pytest
+import pygame
+from game import CaptainForever
+from controller import ArrowController
+from view import PyGameView
+from pacing import FramePacer
+
+pygame.init()
+WIDTH = 1082
+HEIGHT = 720
+screen = pygame.display.set_mode((WIDTH, HEIGHT))
+
+key_cases = [
+    # Check that input the ship responds to has its latency measured
+    (pygame.K_SPACE, 1),
+    (pygame.K_UP, 1),
+    (pygame.K_LEFT, 1),
+    # Check that other keys are not measured
+    (pygame.K_a, 0),
+]
+
+
+def run_frame(pacer):
+    """
+    Run one frame of a new game with a pacer.
+
+    Args:
+        pacer: FramePacer instance shared by the controller and view.
+
+    Returns:
+        The CaptainForever instance the frame was run on.
+    """
+    game = CaptainForever(WIDTH, HEIGHT)
+    controller = ArrowController(game, WIDTH, HEIGHT, pacer)
+    view = PyGameView(game, screen, pacer=pacer)
+    game.main_loop(controller, view, 1)
+    return game
+
+
+@pytest.mark.parametrize("key, measured", key_cases)
+def test_key_latency_is_measured(key, measured):
+    """
+    Check that a key press is timed from arrival to the flip showing it.
+
+    Args:
+        key: Int, PyGame key code pressed.
+        measured: Int, number of latencies expected to be recorded.
+    """
+    pygame.event.clear()
+    pacer = FramePacer(0)
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=key))
+    run_frame(pacer)
+    assert len(pacer.latencies) == measured
+    if measured:
+        assert pacer.latency_summary()[0] > 0
+
+
+def test_events_keep_arrival_time():
+    """
+    Check that events drained while sleeping keep the time they were seen
+    rather than the time they are handled.
+    """
+    pygame.event.clear()
+    pacer = FramePacer(100)
+    pacer.wait()
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_SPACE))
+    pacer.wait()
+    handled = perf_counter()
+    events = pacer.events()
+    assert [event.key for _, event in events] == [pygame.K_SPACE]
+    assert events[0][0] < handled
+
+
+@pytest.mark.parametrize("sleep_before_poll", [False, True])
+def test_frame_rate_is_capped(sleep_before_poll):
+    """
+    Check that frames are paced whether the sleep comes before polling
+    or after presenting.
+
+    Args:
+        sleep_before_poll: Bool, where the pacer sleeps.
+    """
+    pacer = FramePacer(100, sleep_before_poll)
+    start = perf_counter()
+    for _ in range(5):
+        pacer.before_poll()
+        pacer.present()
+    # the first frame starts straight away
+    assert perf_counter() - start >= 0.039
+
+
+def _idle_game(setup):
+    """
+    Create a game and put it in a state to check whether it is idle.
+
+    Args:
+        setup: String naming the state.
+
+    Returns:
+        A CaptainForever instance.
+    """
+    game = CaptainForever(WIDTH, HEIGHT, seed=0)
+    if setup in ("end_screen", "end_screen_with_bullets"):
+        game._message_flag = "lost"
+        game._end_game_message()
+    if setup == "end_screen_with_bullets":
+        game.player_ship.shoot()
+    if setup == "paused":
+        game.toggle_pause()
+    return game
+
+
+idle_cases = [
+    # Check that a game being played is never idle
+    ("playing", False, None),
+    # Check that an unfocused or minimized window is idle
+    ("playing", True, "background"),
+    # Check that pausing makes the game idle
+    ("paused", False, "paused"),
+    # Check that the end screen is idle once nothing moves on it
+    ("end_screen", False, "end_screen"),
+    ("end_screen_with_bullets", False, None),
+]
+
+
+@pytest.mark.parametrize("setup, in_background, reason", idle_cases)
+def test_idle_reason(setup, in_background, reason):
+    """
+    Check when the game has nothing to simulate or draw.
+
+    Args:
+        setup: String naming the state of the game.
+        in_background: Bool, whether the window is in the background.
+        reason: String, expected reason, or None if not idle.
+    """
+    assert _idle_game(setup).idle_reason(in_background) == reason
+
+
+def test_end_screen_idles_without_cpu():
+    """
+    Check that the end screen blocks waiting for input, using almost no CPU
+    and drawing nothing.
+    """
+    pygame.event.clear()
+    game = _idle_game("end_screen")
+    pacer = FramePacer(60)
+    controller = ArrowController(game, WIDTH, HEIGHT, pacer)
+    view = PyGameView(game, screen, pacer=pacer)
+    game.profiler.toggle()
+    start = perf_counter()
+    cpu_start = process_time()
+    game.main_loop(controller, view, 10, idle_timeout_ms=50)
+    wall = perf_counter() - start
+    assert wall >= 0.45
+    assert process_time() - cpu_start < wall * 0.25
+    assert pacer.idle_seconds >= 0.45
+    assert not game.profiler.frame_times
+
+
+def test_pause_and_focus_stop_the_game():
+    """
+    Check that pausing or losing focus stops the simulation until the game
+    is unpaused or the window is focused again.
+    """
+    pygame.event.clear()
+    game = CaptainForever(WIDTH, HEIGHT, seed=0)
+    pacer = FramePacer(0)
+    controller = ArrowController(game, WIDTH, HEIGHT, pacer)
+    view = PyGameView(game, screen, pacer=pacer)
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_p))
+    game.main_loop(controller, view, 3, idle_timeout_ms=1)
+    assert game.paused
+    assert game.counter == 0
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_p))
+    game.main_loop(controller, view, 3, idle_timeout_ms=1)
+    assert not game.paused
+    assert game.counter == 2
+    pygame.event.post(pygame.event.Event(pygame.WINDOWFOCUSLOST))
+    game.main_loop(controller, view, 3, idle_timeout_ms=1)
+    assert pacer.in_background
+    assert game.counter == 3
+    pygame.event.post(pygame.event.Event(pygame.WINDOWFOCUSGAINED))
+    game.main_loop(controller, view, 3, idle_timeout_ms=1)
+    assert not pacer.in_background
+    assert game.counter == 5
+
+
+def test_no_shooting_while_paused():
+    """
+    Check that pressing space while paused neither fires a bullet nor
+    records the fire button.
+    """
+    pygame.event.clear()
+    game = CaptainForever(WIDTH, HEIGHT, seed=0)
+    controller = ArrowController(game, WIDTH, HEIGHT)
+    game.toggle_pause()
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_SPACE))
+    controller.handle_events()
+    assert not game.bullets
+    assert not controller.buttons
+
+
+def test_no_latency_while_paused():
+    """
+    Check that steering keys pressed while paused, which change nothing,
+    are not measured as input latency.
+    """
+    pygame.event.clear()
+    game = CaptainForever(WIDTH, HEIGHT, seed=0)
+    pacer = FramePacer(0)
+    controller = ArrowController(game, WIDTH, HEIGHT, pacer)
+    view = PyGameView(game, screen, pacer=pacer)
+    game.toggle_pause()
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_UP))
+    controller.handle_events()
+    view.draw()
+    assert not pacer.latencies
@@ -0,0 +1,135 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# pylint: disable=protected-access
+# Disabling pylint warnings related to PyGame that aren't valid
+# Disabling protected access because we need to modify private vars to test
+# certain conditions
+"""
+Test the ParticleSystem used for explosions.
+"""
+import pytest
+import pygame
+from pygame import Vector2
+from game import CaptainForever
+from models import Bullet, NPCShip
+from assets import registry
+from particles import ParticleSystem, explosion_frames
+
+pygame.init()
+WIDTH = 1082
+HEIGHT = 720
+screen = pygame.display.set_mode((WIDTH, HEIGHT))
+
+budget_cases = [
+    # Check that emitting never goes over the particle budget
+    (100, 1, 24, 0),
+    (30, 2, 30, 18),
+    (10, 1, 10, 14),
+]
+
+
+@pytest.mark.parametrize("budget, explosions, live, dropped", budget_cases)
+def test_budget(budget, explosions, live, dropped):
+    """
+    Check that particles past the budget are dropped.
+
+    Args:
+        budget: Int, maximum number of live particles.
+        explosions: Int, number of explosions emitted.
+        live: Int, number of particles expected to be live.
+        dropped: Int, number of particles expected to be dropped.
+    """
+    particles = ParticleSystem(budget, seed=0)
+    for _ in range(explosions):
+        particles.emit_explosion((100, 100))
+    assert len(particles) == live
+    assert particles.dropped == dropped
+
+
+def test_expired_particles_are_removed():
+    """
+    Check that every particle is gone once the longest lifetime has passed
+    and that particles move away from where they were emitted.
+    """
+    particles = ParticleSystem(seed=0)
+    particles.emit_explosion((100, 100))
+    particles.update()
+    positions = particles._positions[: len(particles)]
+    assert (abs(positions - 100) > 0).any()
+    longest = max(kind[2] for kind in ParticleSystem.KINDS)
+    for _ in range(longest):
+        particles.update()
+    assert len(particles) == 0
+
+
+def test_frames_advance_with_age():
+    """
+    Check that a particle's frame moves through its kind's animation.
+    """
+    particles = ParticleSystem(seed=0)
+    particles.emit((0, 0), 1, 1, 0, 0)
+    particles._ages[0] = 0
+    particles.update()
+    first_frame = particles._frame_indices[0]
+    for _ in range(20):
+        particles.update()
+    assert first_frame >= ParticleSystem.FRAME_COUNT
+    assert particles._frame_indices[0] > first_frame
+
+
+def test_draw_blits_particles():
+    """
+    Check that drawing changes the pixels around the explosion.
+    """
+    surface = pygame.Surface((200, 200))
+    particles = ParticleSystem(seed=0)
+    particles.emit_explosion((100, 100))
+    particles.update()
+    particles.draw(surface)
+    assert pygame.transform.average_color(surface)[:3] != (0, 0, 0)
+
+
+def test_draw_zoomed_particles():
+    """
+    Check that particles drawn at half scale land at half their position,
+    using frames rendered at half size.
+    """
+    surface = pygame.Surface((200, 200))
+    particles = ParticleSystem(seed=0)
+    particles.emit_explosion((300, 300))
+    particles.update()
+    particles.draw(surface, 0.5)
+    drawn = pygame.mask.from_threshold(surface, (0, 0, 0), (1, 1, 1, 255))
+    drawn.invert()
+    (bounds,) = drawn.get_bounding_rects()
+    assert bounds.collidepoint(150, 150)
+    assert bounds.width < 40
+    frames, _ = particles._zoomed_frames[0.5]
+    particles.load_frames()
+    assert frames[0].get_width() < particles._frames[0].get_width()
+
+
+def test_destroyed_npc_explodes():
+    """
+    Check that shooting an NPC ship sets off an explosion.
+    """
+    game = CaptainForever(WIDTH, HEIGHT)
+    npc_ship = NPCShip(Vector2(100, 100), "ship", game.npc_bullets.append)
+    game._npc_ships = [npc_ship]
+    game._bullets = [Bullet(Vector2(100, 100), Vector2(0))]
+    game._process_game_logic()
+    assert len(game.particles) > 0
+    assert game.entity_counts()["particles"] == len(game.particles)
+
+
+def test_fire_frames_skip_the_full_size_sprite():
+    """
+    Check that fire particle frames are built from the scaled down fire
+    sprite, so the full size one is never loaded and kept.
+    """
+    registry.clear("sprites")
+    registry.clear("particles")
+    frames = explosion_frames("fire", 40, 8, 0)
+    assert max(frame.get_width() for frame in frames) <= 45
+    assert registry.get("sprites", ("fire", True, False, "png")) is None
+    assert registry.usage()["asset"]["fire"] < 100_000
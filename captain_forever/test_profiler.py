@@ -0,0 +1,110 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# pylint: disable=protected-access
+# Disabling pylint warnings related to PyGame that aren't valid
+# Disabling protected access because we need to modify private vars to test
+# certain conditions
+"""
+Test the FrameProfiler class and the profiler overlay.
+"""
+import pytest
+import pygame
+from game import CaptainForever
+from profiler import FrameProfiler
+from view import draw_profiler_overlay
+
+pygame.init()
+WIDTH = 1082
+HEIGHT = 720
+screen = pygame.display.set_mode((WIDTH, HEIGHT))
+test_game = CaptainForever(WIDTH, HEIGHT)
+
+entity_count_cases = [
+    # Check that each entity kind is counted after a profiled frame
+    ("player", 1),
+    ("npc_ships", 3),
+    ("bullets", 0),
+    ("npc_bullets", 0),
+    ("fires", 0),
+]
+
+
+def test_disabled_profiler_records_nothing():
+    """
+    Check that a disabled profiler does not keep any timings.
+    """
+    profiler = FrameProfiler()
+    profiler.begin_frame()
+    profiler.start("move")
+    profiler.stop("move")
+    profiler.end_frame(test_game)
+    assert not profiler.frame_times
+    assert profiler.average("move") == 0.0
+
+
+def test_split_phase_is_summed():
+    """
+    Check that a phase started and stopped twice in a frame is recorded once.
+    """
+    profiler = FrameProfiler(enabled=True)
+    profiler.begin_frame()
+    profiler.start("collision")
+    profiler.stop("collision")
+    profiler.start("collision")
+    profiler.stop("collision")
+    profiler.end_frame(test_game)
+    assert len(profiler._timings["collision"]) == 1
+    assert len(profiler.frame_times) == 1
+
+
+def test_toggle_during_phase():
+    """
+    Check that switching the profiler on partway through a phase does not
+    error when the phase is stopped.
+    """
+    profiler = FrameProfiler()
+    profiler.start("controller")
+    profiler.toggle()
+    profiler.stop("controller")
+    assert profiler.enabled
+
+
+@pytest.mark.parametrize("kind, count", entity_count_cases)
+def test_entity_counts(kind, count):
+    """
+    Check that end_frame records the number of entities of each kind.
+
+    Args:
+        kind: String, entity kind name.
+        count: Int, number of entities of that kind expected.
+    """
+    test_game.__init__(WIDTH, HEIGHT)
+    profiler = FrameProfiler(enabled=True)
+    profiler.begin_frame()
+    profiler.end_frame(test_game)
+    assert profiler.entity_counts[kind] == count
+
+
+def test_restart_keeps_profiler():
+    """
+    Check that restarting the game keeps the same profiler instance.
+    """
+    profiler = FrameProfiler()
+    game = CaptainForever(WIDTH, HEIGHT, profiler)
+    game.restart()
+    assert game.profiler is profiler
+
+
+def test_draw_profiler_overlay():
+    """
+    Check that the overlay draws onto the top left of a surface.
+    """
+    profiler = FrameProfiler(enabled=True)
+    for _ in range(3):
+        profiler.begin_frame()
+        profiler.end_frame(test_game)
+    surface = pygame.Surface((WIDTH, HEIGHT))
+    surface.fill((255, 0, 0))
+    draw_profiler_overlay(surface, profiler, pygame.font.Font(None, 20))
+    assert surface.get_at((2, 2))[:3] != (255, 0, 0)
+    assert surface.get_at((WIDTH - 1, HEIGHT - 1))[:3] == (255, 0, 0)
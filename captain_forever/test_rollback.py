@@ -0,0 +1,196 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# pylint: disable=protected-access
+# Disabling pylint warnings related to PyGame that aren't valid
+# Disabling protected access because we need to modify private vars to test
+# certain conditions
+"""
+Test saving and restoring games and the rollback session built on them.
+"""
+import pytest
+import pygame
+from pygame import Vector2
+from game import CaptainForever
+from controller import RemoteController
+from models import Bullet, NPCShip
+from rollback import RollbackSession, _world_state, measure_worst_case
+from scheduler import AIScheduler
+from sectors import SectorWorld
+
+pygame.init()
+WIDTH = 1082
+HEIGHT = 720
+screen = pygame.display.set_mode((WIDTH, HEIGHT))
+
+late_cases = [
+    # Check how far back a remote input may arrive
+    (8, 2, True),
+    (8, 8, True),
+    (8, 9, False),
+]
+
+
+def play(game, ticks):
+    """
+    Step a game with the player turning and shooting.
+
+    Args:
+        game: CaptainForever instance.
+        ticks: Int, number of ticks to step.
+    """
+    for tick in range(ticks):
+        if game.is_running:
+            game.player_ship.rotate()
+            if tick % 10 == 0:
+                game.player_ship.shoot()
+        game.step()
+
+
+def test_seeded_games_match():
+    """
+    Check that two games with the same seed play out identically.
+    """
+    first = CaptainForever(WIDTH, HEIGHT, seed=3)
+    second = CaptainForever(WIDTH, HEIGHT, seed=3)
+    play(first, 300)
+    play(second, 300)
+    assert _world_state(first) == _world_state(second)
+
+
+def test_load_state_rewinds():
+    """
+    Check that loading a saved state undoes every tick since, and that a
+    state can be loaded more than once.
+    """
+    game = CaptainForever(WIDTH, HEIGHT, seed=1)
+    play(game, 20)
+    state = game.save_state()
+    expected = _world_state(game)
+    for _ in range(2):
+        play(game, 40)
+        assert _world_state(game) != expected
+        game.load_state(state)
+        assert _world_state(game) == expected
+
+
+def test_load_state_rewinds_debris_and_sectors():
+    """
+    Check that loading a saved state puts pushed debris back and undoes
+    entering a sector.
+    """
+    game = CaptainForever(
+        WIDTH, HEIGHT, seed=0, world=SectorWorld(WIDTH, HEIGHT, seed=0)
+    )
+    game.push(game.debris[0], Vector2(3, 0))
+    state = game.save_state()
+    expected = _world_state(game)
+    play(game, 20)
+    assert _world_state(game) != expected
+    game.load_state(state)
+    assert _world_state(game) == expected
+    game.player_ship._position = Vector2(WIDTH - 1, 300)
+    game.player_ship._velocity = Vector2(5, 0)
+    state = game.save_state()
+    stats = game.world.stats()
+    counts = game.entity_counts()
+    for _ in range(2):
+        game.step()
+        assert game.world.sector == (1, 0)
+        game.load_state(state)
+        assert game.world.stats() == stats
+        assert game.entity_counts() == counts
+
+
+def test_load_state_rewinds_scheduler():
+    """
+    Check that loading a saved state puts the AI scheduler's turns back,
+    so the ships that decide after a rollback are the same as before it.
+    """
+    game = CaptainForever(
+        WIDTH, HEIGHT, seed=1, ai_scheduler=AIScheduler(None, buckets=4)
+    )
+    game._npc_ships[:] = [
+        NPCShip(Vector2(x, y), "ship", game.npc_bullets.append)
+        for x in (40, 1040)
+        for y in (40, 360, 680)
+    ]
+    state = game.save_state()
+    play(game, 3)
+    expected = _world_state(game)
+    play(game, 1)
+    game.load_state(state)
+    play(game, 3)
+    assert _world_state(game) == expected
+
+
+def test_session_refuses_scheduler_budget():
+    """
+    Check that a game whose AI scheduler has a time budget, and so depends
+    on the clock, cannot be played in a rollback session.
+    """
+    game = CaptainForever(WIDTH, HEIGHT, seed=1, ai_scheduler=AIScheduler())
+    with pytest.raises(ValueError):
+        RollbackSession(game)
+    game = CaptainForever(WIDTH, HEIGHT, seed=1, ai_scheduler=AIScheduler(None))
+    assert RollbackSession(game).game is game
+
+
+def test_replaying_skips_effects():
+    """
+    Check that a replayed tick destroys ships without an explosion.
+    """
+    game = CaptainForever(WIDTH, HEIGHT)
+    game._npc_ships = [
+        NPCShip(Vector2(100, 100), "ship", game.npc_bullets.append)
+    ]
+    game._bullets = [Bullet(Vector2(100, 100), Vector2(0))]
+    game.step(replaying=True)
+    assert not game.npc_ships
+    assert len(game.particles) == 0
+
+
+@pytest.mark.parametrize("max_rollback, delay, accepted", late_cases)
+def test_late_input_limit(max_rollback, delay, accepted):
+    """
+    Check that inputs further back than max_rollback are refused.
+
+    Args:
+        max_rollback: Int, most ticks the session can roll back.
+        delay: Int, ticks behind the session the input arrives.
+        accepted: Bool, whether the input is expected to be accepted.
+    """
+    session = RollbackSession(
+        CaptainForever(WIDTH, HEIGHT, seed=0), max_rollback=max_rollback
+    )
+    for _ in range(10):
+        session.add_local_input(0)
+        session.advance()
+    if accepted:
+        session.add_remote_input(1, session.tick - delay, RemoteController.UP)
+    else:
+        with pytest.raises(ValueError):
+            session.add_remote_input(1, session.tick - delay, 0)
+
+
+def test_correct_prediction_does_not_roll_back():
+    """
+    Check that an input matching the prediction costs no rollback.
+    """
+    session = RollbackSession(CaptainForever(WIDTH, HEIGHT, seed=0))
+    for _ in range(5):
+        session.add_local_input(RemoteController.LEFT)
+        session.advance()
+    session.add_remote_input(1, 2, 0)
+    session.advance()
+    assert session.rollbacks == 0
+
+
+def test_worst_case_matches_straight_run():
+    """
+    Check that rolling back every tick ends where a game run once with the
+    same inputs does.
+    """
+    report = measure_worst_case(max_rollback=4, ticks=120, seed=2)
+    assert report["deterministic"]
+    assert report["max_resimulated"] == 4
+    assert report["rollbacks"] > 100
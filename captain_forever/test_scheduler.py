@@ -0,0 +1,123 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# pylint: disable=protected-access
+# Disabling pylint warnings related to PyGame that aren't valid
+# Disabling protected access because we need to modify private vars to test
+# certain conditions
+"""
+Test the scheduler that spreads NPC ship decisions over ticks.
+"""
+from collections import Counter
+import pytest
+import pygame
+from pygame import Vector2
+from game import CaptainForever
+from models import NPCShip
+from scheduler import AIScheduler
+
+pygame.init()
+WIDTH = 1082
+HEIGHT = 720
+screen = pygame.display.set_mode((WIDTH, HEIGHT))
+
+PLAYER = Vector2(100, 100)
+# two ships near the player and eight far from it
+POSITIONS = [(120, 100), (100, 300)] + [(900, 100 + 60 * i) for i in range(8)]
+
+turn_cases = [
+    # Check that far ships each take one turn every bucket's worth of ticks
+    (1, 8),
+    (2, 4),
+    (4, 2),
+    (8, 1),
+]
+
+
+def _ships():
+    """
+    Create NPC ships at POSITIONS.
+
+    Returns:
+        List of NPCShip instances.
+    """
+    return [
+        NPCShip(Vector2(position), "ship", [].append) for position in POSITIONS
+    ]
+
+
+@pytest.mark.parametrize("buckets, far_turns", turn_cases)
+def test_round_robin(buckets, far_turns):
+    """
+    Check that near ships decide every tick and far ships take turns.
+
+    Args:
+        buckets: Int, ticks between a far ship's turns.
+        far_turns: Int, turns each far ship gets in 8 ticks.
+    """
+    ships = _ships()
+    scheduler = AIScheduler(None, near_distance=400, buckets=buckets)
+    decided = []
+    for _ in range(8):
+        scheduler.run(ships, PLAYER, decided.append)
+    turns = Counter(decided)
+    assert [turns[index] for index in range(len(ships))] == [8, 8] + [
+        far_turns
+    ] * 8
+    assert scheduler.stats()["decisions"] == len(decided)
+    assert scheduler.stats()["over_budget"] == 0
+
+
+def test_budget_defers_far_ships():
+    """
+    Check that far ships are deferred when the budget runs out, but at least
+    one takes its turn each tick, and the ticks over budget are counted.
+    """
+    ships = _ships()
+    scheduler = AIScheduler(0, near_distance=400, buckets=2)
+    decided = []
+    for _ in range(8):
+        scheduler.run(ships, PLAYER, decided.append)
+    turns = Counter(decided)
+    stats = scheduler.stats()
+    assert turns[0] == turns[1] == 8
+    assert [turns[index] for index in range(2, 10)] == [1] * 8
+    assert stats["deferred"] == 8 * 3
+    assert stats["over_budget"] == 8
+    assert stats["worst_us"] >= stats["last_us"] > 0
+
+
+def test_far_ships_keep_moving():
+    """
+    Check that ships move every tick, including ticks they do not decide
+    on.
+    """
+    game = CaptainForever(
+        WIDTH, HEIGHT, seed=0, ai_scheduler=AIScheduler(None, buckets=4)
+    )
+    game._npc_ships[:] = _ships()
+    game.player_ship._position = Vector2(PLAYER)
+    for ship in game.npc_ships:
+        ship._velocity = Vector2(0, 1)
+    far_ship = game.npc_ships[-1]
+    for _ in range(4):
+        before = Vector2(far_ship.position)
+        game._move_game_objects()
+        assert far_ship.position != before
+
+
+@pytest.mark.parametrize("flow_field", [False, True])
+def test_game_plays_with_scheduler(flow_field):
+    """
+    Check that a game with a scheduler plays on, with or without a flow
+    field.
+
+    Args:
+        flow_field: Bool, whether NPC ships steer by a flow field.
+    """
+    scheduler = AIScheduler()
+    game = CaptainForever(
+        WIDTH, HEIGHT, seed=2, flow_field=flow_field, ai_scheduler=scheduler
+    )
+    for _ in range(300):
+        game.step()
+    assert scheduler.stats()["ticks"] > 0
@@ -0,0 +1,203 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# pylint: disable=protected-access
+# Disabling pylint warnings related to PyGame that aren't valid
+# Disabling protected access because we need to modify private vars to test
+# certain conditions
+"""
+Test the endless world of frozen and generated sectors.
+"""
+import pytest
+import pygame
+from pygame import Vector2
+from game import CaptainForever
+from models import StaticObject
+from sectors import SectorWorld
+from serialization import load_game, save_game
+
+pygame.init()
+WIDTH = 1082
+HEIGHT = 720
+screen = pygame.display.set_mode((WIDTH, HEIGHT))
+
+CENTER = Vector2(WIDTH / 2, HEIGHT / 2)
+
+edge_cases = [
+    # Check that flying off each edge enters the sector beyond it
+    ((WIDTH - 1, 300), (5, 0), (1, 0)),
+    ((0, 300), (-5, 0), (-1, 0)),
+    ((500, HEIGHT - 1), (0, 5), (0, 1)),
+    ((500, 0), (0, -5), (0, -1)),
+    # Check that flying off a corner enters the sector diagonally beyond it
+    ((WIDTH - 1, HEIGHT - 1), (5, 5), (1, 1)),
+]
+
+
+def _layout(npc_ships, fires, debris):
+    """
+    Describe the contents of a sector by where everything is.
+
+    Args:
+        npc_ships: List of NPCShip instances.
+        fires: List of StaticObject instances.
+        debris: List of StaticObject instances.
+
+    Returns:
+        Tuple of lists of rounded x and y tuples.
+    """
+    return tuple(
+        [(round(item.position.x), round(item.position.y)) for item in items]
+        for items in (npc_ships, fires, debris)
+    )
+
+
+def test_generation_is_deterministic():
+    """
+    Check that a sector is generated the same for the same seed and sector,
+    and differently for another seed.
+    """
+    world = SectorWorld(WIDTH, HEIGHT, seed=3)
+    again = SectorWorld(WIDTH, HEIGHT, seed=3)
+    other = SectorWorld(WIDTH, HEIGHT, seed=4)
+    first = _layout(*world.generate((2, -5), [].append))
+    assert first == _layout(*again.generate((2, -5), [].append))
+    assert first != _layout(*other.generate((2, -5), [].append))
+    assert world.stars((2, -5)) == again.stars((2, -5))
+    assert [len(layer[2]) for layer in world.stars()] == [
+        count for count, _, _ in SectorWorld.STAR_LAYERS
+    ]
+
+
+def test_thaw_restores_what_was_left():
+    """
+    Check that a sector left and come back to holds what it did when it was
+    left, not what it was generated with.
+    """
+    world = SectorWorld(WIDTH, HEIGHT, seed=1, max_enemies=4)
+    npc_ships, fires, debris = world.start(CENTER, [].append)
+    fires.append(StaticObject(npc_ships.pop().position, "fire"))
+    for npc_ship in npc_ships:
+        npc_ship._position = Vector2(40, 40)
+        npc_ship._health = 2
+    left = _layout(npc_ships, fires, debris)
+    world.enter((1, 0), npc_ships, fires, debris, CENTER, [].append)
+    assert world.stats()["frozen"] == 1
+    thawed = world.enter((-1, 0), [], [], [], CENTER, [].append)
+    assert _layout(*thawed) == left
+    assert [ship.get_health() for ship in thawed[0]] == [2] * len(thawed[0])
+    assert world.sector == (0, 0)
+    assert world.stats()["thawed"] == 1
+
+
+def test_ships_are_moved_away_from_the_player():
+    """
+    Check that NPC ships are not thawed on top of the player.
+    """
+    world = SectorWorld(WIDTH, HEIGHT, safe_distance=300)
+    npc_ships, _, _ = world.generate((0, 0), [].append)
+    for npc_ship in npc_ships:
+        npc_ship._position = Vector2(CENTER)
+    world.enter((1, 0), npc_ships, [], [], CENTER, [].append)
+    thawed, _, _ = world.enter((-1, 0), [], [], [], CENTER, [].append)
+    assert all(ship.position.distance_to(CENTER) >= 300 for ship in thawed)
+
+
+def test_frozen_sectors_fit_the_budget():
+    """
+    Check that memory and the entities simulated stay bounded however far
+    the player travels, and that evicted sectors are generated afresh.
+    """
+    world = SectorWorld(WIDTH, HEIGHT, budget_bytes=4096)
+    contents = world.start(CENTER, [].append)
+    for _ in range(300):
+        contents = world.enter((1, 0), *contents, CENTER, [].append)
+        assert world.frozen_bytes <= 4096
+        assert sum(len(items) for items in contents) <= 4 + 6
+    stats = world.stats()
+    assert stats["sector"] == (300, 0)
+    assert stats["evictions"] > 0
+    assert stats["frozen"] + stats["evictions"] == 300
+    world.enter((-300, 0), *contents, CENTER, [].append)
+    assert world.stats()["generated"] == 302
+
+
+@pytest.mark.parametrize("position, velocity, sector", edge_cases)
+def test_crossing_an_edge_enters_a_sector(position, velocity, sector):
+    """
+    Check that flying off the screen enters the neighbouring sector, with
+    bullets left behind.
+
+    Args:
+        position: Tuple, x and y of the player ship.
+        velocity: Tuple, x and y velocity of the player ship.
+        sector: Tuple, column and row of the sector entered.
+    """
+    game = CaptainForever(
+        WIDTH, HEIGHT, seed=0, world=SectorWorld(WIDTH, HEIGHT, seed=0)
+    )
+    game.player_ship._position = Vector2(position)
+    game.player_ship._velocity = Vector2(velocity)
+    game.player_ship.shoot()
+    game._move_game_objects()
+    assert game.world.sector == sector
+    assert not game.bullets
+    assert 0 <= game.player_ship.position.x < WIDTH
+    assert 0 <= game.player_ship.position.y < HEIGHT
+
+
+def test_game_plays_in_a_world():
+    """
+    Check that a game in a sector world plays on and never runs out of
+    enemies, and that bullets stop at debris and push it.
+    """
+    game = CaptainForever(
+        WIDTH, HEIGHT, seed=0, world=SectorWorld(WIDTH, HEIGHT, seed=0)
+    )
+    assert game.npc_ships
+    assert game.entity_counts()["debris"] == len(game.debris)
+    game._npc_ships.clear()
+    game.step()
+    assert game.message_flag == ""
+    game._debris[:] = [StaticObject(Vector2(300, 300), "asteroid")]
+    game._sort_sleepers()
+    game.player_ship._position = Vector2(300, 500)
+    game.player_ship.shoot()
+    game.bullets[0]._position = Vector2(300, 300)
+    game._check_bullet_collisions()
+    assert not game.bullets
+    assert not game.debris[0].asleep
+
+
+def test_saved_game_keeps_its_sector_and_debris():
+    """
+    Check that a game saved in a sector world loads into another world
+    with the sector it was in and its debris, drifting as it was.
+    """
+    game = CaptainForever(
+        WIDTH, HEIGHT, seed=0, world=SectorWorld(WIDTH, HEIGHT, seed=0)
+    )
+    game.player_ship._position = Vector2(WIDTH - 1, 300)
+    game.player_ship._velocity = Vector2(5, 0)
+    game.step()
+    game._debris[:] = [
+        StaticObject(Vector2(100, 100), "asteroid"),
+        StaticObject(Vector2(300, 200), "asteroid", (1, 0)),
+    ]
+    game._sort_sleepers()
+    other = CaptainForever(
+        WIDTH, HEIGHT, seed=1, world=SectorWorld(WIDTH, HEIGHT, seed=1)
+    )
+    other.step()
+    load_game(other, save_game(game))
+    assert other.world.sector == (1, 0)
+    assert other.world.stats()["frozen"] == 0
+    assert [(rock.position, rock.velocity) for rock in other.debris] == [
+        (rock.position, rock.velocity) for rock in game.debris
+    ]
+    assert other.entity_counts()["awake"] == 1
+    for _ in range(20):
+        game.step()
+        other.step()
+    assert [rock.position for rock in other.debris] == [
+        rock.position for rock in game.debris
+    ]
@@ -0,0 +1,307 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# pylint: disable=protected-access
+# Disabling pylint warnings related to PyGame that aren't valid
+# Disabling protected access because we need to check private vars to test
+# certain conditions
+"""
+Test the binary game state format: save files, replays, snapshot documents
+and fixtures, round trips of random data and throughput.
+"""
+import math
+import random
+import struct
+from time import perf_counter
+import pytest
+import pygame
+from game import CaptainForever
+from controller import AimBotController
+from models import Bullet
+from rollback import _world_state, apply_buttons
+from snapshots import Snapshot
+from serialization import (
+    LAYOUTS,
+    NPC_SHIP_SECTION,
+    PLAYER_FIRE_SECTION,
+    VERSION,
+    StateReader,
+    encode_document,
+    encode_entity_section,
+    encode_snapshot_document,
+    load_game,
+    play_replay,
+    read_snapshot_document,
+    save_game,
+    save_replay,
+)
+
+pygame.init()
+WIDTH = 1082
+HEIGHT = 720
+screen = pygame.display.set_mode((WIDTH, HEIGHT))
+
+FIXTURE = "fixtures/midgame.cfst"
+# floats that are easy to lose in a round trip
+SPECIAL_FLOATS = [0.0, -0.0, math.inf, -math.inf, math.nan, 5e-324, 1e308]
+
+invalid_document_cases = [
+    # Check that data that is not a document is rejected
+    b"",
+    b"CFST",
+    b"NOPE\x01\x00\x00\x00",
+    # Check that a document from a newer version is rejected
+    struct.pack("<4sHH", b"CFST", VERSION + 1, 0),
+    # Check that a section running past the end is rejected
+    struct.pack("<4sHHHHI", b"CFST", VERSION, 1, 17, 0, 64),
+]
+
+
+def _played_game(seed, ticks):
+    """
+    Create a seeded game and let the aiming bot play it.
+
+    Args:
+        seed: Int, seed for the game.
+        ticks: Int, number of ticks to play.
+
+    Returns:
+        A CaptainForever instance.
+    """
+    game = CaptainForever(WIDTH, HEIGHT, seed=seed)
+    controller = AimBotController(game, WIDTH, HEIGHT)
+    for _ in range(ticks):
+        controller.maneuver_player_ship()
+        game.step()
+    return game
+
+
+def _bits(value):
+    """
+    Return the bits of a float so NaN and -0.0 compare exactly.
+
+    Args:
+        value: Float.
+
+    Returns:
+        Bytes of the double.
+    """
+    return struct.pack("<d", value)
+
+
+def test_save_and_load_continue_identically():
+    """
+    Check that a game loaded from a save file plays on exactly like the
+    game that was saved.
+    """
+    game = _played_game(3, 300)
+    loaded = CaptainForever(WIDTH, HEIGHT, seed=99)
+    load_game(loaded, save_game(game))
+    assert _world_state(loaded) == _world_state(game)
+    assert loaded.counter == game.counter
+    for _ in range(300):
+        game.step()
+        loaded.step()
+    assert _world_state(loaded) == _world_state(game)
+
+
+def test_save_destroyed_player():
+    """
+    Check that a game the player lost saves the wreck and the message.
+    """
+    game = CaptainForever(WIDTH, HEIGHT, seed=0)
+    game.npc_ships[0]._position = pygame.Vector2(game.player_ship.position)
+    game.step()
+    assert game.message_flag == "lost"
+    data = save_game(game)
+    assert PLAYER_FIRE_SECTION in StateReader(data)
+    loaded = CaptainForever(WIDTH, HEIGHT)
+    load_game(loaded, data)
+    assert loaded.message == game.message
+    assert not loaded.is_running
+
+
+def test_replay_matches_recording():
+    """
+    Check that playing a replay ends in the same state as the recorded run.
+    """
+    game = CaptainForever(WIDTH, HEIGHT, seed=11)
+    button_random = random.Random(11)
+    buttons = [button_random.getrandbits(5) for _ in range(400)]
+    data = save_replay(game, buttons)
+    previous = 0
+    for held in buttons:
+        apply_buttons(game, held, previous)
+        game.step()
+        previous = held
+    replayed = CaptainForever(WIDTH, HEIGHT, seed=5)
+    assert play_replay(replayed, data) == 400
+    assert _world_state(replayed) == _world_state(game)
+
+
+def test_negative_spawn_counter():
+    """
+    Check that a spawn counter pushed below zero to hold off enemy spawns,
+    as the benchmarks do, is saved and loaded.
+    """
+    game = CaptainForever(WIDTH, HEIGHT, seed=0)
+    game._enemy_spawn_counter = -(10**9)
+    loaded = CaptainForever(WIDTH, HEIGHT)
+    load_game(loaded, save_game(game))
+    assert loaded._enemy_spawn_counter == -(10**9)
+
+
+def test_loaded_ids_are_not_reused():
+    """
+    Check that objects created after loading get ids above the loaded ones.
+    """
+    game = _played_game(1, 10)
+    data = save_game(game)
+    reader = StateReader(data)
+    last_id = max(reader.entities(NPC_SHIP_SECTION).ids)
+    load_game(CaptainForever(WIDTH, HEIGHT), data)
+    assert CaptainForever(WIDTH, HEIGHT).player_ship.entity_id > last_id
+
+
+def test_fixture():
+    """
+    Check that the fixture saved by an earlier build still loads and saves
+    to the same bytes, so the format has not changed without a new version.
+    """
+    with open(FIXTURE, "rb") as fixture_file:
+        data = fixture_file.read()
+    game = CaptainForever(WIDTH, HEIGHT)
+    load_game(game, data)
+    counts = game.entity_counts()
+    assert counts["npc_ships"] == 4
+    assert counts["npc_bullets"] == 1
+    assert game.is_running
+    assert save_game(game) == data
+
+
+def test_fuzz_entity_round_trip():
+    """
+    Check that random entity sections, including floats that are easy to
+    lose, read back bit for bit.
+    """
+    fuzz_random = random.Random(0)
+    for _ in range(200):
+        sections = []
+        expected = {}
+        for section_type, (float_count, int_count) in LAYOUTS.items():
+            count = fuzz_random.randrange(0, 40)
+            ids = [fuzz_random.getrandbits(32) for _ in range(count)]
+            floats = [
+                (
+                    fuzz_random.choice(SPECIAL_FLOATS)
+                    if fuzz_random.random() < 0.2
+                    else fuzz_random.uniform(-1e6, 1e6)
+                )
+                for _ in range(count * float_count)
+            ]
+            ints = [
+                fuzz_random.randrange(-(2**31), 2**31)
+                for _ in range(count * int_count)
+            ]
+            sections.append(
+                encode_entity_section(section_type, ids, floats, ints)
+            )
+            expected[section_type] = (ids, floats, ints)
+        reader = StateReader(encode_document(sections))
+        for section_type, (ids, floats, ints) in expected.items():
+            columns = reader.entities(section_type)
+            assert columns.ids.tolist() == ids
+            assert [_bits(value) for value in columns.floats.tolist()] == [
+                _bits(value) for value in floats
+            ]
+            assert columns.ints.tolist() == ints
+
+
+def test_fuzz_snapshot_round_trip():
+    """
+    Check that random snapshots read back unchanged.
+    """
+    fuzz_random = random.Random(1)
+    for tick in range(200):
+        entities = {
+            fuzz_random.getrandbits(32): (
+                fuzz_random.randrange(5),
+                fuzz_random.randrange(-32768, 32768),
+                fuzz_random.randrange(-32768, 32768),
+                fuzz_random.randrange(256),
+            )
+            for _ in range(fuzz_random.randrange(0, 60))
+        }
+        snapshot = Snapshot(
+            tick,
+            entities,
+            fuzz_random.choice(("", "won", "lost")),
+            fuzz_random.randrange(4),
+        )
+        decoded = read_snapshot_document(encode_snapshot_document(snapshot))
+        assert decoded.tick == tick
+        assert decoded.entities == entities
+        assert decoded.message_flag == snapshot.message_flag
+        assert decoded.player_health == snapshot.player_health
+
+
+@pytest.mark.parametrize("data", invalid_document_cases)
+def test_invalid_documents(data):
+    """
+    Check that data that is not a valid document raises ValueError.
+
+    Args:
+        data: Bytes that are not a valid document.
+    """
+    with pytest.raises(ValueError):
+        load_game(CaptainForever(WIDTH, HEIGHT), data)
+
+
+def test_fuzz_corrupt_documents():
+    """
+    Check that truncated or corrupted save files only ever raise
+    ValueError, and leave the game they were loaded into as it was.
+    """
+    data = save_game(_played_game(2, 200))
+    game = _played_game(4, 50)
+    before = save_game(game)
+    fuzz_random = random.Random(2)
+    for _ in range(300):
+        corrupt = bytearray(data[: fuzz_random.randrange(len(data) + 1)])
+        for _ in range(fuzz_random.randrange(4)):
+            if corrupt:
+                corrupt[fuzz_random.randrange(len(corrupt))] = (
+                    fuzz_random.getrandbits(8)
+                )
+        try:
+            load_game(game, bytes(corrupt))
+        except ValueError:
+            assert save_game(game) == before
+        else:
+            load_game(game, before)
+
+
+def test_throughput():
+    """
+    Check that a game with many bullets is saved at a million entities a
+    second and loaded at half that, since loading builds a Python object
+    for each one.
+    """
+    count = 100_000
+    game = CaptainForever(WIDTH, HEIGHT, seed=0)
+    game._bullets[:] = [
+        Bullet((index % WIDTH, index % HEIGHT), (1, 0))
+        for index in range(count)
+    ]
+    best_save = best_load = math.inf
+    for _ in range(3):
+        start = perf_counter()
+        data = save_game(game)
+        best_save = min(best_save, perf_counter() - start)
+        loaded = CaptainForever(WIDTH, HEIGHT)
+        start = perf_counter()
+        load_game(loaded, data)
+        best_load = min(best_load, perf_counter() - start)
+    assert len(loaded.bullets) == count
+    assert _world_state(loaded) == _world_state(game)
+    assert count / best_save > 1_000_000
+    assert count / best_load > 500_000
@@ -0,0 +1,95 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# pylint: disable=protected-access
+# Disabling pylint warnings related to PyGame that aren't valid
+# Disabling protected access because we need to check private vars to test
+# certain conditions
+"""
+Test the game server, its clients and the view that draws their snapshots.
+"""
+import asyncio
+import pygame
+from game import CaptainForever
+from controller import RemoteController
+from server import GameServer, SnapshotClient, measure
+from snapshots import capture_snapshot
+from view import SnapshotView
+
+pygame.init()
+WIDTH = 1082
+HEIGHT = 720
+screen = pygame.display.set_mode((WIDTH, HEIGHT))
+
+
+def test_remote_controller_fires_once_per_press():
+    """
+    Check that holding fire shoots once and steering buttons are applied.
+    """
+    game = CaptainForever(WIDTH, HEIGHT)
+    controller = RemoteController(game, WIDTH, HEIGHT)
+    controller.set_buttons(RemoteController.FIRE | RemoteController.UP)
+    for _ in range(3):
+        controller.maneuver_player_ship()
+    assert len(game.bullets) == 1
+    assert game.player_ship.velocity.length() > 0
+
+
+def test_client_follows_server():
+    """
+    Check that a client's decoded snapshots match the server's game and
+    that only the first snapshot is sent in full.
+    """
+
+    async def run():
+        server = GameServer()
+        port = await server.start()
+        client = SnapshotClient()
+        await client.connect(port=port)
+        while not server.sessions:
+            await asyncio.sleep(0.01)
+        session = server.sessions[0]
+        for _ in range(5):
+            server.tick()
+            await client.receive()
+            # let the server read the ack before the next tick
+            await asyncio.sleep(0.01)
+        expected = capture_snapshot(session.game, client.snapshot.tick)
+        full_snapshots = session.full_snapshots
+        await client.close()
+        await server.stop()
+        return client.snapshot, expected, full_snapshots
+
+    snapshot, expected, full_snapshots = asyncio.run(run())
+    assert snapshot.entities == expected.entities
+    assert full_snapshots == 1
+
+
+def test_measure():
+    """
+    Check that measuring reports bandwidth and tick times for every client.
+    """
+    report = asyncio.run(measure(clients=3, seconds=0.3))
+    assert report["clients"] == 3
+    assert report["full_snapshots"] >= 3
+    assert report["delta_snapshots"] > 0
+    assert report["bytes_per_client_per_second"] > 0
+    assert report["tick_ms"]["max"] >= report["tick_ms"]["mean"]
+
+
+def test_snapshot_view_draws():
+    """
+    Check that the snapshot view draws ships from a snapshot.
+    """
+
+    class Client:
+        """
+        Stand in for a SnapshotClient holding one snapshot.
+        """
+
+        snapshot = capture_snapshot(CaptainForever(WIDTH, HEIGHT), 1)
+
+    view = SnapshotView(Client(), screen)
+    view.draw()
+    Client.snapshot = capture_snapshot(CaptainForever(WIDTH, HEIGHT), 2)
+    view.draw()
+    assert len(view._particles) > 0
@@ -0,0 +1,143 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# pylint: disable=protected-access
+# Disabling pylint warnings related to PyGame that aren't valid
+# Disabling protected access because we need to modify private vars to test
+# certain conditions
+"""
+Test quantized snapshots and their full and delta encodings.
+"""
+import pytest
+import pygame
+from pygame import Vector2
+from game import CaptainForever
+from models import Bullet
+from snapshots import (
+    Snapshot,
+    capture_snapshot,
+    decode_input,
+    decode_subscribe,
+    decode_snapshot,
+    encode_input,
+    encode_snapshot,
+    encode_subscribe,
+    quantize_heading,
+    quantize_position,
+)
+
+pygame.init()
+WIDTH = 1082
+HEIGHT = 720
+screen = pygame.display.set_mode((WIDTH, HEIGHT))
+
+quantize_position_cases = [
+    # Check that positions are kept to 1/16 of a pixel and clamped
+    (10.0, 160),
+    (10.03, 160),
+    (-2.5, -40),
+    (5000, 32767),
+]
+
+quantize_heading_cases = [
+    # Check that headings count counter-clockwise from up in 256ths
+    (Vector2(0, -1), 0),
+    (Vector2(-1, 0), 64),
+    (Vector2(0, 1), 128),
+    (Vector2(1, 0), 192),
+    (Vector2(0), 0),
+]
+
+
+@pytest.mark.parametrize("value, quantized", quantize_position_cases)
+def test_quantize_position(value, quantized):
+    """
+    Check that coordinates are quantized to 1/16 pixels.
+
+    Args:
+        value: Float, coordinate in pixels.
+        quantized: Int, expected quantized coordinate.
+    """
+    assert quantize_position(value) == quantized
+
+
+@pytest.mark.parametrize("direction, heading", quantize_heading_cases)
+def test_quantize_heading(direction, heading):
+    """
+    Check that directions are quantized to 256 headings.
+
+    Args:
+        direction: Vector2, direction faced.
+        heading: Int, expected quantized heading.
+    """
+    assert quantize_heading(direction) == heading
+
+
+def test_full_snapshot_round_trip():
+    """
+    Check that a snapshot without a baseline decodes to the same entities.
+    """
+    game = CaptainForever(WIDTH, HEIGHT)
+    snapshot = capture_snapshot(game, 1)
+    decoded = decode_snapshot(encode_snapshot(snapshot), {})
+    assert decoded.tick == 1
+    assert decoded.entities == snapshot.entities
+    assert decoded.player_health == 3
+    assert len(decoded.entities) == 4
+
+
+def test_delta_snapshot():
+    """
+    Check that a delta only holds what changed and decodes on top of its
+    baseline, including new and removed entities.
+    """
+    game = CaptainForever(WIDTH, HEIGHT)
+    baseline = capture_snapshot(game, 1)
+    game._bullets.append(Bullet(Vector2(100, 100), Vector2(5, 0)))
+    removed = game.npc_ships.pop()
+    game.player_ship.rotate()
+    snapshot = capture_snapshot(game, 2)
+    delta = encode_snapshot(snapshot, baseline)
+    assert len(delta) < len(encode_snapshot(snapshot))
+    decoded = decode_snapshot(delta, {1: baseline})
+    assert decoded.entities == snapshot.entities
+    assert removed.entity_id not in decoded.entities
+
+
+def test_message_flag_is_sent():
+    """
+    Check that the end of game state reaches the client.
+    """
+    snapshot = Snapshot(7, {}, "lost", 0)
+    decoded = decode_snapshot(
+        encode_snapshot(snapshot, snapshot), {7: snapshot}
+    )
+    assert decoded.message_flag == "lost"
+
+
+def test_missing_baseline():
+    """
+    Check that a delta from a baseline the client lacks is rejected.
+    """
+    baseline = Snapshot(1, {5: (1, 0, 0, 0)})
+    delta = encode_snapshot(Snapshot(2, {}), baseline)
+    with pytest.raises(ValueError):
+        decode_snapshot(delta, {})
+
+
+def test_input_round_trip():
+    """
+    Check that acks and buttons survive encoding.
+    """
+    assert decode_input(encode_input(42, 0b10101)) == (42, 0b10101)
+
+
+def test_subscribe_round_trip():
+    """
+    Check that a spectator's camera region survives encoding.
+    """
+    assert decode_subscribe(encode_subscribe(-60, 0, 540, 360)) == (
+        -60,
+        0,
+        540,
+        360,
+    )
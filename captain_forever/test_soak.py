@@ -0,0 +1,139 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# pylint: disable=protected-access
+# Disabling pylint warnings related to PyGame that aren't valid
+# Disabling protected access because we need to modify private vars to test
+# certain conditions
+"""
+Test the bot controllers and the soak runner.
+"""
+import pytest
+import pygame
+from pygame import Vector2
+from game import CaptainForever
+from controller import AimBotController, ScriptedBotController, parse_script
+from models import NPCShip
+from soak import run_soak
+
+pygame.init()
+WIDTH = 1082
+HEIGHT = 720
+screen = pygame.display.set_mode((WIDTH, HEIGHT))
+
+script_cases = [
+    # Check that each line becomes a (ticks, turn, thrust, fire) step
+    (["30 right up"], [(30, 1, 1, False)]),
+    (
+        ["1 fire  # shoot once", "", "5 left down"],
+        [(1, 0, 0, True), (5, -1, -1, False)],
+    ),
+    (["# comment only", "2"], [(2, 0, 0, False)]),
+]
+
+bad_script_cases = [
+    # Check that malformed lines are rejected
+    ["right 30"],
+    ["0 fire"],
+    ["3 jump"],
+]
+
+aim_cases = [
+    # Check which way the aiming bot turns and when it shoots
+    (Vector2(400, 100), 0, 1, True),
+    (Vector2(700, 400), 1, 1, False),
+    (Vector2(100, 400), -1, 1, False),
+    (Vector2(400, 300), 0, -1, True),
+]
+
+
+@pytest.mark.parametrize("lines, steps", script_cases)
+def test_parse_script(lines, steps):
+    """
+    Check that bot scripts are parsed into steps.
+
+    Args:
+        lines: List of strings, lines of the script.
+        steps: List of tuples, expected steps.
+    """
+    assert parse_script(lines) == steps
+
+
+@pytest.mark.parametrize("lines", bad_script_cases)
+def test_parse_bad_script(lines):
+    """
+    Check that a malformed bot script raises a ValueError.
+
+    Args:
+        lines: List of strings, lines of the script.
+    """
+    with pytest.raises(ValueError):
+        parse_script(lines)
+
+
+def test_scripted_bot_loops():
+    """
+    Check that the scripted bot plays its steps in order and starts over,
+    firing once at the start of a firing step.
+    """
+    game = CaptainForever(WIDTH, HEIGHT)
+    bot = ScriptedBotController(
+        game, WIDTH, HEIGHT, parse_script(["2 right fire", "1 up"])
+    )
+    actions = [bot.choose_action(game.player_ship) for _ in range(4)]
+    assert actions == [(1, 0, True), (1, 0, False), (0, 1, False), (1, 0, True)]
+
+
+@pytest.mark.parametrize("target, turn, thrust, fire", aim_cases)
+def test_aim_bot(target, turn, thrust, fire):
+    """
+    Check that the aiming bot turns towards the nearest NPC ship, closes in
+    on it and shoots once lined up.
+
+    The player ship starts at (400, 400) facing up.
+
+    Args:
+        target: Vector2, position of the only NPC ship.
+        turn: Int, expected turn.
+        thrust: Int, expected thrust.
+        fire: Bool, whether the bot is expected to shoot.
+    """
+    game = CaptainForever(WIDTH, HEIGHT)
+    game._npc_ships = [NPCShip(target, "ship", game.npc_bullets.append)]
+    bot = AimBotController(game, WIDTH, HEIGHT)
+    assert bot.choose_action(game.player_ship) == (turn, thrust, fire)
+
+
+def test_soak_report():
+    """
+    Check that a short soak run reports its ticks and high-water marks.
+    """
+    report = run_soak("random", 300, seed=0, report_every=100)
+    assert report["ticks"] == 300
+    assert report["exception_count"] == 0
+    assert report["high_water"]["npc_ships"] >= 3
+    assert [sample["tick"] for sample in report["memory"]["samples"]] == [
+        0,
+        100,
+        200,
+        300,
+    ]
+
+
+def test_soak_records_exceptions(monkeypatch):
+    """
+    Check that an exception in a tick is recorded and the game restarted.
+
+    Args:
+        monkeypatch: Pytest fixture used to make the game logic fail.
+    """
+
+    def fail(_):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(CaptainForever, "_process_game_logic", fail)
+    report = run_soak("aim", 10, max_exceptions=3)
+    assert report["ticks"] == 3
+    assert report["exception_count"] == 3
+    assert len(report["exceptions"]) == 1
+    assert report["exceptions"][0]["type"] == "RuntimeError"
+    assert report["exceptions"][0]["count"] == 3
@@ -0,0 +1,117 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# pylint: disable=protected-access
+# Disabling pylint warnings related to PyGame that aren't valid
+# Disabling protected access because we need to check private vars to test
+# certain conditions
+"""
+Test the SoundBank channel pool and how the game triggers it.
+"""
+import pytest
+import pygame
+from game import CaptainForever
+from sounds import SoundBank
+
+pygame.init()
+WIDTH = 1082
+HEIGHT = 720
+screen = pygame.display.set_mode((WIDTH, HEIGHT))
+
+rate_limit_cases = [
+    # Check that an effect is only played once per interval
+    ("npc_laser", 119, None),
+    ("npc_laser", 120, 1),
+    ("player_laser", 59, None),
+    ("player_destroyed", 0, 1),
+]
+
+steal_cases = [
+    # Check that the lowest priority channel is stolen even if it is newer
+    ("player_laser", 1),
+    ("npc_destroyed", 1),
+    ("player_destroyed", 1),
+]
+
+
+def make_bank(channels=2):
+    """
+    Create a sound bank with a small channel pool, stopping sounds left
+    playing by earlier tests.
+
+    Args:
+        channels: Int, number of channels in the pool.
+
+    Returns:
+        A SoundBank instance.
+    """
+    sound_bank = SoundBank(channels=channels)
+    pygame.mixer.stop()
+    return sound_bank
+
+
+def test_effects_share_decoded_sounds():
+    """
+    Check that each sound file is decoded once however many effects use it.
+    """
+    sound_bank = make_bank()
+    sounds = {name: effect[0] for name, effect in sound_bank._effects.items()}
+    assert sounds["player_laser"] is sounds["npc_laser"]
+    assert sounds["npc_destroyed"] is sounds["player_destroyed"]
+    assert sounds["player_laser"] is not sounds["npc_destroyed"]
+
+
+@pytest.mark.parametrize("name, delay, channel", rate_limit_cases)
+def test_rate_limit(name, delay, channel):
+    """
+    Check that triggering an effect again too soon is ignored.
+
+    Args:
+        name: String, name of the effect.
+        delay: Int, ms between the two triggers.
+        channel: Int, channel the second trigger should play on, or None.
+    """
+    sound_bank = make_bank()
+    assert sound_bank.play(name, 1000) == 0
+    assert sound_bank.play(name, 1000 + delay) == channel
+    assert sound_bank.stats["rate_limited"] == int(channel is None)
+
+
+@pytest.mark.parametrize("name, channel", steal_cases)
+def test_voice_stealing(name, channel):
+    """
+    Check that a new sound takes the lowest priority, oldest busy channel.
+
+    Channel 0 plays an NPC explosion and channel 1 a newer NPC laser.
+
+    Args:
+        name: String, name of the effect played once both channels are busy.
+        channel: Int, channel the effect is expected to steal.
+    """
+    sound_bank = make_bank()
+    sound_bank.play("npc_destroyed", 1000)
+    sound_bank.play("npc_laser", 1100)
+    assert sound_bank.play(name, 1200) == channel
+    assert sound_bank.stats["stolen"] == 1
+
+
+def test_low_priority_sound_is_dropped():
+    """
+    Check that a sound cannot steal a channel from a higher priority one.
+    """
+    sound_bank = make_bank(1)
+    sound_bank.play("player_laser", 1000)
+    assert sound_bank.play("npc_laser", 1200) is None
+    assert sound_bank.stats["dropped"] == 1
+
+
+def test_game_plays_shots():
+    """
+    Check that shots fired by ships go through the sound bank.
+    """
+    sound_bank = make_bank(8)
+    game = CaptainForever(WIDTH, HEIGHT, sound_bank=sound_bank)
+    game.player_ship.shoot()
+    assert len(game.bullets) == 1
+    assert sound_bank.stats["played"] == 1
+    game.restart()
+    assert game.sound_bank is sound_bank
@@ -0,0 +1,62 @@
+"""
+Test the uniform grid used for spatial queries.
+"""
+import pytest
+from spatial import SpatialGrid
+
+POINTS = [("a", 10, 10), ("b", 130, 10), ("c", 300, 300), ("d", -20, 5)]
+
+query_cases = [
+    # Check a rectangle inside one cell
+    ((0, 0, 50, 50), ["a"]),
+    # Check a rectangle spanning cells, including negative coordinates
+    ((-50, 0, 200, 20), ["a", "b", "d"]),
+    # Check that the right and bottom edges are exclusive
+    ((0, 0, 130, 10), []),
+    ((0, 0, 130, 11), ["a"]),
+    # Check an empty area
+    ((500, 500, 100, 100), []),
+]
+
+
+@pytest.mark.parametrize("rectangle, keys", query_cases)
+def test_query(rectangle, keys):
+    """
+    Check that a query returns exactly the points inside the rectangle.
+
+    Args:
+        rectangle: Tuple of left, top, width and height.
+        keys: List of the keys expected.
+    """
+    grid = SpatialGrid(128)
+    for key, x, y in POINTS:
+        grid.insert(key, x, y)
+    assert sorted(grid.query(*rectangle)) == keys
+
+
+def test_clear():
+    """
+    Check that clearing the grid removes every point.
+    """
+    grid = SpatialGrid(128)
+    for key, x, y in POINTS:
+        grid.insert(key, x, y)
+    assert len(grid) == 4
+    grid.clear()
+    assert len(grid) == 0
+    assert not grid.query(-1000, -1000, 2000, 2000)
+
+
+def test_remove():
+    """
+    Check that a removed point is no longer found and removing a point that
+    is not there fails.
+    """
+    grid = SpatialGrid(128)
+    for key, x, y in POINTS:
+        grid.insert(key, x, y)
+    grid.remove("b", 130, 10)
+    assert len(grid) == 3
+    assert sorted(grid.query(-1000, -1000, 2000, 2000)) == ["a", "c", "d"]
+    with pytest.raises(KeyError):
+        grid.remove("b", 130, 10)
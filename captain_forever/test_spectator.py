@@ -0,0 +1,202 @@
+# pylint: disable=no-member
+# pylint: disable=no-name-in-module
+# pylint: disable=protected-access
+# Disabling pylint warnings related to PyGame that aren't valid
+# Disabling protected access because we need to check private vars to test
+# certain conditions
+"""
+Test the spectator service and the regions it encodes frames for.
+"""
+import asyncio
+import pytest
+import pygame
+from game import CaptainForever
+from snapshots import POSITION_SCALE
+from spectator import (
+    REGION_MARGIN,
+    SpectatorClient,
+    SpectatorService,
+    Subscriber,
+    snap_region,
+)
+
+pygame.init()
+WIDTH = 1082
+HEIGHT = 720
+screen = pygame.display.set_mode((WIDTH, HEIGHT))
+
+snap_region_cases = [
+    # Check that regions on the grid are kept
+    ((0, 0, 540, 360), (0, 0, 540, 360)),
+    # Check that regions off the grid are widened to it
+    ((10, 70, 500, 300), (0, 60, 540, 360)),
+    # Check that tiny regions still cover one grid cell
+    ((5, 5, 0, 0), (0, 0, 60, 60)),
+]
+
+
+class FakeTransport:
+    """
+    Transport reporting a set amount of unsent data.
+
+    Attributes:
+        buffered: Int, bytes the transport claims are unsent.
+    """
+
+    def __init__(self):
+        """
+        Initialize FakeTransport with nothing unsent.
+        """
+        self.buffered = 0
+
+    def get_write_buffer_size(self):
+        """
+        Return the bytes the transport claims are unsent.
+
+        Returns:
+            Int, buffered.
+        """
+        return self.buffered
+
+
+class FakeWriter:
+    """
+    Stream writer that keeps what is written to it.
+
+    Attributes:
+        transport: FakeTransport instance.
+        written: List of the bytes written.
+        closed: Bool, whether the writer was closed.
+    """
+
+    def __init__(self):
+        """
+        Initialize FakeWriter.
+        """
+        self.transport = FakeTransport()
+        self.written = []
+        self.closed = False
+
+    def write(self, data):
+        """
+        Keep written data.
+
+        Args:
+            data: Bytes written.
+        """
+        self.written.append(data)
+
+    def close(self):
+        """
+        Mark the writer closed.
+        """
+        self.closed = True
+
+
+@pytest.mark.parametrize("region, snapped", snap_region_cases)
+def test_snap_region(region, snapped):
+    """
+    Check that camera regions are widened to the region grid.
+
+    Args:
+        region: Tuple of a camera's left, top, width and height.
+        snapped: Tuple of the expected snapped region.
+    """
+    assert snap_region(*region) == snapped
+
+
+def test_spectators_share_region_frames():
+    """
+    Check that spectators of the same region get the same frames, that each
+    region is encoded once per tick and that only entities near a region
+    are sent for it.
+    """
+
+    async def run():
+        game = CaptainForever(WIDTH, HEIGHT, seed=0)
+        service = SpectatorService(game)
+        port = await service.start()
+        regions = [(0, 0, 540, 360), (0, 0, 540, 360), (540, 360, 542, 360)]
+        clients = [SpectatorClient() for _ in regions]
+        for client, region in zip(clients, regions):
+            await client.connect(region, port=port)
+        while len(service.subscribers) < 3 or len(service.regions) < 2:
+            await asyncio.sleep(0.01)
+        for _ in range(3):
+            game._process_game_logic()
+            service.broadcast()
+            for client in clients:
+                await client.receive()
+        await asyncio.gather(*(client.close() for client in clients))
+        await service.stop()
+        return service, clients, regions
+
+    service, clients, regions = asyncio.run(run())
+    assert list(service.region_counts) == [2, 2, 2]
+    assert clients[0].snapshot.entities == clients[1].snapshot.entities
+    for client, (left, top, width, height) in zip(clients, regions):
+        assert client.frames_received == 3
+        for _, x, y, _ in client.snapshot.entities.values():
+            assert (
+                left - REGION_MARGIN <= x / POSITION_SCALE
+                and x / POSITION_SCALE < left + width + REGION_MARGIN
+            )
+            assert (
+                top - REGION_MARGIN <= y / POSITION_SCALE
+                and y / POSITION_SCALE < top + height + REGION_MARGIN
+            )
+
+
+def test_delta_frames_are_shared():
+    """
+    Check that a spectator that got the previous frame is sent the shared
+    delta and a new spectator is sent the shared full frame.
+    """
+    service = SpectatorService(CaptainForever(WIDTH, HEIGHT, seed=0))
+    first = Subscriber(FakeWriter())
+    second = Subscriber(FakeWriter())
+    service.subscribe(first, 0, 0, WIDTH, HEIGHT)
+    service.broadcast()
+    service.subscribe(second, 0, 0, WIDTH, HEIGHT)
+    service.broadcast()
+    region = service.regions[first.region]
+    assert first._writer.written[-1] is region._delta
+    assert second._writer.written[-1] is region._full
+    assert len(first._writer.written[-1]) < len(second._writer.written[-1])
+
+
+def test_slow_spectator_downsampled_then_dropped():
+    """
+    Check that a spectator with unsent data is sent fewer frames, recovers
+    once it catches up and is dropped if it falls too far behind, while
+    other spectators keep getting every frame.
+    """
+    service = SpectatorService(
+        CaptainForever(WIDTH, HEIGHT, seed=0),
+        slow_buffer=100,
+        drop_buffer=1000,
+        max_stride=4,
+    )
+    slow = Subscriber(FakeWriter())
+    fast = Subscriber(FakeWriter())
+    service.subscribe(slow, 0, 0, WIDTH, HEIGHT)
+    service.subscribe(fast, 0, 0, WIDTH, HEIGHT)
+    slow._writer.transport.buffered = 500
+    for _ in range(4):
+        service.broadcast()
+    assert slow.stride == 4
+    assert service.downsampled == 2
+    assert slow.frames_sent == 0
+
+    slow._writer.transport.buffered = 0
+    for _ in range(8):
+        service.broadcast()
+    assert 0 < slow.frames_sent < 8
+    assert slow.stride == 1
+
+    slow._writer.transport.buffered = 5000
+    service.broadcast()
+    assert slow._writer.closed
+    assert slow.region is None
+    assert service.dropped == 1
+    assert fast.frames_sent == 13
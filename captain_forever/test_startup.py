@@ -0,0 +1,98 @@
+# pylint: disable=protected-access
+# Disabling protected access because we need to check private vars to test
+# certain conditions
+"""
+Test the startup timeline and guard the time to the first frame.
+"""
+import json
+import os
+import subprocess
+import sys
+from startup import PHASES, StartupTimeline, measure_startup
+from particles import ParticleSystem
+
+# generous enough for slow machines, a regression that loads every asset
+# or initializes every subsystem up front again still shows up in the
+# cold_start benchmark
+TIME_TO_FIRST_FRAME_BUDGET_MS = 2000
+
+
+def test_marks_and_durations():
+    """
+    Check that phases are marked once and durations add up to the total.
+    """
+    timeline = StartupTimeline(start=0)
+    timeline._marks = [("import", 10.0), ("display", 15.0)]
+    timeline.mark("import")
+    assert len(timeline.marks) == 2
+    assert timeline.durations() == [("import", 10.0), ("display", 5.0)]
+    assert timeline.elapsed("display") == 15.0
+    assert timeline.elapsed("assets") is None
+    assert "display" in timeline.report()
+
+
+def test_first_frame_hook_warms_up_after_marking(tmp_path):
+    """
+    Check that the hook marks the first frame before warming up and writes
+    the timeline.
+
+    Args:
+        tmp_path: Path, temporary directory from pytest.
+    """
+    timeline = StartupTimeline()
+    warmed = []
+    path = tmp_path / "startup.json"
+    hook = timeline.first_frame_hook(
+        str(path), (lambda: warmed.append(timeline.elapsed("first_frame")),)
+    )
+    assert not hook(1)
+    hook(2)
+    assert warmed == [timeline.elapsed("first_frame")]
+    with open(path, encoding="utf-8") as timeline_file:
+        marks = json.load(timeline_file)["marks"]
+    assert list(marks) == ["first_frame", "warm_up"]
+
+
+def test_particle_frames_are_lazy():
+    """
+    Check that a particle system only renders its frames when asked to or
+    when particles are first drawn.
+    """
+    particles = ParticleSystem()
+    assert particles._frames is None
+    particles.load_frames()
+    assert len(particles._frames) == 3 * ParticleSystem.FRAME_COUNT
+
+
+def test_optional_modules_are_not_imported():
+    """
+    Check that modules only some command line options use are not imported
+    when the game starts without them.
+    """
+    optional = ["flowfield", "modular", "scheduler", "sectors", "gcpolicy"]
+    optional += ["sounds", "serialization"]
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, cli; print(' '.join(sorted(sys.modules)))",
+        ],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env={**os.environ, "SDL_VIDEODRIVER": "dummy"},
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    imported = set(result.stdout.split())
+    assert "game" in imported
+    assert imported.isdisjoint(optional)
+
+
+def test_time_to_first_frame():
+    """
+    Check that every phase is reported in order and the first frame is on
+    screen within the budget.
+    """
+    marks = measure_startup(["--no-sound"])
+    assert list(marks) == list(PHASES)
+    assert marks["first_frame"] < TIME_TO_FIRST_FRAME_BUDGET_MS
@@ -0,0 +1,140 @@
+# pylint: disable=protected-access
+# Disabling protected access because we need to modify private vars to test
+# certain conditions
+"""
+Test the TimelineRecorder ring buffer and its Chrome trace export.
+"""
+import json
+from time import perf_counter, sleep
+import pytest
+from timeline import TimelineRecorder
+
+capacity_cases = [
+    # Check that the number of held events never exceeds the capacity
+    (4, 2, 4),
+    (4, 1, 2),
+    (16, 100, 16),
+]
+
+
+@pytest.mark.parametrize("capacity, spans, expected_length", capacity_cases)
+def test_ring_buffer_capacity(capacity, spans, expected_length):
+    """
+    Check that the ring buffer keeps at most capacity events.
+
+    Args:
+        capacity: Int, size of the ring buffer.
+        spans: Int, number of begin/end pairs recorded.
+        expected_length: Int, number of events expected to be held.
+    """
+    recorder = TimelineRecorder(capacity=capacity)
+    for _ in range(spans):
+        recorder.begin("move")
+        recorder.end("move")
+    assert len(recorder) == expected_length
+
+
+def test_disabled_recorder_records_nothing():
+    """
+    Check that a disabled recorder does not keep any events.
+    """
+    recorder = TimelineRecorder(enabled=False)
+    recorder.begin("move")
+    recorder.end("move")
+    recorder.begin_frame()
+    assert recorder.end_frame() is None
+    assert len(recorder) == 0
+
+
+def test_events_are_chrome_trace_format():
+    """
+    Check that exported events have the fields Chrome trace viewers need.
+    """
+    recorder = TimelineRecorder()
+    recorder.begin("load_sprite", "ship")
+    recorder.end("load_sprite")
+    begin_event, end_event = recorder.events()
+    assert begin_event["ph"] == "B" and end_event["ph"] == "E"
+    assert begin_event["args"] == {"detail": "ship"}
+    assert end_event["ts"] >= begin_event["ts"]
+    assert {"name", "ph", "ts", "pid", "tid"} <= set(begin_event)
+
+
+def test_orphaned_end_events_are_dropped():
+    """
+    Check that end events whose begin was overwritten are not exported.
+    """
+    recorder = TimelineRecorder(capacity=3)
+    recorder.begin("logic")
+    recorder.begin("move")
+    recorder.end("move")
+    recorder.end("logic")
+    names = [(event["name"], event["ph"]) for event in recorder.events()]
+    assert names == [("move", "B"), ("move", "E")]
+
+
+def test_over_budget_frame_dumps(tmp_path):
+    """
+    Check that a frame over budget writes one trace file during cooldown.
+
+    Args:
+        tmp_path: Pytest fixture, temporary directory for trace files.
+    """
+    recorder = TimelineRecorder(frame_budget_ms=0, output_dir=str(tmp_path))
+    recorder.begin_frame()
+    path = recorder.end_frame()
+    recorder.begin_frame()
+    assert recorder.end_frame() is None
+    with open(path, encoding="utf-8") as trace_file:
+        trace = json.load(trace_file)
+    assert trace["otherData"]["reason"] == "over_budget"
+    assert [event["name"] for event in trace["traceEvents"]] == [
+        "frame",
+        "frame",
+    ]
+
+
+def test_pacer_wait_is_not_over_budget(tmp_path):
+    """
+    Check that time a frame spent waiting for the frame pacer does not
+    count towards the frame budget.
+
+    Args:
+        tmp_path: Pytest fixture, temporary directory for trace files.
+    """
+    recorder = TimelineRecorder(frame_budget_ms=5, output_dir=str(tmp_path))
+    recorder.begin_frame()
+    start = perf_counter()
+    sleep(0.01)
+    recorder.add_wait(int((perf_counter() - start) * 1e9))
+    assert recorder.end_frame() is None
+    recorder.begin_frame()
+    sleep(0.01)
+    assert recorder.end_frame() is not None
+
+
+def test_last_frame_sums_spans():
+    """
+    Check that the spans of the last whole frame are summed by name, and
+    that a frame whose start was overwritten gives nothing.
+    """
+    recorder = TimelineRecorder(capacity=16)
+    for spans in (1, 2):
+        recorder.begin_frame()
+        for _ in range(spans):
+            recorder.begin("collision")
+            recorder.end("collision")
+        recorder.begin("draw")
+        recorder.end("draw")
+        recorder.end_frame()
+    recorder.instant("after")
+    last_frame = recorder.last_frame()
+    assert sorted(last_frame) == ["collision", "draw"]
+    assert all(duration >= 0 for duration in last_frame.values())
+    recorder = TimelineRecorder(capacity=4)
+    recorder.begin_frame()
+    for _ in range(2):
+        recorder.begin("move")
+        recorder.end("move")
+    recorder.end_frame()
+    assert recorder.last_frame() == {}
@@ -5,10 +5,34 @@
 # Disabling protected access because we need to modify private vars to test
 # certain conditions
 """
-Test the print_text function in the view class using pytest.
+Test the print_text function and render scaling in the view class using
+pytest.
 """
+import pytest
 import pygame
 import view
+from game import CaptainForever
+
+pygame.init()
+WIDTH = 1082
+HEIGHT = 720
+screen = pygame.display.set_mode((WIDTH, HEIGHT))
+
+# frame times drawn at 1.0 scale with a 10 ms budget, and the scale after
+scaler_cases = [
+    # Check that the scale holds until a whole window is averaged
+    ([20.0] * 29, 1.0),
+    # Check that a window over budget steps the scale down once
+    ([20.0] * 30, 0.75),
+    # Check that another window over budget steps it down again
+    ([20.0] * 60, 0.5),
+    # Check that it never goes below the smallest scale
+    ([20.0] * 120, 0.5),
+    # Check that a spike averaged with fast frames does not change it
+    ([100.0] + [6.0] * 29, 1.0),
+    # Check that plenty of time to spare steps it back up
+    ([20.0] * 60 + [2.0] * 30, 0.75),
+]
 
 
 def test_print_text():
@@ -46,3 +70,42 @@ def test_print_text():
             break
 
     assert found_expected_color, "Text not found in the rendered surface"
+
+
+@pytest.mark.parametrize("frame_times, scale", scaler_cases)
+def test_render_scaler(frame_times, scale):
+    """
+    Check that the render scale follows the time frames take to draw.
+
+    Args:
+        frame_times: List of floats, ms each frame took.
+        scale: Float, scale expected afterwards.
+    """
+    scaler = view.RenderScaler(budget_ms=10.0)
+    for frame_ms in frame_times:
+        scaler.update(frame_ms)
+    assert scaler.scale == scale
+
+
+def test_render_scaler_rejects_other_scales():
+    """
+    Check that only the supported scales can be chosen.
+    """
+    with pytest.raises(ValueError):
+        view.RenderScaler(0.6)
+
+
+def test_draw_at_lower_scale():
+    """
+    Check that a lower render scale draws offscreen at that scale and fills
+    the whole window when it is upscaled.
+    """
+    game = CaptainForever(WIDTH, HEIGHT, seed=0)
+    game_view = view.PyGameView(game, screen, max_fps=0, render_scale=0.5)
+    screen.fill((255, 0, 255))
+    game_view.draw()
+    assert game_view._targets[0.5].get_size() == (WIDTH // 2, HEIGHT // 2)
+    assert screen.get_at((WIDTH - 1, HEIGHT - 1))[:3] != (255, 0, 255)
+    full_view = view.PyGameView(game, screen, max_fps=0)
+    full_view.draw()
+    assert not full_view._targets
@@ -0,0 +1,344 @@
+"""
+Ring buffer of timeline events that can be exported as a Chrome trace.
+"""
+import json
+import os
+import threading
+from array import array
+from time import perf_counter_ns, strftime
+
+
+class TimelineRecorder:
+    """
+    Record begin and end events for game loop phases into a fixed size ring
+    buffer and export them as Chrome trace-event JSON for Perfetto or
+    chrome://tracing.
+
+    All storage is allocated up front, so memory stays capped however long
+    the game runs and recording an event only overwrites a few slots. That
+    keeps the recorder cheap enough to leave on all the time.
+
+    Attributes:
+        _enabled: Bool, whether events are currently being recorded.
+        _capacity: Int, number of events the ring buffer holds.
+        _names: List of strings, event names.
+        _phases: Bytearray, event types as Chrome trace phase characters.
+        _timestamps: Array of ints, perf_counter_ns value of each event.
+        _details: List, extra detail string for each event or None.
+        _count: Int, total number of events recorded so far.
+        _frame_budget_ms: Float, frames longer than this trigger a dump, or
+        None to only dump on demand.
+        _output_dir: String, directory that trace files are written to.
+        _dump_cooldown_ns: Int, minimum time between automatic dumps.
+        _last_dump_ns: Int, perf_counter_ns value of the last automatic dump.
+        _frame_start_ns: Int, perf_counter_ns value when the frame began.
+        _frame_wait_ns: Int, time the frame spent sleeping for the frame
+        pacer, which the budget check leaves out.
+    """
+
+    def __init__(
+        self,
+        capacity=16384,
+        enabled=True,
+        frame_budget_ms=None,
+        output_dir=".",
+        dump_cooldown_s=5.0,
+    ):
+        """
+        Initialize TimelineRecorder.
+
+        Args:
+            capacity: Int, number of events the ring buffer holds.
+            enabled: Bool, whether events are recorded from the start.
+            frame_budget_ms: Float, frames longer than this trigger a dump,
+            or None to only dump on demand.
+            output_dir: String, directory that trace files are written to.
+            dump_cooldown_s: Float, minimum seconds between automatic dumps
+            so a run of slow frames only writes one file.
+        """
+        self._enabled = enabled
+        self._capacity = capacity
+        self._names = [""] * capacity
+        self._phases = bytearray(b"i" * capacity)
+        self._timestamps = array("q", bytes(8 * capacity))
+        self._details = [None] * capacity
+        self._count = 0
+        self._frame_budget_ms = frame_budget_ms
+        self._output_dir = output_dir
+        self._dump_cooldown_ns = int(dump_cooldown_s * 1e9)
+        self._last_dump_ns = None
+        self._frame_start_ns = None
+        self._frame_wait_ns = 0
+
+    @property
+    def enabled(self):
+        """
+        Return _enabled.
+
+        Returns:
+            _enabled: Bool, whether events are currently being recorded.
+        """
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, value):
+        """
+        Set _enabled.
+
+        Args:
+            value: Bool, whether events should be recorded.
+        """
+        self._enabled = value
+
+    @property
+    def frame_budget_ms(self):
+        """
+        Return _frame_budget_ms.
+
+        Returns:
+            _frame_budget_ms: Float, frames longer than this trigger a dump.
+        """
+        return self._frame_budget_ms
+
+    @frame_budget_ms.setter
+    def frame_budget_ms(self, value):
+        """
+        Set _frame_budget_ms.
+
+        Args:
+            value: Float, frame time in ms above which a dump is written, or
+            None to only dump on demand.
+        """
+        self._frame_budget_ms = value
+
+    @property
+    def output_dir(self):
+        """
+        Return _output_dir.
+
+        Returns:
+            _output_dir: String, directory that trace files are written to.
+        """
+        return self._output_dir
+
+    @output_dir.setter
+    def output_dir(self, value):
+        """
+        Set _output_dir.
+
+        Args:
+            value: String, directory that trace files should be written to.
+        """
+        self._output_dir = value
+
+    def __len__(self):
+        """
+        Return the number of events currently held in the ring buffer.
+
+        Returns:
+            Int, number of events that would be exported.
+        """
+        return min(self._count, self._capacity)
+
+    def _record(self, name, phase, detail):
+        """
+        Write one event into the next slot of the ring buffer.
+
+        Args:
+            name: String, event name.
+            phase: Int, Chrome trace phase character as a byte.
+            detail: String shown as the event's argument, or None.
+        """
+        index = self._count % self._capacity
+        self._timestamps[index] = perf_counter_ns()
+        self._names[index] = name
+        self._phases[index] = phase
+        self._details[index] = detail
+        self._count += 1
+
+    def begin(self, name, detail=None):
+        """
+        Record the start of a span.
+
+        Args:
+            name: String, span name.
+            detail: String shown as the span's argument, or None.
+        """
+        if self._enabled:
+            self._record(name, 66, detail)  # b"B"
+
+    def end(self, name):
+        """
+        Record the end of a span.
+
+        Args:
+            name: String, span name matching an earlier begin.
+        """
+        if self._enabled:
+            self._record(name, 69, None)  # b"E"
+
+    def instant(self, name, detail=None):
+        """
+        Record a single point in time.
+
+        Args:
+            name: String, event name.
+            detail: String shown as the event's argument, or None.
+        """
+        if self._enabled:
+            self._record(name, 105, detail)  # b"i"
+
+    def begin_frame(self):
+        """
+        Record the start of a frame.
+        """
+        if self._enabled:
+            self._frame_start_ns = perf_counter_ns()
+            self._frame_wait_ns = 0
+            self._record("frame", 66, None)
+
+    def add_wait(self, duration_ns):
+        """
+        Note time the current frame spent sleeping rather than working, so a
+        frame capped by the frame pacer is not counted as over budget.
+
+        Args:
+            duration_ns: Int, time slept in ns.
+        """
+        self._frame_wait_ns += duration_ns
+
+    def end_frame(self):
+        """
+        Record the end of a frame and dump the buffer if the work in the
+        frame, without the time it waited for the frame pacer, went over
+        budget.
+
+        Returns:
+            String path of the trace file written, or None.
+        """
+        if not self._enabled:
+            return None
+        self._record("frame", 69, None)
+        if self._frame_budget_ms is None or self._frame_start_ns is None:
+            return None
+        now = perf_counter_ns()
+        work_ns = now - self._frame_start_ns - self._frame_wait_ns
+        if work_ns / 1e6 <= self._frame_budget_ms:
+            return None
+        if (
+            self._last_dump_ns is not None
+            and now - self._last_dump_ns < self._dump_cooldown_ns
+        ):
+            return None
+        self._last_dump_ns = now
+        return self.dump(reason="over_budget")
+
+    def events(self):
+        """
+        Return the buffered events as Chrome trace-event dicts, oldest first.
+
+        End events whose begin was overwritten by the ring buffer wrapping
+        around are dropped so the trace nests correctly.
+
+        Returns:
+            List of dicts in Chrome trace-event format.
+        """
+        pid = os.getpid()
+        tid = threading.get_ident()
+        first = max(0, self._count - self._capacity)
+        open_spans = {}
+        trace_events = []
+        for count in range(first, self._count):
+            index = count % self._capacity
+            name = self._names[index]
+            phase = chr(self._phases[index])
+            if phase == "B":
+                open_spans[name] = open_spans.get(name, 0) + 1
+            elif phase == "E":
+                if not open_spans.get(name):
+                    continue
+                open_spans[name] -= 1
+            event = {
+                "name": name,
+                "ph": phase,
+                "ts": self._timestamps[index] / 1000,
+                "pid": pid,
+                "tid": tid,
+            }
+            if phase == "i":
+                event["s"] = "t"
+            if self._details[index] is not None:
+                event["args"] = {"detail": self._details[index]}
+            trace_events.append(event)
+        return trace_events
+
+    def last_frame(self):
+        """
+        Sum the spans of the last finished frame by name.
+
+        Returns:
+            Dict, maps span names to their total duration in ms, empty if
+            no whole frame is buffered.
+        """
+        durations = {}
+        ends = {}
+        in_frame = False
+        for count in range(
+            self._count - 1, max(0, self._count - self._capacity) - 1, -1
+        ):
+            index = count % self._capacity
+            name = self._names[index]
+            phase = self._phases[index]
+            if name == "frame":
+                if phase == 69 and not in_frame:  # b"E"
+                    in_frame = True
+                elif phase == 66 and in_frame:  # b"B"
+                    return durations
+            elif in_frame and phase == 69:
+                ends.setdefault(name, []).append(self._timestamps[index])
+            elif in_frame and phase == 66 and ends.get(name):
+                durations[name] = (
+                    durations.get(name, 0.0)
+                    + (ends[name].pop() - self._timestamps[index]) / 1e6
+                )
+        # the start of the frame was overwritten
+        return {}
+
+    def dump(self, path=None, reason="on_demand"):
+        """
+        Write the buffered events to a Chrome trace JSON file.
+
+        Args:
+            path: String, file to write to. Defaults to a timestamped file in
+            the output directory.
+            reason: String, stored in the trace metadata to say why it was
+            written.
+
+        Returns:
+            String path of the trace file written.
+        """
+        if path is None:
+            path = os.path.join(
+                self._output_dir,
+                f"trace-{strftime('%Y%m%d-%H%M%S')}-{self._count}.json",
+            )
+        trace = {
+            "traceEvents": self.events(),
+            "displayTimeUnit": "ms",
+            "otherData": {"reason": reason},
+        }
+        with open(path, "w", encoding="utf-8") as trace_file:
+            json.dump(trace, trace_file)
+        return path
+
+    def clear(self):
+        """
+        Drop every buffered event.
+        """
+        self._count = 0
+        self._frame_start_ns = None
+        self._frame_wait_ns = 0
+
+
+# shared recorder so game code and asset loading write to the same timeline
+recorder = TimelineRecorder()
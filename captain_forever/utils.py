@@ -5,10 +5,17 @@
 Utility functions that support gameplay.
 """
 import random
+from pygame import Color, Surface, SRCALPHA, BLEND_ADD
 from pygame.image import load
-from pygame.transform import scale
+from pygame.mask import from_surface
+from pygame.transform import rotozoom, scale, smoothscale
 from pygame.math import Vector2
+from assets import registry
+from timeline import recorder
 
+# gameplay draws random numbers from a generator instead of the global random
+# module, so a game can own a seeded generator and play out identically
+rng = random.Random()
 
 # stores horizontal and vertical dimensions of pngs that need to be scaled
 dimensions = {
@@ -16,30 +23,191 @@ dimensions = {
     "space_background": (1000, 800),
     "fire": (100, 100),
     "background": (1082, 720),
+    "asteroid": (60, 60),
 }
 
 
-def load_sprite(name, with_alpha=True, with_scaling=False):
+def load_sprite(name, with_alpha=True, with_scaling=False, extension="png"):
     """
     Load a sprite onto the PyGame surface.
 
+    Sprites are cached in the surface registry, so every object using the
+    same sprite shares one surface and it must not be drawn on. Use
+    tint_sprite for a recolored copy.
+
     Args:
         name: String, representing name of png to load.
         with_alpha: Bool, whether to make image transparent.
         with_scaling: Bool, represents whether image should be scald.
+        extension: String, file extension of the image.
 
     Returns:
         A sprite with properties corresponding to arguments.
     """
+    is_scaled = name in dimensions and with_scaling is True
+    key = (name, with_alpha, is_scaled, extension)
+    cached_sprite = registry.get("sprites", key)
+    if cached_sprite is not None:
+        return cached_sprite
     # os.chdir("C:/Users/jbrown/Desktop/captain_forever/Captain_Forever_Project")
-    loaded_sprite = load(f"../assets/sprites/{name}.png")
-    if name in dimensions and with_scaling is True:
+    recorder.begin("load_sprite", name)
+    loaded_sprite = load(f"../assets/sprites/{name}.{extension}")
+    if is_scaled:
         loaded_sprite = scale(
             loaded_sprite, (dimensions[name][0], dimensions[name][1])
         )
     if with_alpha:
-        return loaded_sprite.convert_alpha()
-    return loaded_sprite.convert()
+        loaded_sprite = loaded_sprite.convert_alpha()
+    else:
+        loaded_sprite = loaded_sprite.convert()
+    recorder.end("load_sprite")
+    variant = "scaled" if is_scaled else "original"
+    return registry.put("sprites", key, name, variant, loaded_sprite)
+
+
+def tint_sprite(name, color, with_alpha=True, with_scaling=True):
+    """
+    Return a copy of a sprite with a color added to every pixel.
+
+    The tinted copy is cached in the surface registry and shared by every
+    object asking for the same sprite and color.
+
+    Args:
+        name: String, representing name of png to load.
+        color: String, name of the PyGame color to add.
+        with_alpha: Bool, whether to make image transparent.
+        with_scaling: Bool, represents whether image should be scaled.
+
+    Returns:
+        A recolored copy of the sprite.
+    """
+    key = (name, color, with_alpha, with_scaling)
+    tinted_sprite = registry.get("tints", key)
+    if tinted_sprite is not None:
+        return tinted_sprite
+    tinted_sprite = load_sprite(name, with_alpha, with_scaling).copy()
+    # creating new surface to recolor sprite
+    recolor_surface = Surface(tinted_sprite.get_size(), SRCALPHA)
+    recolor_surface.fill(Color(color))
+    tinted_sprite.blit(recolor_surface, (0, 0), special_flags=BLEND_ADD)
+    return registry.put("tints", key, name, color, tinted_sprite)
+
+
+def rotate_sprite(sprite, sprite_key, angle, zoom=1.0):
+    """
+    Return a sprite rotated counter-clockwise by a whole number of degrees.
+
+    Rotations are cached in the surface registry by sprite, angle and zoom,
+    so a ship only pays for rotozoom the first time it faces a new heading.
+
+    Args:
+        sprite: PyGame surface to rotate.
+        sprite_key: Tuple of the asset name and variant identifying sprite.
+        angle: Float, degrees to rotate, rounded to the nearest degree.
+        zoom: Float, factor to scale the sprite by as it is rotated.
+
+    Returns:
+        The rotated sprite.
+    """
+    degrees = round(angle) % 360
+    key = (sprite_key, degrees) if zoom == 1 else (sprite_key, degrees, zoom)
+    rotated_sprite = registry.get("rotations", key)
+    if rotated_sprite is not None:
+        return rotated_sprite
+    asset, variant = sprite_key
+    return registry.put(
+        "rotations",
+        key,
+        asset,
+        f"{variant} rotated" if zoom == 1 else f"{variant} rotated x{zoom}",
+        rotozoom(sprite, degrees, zoom),
+    )
+
+
+def zoom_sprite(sprite, sprite_key, zoom):
+    """
+    Return a sprite scaled by a factor, for drawing at a lower resolution.
+
+    Scaled sprites are cached in the surface registry by sprite and zoom.
+    Sprites without a key are scaled every time.
+
+    Args:
+        sprite: PyGame surface to scale.
+        sprite_key: Tuple of the asset name and variant identifying sprite,
+        or None.
+        zoom: Float, factor to scale the sprite by.
+
+    Returns:
+        The scaled sprite, or sprite itself if zoom is 1.
+    """
+    if zoom == 1:
+        return sprite
+    size = (
+        max(1, round(sprite.get_width() * zoom)),
+        max(1, round(sprite.get_height() * zoom)),
+    )
+    if sprite_key is None:
+        return smoothscale(sprite, size)
+    key = (sprite_key, zoom)
+    zoomed_sprite = registry.get("zooms", key)
+    if zoomed_sprite is not None:
+        return zoomed_sprite
+    asset, variant = sprite_key
+    return registry.put(
+        "zooms", key, asset, f"{variant} x{zoom}", smoothscale(sprite, size)
+    )
+
+
+def sprite_mask(sprite, sprite_key):
+    """
+    Return the collision mask of an unrotated sprite.
+
+    Args:
+        sprite: PyGame surface.
+        sprite_key: Tuple of the asset name and variant identifying sprite.
+
+    Returns:
+        A pygame.mask.Mask of the sprite's opaque pixels.
+    """
+    key = (sprite_key, None)
+    mask = registry.get("masks", key)
+    if mask is not None:
+        return mask
+    asset, variant = sprite_key
+    return registry.put(
+        "masks", key, asset, f"{variant} mask", from_surface(sprite)
+    )
+
+
+def rotated_mask(sprite, sprite_key, angle):
+    """
+    Return the collision mask of a sprite rotated the way rotate_sprite
+    rotates it.
+
+    Masks are cached next to the rotations, under the same key, so a ship
+    only builds the mask of a heading once.
+
+    Args:
+        sprite: PyGame surface to rotate.
+        sprite_key: Tuple of the asset name and variant identifying sprite.
+        angle: Float, degrees to rotate, rounded to the nearest degree.
+
+    Returns:
+        A pygame.mask.Mask of the rotated sprite's opaque pixels.
+    """
+    degrees = round(angle) % 360
+    key = (sprite_key, degrees)
+    mask = registry.get("masks", key)
+    if mask is not None:
+        return mask
+    asset, variant = sprite_key
+    return registry.put(
+        "masks",
+        key,
+        asset,
+        f"{variant} rotated mask",
+        from_surface(rotate_sprite(sprite, sprite_key, degrees)),
+    )
 
 
 def wrap_position(position, width, height):
@@ -58,34 +226,40 @@ def wrap_position(position, width, height):
     return Vector2(x_coordinate % width, y_coordinate % height)
 
 
-def get_random_position(width, height):
+def get_random_position(width, height, generator=None):
     """
     Returns a vector pointing in a random direction.
 
     Args:
         width: Int, represents width of screen.
         height: Int, represents height of screen.
+        generator: random.Random instance to draw from, the shared rng if
+        not given.
 
     Returns:
         Vector2 2 item position vector, at a random position.
     """
+    generator = generator or rng
     return Vector2(
-        random.randrange(width),
-        random.randrange(height),
+        generator.randrange(width),
+        generator.randrange(height),
     )
 
 
-def get_random_velocity(min_speed, max_speed):
+def get_random_velocity(min_speed, max_speed, generator=None):
     """
     Generates a randomly oriented vector with magnitude between min and max speed.
 
     Args:
         min_speed: Int, min speed (magnitude of velocity) in pix/second.
         max_speed: Int, max speed (magnitude of velocity) in pix/second.
+        generator: random.Random instance to draw from, the shared rng if
+        not given.
 
     Returns:
         A Vector2 that has been randomly generated.
     """
-    speed = random.randint(min_speed, max_speed)
-    angle = random.randrange(0, 360)
+    generator = generator or rng
+    speed = generator.randint(min_speed, max_speed)
+    angle = generator.randrange(0, 360)
     return Vector2(speed, 0).rotate(angle)
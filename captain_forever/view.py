@@ -5,10 +5,135 @@
 Define Captain Forever view class.
 """
 from abc import ABC, abstractmethod
+from collections import deque
+from time import perf_counter
 import pygame
 from pygame.math import Vector2
 from pygame import Color
-from utils import load_sprite
+from utils import load_sprite, rotate_sprite, tint_sprite, zoom_sprite
+from pacing import FramePacer
+from particles import ParticleSystem
+from game import END_GAME_MESSAGE
+from snapshots import POSITION_SCALE, heading_angle
+
+# fonts are only needed once text is shown, so they are created on first use
+_fonts = {}
+
+PAUSED_MESSAGE = "Paused \n Press P to carry on"
+BACKGROUND_KEY = ("background", "scaled opaque")
+# scales the game can be rendered at, relative to the window
+RENDER_SCALES = (1.0, 0.75, 0.5)
+
+
+def get_font(size):
+    """
+    Return the default font at a size, creating it the first time.
+
+    The font module is initialized here rather than at startup, since most
+    frames draw no text.
+
+    Args:
+        size: Int, height of the font in pixels.
+
+    Returns:
+        A pygame.font.Font instance.
+    """
+    if not pygame.font.get_init():
+        # fonts from before a pygame.quit can no longer render
+        _fonts.clear()
+        pygame.font.init()
+    font = _fonts.get(size)
+    if font is None:
+        font = _fonts[size] = pygame.font.Font(None, size)
+    return font
+
+
+class RenderScaler:
+    """
+    Choose the scale to render at from how long recent frames took to draw.
+
+    The scale steps down one of RENDER_SCALES when the average over a
+    window of frames is over budget, and back up when it is under half of
+    the budget, so it settles instead of switching every frame.
+
+    Attributes:
+        _index: Int, index into RENDER_SCALES of the current scale.
+        _budget_ms: Float, most time drawing a frame should take in ms, or
+        None to keep the scale fixed.
+        _frame_times: Deque, ms taken to draw recent frames at the current
+        scale.
+        _changes: Int, number of times the scale changed.
+    """
+
+    def __init__(self, scale=1.0, budget_ms=None, window=30):
+        """
+        Initialize RenderScaler.
+
+        Args:
+            scale: Float, one of RENDER_SCALES to start at.
+            budget_ms: Float, most time drawing a frame should take in ms,
+            or None to keep the scale fixed.
+            window: Int, number of frames averaged before the scale
+            changes.
+
+        Raises:
+            ValueError: If scale is not one of RENDER_SCALES.
+        """
+        if scale not in RENDER_SCALES:
+            raise ValueError(
+                f"Render scale must be one of {RENDER_SCALES}, not {scale}"
+            )
+        self._index = RENDER_SCALES.index(scale)
+        self._budget_ms = budget_ms
+        self._frame_times = deque(maxlen=window)
+        self._changes = 0
+
+    @property
+    def scale(self):
+        """
+        Return the current scale.
+
+        Returns:
+            Float, one of RENDER_SCALES.
+        """
+        return RENDER_SCALES[self._index]
+
+    @property
+    def changes(self):
+        """
+        Return _changes.
+
+        Returns:
+            _changes: Int, number of times the scale changed.
+        """
+        return self._changes
+
+    def update(self, frame_ms):
+        """
+        Record how long a frame took to draw and change scale if needed.
+
+        Args:
+            frame_ms: Float, ms the frame took to draw and present.
+
+        Returns:
+            Float, the scale to draw the next frame at.
+        """
+        if self._budget_ms is None:
+            return self.scale
+        frame_times = self._frame_times
+        frame_times.append(frame_ms)
+        if len(frame_times) < frame_times.maxlen:
+            return self.scale
+        average = sum(frame_times) / len(frame_times)
+        if average > self._budget_ms and self._index < len(RENDER_SCALES) - 1:
+            self._index += 1
+        elif average < self._budget_ms / 2 and self._index > 0:
+            self._index -= 1
+        else:
+            return self.scale
+        self._changes += 1
+        frame_times.clear()
+        return self.scale
 
 
 class CaptainForeverView(ABC):
@@ -53,40 +178,258 @@ class PyGameView(CaptainForeverView):
     Display the game elements using Pygame.
     """
 
-    def __init__(self, game, screen):
+    def __init__(
+        self,
+        game,
+        screen,
+        max_fps=60,
+        pacer=None,
+        render_scale=1.0,
+        render_budget_ms=None,
+        smooth=False,
+    ):
         """
         Initialize the PyGame Display.
 
+        Args:
+            game: An instance of the game class to display.
+            screen: PyGame surface display instance to draw on.
+            max_fps: Int, frame rate the view is capped to, 0 for uncapped.
+            Only used if pacer is not given.
+            pacer: FramePacer instance told when each frame is presented,
+            one capped to max_fps is created if not given.
+            render_scale: Float, one of RENDER_SCALES, fraction of the
+            window size the game is drawn at before it is upscaled.
+            render_budget_ms: Float, most time drawing a frame should take
+            in ms, beyond which the render scale is lowered, or None to
+            keep it fixed.
+            smooth: Bool, whether to upscale with smoothscale rather than
+            scale.
+
         Attributes:
-            _clock: PyGame clock instance, tracks game time.
+            _pacer: FramePacer instance, caps the frame rate and measures
+            input latency.
             _screen: PyGame surface display instance, surface to draw game
             objects.
             _background: PyGame surface, background of game drawn each frame.
-            _font: PyGame font instance, controls font of endgame message.
+            _scaler: RenderScaler instance, picks the scale to draw at.
+            _smooth: Bool, whether to upscale with smoothscale.
+            _targets: Dict, maps scales below 1 to the offscreen surfaces
+            the game is drawn on at that scale.
+            _stars: Tuple of the sector and scale the star layers were
+            drawn for and the surface they were drawn on, or None.
         """
         super().__init__(game)
         self._screen = screen
         self._background = load_sprite("background", False, True)
-        self._clock = pygame.time.Clock()
-        self._font = pygame.font.Font(None, 64)
+        self._pacer = pacer if pacer is not None else FramePacer(max_fps)
+        self._scaler = RenderScaler(render_scale, render_budget_ms)
+        self._smooth = smooth
+        self._targets = {}
+        self._stars = None
+
+    @property
+    def pacer(self):
+        """
+        Return _pacer.
+
+        Returns:
+            _pacer: FramePacer instance, caps the frame rate and measures
+            input latency.
+        """
+        return self._pacer
+
+    @property
+    def scaler(self):
+        """
+        Return _scaler.
+
+        Returns:
+            _scaler: RenderScaler instance, picks the scale to draw at.
+        """
+        return self._scaler
+
+    def _target(self, scale):
+        """
+        Return the surface to draw the game on at a scale.
+
+        Args:
+            scale: Float, one of RENDER_SCALES.
+
+        Returns:
+            The screen if scale is 1, otherwise an offscreen surface of the
+            screen's format at that fraction of its size.
+        """
+        if scale == 1:
+            return self._screen
+        target = self._targets.get(scale)
+        if target is None:
+            width, height = self._screen.get_size()
+            target = self._targets[scale] = pygame.Surface(
+                (round(width * scale), round(height * scale)), 0, self._screen
+            )
+        return target
+
+    def _star_surface(self, world, scale):
+        """
+        Return the star layers of the current sector, drawn once per sector
+        and scale.
+
+        Args:
+            world: SectorWorld instance the game is played in.
+            scale: Float, one of RENDER_SCALES.
+
+        Returns:
+            A surface the size of the target with the stars drawn on black,
+            which is its colorkey.
+        """
+        key = (world.sector, scale)
+        if self._stars is None or self._stars[0] != key:
+            surface = pygame.Surface(self._target(scale).get_size())
+            surface.set_colorkey((0, 0, 0))
+            for radius, brightness, positions in world.stars():
+                color = (brightness, brightness, brightness)
+                for x, y in positions:
+                    pygame.draw.circle(
+                        surface,
+                        color,
+                        (round(x * scale), round(y * scale)),
+                        max(1, round(radius * scale)),
+                    )
+            self._stars = (key, surface)
+        return self._stars[1]
 
     def draw(self):
         """
         draws the game objects onto the display
         """
+        start = perf_counter()
         game = self.game
-        game.counter += 1
-        if game.counter % 50 == 0 and game.fires:
-            game.fires.pop()
-        self._screen.blit(self._background, (0, 0))
+        profiler = game.profiler
+        scale = self._scaler.scale
+        target = self._target(scale)
+        profiler.start("draw")
+        profiler.start("background")
+        target.blit(
+            zoom_sprite(self._background, BACKGROUND_KEY, scale), (0, 0)
+        )
+        if game.world is not None:
+            target.blit(self._star_surface(game.world, scale), (0, 0))
+        profiler.stop("background")
+        profiler.start("sprites")
         for game_object in game.get_game_objects():
-            game_object.draw(self._screen)
+            game_object.draw(target, scale)
+        game.particles.draw(target, scale)
+        profiler.stop("sprites")
+        if target is not self._screen:
+            profiler.start("upscale")
+            upscale = (
+                pygame.transform.smoothscale
+                if self._smooth
+                else pygame.transform.scale
+            )
+            upscale(target, self._screen.get_size(), self._screen)
+            profiler.stop("upscale")
 
+        profiler.start("text")
         if game.message:
-            print_text(self._screen, game.message, self._font)
+            print_text(self._screen, game.message, get_font(64))
+        elif game.paused:
+            print_text(self._screen, PAUSED_MESSAGE, get_font(64))
+        profiler.stop("text")
+        profiler.stop("draw")
 
+        if profiler.enabled:
+            draw_profiler_overlay(
+                self._screen,
+                profiler,
+                get_font(20),
+                input_latency=self._pacer.latency_summary(),
+            )
+
+        profiler.start("flip")
+        pygame.display.flip()
+        profiler.stop("flip")
+        self._scaler.update((perf_counter() - start) * 1000)
+        self._pacer.present()
+
+
+class SnapshotView(CaptainForeverView):
+    """
+    Display the game from the snapshots a network client receives.
+
+    The client is the view's game: anything with a snapshot attribute that
+    holds the latest Snapshot, or None before the first one arrives. Ships
+    that disappear from one snapshot to the next are drawn exploding.
+
+    Attributes:
+        _screen: PyGame surface display instance, surface to draw on.
+        _background: PyGame surface, background drawn each frame.
+        _sprites: Tuple of (sprite, sprite key) pairs indexed by entity kind,
+        with None as the key for sprites that are not rotated.
+        _particles: ParticleSystem instance, explosions currently playing.
+        _last_entities: Dict, entities of the last snapshot drawn.
+    """
+
+    def __init__(self, client, screen):
+        """
+        Initialize SnapshotView.
+
+        Args:
+            client: Object with a snapshot attribute to display.
+            screen: PyGame surface display instance to draw on.
+        """
+        super().__init__(client)
+        self._screen = screen
+        self._background = load_sprite("background", False, True)
+        # indexed by the kinds in snapshots.KINDS
+        self._sprites = (
+            (load_sprite("player", True, False), ("player", "original")),
+            (tint_sprite("ship", "green"), ("ship", "green")),
+            (load_sprite("bullet"), None),
+            (load_sprite("bullet"), None),
+            (load_sprite("fire", True, True), None),
+        )
+        self._particles = ParticleSystem()
+        self._last_entities = {}
+
+    def draw(self):
+        """
+        Draw the latest snapshot onto the display.
+        """
+        snapshot = self.game.snapshot
+        self._screen.blit(self._background, (0, 0))
+        if snapshot is not None:
+            entities = snapshot.entities
+            for entity_id, (kind, x, y, _) in self._last_entities.items():
+                if kind < 2 and entity_id not in entities:
+                    self._particles.emit_explosion(
+                        (x / POSITION_SCALE, y / POSITION_SCALE)
+                    )
+            self._last_entities = entities
+            for kind, x, y, heading in entities.values():
+                sprite, sprite_key = self._sprites[kind]
+                if sprite_key is not None:
+                    sprite = rotate_sprite(
+                        sprite, sprite_key, heading_angle(heading)
+                    )
+                width, height = sprite.get_size()
+                self._screen.blit(
+                    sprite,
+                    (
+                        x / POSITION_SCALE - width / 2,
+                        y / POSITION_SCALE - height / 2,
+                    ),
+                )
+            if snapshot.message_flag:
+                print_text(
+                    self._screen,
+                    END_GAME_MESSAGE.format(snapshot.message_flag),
+                    get_font(64),
+                )
+        self._particles.update()
+        self._particles.draw(self._screen)
         pygame.display.flip()
-        self._clock.tick(60)
 
 
 def print_text(surface, text, font, color=Color("tomato")):
@@ -128,3 +471,94 @@ def print_text(surface, text, font, color=Color("tomato")):
         rect.center = Vector2(surface.get_size()) / 2
 
         surface.blit(text_surface, rect)
+
+
+def draw_profiler_overlay(
+    surface,
+    profiler,
+    font,
+    color=Color("white"),
+    budget_ms=1000 / 60,
+    input_latency=None,
+):
+    """
+    Blit rolling phase timings, entity counts, surface memory and a frame
+    time sparkline to the top left corner of a surface.
+
+    Args:
+        surface: An instance of a PyGame surface.
+        profiler: FrameProfiler instance with the timings to show.
+        font: PyGame font object used for the overlay text.
+        color: A PyGame color object, used for the overlay text.
+        budget_ms: Float, frame time drawn as the sparkline's middle line.
+        input_latency: Tuple of the average and worst input-to-photon
+        latency in ms, or None to leave the line out.
+    """
+    # sub-phases are indented under the phase they are part of
+    sub_phases = (
+        "move",
+        "cull",
+        "collision",
+        "particles",
+        "background",
+        "sprites",
+        "text",
+    )
+    lines = []
+    for phase in profiler.PHASES:
+        indent = "    " if phase in sub_phases else ""
+        lines.append(f"{indent}{phase}: {profiler.average(phase):.2f} ms")
+    lines.append(
+        " ".join(
+            f"{kind}={count}" for kind, count in profiler.entity_counts.items()
+        )
+    )
+    lines.append(
+        "surfaces "
+        + " ".join(
+            f"{cache}={size / 2**20:.1f}MB"
+            for cache, size in profiler.surface_usage.items()
+        )
+    )
+    if input_latency is not None:
+        lines.append(
+            f"input latency: {input_latency[0]:.1f} ms avg,"
+            f" {input_latency[1]:.1f} ms worst"
+        )
+
+    line_surfaces = [font.render(line, True, color) for line in lines]
+    line_height = font.get_linesize()
+    spark_width = 240
+    spark_height = 40
+    panel_width = max(
+        spark_width, *(line.get_width() for line in line_surfaces)
+    )
+    panel = pygame.Surface(
+        (panel_width + 10, line_height * len(lines) + spark_height + 15),
+        pygame.SRCALPHA,
+    )
+    panel.fill((0, 0, 0, 170))
+    for index, line_surface in enumerate(line_surfaces):
+        panel.blit(line_surface, (5, 5 + index * line_height))
+
+    # sparkline of frame times, scaled so the budget sits halfway up
+    top = 10 + line_height * len(lines)
+    frame_times = list(profiler.frame_times)[-spark_width:]
+    pygame.draw.line(
+        panel,
+        Color("gray40"),
+        (5, top + spark_height // 2),
+        (5 + spark_width, top + spark_height // 2),
+    )
+    if len(frame_times) > 1:
+        points = [
+            (
+                5 + index,
+                top
+                + spark_height
+                - min(frame_time / (budget_ms * 2), 1.0) * spark_height,
+            )
+            for index, frame_time in enumerate(frame_times)
+        ]
+        pygame.draw.lines(panel, Color("yellow"), False, points)
+    surface.blit(panel, (0, 0))